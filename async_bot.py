@@ -0,0 +1,174 @@
+"""
+Асинхронный режим работы бота VKMatchSensei.
+
+Этот модуль содержит асинхронную реализацию бота, в которой longpoll,
+запросы к VK API и отправка сообщений выполняются через `asyncio`.
+Один процесс может обслуживать тысячи диалогов, ожидающих ответа VK,
+без отдельного потока на каждый запрос.
+
+### Классы:
+- `AsyncVKMatchSenseiBot`: Асинхронная версия `VKMatchSenseiBot`.
+
+### Пример использования:
+```python
+if __name__ == "__main__":
+    asyncio.run(AsyncVKMatchSenseiBot(<VK_GROUP_TOKEN>).run())
+```
+"""
+
+import asyncio
+import os
+from typing import Callable
+
+from dotenv import load_dotenv
+
+from config.bot_config import COMMANDS_CONFIG, KEYBOARD_CONFIG
+from db.async_session import async_engine
+from db.managers.schema_manager import DatabaseSchemaManager
+from db.managers.user_cache import cache_listener
+from handlers.async_command_handler import AsyncCommandHandler
+from handlers.async_search_handler import async_search_scheduler
+from handlers.command_router import CommandRouter, RouteContext
+from handlers.search_settings_handler import SETTINGS_BYPASS_COMMANDS
+from handlers.snapshot_crawler import snapshot_crawler
+from services.dispatch.async_event_dispatcher import AsyncEventDispatcher
+from services.formatters.module_formatters import get_module_part
+from services.vk_api.async_longpoll import AsyncBotsLongPoll
+from services.vk_api.bots_longpoll import IncomingMessage
+from utils.logging.setup import setup_logger
+
+logger = setup_logger(
+    module_name=get_module_part(__name__, idx=0),
+    logger_name=__name__
+)
+
+load_dotenv()
+
+
+class AsyncVKMatchSenseiBot:
+    """Асинхронный бот VKMatchSensei."""
+
+    __cmd_handler = AsyncCommandHandler()
+
+    def __init__(self, group_token: str = os.getenv("VK_GROUP_TOKEN")) -> None:
+        self.token = group_token
+        self.longpoll = AsyncBotsLongPoll(self.token)
+        self.dispatcher = AsyncEventDispatcher()
+        self.router = self._build_router()
+
+    async def run(self) -> None:
+        """
+        Запускает бот.
+
+        Снимки групп популярных городов обновляет `snapshot_crawler` в
+        отдельном потоке, не занимая цикл событий. Кэш пользователей и
+        настроек поиска согласуется с другими процессами через
+        `cache_listener`, тоже в отдельном потоке. Перед запуском схема
+        базы данных обновляется до моделей
+        (`DatabaseSchemaManager.upgrade_tables()`).
+        """
+
+        await asyncio.to_thread(DatabaseSchemaManager().upgrade_tables)
+        snapshot_crawler.start()
+        cache_listener.start()
+        await self.dispatcher.start()
+        try:
+            async for event in self.longpoll.listen():
+                message = IncomingMessage.from_event(event)
+                if message is None:
+                    continue
+
+                request = message.text.strip().lower()
+                await self.dispatcher.submit(
+                    message.user_id, self.handle_message, request, message,
+                    self.longpoll.hold()
+                )
+        finally:
+            await self.dispatcher.shutdown()
+            await async_search_scheduler.shutdown()
+            snapshot_crawler.shutdown(wait=False)
+            cache_listener.shutdown(wait=False)
+            await self.longpoll.close()
+            await async_engine.dispose()
+
+    async def handle_message(
+        self,
+        request: str,
+        event: IncomingMessage,
+        release: Callable[[], None] | None = None
+    ) -> None:
+        """
+        Обработка текстовых сообщений.
+
+        После обработки вызывается `release`, разрешающий сохранить
+        позицию longpoll.
+        """
+        try:
+            await self.router.dispatch(request, event)
+        finally:
+            if release is not None:
+                release()
+
+    def _build_router(self) -> CommandRouter:
+        """
+        Собирает маршрутизатор команд бота.
+
+        Маршруты совпадают с `VKMatchSenseiBot`, но обработчики возвращают
+        корутины, которые ожидаются в `handle_message`.
+        """
+
+        cmd = self.__cmd_handler
+        router = CommandRouter.from_config(
+            COMMANDS_CONFIG,
+            KEYBOARD_CONFIG,
+            fallback=lambda ctx: cmd.handle_unknown_message(ctx.user_id),
+        )
+
+        router.add_route(
+            "start", lambda ctx: cmd.start_handler(ctx.user_id)
+        )
+        router.add_route(
+            "configure_search_settings",
+            lambda ctx: cmd.search_settings_handler(ctx.request, ctx.user_id)
+        )
+        router.add_route(
+            "start_searching", lambda ctx: cmd.start_searching(ctx.user_id)
+        )
+        router.add_route(
+            "show_matches", lambda ctx: cmd.show_matches(ctx.user_id)
+        )
+        router.add_route(
+            "next_match",
+            lambda ctx: cmd.handle_next_match(ctx.user_id, ctx.message)
+        )
+        router.add_route(
+            "switch_search_engine",
+            lambda ctx: cmd.switch_search_engine(ctx.user_id)
+        )
+        router.use(self.__search_settings_middleware)
+        router.compile()
+
+        return router
+
+    def __search_settings_middleware(
+        self, ctx: RouteContext, call_next: Callable
+    ):
+        """Асинхронный аналог middleware настройки `VKMatchSenseiBot`."""
+
+        if ctx.command not in SETTINGS_BYPASS_COMMANDS \
+                and self.__cmd_handler.is_in_search_settings(ctx.user_id):
+            return self.__cmd_handler.search_settings_handler(
+                ctx.request, ctx.user_id
+            )
+        return call_next(ctx)
+
+
+def main() -> None:
+    """Запуск асинхронного бота."""
+    bot = AsyncVKMatchSenseiBot()
+    print("Бот запущен в асинхронном режиме!")
+    asyncio.run(bot.run())
+
+
+if __name__ == "__main__":
+    main()
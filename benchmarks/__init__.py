@@ -0,0 +1,7 @@
+"""
+Пакет бенчмарков и локальных stub-серверов бота.
+
+Бенчмарки запускаются из корня проекта как модули, например:
+`python -m benchmarks.bench_runtime_modes`. Сетевые бенчмарки работают
+с локальными stub-серверами VK API и не обращаются к настоящему API.
+"""
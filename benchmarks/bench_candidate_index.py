@@ -0,0 +1,105 @@
+"""
+Бенчмарк индекса кандидатов.
+
+Сравнивает поиск первых `MATCHES_TARGET` мэтчей линейным просмотром
+прочитанных страниц (`SearchHandler.filter_members`) с запросом к
+индексу кандидатов (`handlers.candidate_index`) для нескольких настроек
+поиска. Индекс пополняется теми же страницами по 1000 участников, время
+пополнения выводится отдельно. Результаты обоих способов совпадают.
+
+### Запуск:
+```
+python -m benchmarks.bench_candidate_index --members 1000000
+```
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+from benchmarks.bench_member_filter import build_members
+from handlers.candidate_index import CandidateIndex
+from handlers.search_handler import MATCHES_TARGET, SearchHandler
+from services.vk_api.member_stream import MEMBERS_PAGE_SIZE
+
+QUERIES = {
+    "любой возраст": SimpleNamespace(
+        sex=1, city_id=1, age_min=18, age_max=99, relation=0
+    ),
+    "25-35, пол": SimpleNamespace(
+        sex=2, city_id=1, age_min=25, age_max=35, relation=0
+    ),
+    "25-35, пол, сем. пол.": SimpleNamespace(
+        sex=1, city_id=1, age_min=25, age_max=35, relation=6
+    ),
+    "редкий: 60-99": SimpleNamespace(
+        sex=1, city_id=2, age_min=60, age_max=99, relation=8
+    ),
+}
+
+
+def linear_search(
+    handler: SearchHandler, pages: list[list[dict]], settings
+) -> list[dict]:
+    """Просматривает страницы до `MATCHES_TARGET` мэтчей."""
+
+    matches = []
+    for page in pages:
+        matches.extend(handler.filter_members(page, settings))
+        if len(matches) >= MATCHES_TARGET:
+            break
+    return matches[:MATCHES_TARGET]
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    members = build_members(args.members)
+    pages = [
+        members[start:start + MEMBERS_PAGE_SIZE]
+        for start in range(0, len(members), MEMBERS_PAGE_SIZE)
+    ]
+    handler = SearchHandler()
+    index = CandidateIndex()
+
+    started = time.perf_counter()
+    for page in pages:
+        index.add_page(page)
+    add_time = time.perf_counter() - started
+    stats = index.stats()
+    print(
+        f"Участников: {args.members}, в индексе: {stats['live_rows']}, "
+        f"ключей: {stats['keys']}, массивы: {stats['bytes'] / 2**20:.1f} МБ"
+    )
+    print(
+        f"Пополнение: {add_time:.2f} с, "
+        f"{add_time / len(pages) * 1e3:.2f} мс на страницу"
+    )
+
+    for title, settings in QUERIES.items():
+        started = time.perf_counter()
+        expected = linear_search(handler, pages, settings)
+        linear_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            found = index.query(settings, MATCHES_TARGET)
+        query_time = (time.perf_counter() - started) / args.repeat
+
+        assert [member["id"] for member in found] == [
+            member["id"] for member in expected
+        ], "Результаты различаются"
+        print(
+            f"{title:22} мэтчей: {len(found):2}, "
+            f"просмотр: {linear_time * 1e3:8.2f} мс, "
+            f"индекс: {query_time * 1e6:8.1f} мкс"
+        )
+
+
+if __name__ == "__main__":
+    main()
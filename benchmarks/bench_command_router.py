@@ -0,0 +1,106 @@
+"""
+Микробенчмарк маршрутизации команд.
+
+Сравнивает прежнюю цепочку if/elif с поиском по спискам
+`COMMANDS_CONFIG` и `CommandRouter` со словарными индексами.
+Обработчики пустые, поэтому измеряется только стоимость выбора
+обработчика для сообщения.
+
+### Запуск:
+```
+python -m benchmarks.bench_command_router --number 200000
+```
+"""
+
+import argparse
+import timeit
+
+from config.bot_config import COMMANDS_CONFIG, KEYBOARD_CONFIG
+from handlers.command_router import CommandRouter, RouteContext
+from handlers.search_settings_handler import SETTINGS_BYPASS_COMMANDS
+from services.vk_api.bots_longpoll import IncomingMessage
+
+
+def noop(*args) -> None:
+    """Пустой обработчик."""
+
+
+def is_in_search_settings(user_id: int) -> bool:
+    """Имитация проверки состояния настройки поиска."""
+    return False
+
+
+def legacy_handle_message(request: str, event: IncomingMessage) -> None:
+    """Прежняя цепочка if/elif из `VKMatchSenseiBot.handle_message`."""
+
+    user_id = event.user_id
+
+    if request in COMMANDS_CONFIG.get("start"):
+        noop(user_id)
+    elif request in COMMANDS_CONFIG.get("configure_search_settings"):
+        noop(request, user_id)
+    elif is_in_search_settings(user_id):
+        noop(request, user_id)
+    elif request in COMMANDS_CONFIG.get("start_searching"):
+        noop(user_id)
+    elif request in COMMANDS_CONFIG.get("show_matches"):
+        noop(user_id)
+    elif request in COMMANDS_CONFIG.get("next_match"):
+        noop(user_id, event)
+    else:
+        noop(user_id)
+
+
+def build_router() -> CommandRouter:
+    """Собирает маршрутизатор с теми же маршрутами, что и у бота."""
+
+    def settings_middleware(ctx: RouteContext, call_next):
+        if ctx.command not in SETTINGS_BYPASS_COMMANDS \
+                and is_in_search_settings(ctx.user_id):
+            return noop(ctx)
+        return call_next(ctx)
+
+    router = CommandRouter.from_config(
+        COMMANDS_CONFIG, KEYBOARD_CONFIG, fallback=noop
+    )
+    for command in COMMANDS_CONFIG:
+        router.add_route(command, noop)
+    router.use(settings_middleware)
+    router.compile()
+    return router
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    messages = [
+        ("/start", None),
+        ("следующий", '{"command": "next_match", "after_id": 3}'),
+        ("показать мэтчи", '{"command": "show_matches"}'),
+        ("привет", None),
+    ]
+    messages = [
+        (text, IncomingMessage(1, text, payload)) for text, payload in messages
+    ]
+    router = build_router()
+
+    def run_legacy() -> None:
+        for request, message in messages:
+            legacy_handle_message(request, message)
+
+    def run_router() -> None:
+        for request, message in messages:
+            router.dispatch(request, message)
+
+    total = args.number * len(messages)
+    for name, func in (("if/elif", run_legacy), ("router", run_router)):
+        elapsed = min(timeit.repeat(func, number=args.number, repeat=3))
+        print(f"{name:8} {elapsed / total * 1e9:8.1f} нс/сообщение")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Бенчмарк фильтрации участников группы на стороне VK.
+
+Сравнивает режимы обхода группы `pages` (страницы `groups.getMembers`
+целиком, фильтрация в боте) и `execute` (программа VKScript читает
+несколько страниц и возвращает только подходящих участников) по
+количеству запросов и объему переданных данных до `MATCHES_TARGET`
+мэтчей.
+
+Stub-сервер не исполняет VKScript: обработчик `execute` читает
+параметры из объявлений переменных программы
+(`VKApiService.fetch_group_members_filtered`) и выполняет тот же
+отбор на Python.
+
+### Запуск:
+```
+python -m benchmarks.bench_execute_filter --members 200000 --density 0.002
+```
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("VK_TOKEN", "benchmark")
+os.environ.setdefault("VK_USER_RPS", "0")
+os.environ.setdefault("VK_GROUP_RPS", "0")
+# Каждый замер должен обращаться к VK, а не к кэшу участников или
+# индексу кандидатов
+os.environ.setdefault("VK_MEMBERS_CACHE_TTL", "0")
+os.environ.setdefault("CANDIDATE_INDEX_MAX_ROWS", "0")
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub_vk_server import StubVKServer
+from handlers import search_handler
+from handlers.search_engines import GroupScanEngine, SEARCH_ENGINES
+from handlers.search_handler import MATCHES_TARGET, SearchHandler
+
+SETTINGS = SimpleNamespace(
+    sex=1, city_id=1, city_title="Москва", age_min=18, age_max=99,
+    relation=0, search_engine="groups"
+)
+
+
+def build_population(size: int, density: float, seed: int = 42) \
+    -> list[dict]:
+    """Создает участников, из которых подходит примерно доля `density`."""
+
+    rnd = random.Random(seed)
+    return [
+        {
+            "id": idx,
+            "first_name": "Имя",
+            "last_name": "Фамилия",
+            "sex": 1 if rnd.random() < density else 2,
+            "city": {"id": 1, "title": "Москва"},
+            "bdate": "1.1.1990",
+            "relation": 0,
+            "can_write_private_message": 1,
+            "last_seen": {"time": 1700000000 + idx, "platform": 7},
+        }
+        for idx in range(size)
+    ]
+
+
+def build_handlers(population: list[dict]) -> dict:
+    """Обработчики stub-сервера для обоих режимов."""
+
+    def get_members(params: dict) -> dict:
+        offset = int(params.get("offset", 0))
+        count = int(params.get("count", 1000))
+        return {
+            "count": len(population),
+            "items": population[offset:offset + count],
+        }
+
+    def execute(params: dict) -> dict:
+        code_vars = {
+            name: int(value) for name, value in re.findall(
+                r"var (\w+) = (-?\d+);", params["code"]
+            )
+        }
+        start = code_vars["offset"]
+        end = min(len(population), start + code_vars["pages"] * 1000)
+        items = [
+            member for member in population[start:end]
+            if code_vars["sex"] in (0, member["sex"])
+            and member["can_write_private_message"] == 1
+            and member["city"]["id"] == code_vars["city"]
+        ]
+        return {
+            "count": len(population),
+            "scanned": end - start,
+            "items": items,
+        }
+
+    return {
+        "groups.search": lambda params: {"count": 1, "items": [{"id": 1}]},
+        "groups.getMembers": get_members,
+        "execute": execute,
+    }
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=200_000)
+    parser.add_argument("--density", type=float, default=0.002)
+    args = parser.parse_args()
+
+    population = build_population(args.members, args.density)
+    handler = SearchHandler()
+
+    with StubVKServer(build_handlers(population)) as server:
+        search_handler.vk_service.api_url = server.api_url
+
+        print(
+            f"Участников: {args.members}, подходит ~{args.density:.2%}, "
+            f"цель: {MATCHES_TARGET}"
+        )
+        for mode in ("pages", "execute"):
+            SEARCH_ENGINES["groups"] = GroupScanEngine(mode)
+            server.reset_stats()
+            started = time.perf_counter()
+            matches = handler.search_result_handler(SETTINGS)
+            elapsed = time.perf_counter() - started
+            # Дожидаемся запросов, загруженных заранее
+            time.sleep(0.5)
+            stats = server.stats()
+            print(
+                f"{mode:8} запросов: {stats['requests']:4}, "
+                f"передано: {stats['bytes_sent'] / 1024:9.1f} КБ, "
+                f"мэтчей: {len(matches):3}, время: {elapsed * 1e3:7.1f} мс"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Бенчмарк HTTP-транспорта VK API.
+
+Сравнивает прежний способ выполнения запросов (`requests.get` на каждый
+вызов, то есть новое соединение на каждый запрос) с общим пулом
+keep-alive соединений `HTTPTransport`. Запросы выполняются из нескольких
+потоков к локальному stub-серверу, который считает принятые соединения.
+
+Stub-сервер работает по HTTP, поэтому экономия показывает только
+TCP-рукопожатия. С реальным API к ним добавляется TLS-рукопожатие,
+которое обычно в несколько раз дороже.
+
+### Запуск:
+```
+python -m benchmarks.bench_http_transport --calls 2000 --threads 8
+```
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+os.environ.setdefault("VK_TOKEN", "benchmark")
+# Бенчмарк измеряет транспорт, поэтому ограничение частоты отключено
+os.environ.setdefault("VK_USER_RPS", "0")
+os.environ.setdefault("VK_GROUP_RPS", "0")
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub_vk_server import StubVKServer
+from services.vk_api.http_transport import HTTPTransport
+from services.vk_api.vk_api_service import VKApiService
+
+STUB_HANDLERS = {
+    "users.get": lambda params: [{"id": int(params.get("user_ids", 0))}],
+}
+
+
+def legacy_request(api_url: str, user_id: int) -> dict:
+    """Прежний `VKApiService._make_request`: новое соединение на запрос."""
+    response = requests.get(
+        api_url + "users.get",
+        params={
+            "user_ids": user_id, "access_token": "benchmark", "v": "5.199"
+        },
+        headers={"User-Agent": "VKMatchSensei"},
+        timeout=10,
+    )
+    return response.json()
+
+
+def run(func, calls: int, threads: int) -> float:
+    """Выполняет `calls` вызовов `func(idx)` и возвращает время в секундах."""
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(func, range(calls)))
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with StubVKServer(STUB_HANDLERS) as server:
+        legacy_time = run(
+            lambda idx: legacy_request(server.api_url, idx),
+            args.calls, args.threads
+        )
+        legacy_stats = server.stats()
+        server.reset_stats()
+
+        transport = HTTPTransport(pool_size=args.threads)
+        service = VKApiService(transport=transport)
+        service.api_url = server.api_url
+        pooled_time = run(service.get_user_info, args.calls, args.threads)
+        pooled_stats = server.stats()
+        transport.close()
+
+    print(f"Вызовов: {args.calls}, потоков: {args.threads}")
+    for name, elapsed, stats in (
+        ("requests.get", legacy_time, legacy_stats),
+        ("пул", pooled_time, pooled_stats),
+    ):
+        print(
+            f"{name:13} {args.calls / elapsed:8.0f} вызовов/с, "
+            f"{elapsed / args.calls * 1e3:6.3f} мс/вызов, "
+            f"соединений: {stats['connections']}"
+        )
+
+    histogram = transport.stats()["methods"]["users.get"]
+    print(
+        "Гистограмма users.get (пул): "
+        f"p50 <= {histogram['p50'] * 1e3:g} мс, "
+        f"p95 <= {histogram['p95'] * 1e3:g} мс, "
+        f"max {histogram['max'] * 1e3:.2f} мс"
+    )
+
+
+if __name__ == "__main__":
+    main()
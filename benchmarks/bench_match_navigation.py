@@ -0,0 +1,95 @@
+"""
+Бенчмарк перехода к следующему мэтчу.
+
+Сравнивает время одного нажатия кнопки "Следующий" при прежней
+навигации по индексу (все мэтчи пользователя загружаются
+`get_user_matches()`, показывается один из списка) и при keyset-навигации
+(`get_next_match()` читает мэтч, следующий за показанным). Время
+измеряется в начале, середине и конце списка мэтчей.
+
+По умолчанию используется SQLite в памяти; другую базу данных можно
+указать переменной окружения `DSN`.
+
+### Запуск:
+```
+python -m benchmarks.bench_match_navigation --matches 10000
+```
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("DSN", "sqlite://")
+
+# pylint: disable=wrong-import-position
+from db.managers.matches_manager import DatabaseMatchesManager
+from db.models.models import Base, Matches, Session, User, engine
+
+USER_ID = 1
+
+
+def fill_matches(count: int) -> list[int]:
+    """
+    Создает пользователя с `count` мэтчами.
+
+    ### Возвращает:
+    - list[int]: `Matches.id` мэтчей по возрастанию.
+    """
+
+    Base.metadata.create_all(engine)
+    session = Session()
+    session.add(User(
+        user_id=USER_ID, first_name="Бенчмарк", last_name="Бенчмарк",
+        profile_url="https://vk.com/id1"
+    ))
+    session.add_all(
+        Matches(
+            user_id=USER_ID, match_id=1_000_000 + i, first_name="Имя",
+            last_name="Фамилия", profile_url=f"https://vk.com/id{i}"
+        )
+        for i in range(count)
+    )
+    session.commit()
+    ids = [
+        match_id for (match_id,) in session.query(Matches.id).filter_by(
+            user_id=USER_ID
+        ).order_by(Matches.id)
+    ]
+    session.close()
+    return ids
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--matches", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    ids = fill_matches(args.matches)
+    manager = DatabaseMatchesManager()
+
+    print(f"Мэтчей: {args.matches}")
+    for position in (0, len(ids) // 2, len(ids) - 1):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            matches = manager.get_user_matches(USER_ID)
+            matches[position]  # pylint: disable=pointless-statement
+        index_time = (time.perf_counter() - started) / args.repeat
+
+        after_id = ids[position - 1] if position else 0
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            manager.get_next_match(USER_ID, after_id)
+        keyset_time = (time.perf_counter() - started) / args.repeat
+
+        print(
+            f"мэтч {position + 1:7}: по индексу {index_time * 1e3:8.2f} мс, "
+            f"keyset {keyset_time * 1e3:6.2f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Бенчмарк общего кэша участников групп.
+
+Несколько пользователей одного города одновременно ищут мэтчи с разными
+настройками (пол, возраст) среди участников одной группы. Без кэша
+каждый поиск обходит группу сам, с кэшем страницы загружаются из VK
+один раз: одновременные запросы одной страницы объединяются, а
+следующие поиски читают снимок группы из памяти. Вторая волна поисков
+показывает работу с уже загруженным снимком.
+
+### Запуск:
+```
+python -m benchmarks.bench_member_cache --users 20 --members 100000
+```
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from types import SimpleNamespace
+
+os.environ.setdefault("VK_TOKEN", "benchmark")
+os.environ.setdefault("VK_USER_RPS", "0")
+os.environ.setdefault("VK_GROUP_RPS", "0")
+# Повторные поиски должны читать группу, а не индекс кандидатов
+os.environ.setdefault("CANDIDATE_INDEX_MAX_ROWS", "0")
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub_vk_server import StubVKServer
+from handlers import search_handler
+from handlers.search_engines import SEARCH_ENGINES, GroupScanEngine
+from handlers.search_handler import SearchHandler
+from services.vk_api.member_cache import GroupSnapshotCache
+
+
+def build_population(size: int, seed: int = 42) -> list[dict]:
+    """Создает участников со случайными полом и возрастом."""
+
+    rnd = random.Random(seed)
+    year = date.today().year
+    return [
+        {
+            "id": idx,
+            "sex": rnd.choice((1, 2)),
+            "city": {"id": 1},
+            "bdate": f"1.1.{year - rnd.randint(18, 60)}",
+            "relation": 0,
+            "can_write_private_message": int(rnd.random() < 0.1),
+        }
+        for idx in range(size)
+    ]
+
+
+def build_settings(users: int) -> list[SimpleNamespace]:
+    """Настройки поиска пользователей: разные пол и диапазон возраста."""
+    return [
+        SimpleNamespace(
+            sex=1 + idx % 2, city_id=1, city_title="Москва",
+            age_min=20 + idx % 4 * 5, age_max=29 + idx % 4 * 5,
+            relation=0, search_engine="groups"
+        )
+        for idx in range(users)
+    ]
+
+
+def run_wave(handler: SearchHandler, settings: list) -> float:
+    """Запускает поиски всех пользователей одновременно."""
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(settings)) as executor:
+        list(executor.map(handler.search_result_handler, settings))
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    population = build_population(args.members)
+    handlers = {
+        "groups.search": lambda params: {"count": 1, "items": [{"id": 1}]},
+        "groups.getMembers": lambda params: {
+            "count": len(population),
+            "items": population[
+                int(params["offset"]):
+                int(params["offset"]) + int(params["count"])
+            ],
+        },
+    }
+    settings = build_settings(args.users)
+    handler = SearchHandler()
+    SEARCH_ENGINES["groups"] = GroupScanEngine("pages", groups_count=1)
+
+    with StubVKServer(handlers, latency=args.latency) as server:
+        search_handler.vk_service.api_url = server.api_url
+
+        print(
+            f"Пользователей: {args.users}, участников группы: "
+            f"{args.members}, задержка ответа: {args.latency * 1e3:.0f} мс"
+        )
+        for title, cache in (
+            ("без кэша", GroupSnapshotCache(ttl=0)),
+            ("с кэшем", GroupSnapshotCache(ttl=600)),
+        ):
+            search_handler.vk_service.member_cache = cache
+            for wave in (1, 2):
+                server.reset_stats()
+                elapsed = run_wave(handler, settings)
+                # Дожидаемся запросов, загруженных заранее
+                time.sleep(args.latency * 4)
+                stats = server.stats()
+                print(
+                    f"{title:9} волна {wave}: "
+                    "запросов getMembers: "
+                    f"{stats['requests'] - args.users:4}, "
+                    f"передано: {stats['bytes_sent'] / 2**20:6.1f} МБ, "
+                    f"время: {elapsed * 1e3:7.1f} мс"
+                )
+
+            cache_stats = cache.stats()
+            if cache.enabled:
+                snapshot = cache_stats["snapshots"][0]
+                print(
+                    f"          попаданий: {cache_stats['hit_rate']:.0%}, "
+                    f"общих запросов: {cache_stats['shared']}, "
+                    f"в кэше: {snapshot['pages']} страниц, "
+                    f"{cache_stats['bytes'] / 2**20:.1f} МБ"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Микробенчмарк отбора кандидатов.
+
+Сравнивает проверку каждого словаря (`SearchHandler.filter_members`)
+с векторизованным отбором `match_mask` по столбцам NumPy. Оба варианта
+проверяют полное условие поиска, включая возраст и семейное положение,
+и обрабатывают участников страницами по 1000, как при поиске. Для
+векторизованного отбора отдельно показаны перевод страниц в столбцы
+(`MemberColumns.from_page`) и вычисление маски по готовым столбцам.
+
+### Запуск:
+```
+python -m benchmarks.bench_member_filter --sizes 10000 100000 1000000
+```
+"""
+
+import argparse
+import random
+import time
+from datetime import date
+from types import SimpleNamespace
+
+import numpy as np
+
+from handlers.member_filter import MemberColumns, match_mask
+from handlers.search_handler import SearchHandler
+from services.vk_api.member_stream import MEMBERS_PAGE_SIZE
+
+SETTINGS = SimpleNamespace(
+    sex=1, city_id=1, age_min=25, age_max=35, relation=6
+)
+
+
+def build_members(size: int, seed: int = 42) -> list[dict]:
+    """Создает участников со случайными полями профиля."""
+
+    rnd = random.Random(seed)
+    year = date.today().year
+    members = []
+    for idx in range(size):
+        member = {
+            "id": idx,
+            "sex": rnd.choice((1, 2)),
+            "city": {"id": rnd.choice((1, 1, 2))},
+            "relation": rnd.randint(0, 8),
+            "can_write_private_message": rnd.randint(0, 1),
+        }
+        # У части профилей дата рождения скрыта или указана без года
+        kind = rnd.random()
+        if kind < 0.6:
+            member["bdate"] = (
+                f"{rnd.randint(1, 28)}.{rnd.randint(1, 12)}."
+                f"{year - rnd.randint(16, 70)}"
+            )
+        elif kind < 0.8:
+            member["bdate"] = f"{rnd.randint(1, 28)}.{rnd.randint(1, 12)}"
+        members.append(member)
+    return members
+
+
+def measure(func, pages: list[list[dict]]) -> tuple[float, int]:
+    """Обрабатывает все страницы и возвращает время и число мэтчей."""
+
+    started = time.perf_counter()
+    found = sum(len(func(page)) for page in pages)
+    return time.perf_counter() - started, found
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    args = parser.parse_args()
+
+    handler = SearchHandler()
+
+    def dict_loop(page: list[dict]) -> list[dict]:
+        return handler.filter_members(page, SETTINGS)
+
+    def vectorized(page: list[dict]) -> list[dict]:
+        mask = match_mask(MemberColumns.from_page(page), SETTINGS)
+        return [page[idx] for idx in np.flatnonzero(mask)]
+
+    print(
+        f"Возраст {SETTINGS.age_min}-{SETTINGS.age_max}, "
+        f"семейное положение {SETTINGS.relation}, страницы по "
+        f"{MEMBERS_PAGE_SIZE}"
+    )
+    for size in args.sizes:
+        members = build_members(size)
+        pages = [
+            members[start:start + MEMBERS_PAGE_SIZE]
+            for start in range(0, size, MEMBERS_PAGE_SIZE)
+        ]
+
+        loop_time, loop_found = measure(dict_loop, pages)
+        vector_time, vector_found = measure(vectorized, pages)
+        started = time.perf_counter()
+        columns = [MemberColumns.from_page(page) for page in pages]
+        convert_time = time.perf_counter() - started
+        started = time.perf_counter()
+        for page_columns in columns:
+            match_mask(page_columns, SETTINGS)
+        mask_time = time.perf_counter() - started
+
+        assert loop_found == vector_found, "Результаты отбора различаются"
+        print(
+            f"{size:>9}: цикл {loop_time * 1e3:8.1f} мс, "
+            f"NumPy {vector_time * 1e3:8.1f} мс "
+            f"(столбцы {convert_time * 1e3:7.1f} мс, "
+            f"маска {mask_time * 1e3:6.2f} мс), "
+            f"маска быстрее цикла в {loop_time / mask_time:5.1f} раз, "
+            f"мэтчей: {vector_found}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Бенчмарк колоночных снимков участников групп.
+
+Сравнивает участников группы в виде списка словарей `groups.getMembers`
+и в виде снимка (`handlers.member_snapshot`): объем в памяти против
+объема файлов снимка, время записи и открытия снимка и время полного
+обхода группы `SearchHandler.filter_members` страницами по 1000.
+
+### Запуск:
+```
+python -m benchmarks.bench_member_snapshot --members 1000000
+```
+"""
+
+import argparse
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from types import SimpleNamespace
+
+from handlers.member_snapshot import SnapshotMemberStream, SnapshotStore
+from handlers.search_handler import SearchHandler
+from services.vk_api.member_stream import MEMBERS_PAGE_SIZE
+
+SETTINGS = SimpleNamespace(
+    sex=1, city_id=1, age_min=25, age_max=35, relation=6
+)
+FIRST_NAMES = ("Анна", "Мария", "Елена", "Иван", "Дмитрий", "Александр")
+LAST_NAMES = ("Иванова", "Смирнова", "Кузнецов", "Попов", "Соколов")
+
+
+def build_members(size: int, seed: int = 42) -> list[dict]:
+    """Создает участников в формате ответа `groups.getMembers`."""
+
+    rnd = random.Random(seed)
+    year = date.today().year
+    members = []
+    for idx in range(size):
+        member = {
+            "id": 100_000_000 + idx,
+            "first_name": rnd.choice(FIRST_NAMES),
+            "last_name": rnd.choice(LAST_NAMES),
+            "can_access_closed": True,
+            "is_closed": False,
+            "sex": rnd.choice((1, 2)),
+            "city": {"id": rnd.choice((1, 1, 2)), "title": "Москва"},
+            "relation": rnd.randint(0, 8),
+            "can_write_private_message": rnd.randint(0, 1),
+            "last_seen": {"time": 1_700_000_000 + idx, "platform": 7},
+        }
+        if rnd.random() < 0.6:
+            member["bdate"] = (
+                f"{rnd.randint(1, 28)}.{rnd.randint(1, 12)}."
+                f"{year - rnd.randint(16, 70)}"
+            )
+        members.append(member)
+    return members
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    gc.collect()
+    tracemalloc.start()
+    members = build_members(args.members)
+    dicts_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    pages = [
+        members[start:start + MEMBERS_PAGE_SIZE]
+        for start in range(0, len(members), MEMBERS_PAGE_SIZE)
+    ]
+    handler = SearchHandler()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = SnapshotStore(root, ttl=3600)
+
+        started = time.perf_counter()
+        store.write(1, pages)
+        write_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        snapshot = store.open(1)
+        open_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        dict_matches = [
+            member for page in pages
+            for member in handler.filter_members(page, SETTINGS)
+        ]
+        dict_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with SnapshotMemberStream(snapshot) as stream:
+            snapshot_matches = [
+                member for page in stream.pages()
+                for member in handler.filter_members(page, SETTINGS)
+            ]
+        snapshot_time = time.perf_counter() - started
+
+        assert [member["id"] for member in dict_matches] == [
+            member["id"] for member in snapshot_matches
+        ], "Результаты отбора различаются"
+
+        print(f"Участников: {args.members}, мэтчей: {len(dict_matches)}")
+        print(
+            f"Объем: словари {dicts_bytes / 2**20:8.1f} МБ, "
+            f"снимок {snapshot.nbytes / 2**20:6.1f} МБ "
+            f"(в {dicts_bytes / snapshot.nbytes:.0f} раз меньше)"
+        )
+        print(
+            f"Снимок: запись {write_time:6.2f} с, "
+            f"открытие {open_time * 1e3:6.2f} мс"
+        )
+        print(
+            f"Полный обход: словари {dict_time * 1e3:7.1f} мс, "
+            f"снимок {snapshot_time * 1e3:7.1f} мс "
+            f"(в {dict_time / snapshot_time:.1f} раз быстрее)"
+        )
+
+
+if __name__ == "__main__":
+    main()
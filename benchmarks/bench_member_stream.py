@@ -0,0 +1,116 @@
+"""
+Бенчмарк потокового чтения участников группы.
+
+Измеряет время до нахождения 25 мэтчей в большой группе, где подходящие
+участники встречаются редко: прежний обход страниц по одной
+(`prefetch=0`) против `GroupMemberStream` с упреждающей загрузкой
+страниц. Stub-сервер отвечает с задержкой, имитирующей сеть до VK, и
+считает запросы, чтобы было видно, сколько страниц загружено зря.
+
+Ограничение частоты отключено. С ключом пользователя (3 запроса
+в секунду) выигрыш ограничен тем, насколько задержка ответа VK меньше
+интервала между запросами.
+
+### Запуск:
+```
+python -m benchmarks.bench_member_stream --members 200000 --density 800
+```
+"""
+
+import argparse
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("VK_TOKEN", "benchmark")
+os.environ.setdefault("VK_USER_RPS", "0")
+os.environ.setdefault("VK_GROUP_RPS", "0")
+# Каждый замер должен обращаться к VK, а не к кэшу участников
+os.environ.setdefault("VK_MEMBERS_CACHE_TTL", "0")
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub_vk_server import StubVKServer
+from handlers.search_handler import MATCHES_TARGET, SearchHandler
+from services.vk_api.vk_api_service import VKApiService
+
+SETTINGS = SimpleNamespace(
+    sex=1, city_id=1, age_min=18, age_max=99, relation=0
+)
+HANDLER = SearchHandler()
+
+
+def build_handlers(members: int, density: int) -> dict:
+    """Обработчики stub-сервера: каждый `density`-й участник подходит."""
+
+    def get_members(params: dict) -> dict:
+        offset = int(params.get("offset", 0))
+        count = int(params.get("count", 1000))
+        items = [
+            {
+                "id": idx,
+                "sex": 1 if idx % density == 0 else 2,
+                "city": {"id": 1},
+                "can_write_private_message": 1,
+            }
+            for idx in range(offset, min(offset + count, members))
+        ]
+        return {"count": members, "items": items}
+
+    return {"groups.getMembers": get_members}
+
+
+def find_matches(service: VKApiService, prefetch: int) -> tuple[int, int]:
+    """
+    Ищет `MATCHES_TARGET` мэтчей.
+
+    ### Возвращает:
+    - tuple: Количество найденных мэтчей и проверенных участников.
+    """
+
+    matches = []
+    with service.iter_group_members(1, prefetch=prefetch) as stream:
+        for page in stream.pages():
+            matches.extend(HANDLER.filter_members(page, SETTINGS))
+            if len(matches) >= MATCHES_TARGET:
+                break
+    return len(matches), stream.offset
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=200_000)
+    parser.add_argument("--density", type=int, default=800)
+    parser.add_argument("--latency", type=float, default=0.08)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with StubVKServer(
+        build_handlers(args.members, args.density), latency=args.latency
+    ) as server:
+        service = VKApiService()
+        service.api_url = server.api_url
+
+        print(
+            f"Участников: {args.members}, подходит каждый {args.density}-й, "
+            f"задержка ответа: {args.latency * 1e3:.0f} мс"
+        )
+        for prefetch in (0, 1, 2, 4):
+            server.reset_stats()
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                found, scanned = find_matches(service, prefetch)
+            elapsed = (time.perf_counter() - started) / args.repeat
+            # Запросы, выполняющиеся в момент остановки, дойдут до сервера
+            time.sleep(args.latency * 2)
+            requests_per_search = server.stats()["requests"] / args.repeat
+            print(
+                f"prefetch={prefetch}: {elapsed * 1e3:7.1f} мс до "
+                f"{found} мэтчей, проверено {scanned}, "
+                f"запросов: {requests_per_search:.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
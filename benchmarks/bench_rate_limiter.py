@@ -0,0 +1,94 @@
+"""
+Бенчмарк общего ограничителя частоты запросов.
+
+Несколько потоков одновременно запрашивают разрешения у `RateLimiter`:
+один "тяжелый" пользователь (поиск мэтчей) делает много запросов подряд,
+остальные — по одному запросу (ответы на сообщения). Бенчмарк
+показывает фактическую частоту выдачи разрешений относительно заданной
+и время ожидания легких пользователей, а также снижение и
+восстановление частоты после ошибки 6.
+
+### Запуск:
+```
+python -m benchmarks.bench_rate_limiter --rate 20 --seconds 3
+```
+"""
+
+import argparse
+import threading
+import time
+
+from services.vk_api.rate_limiter import RateLimiter
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=20)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--heavy-threads", type=int, default=8)
+    args = parser.parse_args()
+
+    limiter = RateLimiter(args.rate, name="bench")
+    deadline = time.monotonic() + args.seconds
+    granted = [0]
+    light_waits: list[float] = []
+    lock = threading.Lock()
+
+    def heavy() -> None:
+        while time.monotonic() < deadline:
+            limiter.acquire(user_id=1)
+            with lock:
+                granted[0] += 1
+
+    def light(user_id: int) -> None:
+        started = time.monotonic()
+        limiter.acquire(user_id=user_id)
+        with lock:
+            granted[0] += 1
+            light_waits.append(time.monotonic() - started)
+
+    started = time.monotonic()
+    threads = [
+        threading.Thread(target=heavy) for _ in range(args.heavy_threads)
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Легкие пользователи пишут боту, пока идет поиск
+    time.sleep(0.5)
+    light_threads = [
+        threading.Thread(target=light, args=(user_id,))
+        for user_id in range(2, 12)
+    ]
+    for thread in light_threads:
+        thread.start()
+    for thread in threads + light_threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    print(
+        f"Заданная частота: {args.rate:g}/с, "
+        f"фактическая: {granted[0] / elapsed:.2f}/с"
+    )
+    print(
+        "Ожидание легких пользователей: "
+        f"среднее {sum(light_waits) / len(light_waits) * 1e3:.0f} мс, "
+        f"максимум {max(light_waits) * 1e3:.0f} мс. "
+        "При круговой очереди каждый ждет не больше одного запроса "
+        "тяжелого пользователя и остальных легких: "
+        f"{(len(light_threads) + 1) / args.rate * 1e3:.0f} мс"
+    )
+
+    limiter.report_throttled()
+    rates = [limiter.stats()["rate"]]
+    for _ in range(4):
+        time.sleep(1.05)
+        limiter.acquire()
+        rates.append(limiter.stats()["rate"])
+    print("Частота после ошибки 6, по секундам:", rates)
+
+
+if __name__ == "__main__":
+    main()
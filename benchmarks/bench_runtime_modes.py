@@ -0,0 +1,111 @@
+"""
+Бенчмарк пропускной способности синхронного и асинхронного режимов.
+
+Каждое событие имитирует типичную обработку сообщения: запрос к VK API
+и отправку ответа. Запросы уходят на локальный stub-сервер с
+искусственной задержкой, поэтому результат показывает, сколько событий
+в секунду успевает обработать каждый режим, пока ждет ответа сети.
+
+### Запуск:
+```
+python -m benchmarks.bench_runtime_modes --events 500 --latency 0.05
+```
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("VK_TOKEN", "benchmark")
+# Бенчмарк измеряет транспорт, поэтому ограничение частоты отключено
+os.environ.setdefault("VK_USER_RPS", "0")
+os.environ.setdefault("VK_GROUP_RPS", "0")
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub_vk_server import StubVKServer
+from services.dispatch.async_event_dispatcher import AsyncEventDispatcher
+from services.dispatch.event_dispatcher import EventDispatcher
+from services.vk_api.async_vk_api_service import AsyncVKApiService
+from services.vk_api.vk_api_service import VKApiService
+
+STUB_HANDLERS = {
+    "users.get": lambda params: [{"id": int(params.get("user_ids", 0))}],
+    "messages.send": lambda params: 1,
+}
+
+
+def bench_sync(api_url: str, events: int, users: int, workers: int) -> float:
+    """Возвращает количество событий в секунду в синхронном режиме."""
+
+    service = VKApiService()
+    service.api_url = api_url
+
+    def handle(user_id: int) -> None:
+        service._make_request("users.get", {"user_ids": user_id})
+        service._make_request("messages.send", {"user_id": user_id})
+
+    dispatcher = EventDispatcher(workers=workers, max_queue_size=events)
+    dispatcher.start()
+
+    started = time.perf_counter()
+    for idx in range(events):
+        dispatcher.submit(idx % users, handle, idx % users)
+    dispatcher.shutdown()
+
+    return events / (time.perf_counter() - started)
+
+
+async def bench_async(
+    api_url: str, events: int, users: int, workers: int
+) -> float:
+    """Возвращает количество событий в секунду в асинхронном режиме."""
+
+    service = AsyncVKApiService()
+    service.api_url = api_url
+
+    async def handle(user_id: int) -> None:
+        await service._make_request("users.get", {"user_ids": user_id})
+        await service._make_request("messages.send", {"user_id": user_id})
+
+    dispatcher = AsyncEventDispatcher(workers=workers, max_queue_size=events)
+    await dispatcher.start()
+
+    started = time.perf_counter()
+    for idx in range(events):
+        await dispatcher.submit(idx % users, handle, idx % users)
+    await dispatcher.shutdown()
+    elapsed = time.perf_counter() - started
+
+    await service.close()
+    return events / elapsed
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--sync-workers", type=int, default=8)
+    parser.add_argument("--async-workers", type=int, default=200)
+    args = parser.parse_args()
+
+    with StubVKServer(STUB_HANDLERS, latency=args.latency) as server:
+        sync_rate = bench_sync(
+            server.api_url, args.events, args.users, args.sync_workers
+        )
+        async_rate = asyncio.run(bench_async(
+            server.api_url, args.events, args.users, args.async_workers
+        ))
+
+    print(f"Событий: {args.events}, задержка VK: {args.latency * 1000:.0f} мс")
+    print(f"sync  ({args.sync_workers} потоков): {sync_rate:10.1f} событий/с")
+    print(
+        f"async ({args.async_workers} задач):   {async_rate:10.1f} событий/с"
+    )
+
+
+if __name__ == "__main__":
+    main()
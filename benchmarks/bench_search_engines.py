@@ -0,0 +1,168 @@
+"""
+Бенчмарк способов поиска кандидатов.
+
+Сравнивает обход группы города (`groups`) и `users.search`
+(`users_search`) по количеству запросов к API и объему переданных
+данных на `MATCHES_TARGET` мэтчей. Stub-сервер отдает одну и ту же
+случайную выборку профилей: участниками группы и результатами
+`users.search`, который, как и VK, сам фильтрует по городу, полу,
+возрасту и семейному положению.
+
+Отдельно выводится, сколько найденных мэтчей соответствуют всем
+настройкам по проверке stub-сервера, и объем данных считается на
+`MATCHES_TARGET` таких мэтчей.
+
+### Запуск:
+```
+python -m benchmarks.bench_search_engines --members 100000
+```
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import date
+from types import SimpleNamespace
+
+os.environ.setdefault("VK_TOKEN", "benchmark")
+os.environ.setdefault("VK_USER_RPS", "0")
+os.environ.setdefault("VK_GROUP_RPS", "0")
+# Каждый замер должен обращаться к VK, а не к кэшу участников или
+# индексу кандидатов
+os.environ.setdefault("VK_MEMBERS_CACHE_TTL", "0")
+os.environ.setdefault("CANDIDATE_INDEX_MAX_ROWS", "0")
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub_vk_server import StubVKServer
+from handlers import search_handler
+from handlers.search_engines import SEARCH_ENGINES
+from handlers.search_handler import MATCHES_TARGET, SearchHandler
+
+CITY_ID = 1
+
+
+def build_population(size: int, seed: int = 42) -> list[dict]:
+    """Создает профили со случайными городом, полом, возрастом и т.д."""
+
+    rnd = random.Random(seed)
+    year = date.today().year
+    return [
+        {
+            "id": idx,
+            "sex": rnd.choice((1, 2)),
+            "city": {"id": CITY_ID if rnd.random() < 0.6 else 2},
+            "bdate": f"{rnd.randint(1, 28)}.{rnd.randint(1, 12)}."
+                     f"{year - rnd.randint(16, 70)}",
+            "relation": rnd.randint(0, 8),
+            "can_write_private_message": int(rnd.random() < 0.35),
+            "last_seen": {"time": 1700000000 + idx, "platform": 7},
+        }
+        for idx in range(size)
+    ]
+
+
+def get_age(member: dict) -> int:
+    """Возраст по дате рождения (без учета дня и месяца)."""
+    return date.today().year - int(member["bdate"].rsplit(".", 1)[-1])
+
+
+def is_full_match(member: dict, settings: SimpleNamespace) -> bool:
+    """Соответствует ли профиль всем настройкам поиска."""
+    return (
+        member["sex"] == settings.sex
+        and member["city"]["id"] == settings.city_id
+        and settings.age_min <= get_age(member) <= settings.age_max
+        and (not settings.relation or member["relation"] == settings.relation)
+    )
+
+
+def build_handlers(population: list[dict]) -> dict:
+    """Обработчики stub-сервера для обоих способов поиска."""
+
+    def get_members(params: dict) -> dict:
+        offset = int(params.get("offset", 0))
+        count = int(params.get("count", 1000))
+        return {
+            "count": len(population),
+            "items": population[offset:offset + count],
+        }
+
+    def search_users(params: dict) -> dict:
+        settings = SimpleNamespace(
+            sex=int(params["sex"]),
+            city_id=int(params["city"]),
+            age_min=int(params["age_from"]),
+            age_max=int(params["age_to"]),
+            relation=int(params.get("status", 0)),
+        )
+        found = [
+            member for member in population
+            if is_full_match(member, settings)
+        ]
+        offset = int(params.get("offset", 0))
+        count = int(params.get("count", 20))
+        # Как и VK, отдаем не больше 1000 результатов
+        return {
+            "count": len(found),
+            "items": found[offset:min(offset + count, 1000)],
+        }
+
+    return {
+        "groups.search": lambda params: {"count": 1, "items": [{"id": 1}]},
+        "groups.getMembers": get_members,
+        "users.search": search_users,
+    }
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--age", default="25-35")
+    parser.add_argument("--relation", type=int, default=6)
+    args = parser.parse_args()
+
+    age_min, age_max = map(int, args.age.split("-"))
+    population = build_population(args.members)
+    handler = SearchHandler()
+
+    with StubVKServer(build_handlers(population)) as server:
+        search_handler.vk_service.api_url = server.api_url
+
+        print(
+            f"Профилей: {args.members}, возраст {age_min}-{age_max}, "
+            f"семейное положение {args.relation}, цель: {MATCHES_TARGET}"
+        )
+        for name in SEARCH_ENGINES:
+            settings = SimpleNamespace(
+                sex=1, city_id=CITY_ID, city_title="Москва",
+                age_min=age_min, age_max=age_max, relation=args.relation,
+                search_engine=name
+            )
+            server.reset_stats()
+            matches = handler.search_result_handler(settings)
+            # Загруженные заранее страницы, которые уже запрошены, дойдут
+            # до сервера после остановки поиска
+            time.sleep(0.5)
+            stats = server.stats()
+
+            full_matches = sum(
+                is_full_match(member, settings) for member in matches
+            )
+            kb_per_target = (
+                stats["bytes_sent"] / 1024 / max(1, full_matches)
+                * MATCHES_TARGET
+            )
+            print(
+                f"{name:13} запросов: {stats['requests']:3}, "
+                f"передано: {stats['bytes_sent'] / 1024:8.1f} КБ, "
+                f"мэтчей: {len(matches):4} "
+                f"(по всем настройкам: {full_matches}), "
+                f"КБ на {MATCHES_TARGET} полных мэтчей: {kb_per_target:8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Бенчмарк фильтра уже найденных кандидатов.
+
+Для нескольких количеств мэтчей пользователя сравнивает множество VK ID
+(`set`, `CompactIntSet`) и фильтр Блума (`utils.collections.BloomFilter`):
+объем в памяти, измеренную на миллионе новых ID долю ложных
+срабатываний и время проверки страницы из 1000 участников.
+
+### Запуск:
+```
+python -m benchmarks.bench_seen_filter --error-rate 0.001
+```
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from services.vk_api.member_stream import MEMBERS_PAGE_SIZE
+from utils.collections import BloomFilter, CompactIntSet
+
+SIZES = (1_000, 10_000, 100_000)
+PROBES = 1_000_000
+
+
+def set_bytes(values: set[int]) -> int:
+    """Объем множества вместе с объектами чисел."""
+    return sys.getsizeof(values) + sum(map(sys.getsizeof, values))
+
+
+def main() -> None:
+    """Запуск бенчмарка."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    rnd = np.random.default_rng(42)
+    # Новые ID не пересекаются с сохраненными
+    probes = rnd.integers(900_000_000, 1_000_000_000, PROBES)
+    page = probes[:MEMBERS_PAGE_SIZE].tolist()
+
+    print(f"Доля ложных срабатываний: {args.error_rate}")
+    for size in SIZES:
+        match_ids = rnd.integers(1, 900_000_000, size).tolist()
+        exact = set(match_ids)
+        compact = CompactIntSet()
+        for match_id in match_ids:
+            compact.add(match_id)
+        bloom = BloomFilter(size, args.error_rate)
+        bloom.update(match_ids)
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            [member_id in exact for member_id in page]
+        set_time = (time.perf_counter() - started) / args.repeat
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            bloom.contains_many(page)
+        bloom_time = (time.perf_counter() - started) / args.repeat
+
+        print(
+            f"мэтчей {size:7}: set {set_bytes(exact) / 1024:8.1f} КБ, "
+            f"CompactIntSet {compact.memory_usage() / 1024:7.1f} КБ, "
+            f"фильтр {bloom.nbytes / 1024:6.1f} КБ "
+            f"(ложных {bloom.contains_many(probes).mean():.4%}), "
+            f"страница: set {set_time * 1e6:6.1f} мкс, "
+            f"фильтр {bloom_time * 1e6:6.1f} мкс"
+        )
+
+
+if __name__ == "__main__":
+    main()
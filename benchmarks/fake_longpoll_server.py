@@ -0,0 +1,295 @@
+"""
+Локальный fake-сервер Bots Long Poll для офлайн-проверки.
+
+Сервер реализует методы `groups.getById` и `groups.getLongPollServer`,
+а также сам сервер событий (`act=a_check`) с поддержкой ожидания
+`wait`. Состоянием сервера можно управлять из кода: публиковать
+сообщения, устаревать ключ (`failed: 2`), терять информацию
+(`failed: 3`) и обрезать историю событий (`failed: 1`).
+
+При запуске как модуль выполняет сценарий проверки возобновления
+`BotsLongPoll` после перезапуска:
+```
+python -m benchmarks.fake_longpoll_server
+```
+"""
+
+import json
+import os
+import tempfile
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+os.environ.setdefault("VK_TOKEN", "fake")
+
+# pylint: disable=wrong-import-position
+from services.vk_api.bots_longpoll import BotsLongPoll, IncomingMessage
+from services.vk_api.longpoll_checkpoint import LongPollCheckpoint
+
+
+class FakeBotsLongPollServer:
+    """
+    Fake-сервер Bots Long Poll.
+
+    `ts` сервера — номер следующего события. Ответ на `a_check` содержит
+    все события начиная с переданного `ts` и новый `ts`.
+
+    ### Аргументы:
+    - group_id (int): ID сообщества, которое обслуживает сервер.
+    """
+
+    def __init__(self, group_id: int = 1) -> None:
+        self.group_id = group_id
+        self.key_requests = 0
+        self.checks = 0
+
+        self.__events: list[dict] = []
+        self.__history_start = 0
+        self.__key = uuid.uuid4().hex
+        self.__info_lost = False
+        self.__cond = threading.Condition()
+        self.__server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), self.__build_handler()
+        )
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, daemon=True
+        )
+
+    @property
+    def base_url(self) -> str:
+        """Адрес сервера."""
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        """Адрес для подстановки в `VKApiService.api_url`."""
+        return f"{self.base_url}/method/"
+
+    def start(self) -> "FakeBotsLongPollServer":
+        """Запускает сервер в фоновом потоке."""
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает сервер."""
+        with self.__cond:
+            self.__cond.notify_all()
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __enter__(self) -> "FakeBotsLongPollServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def publish_message(
+        self, user_id: int, text: str, payload: str | None = None
+    ) -> int:
+        """Публикует событие `message_new` и возвращает его номер."""
+
+        message = {
+            "from_id": user_id, "peer_id": user_id, "text": text,
+            "id": len(self.__events) + 1,
+        }
+        if payload is not None:
+            message["payload"] = payload
+
+        with self.__cond:
+            self.__events.append({
+                "type": "message_new",
+                "object": {"message": message, "client_info": {}},
+                "group_id": self.group_id,
+                "event_id": uuid.uuid4().hex,
+            })
+            self.__cond.notify_all()
+            return len(self.__events) - 1
+
+    def expire_key(self) -> None:
+        """Делает текущий ключ недействительным (`failed: 2`)."""
+        with self.__cond:
+            self.__key = uuid.uuid4().hex
+
+    def lose_info(self) -> None:
+        """Имитирует потерю информации о сессии (`failed: 3`)."""
+        with self.__cond:
+            self.__info_lost = True
+
+    def drop_history(self) -> None:
+        """Удаляет историю событий (`failed: 1` для старых `ts`)."""
+        with self.__cond:
+            self.__history_start = len(self.__events)
+
+    def _get_server(self, params: dict) -> dict:
+        """Ответ метода `groups.getLongPollServer`."""
+
+        with self.__cond:
+            self.key_requests += 1
+            self.__info_lost = False
+            return {
+                "key": self.__key,
+                "server": f"{self.base_url}/lp",
+                "ts": str(len(self.__events)),
+            }
+
+    def _check(self, params: dict) -> dict:
+        """Ответ сервера событий."""
+
+        with self.__cond:
+            self.checks += 1
+
+            if self.__info_lost:
+                return {"failed": 3}
+            if params.get("key") != self.__key:
+                return {"failed": 2}
+
+            ts = int(params.get("ts", 0))
+            if ts < self.__history_start:
+                return {"failed": 1, "ts": str(len(self.__events))}
+
+            if ts >= len(self.__events):
+                self.__cond.wait(timeout=float(params.get("wait", 0)))
+
+            updates = self.__events[ts:]
+            return {"ts": str(ts + len(updates)), "updates": updates}
+
+    def __build_handler(self) -> type[BaseHTTPRequestHandler]:
+        """Создает класс обработчика запросов, связанный с сервером."""
+
+        fake = self
+        routes = {
+            "/method/groups.getById": lambda params: {
+                "response": [{"id": fake.group_id}]
+            },
+            "/method/groups.getLongPollServer": lambda params: {
+                "response": fake._get_server(params)
+            },
+            "/lp": fake._check,
+        }
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                url = urlsplit(self.path)
+                self.__reply(url.path, dict(parse_qsl(url.query)))
+
+            def do_POST(self) -> None:  # noqa: N802
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                params = dict(parse_qsl(url.query))
+                params.update(parse_qsl(self.rfile.read(length).decode()))
+                self.__reply(url.path, params)
+
+            def log_message(self, *args) -> None:
+                return
+
+            def __reply(self, path: str, params: dict) -> None:
+                route = routes.get(path)
+                body = route(params) if route else {
+                    "error": {"error_code": 3, "error_msg": "Unknown method"}
+                }
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return _Handler
+
+
+def _connect(
+    server: FakeBotsLongPollServer, checkpoint: LongPollCheckpoint
+) -> BotsLongPoll:
+    """Создает транспорт, направленный на fake-сервер."""
+    longpoll = BotsLongPoll(
+        "fake", group_id=server.group_id, wait=1, checkpoint=checkpoint
+    )
+    longpoll.api.api_url = server.api_url
+    return longpoll
+
+
+def _publish_later(server: FakeBotsLongPollServer, *texts: str) -> None:
+    """Публикует сообщения с небольшой задержкой из другого потока."""
+
+    def publish() -> None:
+        for text in texts:
+            server.publish_message(100, text)
+
+    threading.Timer(0.3, publish).start()
+
+
+def _receive(listener, count: int) -> list[str]:
+    """Получает `count` сообщений из генератора `listen()`."""
+    texts = []
+    while len(texts) < count:
+        message = IncomingMessage.from_event(next(listener))
+        if message is not None:
+            texts.append(message.text)
+    return texts
+
+
+def main() -> None:
+    """Сценарий проверки возобновления после перезапуска."""
+
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            FakeBotsLongPollServer(group_id=42) as server:
+        checkpoint = LongPollCheckpoint(
+            os.path.join(tmp_dir, "checkpoint.json")
+        )
+
+        # Первый запуск без сохраненной позиции: события читаются
+        # с текущего ts сервера.
+        listener = _connect(server, checkpoint).listen()
+        _publish_later(server, "1", "2")
+        assert _receive(listener, 2) == ["1", "2"]
+
+        # Следующий ответ сервера сохраняет позицию после "1" и "2".
+        server.publish_message(100, "3")
+        assert _receive(listener, 1) == ["3"]
+        listener.close()
+
+        # Бот "упал" после обработки "3", пока он лежал, пришло "4".
+        # Позиция после "3" еще не сохранена, поэтому "3" придет повторно,
+        # но ни одно сообщение не потеряется.
+        server.publish_message(100, "4")
+        listener = _connect(server, checkpoint).listen()
+        assert _receive(listener, 2) == ["3", "4"]
+
+        # Истек ключ: переподключение без потери позиции.
+        server.expire_key()
+        server.publish_message(100, "5")
+        assert _receive(listener, 1) == ["5"]
+
+        # Сервер потерял информацию: транспорт получает новые ключ и ts
+        # и продолжает принимать сообщения, пришедшие после этого.
+        server.lose_info()
+        _publish_later(server, "6")
+        assert _receive(listener, 1) == ["6"]
+
+        # История обрезана: сохраненный ts устарел, транспорт продолжает
+        # с нового ts, запросив ключ только один раз при подключении.
+        key_requests = server.key_requests
+        server.drop_history()
+        checkpoint.save(server.group_id, "0")
+        listener.close()
+        listener = _connect(server, checkpoint).listen()
+        _publish_later(server, "7")
+        assert _receive(listener, 1) == ["7"]
+        assert server.key_requests == key_requests + 1
+        listener.close()
+
+        print(
+            "Проверка возобновления пройдена. "
+            f"Запросов ключа: {server.key_requests}, "
+            f"запросов событий: {server.checks}."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Локальный stub-сервер VK API для бенчмарков.
+
+Сервер принимает запросы вида `/method/<название метода>` (GET и POST),
+имитирует задержку ответа и возвращает JSON, сформированный
+переданными обработчиками методов. Соединения поддерживают keep-alive
+(HTTP/1.1), а сервер считает запросы, соединения и отправленные байты.
+
+### Пример использования:
+```python
+with StubVKServer({"users.get": lambda params: [{"id": 1}]}) as server:
+    service = VKApiService()
+    service.api_url = server.api_url
+    service.get_user_info(1)
+    print(server.stats())
+```
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from urllib.parse import parse_qsl, urlsplit
+
+MethodHandler = Callable[[dict], object]
+
+
+class StubVKServer:
+    """
+    Локальный stub-сервер VK API.
+
+    ### Аргументы:
+    - handlers (dict): Словарь "название метода -> функция", функция
+      получает параметры запроса и возвращает значение поля `response`.
+      Если функция возвращает словарь с ключом `error`, он отдается как
+      ошибка VK API.
+    - latency (float): Искусственная задержка ответа в секундах.
+    """
+
+    def __init__(
+        self,
+        handlers: dict[str, MethodHandler] | None = None,
+        latency: float = 0.0
+    ) -> None:
+        self.handlers = handlers or {}
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        self.bytes_sent = 0
+        self.__lock = threading.Lock()
+        self.__server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), self.__build_handler()
+        )
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, daemon=True
+        )
+
+    @property
+    def api_url(self) -> str:
+        """Адрес для подстановки в `VKApiService.api_url`."""
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}/method/"
+
+    def start(self) -> "StubVKServer":
+        """Запускает сервер в фоновом потоке."""
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает сервер."""
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def stats(self) -> dict:
+        """Возвращает счетчики запросов, соединений и отправленных байт."""
+        with self.__lock:
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "bytes_sent": self.bytes_sent,
+            }
+
+    def reset_stats(self) -> None:
+        """Обнуляет счетчики."""
+        with self.__lock:
+            self.requests = self.connections = self.bytes_sent = 0
+
+    def __enter__(self) -> "StubVKServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _record(
+        self, requests: int = 0, connections: int = 0, bytes_sent: int = 0
+    ) -> None:
+        """Увеличивает счетчики сервера."""
+        with self.__lock:
+            self.requests += requests
+            self.connections += connections
+            self.bytes_sent += bytes_sent
+
+    def _respond(self, path: str, params: dict) -> bytes:
+        """Формирует тело ответа на запрос к методу."""
+
+        method = path.rsplit("/", 1)[-1]
+        handler = self.handlers.get(method)
+        if handler is None:
+            body = {"error": {"error_code": 3, "error_msg": "Unknown method"}}
+        else:
+            result = handler(params)
+            is_error = isinstance(result, dict) and "error" in result
+            body = result if is_error else {"response": result}
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+    def __build_handler(self) -> type[BaseHTTPRequestHandler]:
+        """Создает класс обработчика запросов, связанный с сервером."""
+
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Заголовки и тело отправляются отдельными записями. Без
+            # TCP_NODELAY на keep-alive соединении второй записи пришлось бы
+            # ждать отложенного ACK клиента (~40 мс)
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                super().setup()
+                stub._record(connections=1)
+
+            def do_GET(self) -> None:  # noqa: N802
+                url = urlsplit(self.path)
+                self.__reply(url.path, dict(parse_qsl(url.query)))
+
+            def do_POST(self) -> None:  # noqa: N802
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8")
+                params = dict(parse_qsl(url.query))
+                params.update(parse_qsl(body))
+                self.__reply(url.path, params)
+
+            def log_message(self, *args) -> None:
+                return
+
+            def __reply(self, path: str, params: dict) -> None:
+                payload = stub._respond(path, params)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                stub._record(requests=1, bytes_sent=len(payload))
+
+        return _Handler
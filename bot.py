@@ -17,14 +17,22 @@ if __name__ == "__main__":
 """
 
 import os
+from typing import Callable
 
-from vk_api.longpoll import VkEventType, VkLongPoll
 from dotenv import load_dotenv
 
-from config.bot_config import COMMANDS_CONFIG
+from config.bot_config import COMMANDS_CONFIG, KEYBOARD_CONFIG
+from db.managers.schema_manager import DatabaseSchemaManager
+from db.managers.user_cache import cache_listener
+from db.session import unit_of_work
 from handlers.command_handler import CommandHandler
+from handlers.command_router import CommandRouter, RouteContext
+from handlers.search_handler import search_scheduler
+from handlers.search_settings_handler import SETTINGS_BYPASS_COMMANDS
+from handlers.snapshot_crawler import snapshot_crawler
+from services.dispatch.event_dispatcher import EventDispatcher
 from services.formatters.module_formatters import get_module_part
-from services.vk_api.auth_vk_service import AuthVKService
+from services.vk_api.bots_longpoll import BotsLongPoll, IncomingMessage
 from utils.logging.setup import setup_logger
 
 logger = setup_logger(
@@ -42,43 +50,136 @@ class VKMatchSenseiBot:
 
     def __init__(self, group_token: str = os.getenv("VK_GROUP_TOKEN")) -> None:
         self.token = group_token
-        self.vk = AuthVKService().auth_vk_group(self.token)
-        self.longpoll = VkLongPoll(self.vk)
-        self.user_id = None
+        self.longpoll = BotsLongPoll(self.token)
+        self.dispatcher = EventDispatcher()
+        self.router = self._build_router()
 
     def run(self) -> None:
-        """Запускает бот."""
-        for event in self.longpoll.listen():
-            if event.type == VkEventType.MESSAGE_NEW and event.to_me:
-                request = event.text.strip().lower()
-                self.user_id = event.user_id
-                self.handle_message(request, event)
-
-    def handle_message(self, request: str, event) -> None:
-        """Обработка текстовых сообщений."""
-
-        if request in COMMANDS_CONFIG.get("start"):
-            self.__cmd_handler.start_handler(self.user_id)
-        elif request in COMMANDS_CONFIG.get("configure_search_settings"):
-            self.__cmd_handler.search_settings_handler(request, self.user_id)
-        elif self.__cmd_handler.is_in_search_settings(self.user_id):
-            # Передаем сообщение в обработчик настроек только если пользователь
-            # находится в процессе настройки
-            self.__cmd_handler.search_settings_handler(request, self.user_id)
-        elif request in COMMANDS_CONFIG.get("start_searching"):
-            self.__cmd_handler.start_searching(self.user_id)
-            self.__cmd_handler.show_matches(self.user_id)
-        elif request in COMMANDS_CONFIG.get("show_matches"):
-            self.__cmd_handler.show_matches(self.user_id)
-        elif request in COMMANDS_CONFIG.get("next_match"):
-            self.__cmd_handler.handle_next_match(self.user_id, event)
-        else:
+        """
+        Запускает бот.
+
+        События Bots Long Poll передаются в диспетчер, который обрабатывает
+        сообщения разных пользователей параллельно, сохраняя порядок
+        сообщений каждого отдельного пользователя. Позиция longpoll
+        сохраняется после обработки сообщений, поэтому после перезапуска
+        чтение событий продолжается с места остановки. Поиск мэтчей
+        выполняется в фоне планировщиком `search_scheduler`, а снимки
+        групп популярных городов заранее обновляет `snapshot_crawler`. Кэш
+        пользователей и настроек поиска согласуется с другими процессами
+        через `cache_listener`. Перед запуском схема базы данных
+        обновляется до моделей (`DatabaseSchemaManager.upgrade_tables()`).
+        """
+
+        DatabaseSchemaManager().upgrade_tables()
+        search_scheduler.start()
+        snapshot_crawler.start()
+        cache_listener.start()
+        self.dispatcher.start()
+        try:
+            for event in self.longpoll.listen():
+                message = IncomingMessage.from_event(event)
+                if message is None:
+                    continue
+
+                request = message.text.strip().lower()
+                self.dispatcher.submit(
+                    message.user_id, self.handle_message, request, message,
+                    self.longpoll.hold()
+                )
+        finally:
+            self.dispatcher.shutdown()
+            search_scheduler.shutdown()
+            snapshot_crawler.shutdown(wait=False)
+            cache_listener.shutdown(wait=False)
+
+    def handle_message(
+        self,
+        request: str,
+        event: IncomingMessage,
+        release: Callable[[], None] | None = None
+    ) -> None:
+        """
+        Обработка текстовых сообщений.
+
+        Сообщение обрабатывается в отдельной единице работы с базой
+        данных (`db.session.unit_of_work()`). После обработки вызывается
+        `release`, разрешающий сохранить позицию longpoll.
+        """
+        try:
+            with unit_of_work():
+                self.router.dispatch(request, event)
+        finally:
+            if release is not None:
+                release()
+
+    def _build_router(self) -> CommandRouter:
+        """Собирает маршрутизатор команд бота."""
+
+        cmd = self.__cmd_handler
+        router = CommandRouter.from_config(
+            COMMANDS_CONFIG,
+            KEYBOARD_CONFIG,
             # Обработка неизвестных команд
-            self.__cmd_handler.handle_unknown_message(self.user_id)
+            fallback=lambda ctx: cmd.handle_unknown_message(ctx.user_id),
+        )
+
+        router.add_route(
+            "start", lambda ctx: cmd.start_handler(ctx.user_id)
+        )
+        router.add_route(
+            "configure_search_settings",
+            lambda ctx: cmd.search_settings_handler(ctx.request, ctx.user_id)
+        )
+        router.add_route(
+            "start_searching", lambda ctx: cmd.start_searching(ctx.user_id)
+        )
+        router.add_route(
+            "show_matches", lambda ctx: cmd.show_matches(ctx.user_id)
+        )
+        router.add_route(
+            "next_match",
+            lambda ctx: cmd.handle_next_match(ctx.user_id, ctx.message)
+        )
+        router.add_route(
+            "switch_search_engine",
+            lambda ctx: cmd.switch_search_engine(ctx.user_id)
+        )
+        router.use(self.__search_settings_middleware)
+        router.compile()
+
+        return router
+
+    def __search_settings_middleware(
+        self, ctx: RouteContext, call_next: Callable
+    ):
+        """
+        Передает сообщение в обработчик настроек, если пользователь находится
+        в процессе настройки поиска. Команды `start` и
+        `configure_search_settings` обрабатываются в любом случае.
+        """
+
+        if ctx.command not in SETTINGS_BYPASS_COMMANDS \
+                and self.__cmd_handler.is_in_search_settings(ctx.user_id):
+            return self.__cmd_handler.search_settings_handler(
+                ctx.request, ctx.user_id
+            )
+        return call_next(ctx)
 
 
 def main() -> None:
-    """Запуск бота."""
+    """
+    Запуск бота.
+
+    Режим работы выбирается переменной окружения `BOT_MODE`: `sync`
+    (по умолчанию) или `async`.
+    """
+
+    if os.getenv("BOT_MODE", "sync").lower() == "async":
+        # Асинхронный режим требует aiohttp, поэтому импортируется по запросу
+        from async_bot import main as async_main
+        async_main()
+        return
+
     bot = VKMatchSenseiBot()
     print("Бот запущен!")
     bot.run()
@@ -0,0 +1,61 @@
+"""
+Асинхронное подключение к базе данных.
+
+Асинхронные менеджеры (`db.managers.async_user_manager`,
+`db.managers.async_matches_manager`) работают через движок расширения
+`sqlalchemy.ext.asyncio` и используют те же модели, что и синхронные.
+Запрос к базе данных не занимает поток: пока он выполняется, цикл
+событий обслуживает других пользователей.
+
+Строка подключения по умолчанию строится из `DSN` заменой драйвера на
+асинхронный (`postgresql://` → `postgresql+asyncpg://`). Пул соединений
+настраивается теми же переменными окружения, что и синхронный
+(`db.session`), а его метрики попадают в `db_pool_stats()`.
+
+### Переменные окружения:
+- `ASYNC_DSN`: Строка подключения асинхронного движка. Если не задана,
+  строится из `DSN`.
+
+### Пример использования:
+```python
+async with AsyncSession() as session:
+    settings = await session.scalar(select(UserSearchSettings))
+```
+"""
+
+import os
+
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from db.session import MeteredAsyncQueuePool, instrument_engine, pool_options
+
+# Асинхронные драйверы баз данных
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def to_async_dsn(dsn: str | URL) -> URL:
+    """
+    Заменяет драйвер строки подключения на асинхронный.
+
+    ### Исключения:
+    - ValueError: Если для базы данных нет асинхронного драйвера.
+    """
+
+    url = make_url(dsn)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Нет асинхронного драйвера для {backend}.")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+ASYNC_DSN = os.getenv("ASYNC_DSN") or to_async_dsn(os.getenv("DSN"))
+
+async_engine = create_async_engine(
+    ASYNC_DSN, **pool_options(ASYNC_DSN, MeteredAsyncQueuePool)
+)
+instrument_engine(async_engine.sync_engine)
+AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
@@ -0,0 +1,195 @@
+"""Асинхронный менеджер базы данных для работы с мэтчами."""
+
+import asyncio
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from db.async_session import AsyncSession
+from db.managers.matches_manager import (
+    INSERT_BATCH_SIZE, INSERT_DIALECTS, add_match_count, build_match_insert,
+    cache_match_count, get_cached_match_count
+)
+from db.managers.seen_filter_manager import DatabaseSeenFilterManager
+from db.managers.user_cache import (
+    caches, notify_statement, supports_notify
+)
+from db.models.models import Matches
+from services.formatters.matches_formatter import format_matches_batch
+from services.formatters.module_formatters import get_module_part
+from utils.logging.setup import setup_logger
+
+
+class AsyncDatabaseMatchesManager:
+    """
+    Асинхронный менеджер базы данных для работы с мэтчами.
+
+    Методы совпадают с `DatabaseMatchesManager`, но выполняют запросы
+    через асинхронный движок (`db.async_session`), каждый в собственной
+    сессии. Количество мэтчей кэшируется вместе с синхронным менеджером.
+    """
+
+    __seen_manager = DatabaseSeenFilterManager()
+
+    def __init__(self) -> None:
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+
+    async def save_user_match(self, user_id: int, matches: list[dict]) \
+        -> tuple[int, int]:
+        """
+        Сохраняет информацию о мэтчах пользователя в базу данных.
+
+        Уже сохраненные мэтчи отбираются одним запросом по уникальному
+        ключу (`user_id`, `match_id`), фотографии новых запрашиваются
+        пакетно, а вставка выполняется так же, как в
+        `DatabaseMatchesManager.save_user_match`. Запрос фотографий к VK
+        API и обновление фильтра мэтчей (`DatabaseSeenFilterManager`)
+        синхронные и выполняются в отдельном потоке.
+
+        ### Возвращает:
+        - tuple[int, int]: Количество добавленных и пропущенных мэтчей.
+        """
+
+        matches = [match for match in matches if match]
+        if not matches:
+            return 0, 0
+
+        known_ids = set(await self.get_user_match_ids(
+            user_id, [match.get("id") for match in matches]
+        ))
+        new_matches = []
+        for match in matches:
+            if match.get("id") not in known_ids:
+                known_ids.add(match.get("id"))
+                new_matches.append(match)
+
+        if not new_matches:
+            self.logger.info(
+                "Новых мэтчей для сохранения не найдено для пользователя %d",
+                user_id
+            )
+            return 0, len(matches)
+
+        formatted_matches = await asyncio.to_thread(
+            format_matches_batch, new_matches
+        )
+
+        inserted_ids = []
+        async with AsyncSession() as session:
+            try:
+                dialect_name = session.bind.dialect.name
+                for start in range(
+                    0, len(formatted_matches), INSERT_BATCH_SIZE
+                ):
+                    batch = formatted_matches[start:start + INSERT_BATCH_SIZE]
+                    statement = build_match_insert(
+                        dialect_name, user_id, batch
+                    )
+                    if dialect_name in INSERT_DIALECTS:
+                        inserted_ids.extend(await session.scalars(statement))
+                    else:
+                        await session.execute(statement)
+                        inserted_ids.extend(
+                            match["match_id"] for match in batch
+                        )
+                if inserted_ids and supports_notify(dialect_name):
+                    await session.execute(
+                        notify_statement("matches", user_id)
+                    )
+                await session.commit()
+            except SQLAlchemyError as e:
+                await session.rollback()
+                self.logger.error("Ошибка при сохранении мэтча:\n%s", e)
+                return 0, 0
+
+        skipped = len(matches) - len(inserted_ids)
+        if inserted_ids:
+            add_match_count(user_id, len(inserted_ids))
+            await asyncio.to_thread(
+                self.__seen_manager.add_seen, user_id, inserted_ids
+            )
+            self.logger.info(
+                "Сохранено %d новых мэтчей для пользователя %d, "
+                "пропущено %d",
+                len(inserted_ids), user_id, skipped
+            )
+        else:
+            self.logger.info(
+                "Новых мэтчей для сохранения не найдено для пользователя %d",
+                user_id
+            )
+        return len(inserted_ids), skipped
+
+    async def get_user_match_ids(
+        self, user_id: int, match_ids: list[int] | None = None
+    ) -> list[int]:
+        """
+        Возвращает VK ID сохраненных мэтчей пользователя.
+
+        Аргументы совпадают с `DatabaseMatchesManager.get_user_match_ids`.
+        """
+
+        statement = select(Matches.match_id).filter_by(user_id=user_id)
+        if match_ids is not None:
+            statement = statement.filter(Matches.match_id.in_(match_ids))
+
+        async with AsyncSession() as session:
+            try:
+                return list(await session.scalars(statement))
+            except SQLAlchemyError as e:
+                self.logger.error(
+                    "Ошибка при получении мэтчей для пользователя %d: %s",
+                    user_id, str(e)
+                )
+                return []
+
+    async def get_next_match(self, user_id: int, after_id: int = 0) \
+        -> tuple[Matches | None, bool]:
+        """
+        Возвращает мэтч пользователя, следующий за `after_id`.
+
+        Аргументы и результат совпадают с
+        `DatabaseMatchesManager.get_next_match`.
+        """
+
+        async with AsyncSession() as session:
+            try:
+                rows = list(await session.scalars(
+                    select(Matches)
+                    .filter(Matches.user_id == user_id, Matches.id > after_id)
+                    .order_by(Matches.id)
+                    .limit(2)
+                ))
+                return (rows[0] if rows else None), len(rows) > 1
+            except SQLAlchemyError as e:
+                self.logger.error(
+                    "Ошибка при получении мэтча для пользователя %d: %s",
+                    user_id, str(e)
+                )
+                return None, False
+
+    async def count_user_matches(self, user_id: int) -> int:
+        """Возвращает количество мэтчей пользователя."""
+
+        count = get_cached_match_count(user_id)
+        if count is not None:
+            return count
+
+        version = caches["matches"].version(user_id)
+        async with AsyncSession() as session:
+            try:
+                count = await session.scalar(
+                    select(func.count(Matches.id)).filter_by(user_id=user_id)
+                )
+            except SQLAlchemyError as e:
+                self.logger.error(
+                    "Ошибка при подсчете мэтчей для пользователя %d: %s",
+                    user_id, str(e)
+                )
+                return 0
+
+        cache_match_count(user_id, count, version)
+        return count
@@ -0,0 +1,221 @@
+"""Асинхронный менеджер базы данных для работы с пользователями."""
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from db.async_session import AsyncSession
+from db.managers.user_cache import (
+    MISSING, caches, from_values, notify_statement, row_values,
+    supports_notify
+)
+from db.models.models import SearchCursor, User, UserSearchSettings
+from services.formatters.db_user_formatter import DatabaseUserFormatServices
+from services.formatters.module_formatters import get_module_part
+from utils.logging.setup import setup_logger
+
+
+class AsyncDatabaseUserManager:
+    """
+    Асинхронный менеджер базы данных для работы с пользователями.
+
+    Методы совпадают с `DatabaseUserManager`, но выполняют запросы через
+    асинхронный движок (`db.async_session`). Каждый метод открывает
+    собственную сессию, поэтому менеджер можно вызывать из разных задач
+    одновременно. Кэш пользователей и настроек поиска
+    (`db.managers.user_cache`) общий с `DatabaseUserManager`.
+    """
+
+    __fmt_service = DatabaseUserFormatServices()
+
+    def __init__(self) -> None:
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+
+    async def create_user(self, data: dict) -> None:
+        """Создает пользователя в базе данных."""
+
+        async with AsyncSession() as session:
+            try:
+                new_user = User(
+                    **self.__fmt_service.fmt_user_data_to_db(data)
+                )
+                if await self.get_user_by_id(new_user.user_id):
+                    return
+
+                session.add(new_user)
+                await self.__notify(session, "users", new_user.user_id)
+                await session.commit()
+                caches["users"].set(new_user.user_id, row_values(new_user))
+
+                self.logger.info(
+                    'Пользователь "%s" успешно создан.', new_user.profile_url)
+            except SQLAlchemyError as e:
+                await session.rollback()
+                self.logger.error("Ошибка при создании пользователя:\n%s", e)
+
+    async def get_user_by_id(self, user_id: int) -> User | None:
+        """Возвращает пользователя по его id."""
+
+        cache = caches["users"]
+        values = cache.get(user_id, MISSING)
+        if values is MISSING:
+            # Строка, удаленная из кэша во время чтения, в него не попадет
+            version = cache.version(user_id)
+            async with AsyncSession() as session:
+                values = row_values(await session.scalar(
+                    select(User).filter_by(user_id=user_id)
+                ))
+            cache.set(user_id, values, version)
+        return from_values(User, values)
+
+    async def create_user_search_settings(
+        self, user_id: int, settings_data: dict
+    ) -> None:
+        """
+        Создает настройки пользователя для поиска мэтчей в базе данных.
+
+        Аргументы совпадают с
+        `DatabaseUserManager.create_user_search_settings`.
+        """
+
+        async with AsyncSession() as session:
+            try:
+                if await self.get_user_search_settings(user_id):
+                    self.logger.info(
+                        "Настройки для пользователя %d уже существуют. "
+                        "Создание новых настроек прекращено.",
+                        user_id
+                    )
+                    return
+
+                settings = UserSearchSettings(user_id=user_id, **settings_data)
+                session.add(settings)
+                await self.__notify(session, "user_search_settings", user_id)
+                await session.commit()
+                caches["user_search_settings"].set(
+                    user_id, row_values(settings)
+                )
+
+                self.logger.info(
+                    "Настройки для пользователя %d успешно созданы.", user_id)
+            except SQLAlchemyError as e:
+                await session.rollback()
+                self.logger.error(
+                    "Ошибка при создании настроек пользователя:\n%s", e)
+
+    async def get_user_search_settings(self, user_id: int) \
+        -> UserSearchSettings | None:
+        """
+        Возвращает настройки пользователя для поиска мэтчей из базы данных.
+
+        ### Аргументы:
+        - user_id (int): ID пользователя ВКонтакте.
+
+        ### Возвращает:
+        - UserSearchSettings: Объект настроек пользователя для поиска мэтчей.
+        - None: Если настройки не были найдены.
+        """
+
+        cache = caches["user_search_settings"]
+        values = cache.get(user_id, MISSING)
+        if values is MISSING:
+            version = cache.version(user_id)
+            async with AsyncSession() as session:
+                values = row_values(await session.scalar(
+                    select(UserSearchSettings).filter_by(user_id=user_id)
+                ))
+            cache.set(user_id, values, version)
+        return from_values(UserSearchSettings, values)
+
+    async def update_user_settings(
+        self, user_id: int, settings_data: dict
+    ) -> bool:
+        """
+        Обновляет настройки пользователя для поиска мэтчей в базе данных.
+
+        Аргументы и работа с кэшем совпадают с
+        `DatabaseUserManager.update_user_settings`. Если настройки
+        изменились, курсоры поиска пользователя удаляются.
+
+        ### Возвращает:
+        - bool: True, если настройки созданы или изменились.
+        """
+
+        current = row_values(await self.get_user_search_settings(user_id))
+        if current is None:
+            await self.create_user_search_settings(user_id, settings_data)
+            return True
+
+        changes = {
+            key: value for key, value in settings_data.items()
+            if key in current and current[key] != value
+        }
+        if not changes:
+            self.logger.debug(
+                "Настройки пользователя %d не изменились.", user_id)
+            return False
+
+        async with AsyncSession() as session:
+            try:
+                result = await session.execute(
+                    update(UserSearchSettings)
+                    .filter_by(user_id=user_id)
+                    .values(changes)
+                )
+                if result.rowcount:
+                    values = {**current, **changes}
+                else:
+                    # Настройки удалены другим процессом после чтения в
+                    # кэш: создаются заново в той же транзакции
+                    settings = UserSearchSettings(
+                        user_id=user_id, **settings_data
+                    )
+                    session.add(settings)
+                    await session.flush()
+                    values = row_values(settings)
+
+                await session.execute(
+                    delete(SearchCursor).filter_by(user_id=user_id)
+                )
+                await self.__notify(session, "user_search_settings", user_id)
+                await session.commit()
+                caches["user_search_settings"].set(user_id, values)
+                self.logger.info(
+                    "Настройки пользователя %d успешно обновлены.", user_id)
+                return True
+            except SQLAlchemyError as e:
+                await session.rollback()
+                self.logger.error(
+                    "Ошибка при обновлении настроек пользователя:\n%s", e)
+                return False
+
+    async def delete_user_settings(self, user_id: int) -> None:
+        """Удаляет настройки пользователя для поиска мэтчей из базы данных."""
+
+        async with AsyncSession() as session:
+            try:
+                result = await session.execute(
+                    delete(UserSearchSettings).filter_by(user_id=user_id)
+                )
+                if result.rowcount:
+                    await self.__notify(
+                        session, "user_search_settings", user_id
+                    )
+                    await session.commit()
+                    self.logger.info(
+                        "Настройки пользователя %d успешно удалены.", user_id)
+                caches["user_search_settings"].set(user_id, None)
+            except SQLAlchemyError as e:
+                await session.rollback()
+                self.logger.error(
+                    "Ошибка при удалении настроек пользователя:\n%s", e)
+
+    @staticmethod
+    async def __notify(session: AsyncSession, table: str, user_id: int) \
+        -> None:
+        """Уведомляет другие процессы об изменении строки при фиксации."""
+
+        if supports_notify(session.bind.dialect.name):
+            await session.execute(notify_statement(table, user_id))
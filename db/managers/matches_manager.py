@@ -1,17 +1,105 @@
 """Менеджер базы данных для работы с мэтчей."""
 
+import threading
+
+from sqlalchemy import Insert, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import SQLAlchemyError
 
+from db.managers.seen_filter_manager import DatabaseSeenFilterManager
+from db.managers.user_cache import (
+    caches, notify_statement, supports_notify
+)
 from db.models.models import Matches, Session
-from services.formatters.matches_formatter import format_matches
+from db.session import after_commit, unit_of_work
+from services.formatters.matches_formatter import format_matches_batch
 from services.formatters.module_formatters import get_module_part
 from utils.logging.setup import setup_logger
 
+# Мэтчей в одном запросе вставки
+INSERT_BATCH_SIZE = 1000
+
+# Конструкторы `INSERT` диалектов с поддержкой `ON CONFLICT DO NOTHING`
+INSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+# Количество мэтчей пользователей хранится в кэше `caches["matches"]`
+# (`db.managers.user_cache`) и обновляется при сохранении мэтчей, поэтому
+# показ мэтчей не считает их заново. Другие процессы удаляют его через
+# уведомление `matches`, а время жизни записи ограничивает устаревание
+_match_counts_lock = threading.Lock()
+
+
+def get_cached_match_count(user_id: int) -> int | None:
+    """Возвращает сохраненное количество мэтчей пользователя."""
+    return caches["matches"].get(user_id)
+
+
+def cache_match_count(
+    user_id: int, count: int, version: tuple[int, int] | None = None
+) -> None:
+    """
+    Сохраняет количество мэтчей пользователя.
+
+    ### Аргументы:
+    - user_id (int): VK ID пользователя.
+    - count (int): Количество мэтчей.
+    - version (tuple[int, int], optional): Версия записи кэша
+      (`LRUCache.version()`) до подсчета. Если мэтчи за это время
+      сохранены, количество не запоминается.
+    """
+    caches["matches"].set(user_id, count, version)
+
+
+def add_match_count(user_id: int, added: int) -> None:
+    """Увеличивает сохраненное количество мэтчей пользователя."""
+
+    cache = caches["matches"]
+    with _match_counts_lock:
+        count = cache.get(user_id)
+        if count is None:
+            # Подсчет, начатый до сохранения, не запомнит старое значение
+            cache.invalidate(user_id)
+        else:
+            cache.set(user_id, count + added)
+
+
+def build_match_insert(
+    dialect_name: str, user_id: int, formatted_matches: list[dict]
+) -> Insert:
+    """
+    Строит запрос вставки мэтчей пользователя.
+
+    ### Возвращает:
+    - Insert: `INSERT ... ON CONFLICT DO NOTHING RETURNING match_id` для
+      диалектов из `INSERT_DIALECTS`, иначе обычный `INSERT`.
+    """
+
+    rows = [{"user_id": user_id, **match} for match in formatted_matches]
+    insert_factory = INSERT_DIALECTS.get(dialect_name)
+    if insert_factory is None:
+        return insert(Matches).values(rows)
+
+    return (
+        insert_factory(Matches)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["user_id", "match_id"])
+        .returning(Matches.match_id)
+    )
+
 
 class DatabaseMatchesManager:
-    """Менеджер базы данных для работы с мэтчами."""
+    """
+    Менеджер базы данных для работы с мэтчами.
 
-    __session = Session()
+    Запросы выполняются в единицах работы (`db.session.unit_of_work()`),
+    фиксацию и закрытие сессии выполняет внешняя единица работы.
+    """
+
+    __session = Session
+    __seen_manager = DatabaseSeenFilterManager()
 
     def __init__(self) -> None:
         self.logger = setup_logger(
@@ -19,28 +107,84 @@ class DatabaseMatchesManager:
             logger_name=__name__
         )
 
-    def save_user_match(self, user_id: int, matches: list[dict]) -> None:
-        """Сохраняет информацию о мэтче пользователя в базу данных."""
+    def save_user_match(self, user_id: int, matches: list[dict]) \
+        -> tuple[int, int]:
+        """
+        Сохраняет информацию о мэтчах пользователя в базу данных.
+
+        Уже сохраненные мэтчи пропускаются до обращения к VK API, а
+        фотографии новых мэтчей запрашиваются пакетно. Сохраненные мэтчи
+        проверяются по фильтру пользователя
+        (`DatabaseSeenFilterManager`), и из базы данных одним запросом
+        загружаются только кандидаты, на которых фильтр сработал.
+        Новые мэтчи вставляются одним запросом на `INSERT_BATCH_SIZE`
+        строк: строки, уже добавленные другим поиском, пропускаются по
+        уникальному ключу (`user_id`, `match_id`).
+
+        Проверка сохраненных мэтчей и вставка выполняются в отдельных
+        единицах работы, а фотографии запрашиваются между ними, поэтому
+        отдельно вызванный метод не держит соединение с базой данных на
+        время запросов к VK API.
+
+        ### Возвращает:
+        - tuple[int, int]: Количество добавленных и пропущенных мэтчей.
+        """
+
+        inserted_ids = []
+        skipped = 0
         try:
-            saved_count = 0
+            seen_manager = self.__seen_manager
+            matches = [match for match in matches if match]
+            match_ids = [match.get("id") for match in matches]
+            with unit_of_work():
+                seen = seen_manager.get_seen_filter(user_id)
+                maybe_seen = [
+                    match_id for match_id, is_seen in zip(
+                        match_ids, seen.contains_many(match_ids)
+                    ) if is_seen
+                ]
+                known_ids = set(
+                    self.get_user_match_ids(user_id, maybe_seen)
+                ) if maybe_seen else set()
+            new_matches = []
             for match in matches:
-                match = format_matches(match)
-                new_match = Matches(user_id=user_id, **match)
-
-                if not self.get_user_matches(user_id, match):
-                    self.__session.add(new_match)
-                    saved_count += 1
-                else:
+                match_id = match.get("id")
+                if match_id in known_ids:
                     self.logger.debug(
                         "Мэтч %s уже существует для пользователя %d",
-                        match.get("match_id"), user_id
+                        match_id, user_id
                     )
+                    continue
+
+                known_ids.add(match_id)
+                new_matches.append(match)
+
+            formatted_matches = format_matches_batch(new_matches)
+            with unit_of_work():
+                for start in range(
+                    0, len(formatted_matches), INSERT_BATCH_SIZE
+                ):
+                    inserted_ids.extend(self.__insert_ignoring_duplicates(
+                        user_id,
+                        formatted_matches[start:start + INSERT_BATCH_SIZE]
+                    ))
+                if inserted_ids:
+                    seen_manager.add_seen(user_id, inserted_ids)
+                    if supports_notify(
+                        self.__session.get_bind().dialect.name
+                    ):
+                        self.__session.execute(
+                            notify_statement("matches", user_id)
+                        )
+                    added = len(inserted_ids)
+                    after_commit(lambda: add_match_count(user_id, added))
+            skipped = len(matches) - len(inserted_ids)
 
-            if saved_count > 0:
-                self.__session.commit()
+            if inserted_ids:
                 self.logger.info(
-                    "Сохранено %d новых мэтчей для пользователя %d",
-                    saved_count, user_id
+                    "Сохранено %d новых мэтчей для пользователя %d, "
+                    "пропущено %d",
+                    len(inserted_ids), user_id, skipped
                 )
             else:
                 self.logger.info(
@@ -48,10 +192,62 @@ class DatabaseMatchesManager:
                     user_id
                 )
         except SQLAlchemyError as e:
-            self.__session.rollback()
+            inserted_ids, skipped = [], 0
             self.logger.error("Ошибка при сохранении мэтча:\n%s", e)
-        finally:
-            self.__session.close()
+
+        return len(inserted_ids), skipped
+
+    def __insert_ignoring_duplicates(
+        self, user_id: int, formatted_matches: list[dict]
+    ) -> list[int]:
+        """
+        Вставляет мэтчи одним запросом `INSERT ... ON CONFLICT DO NOTHING`.
+
+        Диалекты без `ON CONFLICT` выполняют обычную вставку и полагаются
+        на проверку сохраненных мэтчей перед ней.
+
+        ### Возвращает:
+        - list[int]: VK ID добавленных мэтчей.
+        """
+
+        if not formatted_matches:
+            return []
+
+        dialect_name = self.__session.get_bind().dialect.name
+        statement = build_match_insert(
+            dialect_name, user_id, formatted_matches
+        )
+        if dialect_name not in INSERT_DIALECTS:
+            self.__session.execute(statement)
+            return [match["match_id"] for match in formatted_matches]
+
+        return list(self.__session.scalars(statement))
+
+    def get_user_match_ids(
+        self, user_id: int, match_ids: list[int] | None = None
+    ) -> list[int]:
+        """
+        Возвращает VK ID сохраненных мэтчей пользователя.
+
+        ### Аргументы:
+        - user_id (int): ID пользователя.
+        - match_ids (list[int], optional): Проверяемые VK ID. Если
+          указаны, возвращаются только сохраненные из них.
+        """
+        try:
+            with unit_of_work():
+                query = self.__session.query(Matches.match_id).filter_by(
+                    user_id=user_id
+                )
+                if match_ids is not None:
+                    query = query.filter(Matches.match_id.in_(match_ids))
+                return [match_id for (match_id,) in query]
+        except SQLAlchemyError as e:
+            self.logger.error(
+                "Ошибка при получении мэтчей для пользователя %d: %s",
+                user_id, str(e)
+            )
+            return []
 
     def get_user_matches(self, user_id: int, matches: dict = None) \
         -> list[Matches]:
@@ -67,17 +263,79 @@ class DatabaseMatchesManager:
             return []
 
         try:
-            query = self.__session.query(Matches).filter_by(user_id=user_id)
+            with unit_of_work():
+                query = self.__session.query(Matches).filter_by(
+                    user_id=user_id
+                )
 
-            if matches and isinstance(matches, dict):
-                query = query.filter_by(**matches)
-                result = query.first()
-                return [result] if result else []
+                if matches and isinstance(matches, dict):
+                    query = query.filter_by(**matches)
+                    result = query.first()
+                    return [result] if result else []
 
-            return query.all() or []
+                return query.all() or []
         except SQLAlchemyError as e:
             self.logger.error(
                 "Ошибка при получении мэтчей для пользователя %d: %s",
                 user_id, str(e)
             )
             return []
+
+    def get_next_match(self, user_id: int, after_id: int = 0) \
+        -> tuple[Matches | None, bool]:
+        """
+        Возвращает мэтч пользователя, следующий за `after_id`.
+
+        Мэтчи перебираются по возрастанию `Matches.id` (keyset): запрос
+        читает по индексу (`user_id`, `id`) не больше двух строк, поэтому
+        время не зависит от количества мэтчей и номера показываемого.
+
+        ### Аргументы:
+        - user_id (int): ID пользователя.
+        - after_id (int): `Matches.id` показанного мэтча. 0 — первый мэтч.
+
+        ### Возвращает:
+        - tuple[Matches | None, bool]: Мэтч (None, если мэтчей после
+          `after_id` нет) и есть ли мэтчи после него.
+        """
+        try:
+            with unit_of_work():
+                rows = (
+                    self.__session.query(Matches)
+                    .filter(Matches.user_id == user_id, Matches.id > after_id)
+                    .order_by(Matches.id)
+                    .limit(2)
+                    .all()
+                )
+            return (rows[0] if rows else None), len(rows) > 1
+        except SQLAlchemyError as e:
+            self.logger.error(
+                "Ошибка при получении мэтча для пользователя %d: %s",
+                user_id, str(e)
+            )
+            return None, False
+
+    def count_user_matches(self, user_id: int) -> int:
+        """Возвращает количество мэтчей пользователя."""
+
+        count = get_cached_match_count(user_id)
+        if count is not None:
+            return count
+
+        version = caches["matches"].version(user_id)
+        try:
+            with unit_of_work():
+                count = self.__session.query(
+                    func.count(Matches.id)
+                ).filter_by(user_id=user_id).scalar()
+                after_commit(
+                    lambda: cache_match_count(user_id, count, version)
+                )
+        except SQLAlchemyError as e:
+            self.logger.error(
+                "Ошибка при подсчете мэтчей для пользователя %d: %s",
+                user_id, str(e)
+            )
+            return 0
+
+        return count
@@ -1,6 +1,9 @@
 """Модуль для менеджера управления схемой базы данных."""
 
-from db.models.models import Base, engine
+from sqlalchemy import delete, func, inspect, select
+from sqlalchemy.schema import CreateIndex
+
+from db.models.models import Base, Matches, engine
 from services.formatters.module_formatters import get_module_part
 from utils.logging.setup import setup_logger
 
@@ -13,6 +16,8 @@ class DatabaseSchemaManager:
     - `create_tables()`: Метод для создания всех таблиц в базе данных.
     - `drop_tables_cascade()`: Метод для удаления всех таблиц в базе данных.
     - `recreate_tables()`: Метод для перезаписи всех таблиц в базе данных.
+    - `upgrade_tables()`: Метод для обновления схемы существующей БД без
+      потери данных.
     """
 
     def __init__(self) -> None:
@@ -52,3 +57,54 @@ class DatabaseSchemaManager:
         self.drop_tables_cascade()
         self.create_tables()
         self.logger.info("Таблицы успешно перезаписаны.")
+
+    def upgrade_tables(self) -> None:
+        """
+        Приводит схему существующей БД к моделям без потери данных.
+
+        Создает недостающие таблицы и индексы (`CREATE INDEX IF NOT
+        EXISTS`). Перед созданием уникального индекса мэтчей из таблицы
+        удаляются повторы пары (`user_id`, `match_id`) — остается мэтч с
+        наименьшим `id`, — иначе индекс не создать. Без этого индекса
+        вставка мэтчей (`ON CONFLICT DO NOTHING`) завершается ошибкой.
+
+        Метод можно вызывать многократно: бот вызывает его при запуске.
+        """
+
+        try:
+            Base.metadata.create_all(engine)
+            with engine.begin() as connection:
+                indexes = {
+                    index["name"]
+                    for index in inspect(connection).get_indexes(
+                        Matches.__tablename__
+                    )
+                }
+                if "uq_matches_user_match" not in indexes:
+                    removed = self.__remove_duplicate_matches(connection)
+                    if removed:
+                        self.logger.info(
+                            "Удалено повторяющихся мэтчей: %d.", removed
+                        )
+
+                for table in Base.metadata.sorted_tables:
+                    for index in table.indexes:
+                        connection.execute(
+                            CreateIndex(index, if_not_exists=True)
+                        )
+            self.logger.info("Схема базы данных обновлена.")
+        except Exception as e:
+            self.logger.error("Ошибка при обновлении схемы:\n%s", e)
+
+    @staticmethod
+    def __remove_duplicate_matches(connection) -> int:
+        """Удаляет повторы мэтчей, оставляя мэтч с наименьшим `id`."""
+
+        first_ids = (
+            select(func.min(Matches.id))
+            .group_by(Matches.user_id, Matches.match_id)
+        )
+        result = connection.execute(
+            delete(Matches).where(Matches.id.not_in(first_ids))
+        )
+        return result.rowcount
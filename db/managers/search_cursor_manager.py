@@ -0,0 +1,119 @@
+"""Менеджер базы данных для работы с курсорами поиска."""
+
+import hashlib
+import json
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from db.models.models import SearchCursor, Session, UserSearchSettings
+from db.session import unit_of_work
+from services.formatters.module_formatters import get_module_part
+from utils.logging.setup import setup_logger
+
+# Настройки, от которых зависит, какие участники группы подходят
+SETTINGS_HASH_FIELDS = (
+    "city_id", "sex", "age_min", "age_max", "relation", "search_engine"
+)
+
+
+def settings_hash(search_settings: UserSearchSettings) -> str:
+    """Отпечаток настроек поиска, с которыми читались группы."""
+
+    values = [
+        getattr(search_settings, field, None) for field in SETTINGS_HASH_FIELDS
+    ]
+    return hashlib.sha1(
+        json.dumps(values).encode(), usedforsecurity=False
+    ).hexdigest()[:16]
+
+
+class DatabaseSearchCursorManager:
+    """
+    Менеджер базы данных для работы с курсорами поиска.
+
+    Курсор хранит смещение группы, на котором остановился поиск
+    пользователя, вместе с отпечатком настроек поиска. Курсоры с другим
+    отпечатком не возвращаются, поэтому после изменения настроек поиск
+    начинается с начала групп. Курсор прочитанной до конца группы
+    сохраняется равным 0 (`MultiGroupMemberStream.cursors`), и
+    следующий поиск читает ее с начала.
+    """
+
+    __session = Session
+
+    def __init__(self) -> None:
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+
+    def get_cursors(
+        self, user_id: int, search_settings: UserSearchSettings
+    ) -> dict[int, int]:
+        """
+        Возвращает курсоры поиска пользователя для его настроек.
+
+        ### Возвращает:
+        - dict[int, int]: Смещения первых непрочитанных участников по ID
+          групп.
+        """
+        try:
+            with unit_of_work():
+                return {
+                    group_id: offset
+                    for group_id, offset in self.__session.query(
+                        SearchCursor.group_id, SearchCursor.offset
+                    ).filter_by(
+                        user_id=user_id,
+                        settings_hash=settings_hash(search_settings)
+                    )
+                }
+        except SQLAlchemyError as e:
+            self.logger.error(
+                "Ошибка при получении курсоров поиска пользователя %d: %s",
+                user_id, e
+            )
+            return {}
+
+    def save_cursors(
+        self,
+        user_id: int,
+        search_settings: UserSearchSettings,
+        cursors: dict[int, int]
+    ) -> None:
+        """
+        Сохраняет курсоры поиска пользователя.
+
+        Курсоры групп, которых нет в `cursors`, не изменяются.
+        """
+        if not cursors:
+            return
+
+        fingerprint = settings_hash(search_settings)
+        try:
+            with unit_of_work():
+                existing = {
+                    cursor.group_id: cursor
+                    for cursor in self.__session.query(SearchCursor).filter(
+                        SearchCursor.user_id == user_id,
+                        SearchCursor.group_id.in_(cursors)
+                    )
+                }
+                for group_id, offset in cursors.items():
+                    cursor = existing.get(group_id)
+                    if cursor is None:
+                        self.__session.add(SearchCursor(
+                            user_id=user_id, group_id=group_id,
+                            settings_hash=fingerprint, offset=offset
+                        ))
+                    else:
+                        cursor.settings_hash = fingerprint
+                        cursor.offset = offset
+
+            self.logger.debug(
+                "Курсоры поиска пользователя %d сохранены: %s",
+                user_id, cursors
+            )
+        except SQLAlchemyError as e:
+            self.logger.error(
+                "Ошибка при сохранении курсоров поиска:\n%s", e)
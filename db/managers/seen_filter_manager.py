@@ -0,0 +1,145 @@
+"""
+Менеджер базы данных для работы с фильтрами уже найденных кандидатов.
+
+Фильтр Блума пользователя (`utils.collections.BloomFilter`) содержит VK
+ID его мэтчей и хранится в таблице `seen_filters` одной строкой.
+Поиск загружает только фильтр, а не все мэтчи пользователя, и
+отбрасывает по нему уже найденных кандидатов. Ложное срабатывание
+фильтра означает, что новый кандидат будет пропущен, поэтому их доля
+задается переменной окружения. Точная проверка остается при сохранении
+мэтчей и выполняется только для кандидатов, на которых сработал фильтр.
+
+Фильтр перестраивается по таблице `matches`, если его нет, если
+изменилась доля ложных срабатываний или если мэтчей стало больше
+емкости. Новая емкость — вдвое больше количества мэтчей.
+
+### Переменные окружения:
+- `SEEN_FILTER_CAPACITY`: Начальная емкость фильтра пользователя.
+- `SEEN_FILTER_ERROR_RATE`: Доля ложных срабатываний при заполненном
+  фильтре. Вместе с емкостью определяет объем фильтра: при 0.001
+  около 1.8 байта на мэтч.
+"""
+
+import os
+from typing import Iterable
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from db.models.models import Matches, SeenFilter, Session
+from db.session import unit_of_work
+from services.formatters.module_formatters import get_module_part
+from utils.collections import BloomFilter
+from utils.logging.setup import setup_logger
+
+SEEN_FILTER_CAPACITY = int(os.getenv("SEEN_FILTER_CAPACITY", "1000"))
+SEEN_FILTER_ERROR_RATE = float(os.getenv("SEEN_FILTER_ERROR_RATE", "0.001"))
+
+
+class DatabaseSeenFilterManager:
+    """Менеджер базы данных для работы с фильтрами уже найденных кандидатов."""
+
+    __session = Session
+
+    def __init__(
+        self,
+        capacity: int = SEEN_FILTER_CAPACITY,
+        error_rate: float = SEEN_FILTER_ERROR_RATE
+    ) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+
+    def get_seen_filter(self, user_id: int) -> BloomFilter:
+        """
+        Возвращает фильтр мэтчей пользователя.
+
+        ### Возвращает:
+        - BloomFilter: Фильтр. Если его не удалось загрузить или
+          построить, возвращается пустой фильтр.
+        """
+        try:
+            with unit_of_work():
+                row = self.__session.query(SeenFilter).filter_by(
+                    user_id=user_id
+                ).first()
+                if row is not None and row.error_rate == self.error_rate \
+                        and row.count <= row.capacity:
+                    bloom = BloomFilter.from_bytes(
+                        row.bits, row.capacity, row.error_rate, row.count
+                    )
+                else:
+                    bloom = self.__rebuild(user_id, row)
+
+            self.logger.debug(
+                "Фильтр мэтчей пользователя %d: %s", user_id, bloom.stats()
+            )
+            return bloom
+        except (SQLAlchemyError, ValueError) as e:
+            self.logger.error(
+                "Ошибка при загрузке фильтра мэтчей пользователя %d: %s",
+                user_id, e
+            )
+            return BloomFilter(self.capacity, self.error_rate)
+
+    def add_seen(self, user_id: int, match_ids: Iterable[int]) -> None:
+        """Добавляет VK ID сохраненных мэтчей в фильтр пользователя."""
+
+        match_ids = list(match_ids)
+        if not match_ids:
+            return
+
+        try:
+            with unit_of_work():
+                row = self.__session.query(SeenFilter).filter_by(
+                    user_id=user_id
+                ).first()
+                if row is None or row.error_rate != self.error_rate \
+                        or row.count + len(match_ids) > row.capacity:
+                    # Мэтчи уже сохранены и попадут в новый фильтр
+                    self.__rebuild(user_id, row)
+                    return
+
+                bloom = BloomFilter.from_bytes(
+                    row.bits, row.capacity, row.error_rate, row.count
+                )
+                bloom.update(match_ids)
+                row.bits = bloom.to_bytes()
+                row.count = bloom.count
+        except (SQLAlchemyError, ValueError) as e:
+            self.logger.error(
+                "Ошибка при обновлении фильтра мэтчей пользователя %d: %s",
+                user_id, e
+            )
+
+    def __rebuild(self, user_id: int, row: SeenFilter | None) -> BloomFilter:
+        """
+        Строит фильтр по таблице `matches` и сохраняет его в текущей
+        единице работы.
+        """
+
+        match_ids = [
+            match_id for (match_id,) in self.__session.query(
+                Matches.match_id
+            ).filter_by(user_id=user_id)
+        ]
+        bloom = BloomFilter(
+            max(self.capacity, 2 * len(match_ids)), self.error_rate
+        )
+        bloom.update(match_ids)
+
+        if row is None:
+            row = SeenFilter(user_id=user_id)
+            self.__session.add(row)
+        row.capacity = bloom.capacity
+        row.error_rate = bloom.error_rate
+        row.count = bloom.count
+        row.bits = bloom.to_bytes()
+
+        self.logger.info(
+            "Фильтр мэтчей пользователя %d перестроен: %d мэтчей, %d байт.",
+            user_id, bloom.count, bloom.nbytes
+        )
+        return bloom
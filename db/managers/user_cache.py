@@ -0,0 +1,270 @@
+"""
+Кэш строк пользователей и настроек поиска.
+
+Менеджеры пользователей (`DatabaseUserManager`,
+`AsyncDatabaseUserManager`) читают строки `users` и
+`user_search_settings` через общий для процесса кэш (read-through) и
+обновляют его при записи (write-through), поэтому каждый поиск и шаг
+настройки не обращается к базе данных за настройками, а `/start` — за
+пользователем. В кэше хранятся значения столбцов строки, а менеджеры
+возвращают новые отсоединенные объекты моделей, поэтому изменение
+объекта вызывающим кодом не меняет кэш. Отсутствие строки тоже
+кэшируется. В кэше `matches` хранится количество мэтчей пользователя
+(`DatabaseMatchesManager.count_user_matches`).
+
+Несколько процессов бота согласуют кэши через PostgreSQL
+`LISTEN/NOTIFY`: запись в таблицу отправляет в той же транзакции
+уведомление в канал `CHANNEL`, а `CacheInvalidationListener` каждого
+процесса удаляет из своего кэша измененную строку. После потери
+соединения с базой данных слушатель очищает кэши целиком, так как
+пропущенные уведомления неизвестны. Для других баз данных уведомления не
+отправляются: предполагается один процесс. Время жизни записи
+ограничивает устаревание, если уведомление все же потеряно.
+
+### Переменные окружения:
+- `USER_CACHE_SIZE`: Максимальное количество записей каждого кэша.
+  0 — кэш отключен.
+- `USER_CACHE_TTL`: Время жизни записи в секундах. 0 — кэш отключен.
+
+### Пример использования:
+```python
+cache_listener.start()
+print(user_cache_stats())
+cache_listener.shutdown()
+```
+"""
+
+import os
+import select
+import threading
+import uuid
+from typing import Any, TypeVar
+
+from sqlalchemy import Select, func, inspect
+from sqlalchemy import select as sql_select
+
+from db.session import engine
+from services.formatters.module_formatters import get_module_part
+from utils.collections import LRUCache
+from utils.logging.setup import setup_logger
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+# Канал уведомлений об изменении строк
+CHANNEL = "user_cache"
+# Уведомления процесса о собственных записях пропускаются
+PROCESS_ID = uuid.uuid4().hex[:12]
+# Время ожидания уведомления и пауза перед переподключением в секундах
+POLL_TIMEOUT = 1.0
+RECONNECT_DELAY = 5.0
+
+# Значения столбцов строк по VK ID пользователя, ключи — имена таблиц.
+# Для `matches` — количество мэтчей пользователя
+caches = {
+    "users": LRUCache(USER_CACHE_SIZE, USER_CACHE_TTL),
+    "user_search_settings": LRUCache(USER_CACHE_SIZE, USER_CACHE_TTL),
+    "matches": LRUCache(USER_CACHE_SIZE, USER_CACHE_TTL),
+}
+# Значение `get()` для ключа, которого нет в кэше
+MISSING = object()
+
+Model = TypeVar("Model")
+
+logger = setup_logger(
+    module_name=get_module_part(__name__, idx=0), logger_name=__name__
+)
+
+
+def row_values(row: Any) -> dict | None:
+    """Значения столбцов строки модели для кэша."""
+
+    if row is None:
+        return None
+    return {
+        attr.key: getattr(row, attr.key)
+        for attr in inspect(row).mapper.column_attrs
+    }
+
+
+def from_values(model: type[Model], values: dict | None) -> Model | None:
+    """Создает отсоединенный объект модели из значений кэша."""
+    return None if values is None else model(**values)
+
+
+def supports_notify(dialect_name: str) -> bool:
+    """База данных поддерживает `LISTEN/NOTIFY`."""
+    return dialect_name == "postgresql"
+
+
+def notify_statement(table: str, user_id: int) -> Select:
+    """
+    Запрос уведомления других процессов об изменении строки.
+
+    Уведомление доставляется после фиксации транзакции, в которой
+    выполнен запрос, и не доставляется при откате.
+    """
+    return sql_select(
+        func.pg_notify(CHANNEL, f"{PROCESS_ID}:{table}:{user_id}")
+    )
+
+
+def invalidate(table: str | None = None, user_id: int | None = None) -> None:
+    """
+    Удаляет строки из кэшей процесса.
+
+    ### Аргументы:
+    - table (str, optional): Имя таблицы. Если не указано — все кэши.
+    - user_id (int, optional): VK ID пользователя. Если не указан —
+      все строки таблицы.
+    """
+
+    for name, cache in caches.items():
+        if table is None or name == table:
+            cache.invalidate(user_id)
+
+
+class CacheInvalidationListener:
+    """
+    Фоновый слушатель уведомлений об изменении строк.
+
+    Работает только с PostgreSQL через драйвер psycopg2 и держит одно
+    отдельное от пула соединение.
+
+    ### Методы:
+    - `start()`: Запускает поток слушателя.
+    - `handle()`: Применяет одно уведомление.
+    - `stats()`: Возвращает статистику слушателя.
+    - `shutdown()`: Останавливает поток.
+    """
+
+    def __init__(self) -> None:
+        self.__stop = threading.Event()
+        self.__thread: threading.Thread | None = None
+        self.__counters = dict.fromkeys(
+            ("received", "applied", "own", "connects", "errors"), 0
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Слушатель может работать с базой данных процесса."""
+        return supports_notify(engine.dialect.name) \
+            and engine.dialect.driver == "psycopg2" \
+            and any(cache.enabled for cache in caches.values())
+
+    def start(self) -> None:
+        """Запускает поток слушателя, если он включен."""
+
+        if not self.enabled or self.__thread is not None:
+            return
+
+        self.__stop.clear()
+        self.__thread = threading.Thread(
+            target=self.__run, name="user-cache-listener", daemon=True
+        )
+        self.__thread.start()
+        logger.info("Слушатель канала %s запущен.", CHANNEL)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Останавливает поток слушателя."""
+
+        self.__stop.set()
+        if wait and self.__thread is not None:
+            self.__thread.join()
+        self.__thread = None
+
+    def handle(self, payload: str) -> None:
+        """
+        Применяет уведомление `<процесс>:<таблица>:<VK ID>`.
+
+        Уведомления о собственных записях процесса пропускаются: его
+        кэш уже обновлен при записи.
+        """
+
+        self.__counters["received"] += 1
+        try:
+            process_id, table, user_id = payload.split(":")
+            user_id = int(user_id)
+        except ValueError:
+            logger.warning("Неизвестное уведомление: %s", payload)
+            return
+
+        if process_id == PROCESS_ID:
+            self.__counters["own"] += 1
+            return
+
+        invalidate(table, user_id)
+        self.__counters["applied"] += 1
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику слушателя.
+
+        ### Возвращает:
+        - dict: Счетчики `received`, `applied`, `own` (собственные
+          уведомления), `connects`, `errors` и признак `running`.
+        """
+        return {
+            **self.__counters,
+            "running": self.__thread is not None and self.__thread.is_alive(),
+        }
+
+    def __run(self) -> None:
+        """Цикл потока: подключение, ожидание уведомлений, переподключение."""
+
+        while not self.__stop.is_set():
+            connection = None
+            try:
+                connection = self.__connect()
+                # Уведомления, пришедшие без соединения, пропущены
+                invalidate()
+                self.__listen(connection)
+            except Exception as e:
+                self.__counters["errors"] += 1
+                logger.error("Ошибка слушателя канала %s:\n%s", CHANNEL, e)
+                self.__stop.wait(RECONNECT_DELAY)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+    def __connect(self) -> Any:
+        """Открывает отдельное от пула соединение и подписывается на канал."""
+
+        proxied = engine.raw_connection()
+        proxied.detach()
+        connection = proxied.dbapi_connection
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        self.__counters["connects"] += 1
+        return connection
+
+    def __listen(self, connection: Any) -> None:
+        """Применяет уведомления, пока слушатель не остановлен."""
+
+        while not self.__stop.is_set():
+            if select.select([connection], [], [], POLL_TIMEOUT) \
+                    == ([], [], []):
+                continue
+
+            connection.poll()
+            while connection.notifies:
+                self.handle(connection.notifies.pop(0).payload)
+
+
+cache_listener = CacheInvalidationListener()
+
+
+def user_cache_stats() -> dict:
+    """
+    Возвращает статистику кэшей пользователей, настроек поиска и
+    количества мэтчей.
+
+    ### Возвращает:
+    - dict: Статистика каждого кэша (`LRUCache.stats()`) по имени
+      таблицы и статистика слушателя уведомлений (`listener`).
+    """
+    return {
+        **{name: cache.stats() for name, cache in caches.items()},
+        "listener": cache_listener.stats(),
+    }
@@ -1,18 +1,35 @@
 """Менеджер базы данных для работы с пользователями."""
 
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
 
-from db.models.models import User, UserSearchSettings, Session
+from db.managers.user_cache import (
+    MISSING, caches, from_values, notify_statement, row_values,
+    supports_notify
+)
+from db.models.models import SearchCursor, User, UserSearchSettings, Session
+from db.session import after_commit, unit_of_work
 from services.formatters.db_user_formatter import DatabaseUserFormatServices
 from services.formatters.module_formatters import get_module_part
 from utils.logging.setup import setup_logger
 
 
 class DatabaseUserManager:
-    """Менеджер базы данных для работы с пользователями."""
+    """
+    Менеджер базы данных для работы с пользователями.
+
+    Запросы выполняются в сессии текущего потока (`db.session.Session`)
+    внутри единицы работы (`db.session.unit_of_work()`): метод, вызванный
+    в обработчике сообщения, фиксируется вместе с ним. Пользователи и
+    настройки поиска читаются через кэш (`db.managers.user_cache`) и
+    обновляют его после фиксации (`db.session.after_commit()`), если
+    строка не была удалена из кэша во время чтения или записи:
+    `get_user_by_id()` и `get_user_search_settings()` возвращают
+    отсоединенные объекты, изменение которых не сохраняется.
+    """
 
     __fmt_service = DatabaseUserFormatServices()
-    __session = Session()
+    __session = Session
 
     def __init__(self) -> None:
         self.logger = setup_logger(
@@ -24,25 +41,43 @@ class DatabaseUserManager:
         """Создает пользователя в базе данных."""
 
         try:
-            new_user = User(**self.__fmt_service.fmt_user_data_to_db(data))
+            with unit_of_work():
+                new_user = User(
+                    **self.__fmt_service.fmt_user_data_to_db(data)
+                )
 
-            if self.get_user_by_id(new_user.user_id):
-                return
+                if self.get_user_by_id(new_user.user_id):
+                    return
 
-            self.__session.add(new_user)
-            self.__session.commit()
+                self.__session.add(new_user)
+                self.__notify("users", new_user.user_id)
+                self.__session.flush()
+                # До фиксации пользователь читается из сессии, а не из кэша
+                caches["users"].invalidate(new_user.user_id)
+                values = row_values(new_user)
+                after_commit(
+                    lambda: caches["users"].set(new_user.user_id, values)
+                )
 
             self.logger.info(
                 'Пользователь "%s" успешно создан.', new_user.profile_url)
         except SQLAlchemyError as e:
-            self.__session.rollback()
             self.logger.error("Ошибка при создании пользователя:\n%s", e)
-        finally:
-            self.__session.close()
 
     def get_user_by_id(self, user_id: int) -> User | None:
         """Возвращает пользователя по его id."""
-        return self.__session.query(User).filter_by(user_id=user_id).first()
+
+        cache = caches["users"]
+        values = cache.get(user_id, MISSING)
+        if values is MISSING:
+            # Строка, удаленная из кэша во время чтения, в него не попадет
+            version = cache.version(user_id)
+            with unit_of_work():
+                values = row_values(self.__session.query(User).filter_by(
+                    user_id=user_id
+                ).first())
+                after_commit(lambda: cache.set(user_id, values, version))
+        return from_values(User, values)
 
     def update_user(self, user_id: int) -> None:
         """Обновляет данные пользователя в базе данных."""
@@ -67,26 +102,34 @@ class DatabaseUserManager:
             - relation (int): Возрастная группа для поиска
         """
         try:
-            if self.get_user_search_settings(user_id):
-                self.logger.info(
-                    "Настройки для пользователя %d уже существуют. \
-                    Создание новых настроек прекращено.",
-                    user_id
-                )
-                return
+            with unit_of_work():
+                if self.get_user_search_settings(user_id):
+                    self.logger.info(
+                        "Настройки для пользователя %d уже существуют. \
+                        Создание новых настроек прекращено.",
+                        user_id
+                    )
+                    return
 
-            settings = UserSearchSettings(user_id=user_id, **settings_data)
-            self.__session.add(settings)
-            self.__session.commit()
+                settings = UserSearchSettings(
+                    user_id=user_id, **settings_data
+                )
+                self.__session.add(settings)
+                self.__notify("user_search_settings", user_id)
+                self.__session.flush()
+                caches["user_search_settings"].invalidate(user_id)
+                values = row_values(settings)
+                after_commit(
+                    lambda: caches["user_search_settings"].set(
+                        user_id, values
+                    )
+                )
 
             self.logger.info(
                 "Настройки для пользователя %d успешно созданы.", user_id)
         except SQLAlchemyError as e:
-            self.__session.rollback()
             self.logger.error(
                 "Ошибка при создании настроек пользователя:\n%s", e)
-        finally:
-            self.__session.close()
 
     def get_user_search_settings(self, user_id: int) -> UserSearchSettings | None:
         """
@@ -99,14 +142,53 @@ class DatabaseUserManager:
         - UserSearchSettings: Объект настроек пользователя для поиска мэтчей.
         - None: Если настройки не были найдены.
         """
-        return (
-            self.__session
-            .query(UserSearchSettings)
-            .filter_by(user_id=user_id)
-            .first()
-        )
-
-    def update_user_settings(self, user_id: int, settings_data: dict) -> None:
+
+        cache = caches["user_search_settings"]
+        values = cache.get(user_id, MISSING)
+        if values is MISSING:
+            version = cache.version(user_id)
+            with unit_of_work():
+                values = row_values(
+                    self.__session
+                    .query(UserSearchSettings)
+                    .filter_by(user_id=user_id)
+                    .first()
+                )
+                after_commit(lambda: cache.set(user_id, values, version))
+        return from_values(UserSearchSettings, values)
+
+    def get_popular_cities(self, limit: int) -> list[tuple[int, str, int]]:
+        """
+        Возвращает города, в которых ищет больше всего пользователей.
+
+        ### Аргументы:
+        - limit (int): Количество городов.
+
+        ### Возвращает:
+        - list[tuple[int, str, int]]: ID, название города и количество
+          пользователей по убыванию количества.
+        """
+        try:
+            with unit_of_work():
+                users = func.count(UserSearchSettings.id)
+                return [
+                    (city_id, city_title, count)
+                    for city_id, city_title, count in self.__session.query(
+                        UserSearchSettings.city_id,
+                        func.max(UserSearchSettings.city_title),
+                        users
+                    )
+                    .filter(UserSearchSettings.city_id.isnot(None))
+                    .group_by(UserSearchSettings.city_id)
+                    .order_by(users.desc())
+                    .limit(limit)
+                ]
+        except SQLAlchemyError as e:
+            self.logger.error(
+                "Ошибка при получении популярных городов:\n%s", e)
+            return []
+
+    def update_user_settings(self, user_id: int, settings_data: dict) -> bool:
         """
         Обновляет настройки пользователя для поиска мэтчей в базе данных.
         
@@ -119,40 +201,86 @@ class DatabaseUserManager:
             - sex (int): Предпочитаемый пол (0 - любой, 1 - жен., 2 - муж.) \
             - city_id (int): ID города для поиска \
             - city_title (str): Название города для поиска \
-            - relation (int): Семейное положение.
+            - relation (int): Семейное положение. \
+            - search_engine (str): Способ поиска.
+
+        Текущие настройки сравниваются с новыми по кэшу: неизменные
+        настройки не записываются, а измененные сохраняются одним
+        `UPDATE`. Если настройки изменились, курсоры поиска пользователя
+        удаляются, и следующий поиск читает группы с начала.
+
+        ### Возвращает:
+        - bool: True, если настройки созданы или изменились.
         """
         try:
-            settings = self.get_user_search_settings(user_id)
-            if not settings:
-                self.create_user_search_settings(user_id, settings_data)
-                return
+            with unit_of_work():
+                current = row_values(self.get_user_search_settings(user_id))
+                if current is None:
+                    self.create_user_search_settings(user_id, settings_data)
+                    return True
 
-            for key, value in settings_data.items():
-                if hasattr(settings, key):
-                    setattr(settings, key, value)
+                changes = {
+                    key: value for key, value in settings_data.items()
+                    if key in current and current[key] != value
+                }
+                if not changes:
+                    self.logger.debug(
+                        "Настройки пользователя %d не изменились.", user_id)
+                    return False
+
+                is_updated = self.__session.query(
+                    UserSearchSettings
+                ).filter_by(user_id=user_id).update(
+                    changes, synchronize_session=False
+                )
+                if not is_updated:
+                    # Настройки удалены другим процессом после чтения в кэш
+                    caches["user_search_settings"].invalidate(user_id)
+                    self.create_user_search_settings(user_id, settings_data)
+                    return True
+
+                self.__session.query(SearchCursor).filter_by(
+                    user_id=user_id
+                ).delete()
+                self.__notify("user_search_settings", user_id)
+                caches["user_search_settings"].invalidate(user_id)
+                after_commit(
+                    lambda: caches["user_search_settings"].set(
+                        user_id, {**current, **changes}
+                    )
+                )
 
-            self.__session.commit()
             self.logger.info(
                 "Настройки пользователя %d успешно обновлены.", user_id)
+            return True
         except SQLAlchemyError as e:
-            self.__session.rollback()
             self.logger.error(
                 "Ошибка при обновлении настроек пользователя:\n%s", e)
-        finally:
-            self.__session.close()
+            return False
 
     def delete_user_settings(self, user_id: int) -> None:
         """Удаляет настройки пользователя для поиска мэтчей из базы данных."""
         try:
-            settings = self.get_user_search_settings(user_id)
-            if settings:
-                self.__session.delete(settings)
-                self.__session.commit()
+            with unit_of_work():
+                is_deleted = self.__session.query(
+                    UserSearchSettings
+                ).filter_by(user_id=user_id).delete()
+                if is_deleted:
+                    self.__notify("user_search_settings", user_id)
+                caches["user_search_settings"].invalidate(user_id)
+                after_commit(
+                    lambda: caches["user_search_settings"].set(user_id, None)
+                )
+
+            if is_deleted:
                 self.logger.info(
                     "Настройки пользователя %d успешно удалены.", user_id)
         except SQLAlchemyError as e:
-            self.__session.rollback()
             self.logger.error(
                 "Ошибка при удалении настроек пользователя:\n%s", e)
-        finally:
-            self.__session.close()
+
+    def __notify(self, table: str, user_id: int) -> None:
+        """Уведомляет другие процессы об изменении строки при фиксации."""
+
+        if supports_notify(self.__session.get_bind().dialect.name):
+            self.__session.execute(notify_statement(table, user_id))
@@ -7,25 +7,23 @@
 - `User`: Модель для хранения информации о пользователях.
 - `UserSettings`: Модель для хранения настроек пользователя.
 - `Matches`: Модель для хранения информации о матчах между пользователями.
+- `SearchCursor`: Модель для хранения места остановки поиска в группе.
+- `SeenFilter`: Модель для хранения фильтра уже найденных кандидатов.
 
 ### Дополнительно определены следующие объекты:
-- `engine`: Объект для подключения к базе данных.
-- `Session`: Класс для работы с сессиями базы данных.
+- `engine`: Объект для подключения к базе данных (см. `db.session`).
+- `Session`: Реестр сессий базы данных потоков (см. `db.session`).
 - `Base`: Базовый класс для определения моделей для работы с базой данных.
 """
 
-import os
 from sqlalchemy import (
-    Column, Integer, SmallInteger, String, ForeignKey, create_engine
+    Column, Float, Index, Integer, LargeBinary, SmallInteger, String,
+    ForeignKey, UniqueConstraint
 )
-from sqlalchemy.orm import relationship, DeclarativeBase, sessionmaker
+from sqlalchemy.orm import relationship, DeclarativeBase
 
-from dotenv import load_dotenv
-
-load_dotenv()
-
-engine = create_engine(os.getenv("DSN"))
-Session = sessionmaker(bind=engine)
+# Реэкспорт для менеджеров, импортирующих сессию вместе с моделями
+from db.session import Session, engine  # noqa: F401
 
 
 class Base(DeclarativeBase):
@@ -55,6 +53,15 @@ class User(Base):
         uselist=False,
         cascade="all, delete-orphan"
     )
+    search_cursors = relationship(
+        "SearchCursor", back_populates="user", cascade="all, delete-orphan"
+    )
+    seen_filter = relationship(
+        "SeenFilter",
+        back_populates="user",
+        uselist=False,
+        cascade="all, delete-orphan"
+    )
 
     def __str__(self) -> str:
         return f"User(id={self.id}, first_name='{self.first_name}')"
@@ -79,6 +86,8 @@ class UserSearchSettings(Base):
     - city_id (int): ID города для поиска (по умолчанию 1).
     - city_title (str): Название города для поиска (по умолчанию "Москва").
     - relation (int): Семейное положение (по умолчанию 0 - не указано).
+    - search_engine (str): Способ поиска (`groups`, `users_search`).
+      None — способ по умолчанию.
 
     ### Отношения:
     - user (User): Объект пользователя, которому принадлежат настройки.
@@ -99,6 +108,7 @@ class UserSearchSettings(Base):
     city_id = Column(SmallInteger, default=1)
     city_title = Column(String(100), default="Москва")
     relation = Column(SmallInteger, default=0)
+    search_engine = Column(String(20))
 
     user = relationship("User", back_populates="settings")
 
@@ -114,9 +124,20 @@ class UserSearchSettings(Base):
 
 
 class Matches(Base):
-    """Модель для хранения информации о мэтчах."""
+    """Модель для хранения информации о мэтчах.
+
+    Мэтч сохраняется для пользователя один раз: пара (`user_id`,
+    `match_id`) уникальна. Уникальность задана индексом, а не
+    ограничением таблицы, чтобы его можно было добавить в существующую
+    БД (`DatabaseSchemaManager.upgrade_tables()`).
+    """
 
     __tablename__ = "matches"
+    __table_args__ = (
+        Index("uq_matches_user_match", "user_id", "match_id", unique=True),
+        # Перебор мэтчей пользователя по порядку (`get_next_match`)
+        Index("ix_matches_user_id_id", "user_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
@@ -140,3 +161,89 @@ class Matches(Base):
             f"match_id={self.match_id}, first_name='{self.first_name}', "
             f"last_name='{self.last_name}', profile_url='{self.profile_url}')>"
         )
+
+
+class SearchCursor(Base):
+    """Модель для хранения места остановки поиска пользователя в группе.
+
+    ### Атрибуты:
+    - id (int): Уникальный идентификатор записи.
+    - user_id (int): Внешний ключ, ссылающийся на пользователя.
+    - group_id (int): ID группы.
+    - settings_hash (str): Отпечаток настроек поиска, с которыми
+      группа читалась.
+    - offset (int): Смещение первого непрочитанного участника группы.
+
+    ### Отношения:
+    - user (User): Объект пользователя, которому принадлежит курсор.
+    """
+
+    __tablename__ = "search_cursors"
+    __table_args__ = (UniqueConstraint("user_id", "group_id"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    group_id = Column(Integer, nullable=False)
+    settings_hash = Column(String(16), nullable=False)
+    offset = Column(Integer, nullable=False, default=0)
+
+    user = relationship("User", back_populates="search_cursors")
+
+    def __str__(self) -> str:
+        return (
+            f"SearchCursor(user_id={self.user_id}, "
+            f"group_id={self.group_id}, offset={self.offset})"
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"<SearchCursor(id={self.id}, user_id={self.user_id}, "
+            f"group_id={self.group_id}, settings_hash='{self.settings_hash}', "
+            f"offset={self.offset})>"
+        )
+
+
+class SeenFilter(Base):
+    """Модель для хранения фильтра Блума мэтчей пользователя.
+
+    Фильтр строится по таблице `matches` и позволяет отбросить уже
+    найденных кандидатов, не загружая все мэтчи пользователя.
+
+    ### Атрибуты:
+    - id (int): Уникальный идентификатор записи.
+    - user_id (int): Внешний ключ, ссылающийся на пользователя.
+    - capacity (int): Емкость фильтра.
+    - error_rate (float): Доля ложных срабатываний при `capacity`
+      элементах.
+    - count (int): Количество элементов в фильтре.
+    - bits (bytes): Битовый массив фильтра.
+
+    ### Отношения:
+    - user (User): Объект пользователя, которому принадлежит фильтр.
+    """
+
+    __tablename__ = "seen_filters"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.user_id"),
+        nullable=False,
+        unique=True
+    )
+    capacity = Column(Integer, nullable=False)
+    error_rate = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    bits = Column(LargeBinary, nullable=False)
+
+    user = relationship("User", back_populates="seen_filter")
+
+    def __str__(self) -> str:
+        return f"SeenFilter(user_id={self.user_id}, count={self.count})"
+
+    def __repr__(self) -> str:
+        return (
+            f"<SeenFilter(id={self.id}, user_id={self.user_id}, "
+            f"capacity={self.capacity}, error_rate={self.error_rate}, "
+            f"count={self.count})>"
+        )
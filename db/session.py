@@ -0,0 +1,279 @@
+"""
+Подключение к базе данных и единицы работы.
+
+Сессии SQLAlchemy не потокобезопасны, поэтому `Session` — реестр
+`scoped_session`: каждый поток получает собственную сессию, а менеджеры
+базы данных обращаются к ней через реестр (`Session.query(...)`).
+Менеджеры не фиксируют и не закрывают сессию сами: каждый их метод
+выполняется в единице работы (`unit_of_work()`). При выходе из внешней
+единицы работы изменения фиксируются, при исключении — откатываются, а
+сессия потока закрывается и возвращает соединение в пул. Обработчик
+сообщения выполняется в одной единице работы, поэтому его изменения
+фиксируются вместе, а ошибка одного обработчика не переходит в
+следующие. Длительные задачи (поиск) открывают единицы работы только на
+время обращений к базе данных и не держат соединение, пока ждут VK API.
+
+Пул соединений настраивается переменными окружения, общими с
+асинхронным движком (`db.async_session`). Время ожидания свободного
+соединения, количество выданных соединений и превышения
+`DB_POOL_TIMEOUT` обоих движков доступны через `db_pool_stats()`.
+
+### Переменные окружения:
+- `DSN`: Строка подключения к базе данных.
+- `DB_POOL_SIZE`: Количество постоянных соединений пула.
+- `DB_MAX_OVERFLOW`: Количество дополнительных соединений сверх
+  `DB_POOL_SIZE` при пиковой нагрузке.
+- `DB_POOL_TIMEOUT`: Время ожидания свободного соединения в секундах.
+- `DB_POOL_RECYCLE`: Время в секундах, после которого соединение
+  переоткрывается (0 — не переоткрывать).
+- `DB_POOL_PRE_PING`: Проверять соединение перед выдачей из пула
+  (1 — да, 0 — нет).
+
+Для SQLite настройки размера пула не применяются: SQLAlchemy выбирает
+пул для SQLite сам.
+
+### Пример использования:
+```python
+with unit_of_work():
+    router.dispatch(request, event)
+
+with unit_of_work():
+    session.add(settings)
+    after_commit(lambda: cache.set(user_id, values))
+
+settings = await asyncio.to_thread(
+    run_in_unit_of_work, manager.get_user_search_settings, user_id
+)
+print(db_pool_stats()["checkout_wait"]["p95"])
+```
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from utils.metrics import CounterRegistry, Histogram
+
+load_dotenv()
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+# Метрики пула, общие для всех соединений процесса
+counters = CounterRegistry()
+checkout_wait = Histogram(
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+)
+_in_use = 0
+_in_use_lock = threading.Lock()
+
+
+class _MeteredPoolMixin:
+    """
+    Измерение времени выдачи соединения из пула.
+
+    Время включает ожидание свободного соединения и открытие нового,
+    если пул еще не заполнен.
+    """
+
+    def _do_get(self) -> Any:
+        started = time.monotonic()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            counters.inc("timeouts")
+            raise
+        finally:
+            checkout_wait.observe(time.monotonic() - started)
+
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    """Пул соединений, измеряющий время выдачи соединения."""
+
+
+class MeteredAsyncQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    """Пул соединений асинхронного движка с теми же метриками."""
+
+
+def pool_options(
+    dsn: str | URL | None, poolclass: type[QueuePool] = MeteredQueuePool
+) -> dict:
+    """
+    Возвращает параметры пула соединений из окружения.
+
+    ### Аргументы:
+    - dsn (str | URL | None): Строка подключения.
+    - poolclass (type[QueuePool]): Класс пула. Для SQLite не задается.
+
+    ### Возвращает:
+    - dict: Именованные аргументы `create_engine()`.
+    """
+
+    options = {
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE or -1,
+    }
+    if dsn and make_url(dsn).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=poolclass,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def instrument_engine(db_engine: Engine) -> Engine:
+    """Добавляет движку обработчики событий пула для `db_pool_stats()`."""
+
+    event.listen(db_engine, "checkout", _on_checkout)
+    event.listen(db_engine, "checkin", _on_checkin)
+    event.listen(db_engine, "connect", lambda *_: counters.inc("connects"))
+    return db_engine
+
+
+def create_db_engine(dsn: str | None) -> Engine:
+    """
+    Создает движок базы данных с настройками пула из окружения.
+
+    ### Аргументы:
+    - dsn (str | None): Строка подключения.
+
+    ### Возвращает:
+    - Engine: Движок с обработчиками событий пула для `db_pool_stats()`.
+    """
+    return instrument_engine(create_engine(dsn, **pool_options(dsn)))
+
+
+def _on_checkout(*_: Any) -> None:
+    """Учитывает соединение, выданное из пула."""
+
+    global _in_use
+    with _in_use_lock:
+        _in_use += 1
+    counters.inc("checkouts")
+
+
+def _on_checkin(*_: Any) -> None:
+    """Учитывает соединение, возвращенное в пул."""
+
+    global _in_use
+    with _in_use_lock:
+        _in_use = max(0, _in_use - 1)
+
+
+engine = create_db_engine(os.getenv("DSN"))
+# Объекты, полученные одним менеджером, остаются доступными после
+# фиксации изменений другим менеджером в той же единице работы
+Session = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+
+# Глубина вложенности единиц работы потока и функции, ожидающие фиксации
+_state = threading.local()
+
+
+@contextmanager
+def unit_of_work() -> Iterator[None]:
+    """
+    Единица работы: обработка одного сообщения или этап задачи.
+
+    Внешняя единица работы при выходе фиксирует изменения сессии потока,
+    вызывает функции, отложенные `after_commit()`, и закрывает сессию.
+    Вложенные единицы работы выполняются в рамках внешней: метод
+    менеджера, вызванный в обработчике сообщения, фиксируется вместе с
+    обработчиком, а вызванный отдельно — сразу.
+
+    Исключение на любом уровне откатывает транзакцию потока целиком:
+    после ошибки базы данных транзакция непригодна, а отложенные функции
+    не вызываются.
+    """
+
+    depth = getattr(_state, "depth", 0)
+    if not depth:
+        _state.callbacks = []
+    _state.depth = depth + 1
+    try:
+        yield
+        if not depth:
+            Session.commit()
+    except BaseException:
+        Session.rollback()
+        _state.callbacks.clear()
+        raise
+    finally:
+        _state.depth = depth
+        if not depth:
+            Session.remove()
+
+    if not depth:
+        callbacks, _state.callbacks = _state.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+def after_commit(callback: Callable[[], Any]) -> None:
+    """
+    Откладывает вызов `callback` до фиксации внешней единицы работы.
+
+    Используется для обновления кэшей: до фиксации изменения не видны
+    другим соединениям, а при откате `callback` не вызывается. Вне
+    единицы работы `callback` вызывается сразу.
+    """
+
+    if getattr(_state, "depth", 0):
+        _state.callbacks.append(callback)
+    else:
+        callback()
+
+
+def run_in_unit_of_work(
+    func: Callable[..., Any], *args: Any, **kwargs: Any
+) -> Any:
+    """
+    Вызывает `func` в отдельной единице работы.
+
+    Используется с `asyncio.to_thread`: сессия потока из пула
+    исполнителя закрывается после вызова.
+    """
+
+    with unit_of_work():
+        return func(*args, **kwargs)
+
+
+def db_pool_stats() -> dict:
+    """
+    Возвращает метрики пула соединений.
+
+    ### Возвращает:
+    - dict: Ключи `pool` (состояние пула синхронного движка), `in_use`
+      (выданные соединения обоих движков), `size` и `overflow`
+      (постоянные и дополнительные соединения `QueuePool` синхронного
+      движка, иначе None), `counters`
+      (`checkouts`, `connects`, `timeouts`) и
+      `checkout_wait` (гистограмма времени выдачи соединения в секундах;
+      пуст для SQLite).
+    """
+
+    pool = engine.pool
+    is_queue_pool = isinstance(pool, QueuePool)
+    with _in_use_lock:
+        in_use = _in_use
+    return {
+        "pool": pool.status(),
+        "in_use": in_use,
+        "size": pool.size() if is_queue_pool else None,
+        "overflow": pool.overflow() if is_queue_pool else None,
+        "counters": counters.as_dict(),
+        "checkout_wait": checkout_wait.as_dict(),
+    }
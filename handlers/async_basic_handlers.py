@@ -0,0 +1,53 @@
+"""Асинхронные обработчики базовых команд бота."""
+
+from config.bot_config import KEYBOARD_CONFIG, MESSAGES_CONFIG
+from db.managers.async_user_manager import AsyncDatabaseUserManager
+from handlers.async_search_settings_handler import AsyncSearchSettingsHandler
+from services.vk_api.async_msg_service import AsyncMessageService
+from services.vk_api.async_vk_api_service import AsyncVKApiService
+
+async_vk_service = AsyncVKApiService()
+db_user_manager = AsyncDatabaseUserManager()
+
+
+class AsyncBasicHandler:
+    """Асинхронный обработчик базовых команд бота."""
+
+    def __init__(self):
+        self.__msg_service = AsyncMessageService()
+        self.__search_handler = AsyncSearchSettingsHandler()
+
+    async def start_handler(self, user_id: int) -> None:
+        """Обработчик команды "/start"."""
+
+        # Отправка сообщения пользователю в чате.
+        await self.__msg_service.send_message(
+            user_id,
+            msg=MESSAGES_CONFIG.get("start", MESSAGES_CONFIG.get("error")),
+            btns=KEYBOARD_CONFIG.get("start", None),
+        )
+
+        # Получение информации о пользователе по его ID.
+        fetched_user_data: dict = await async_vk_service.get_user_info(user_id)
+
+        # Загрузка данных пользователя в базу данных.
+        await db_user_manager.create_user(fetched_user_data)
+
+    def is_in_search_settings(self, user_id: int) -> bool:
+        """Проверяет, находится ли пользователь в процессе настройки поиска."""
+        return self.__search_handler.is_in_search_settings(user_id)
+
+    async def handle_unknown_message(self, user_id: int) -> None:
+        """Обработка неизвестных сообщений."""
+        await self.__msg_service.send_message(
+            user_id,
+            msg=MESSAGES_CONFIG.get(
+                "unknown_command", MESSAGES_CONFIG.get("error")
+            ),
+            btns=KEYBOARD_CONFIG.get("start", None),
+        )
+
+    async def search_settings_handler(self, request: str, user_id: int) \
+        -> None:
+        """Обработчик настройки поиска."""
+        await self.__search_handler.handle_search_settings(request, user_id)
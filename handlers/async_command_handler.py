@@ -0,0 +1,8 @@
+"""Модуль для асинхронной обработки команд бота."""
+
+from handlers.async_basic_handlers import AsyncBasicHandler
+from handlers.async_search_handler import AsyncSearchHandler
+
+
+class AsyncCommandHandler(AsyncBasicHandler, AsyncSearchHandler):
+    pass
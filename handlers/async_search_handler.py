@@ -0,0 +1,250 @@
+"""Асинхронная обработка команды поиска."""
+
+import asyncio
+import json
+from typing import Container
+
+from config.bot_config import KEYBOARD_CONFIG, MESSAGES_CONFIG
+from db.managers.async_matches_manager import AsyncDatabaseMatchesManager
+from db.managers.async_user_manager import AsyncDatabaseUserManager
+from db.managers.search_cursor_manager import DatabaseSearchCursorManager
+from db.managers.seen_filter_manager import DatabaseSeenFilterManager
+from db.models.models import UserSearchSettings
+from handlers.search_engines import get_next_search_engine, get_search_engine
+from handlers.search_handler import MATCHES_TARGET, SearchHandler
+from services.dispatch.async_search_scheduler import (
+    AsyncSearchJob, AsyncSearchScheduler
+)
+from services.formatters.module_formatters import get_module_part
+from services.vk_api.async_msg_service import AsyncMessageService
+from services.vk_api.async_vk_api_service import AsyncVKApiService
+from services.vk_api.vk_api_service import VKAPIError
+from utils.logging.setup import setup_logger
+
+async_vk_service = AsyncVKApiService()
+async_search_scheduler = AsyncSearchScheduler()
+
+logger = setup_logger(
+    module_name=get_module_part(__name__, idx=0), logger_name=__name__
+)
+
+
+class AsyncSearchHandler(SearchHandler):
+    """
+    Асинхронная обработка команды поиска.
+
+    Фильтрация участников, форматирование сообщений и клавиатур
+    наследуются от `SearchHandler`. Запросы к VK API выполняются через
+    `AsyncVKApiService`, пользователи и мэтчи читаются и сохраняются
+    асинхронными менеджерами базы данных, а фильтр мэтчей и курсоры
+    поиска — в отдельном потоке через `asyncio.to_thread`. Методы
+    синхронных менеджеров сами выполняются в единицах работы
+    (`db.session.unit_of_work()`) и возвращают соединение в пул.
+    """
+
+    __msg_service = AsyncMessageService()
+
+    async def start_searching(self, user_id: int) -> None:
+        """Обработка команды поиска через `async_search_scheduler`."""
+        await async_search_scheduler.submit(user_id, self.run_search, user_id)
+
+    async def run_search(self, job: AsyncSearchJob, user_id: int) -> None:
+        """
+        Выполняет поиск мэтчей и показывает результаты.
+
+        Отмена задачи прерывает поиск в любой точке ожидания.
+        """
+
+        await self.__msg_service.send_message(
+            user_id,
+            msg=MESSAGES_CONFIG.get(
+                "start_searching_matches", MESSAGES_CONFIG.get("error")
+            )
+        )
+
+        search_settings = await AsyncDatabaseUserManager() \
+            .get_user_search_settings(user_id)
+        seen = await asyncio.to_thread(
+            DatabaseSeenFilterManager().get_seen_filter, user_id
+        )
+        cursor_manager = DatabaseSearchCursorManager()
+        cursors = await asyncio.to_thread(
+            cursor_manager.get_cursors, user_id, search_settings
+        )
+
+        matches = await self.search_result_handler(
+            search_settings, job, seen, cursors
+        )
+
+        await self.load_matches_to_db(user_id, matches)
+        await asyncio.to_thread(
+            cursor_manager.save_cursors, user_id, search_settings, cursors
+        )
+
+        await self.__msg_service.send_message(
+            user_id,
+            msg=MESSAGES_CONFIG.get(
+                "end_searching_matches", MESSAGES_CONFIG.get("error")
+            )
+        )
+        await self.show_matches(user_id)
+
+    async def search_result_handler(
+        self,
+        search_settings: UserSearchSettings,
+        job: AsyncSearchJob | None = None,
+        exclude_ids: Container[int] = frozenset(),
+        cursors: dict[int, int] | None = None
+    ) -> list[dict]:
+        """Асинхронная версия `SearchHandler.search_result_handler`."""
+
+        matches = self.find_indexed_matches(search_settings, exclude_ids)
+        if len(matches) >= MATCHES_TARGET:
+            logger.info(
+                "Найдено %d мэтчей в индексе кандидатов.", len(matches)
+            )
+            return matches
+        seen_ids = {match["id"] for match in matches}
+
+        engine = get_search_engine(search_settings.search_engine)
+        logger.info("Поиск мэтчей способом %s.", engine.name)
+
+        stream = await engine.open_stream_async(
+            async_vk_service, search_settings, cursors
+        )
+        async with stream:
+            try:
+                async for page in stream.pages():
+                    if job is not None:
+                        await job.progress(MESSAGES_CONFIG.get(
+                            "search_progress", MESSAGES_CONFIG.get("error")
+                        ) % (stream.offset, len(matches)))
+
+                    matches.extend(self.collect_page_matches(
+                        page, search_settings, seen_ids, exclude_ids
+                    ))
+                    if len(matches) >= MATCHES_TARGET:
+                        break
+            except VKAPIError as e:
+                if not stream.offset:
+                    raise
+                logger.error(
+                    "Поиск остановлен на смещении %d из-за ошибки VK API: %s",
+                    stream.offset, e
+                )
+
+        if cursors is not None:
+            cursors.update(engine.get_cursors(stream))
+        logger.info(
+            "Проверено %d кандидатов, отфильтровано %d, "
+            "удовлетворяющих условиям поиска.",
+            stream.offset, len(matches)
+        )
+        return matches
+
+    async def show_matches(self, user_id: int, after_id: int = 0) -> None:
+        """Асинхронная версия `SearchHandler.show_matches`."""
+
+        match, has_next = await self.get_next_match(user_id, after_id)
+        if match is None and after_id:
+            logger.info("Мэтчей после %d нет, показ с начала", after_id)
+            match, has_next = await self.get_next_match(user_id)
+            after_id = 0
+        if match is None:
+            await self.handle_no_matches(user_id)
+            return
+
+        if after_id == 0:
+            await self.send_start_message(
+                user_id,
+                await AsyncDatabaseMatchesManager().count_user_matches(user_id)
+            )
+
+        match_msg, attachment = self.format_match_message(match)
+        keyboard = self.get_keyboard_for_match_navigation(match.id, has_next)
+
+        await self.__msg_service.send_message(
+            user_id,
+            msg=match_msg,
+            btns=keyboard,
+            attachment=attachment
+        )
+
+    async def switch_search_engine(self, user_id: int) -> None:
+        """Асинхронная версия `SearchHandler.switch_search_engine`."""
+
+        db_user_manager = AsyncDatabaseUserManager()
+        settings = await db_user_manager.get_user_search_settings(user_id)
+        engine = get_next_search_engine(
+            settings.search_engine if settings else None
+        )
+        if await db_user_manager.update_user_settings(
+            user_id, {"search_engine": engine.name}
+        ):
+            await async_search_scheduler.cancel(user_id)
+
+        await self.__msg_service.send_message(
+            user_id,
+            msg=MESSAGES_CONFIG.get(
+                "search_engine_switched", MESSAGES_CONFIG.get("error")
+            ) % engine.title,
+            btns=KEYBOARD_CONFIG["main_menu"]
+        )
+
+    async def load_matches_to_db(self, user_id: int, matches: list[dict]) \
+        -> None:
+        """Загрузка найденных мэтчей в базу данных."""
+        await AsyncDatabaseMatchesManager().save_user_match(user_id, matches)
+
+    async def get_next_match(self, user_id: int, after_id: int = 0) \
+        -> tuple:
+        """Получает из базы данных мэтч пользователя после `after_id`."""
+        return await AsyncDatabaseMatchesManager().get_next_match(
+            user_id, after_id
+        )
+
+    async def handle_no_matches(self, user_id: int) -> None:
+        """Обрабатывает случай, когда нет найденных мэтчей."""
+        await self.__msg_service.send_message(
+            user_id,
+            msg=MESSAGES_CONFIG.get(
+                "no_matches_found", MESSAGES_CONFIG.get("error")
+            ),
+            btns=KEYBOARD_CONFIG["main_menu"]
+        )
+
+    async def send_start_message(self, user_id: int, total_matches: int) \
+        -> None:
+        """Отправляет сообщение о начале показа мэтчей."""
+        await self.__msg_service.send_message(
+            user_id,
+            msg=MESSAGES_CONFIG.get(
+                "show_matches_start", MESSAGES_CONFIG.get("error")
+            ) % total_matches
+        )
+
+    async def handle_next_match(self, user_id: int, event) -> None:
+        """Обработка команды показа следующего мэтча."""
+
+        payload_str = getattr(event, 'payload', None)
+        if not payload_str:
+            await self.show_matches(user_id)
+            return
+
+        try:
+            payload = json.loads(payload_str)
+            logger.info("Получен payload: %s", payload)
+            # Кнопки старого формата (`match_index`) начинают с начала
+            after_id = int(payload.get("after_id", 0))
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error("Ошибка при обработке payload: %s", str(e))
+            await self.__msg_service.send_message(
+                user_id,
+                msg=MESSAGES_CONFIG.get(
+                    "unknown_command", MESSAGES_CONFIG.get("error")
+                ),
+                btns=KEYBOARD_CONFIG.get("main_menu"),
+            )
+            return
+
+        await self.show_matches(user_id, after_id)
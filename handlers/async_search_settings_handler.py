@@ -0,0 +1,139 @@
+"""Асинхронный обработчик настройки поиска."""
+
+from config.bot_config import COMMANDS_CONFIG, KEYBOARD_CONFIG, MESSAGES_CONFIG
+from db.managers.async_user_manager import AsyncDatabaseUserManager
+from handlers.async_search_handler import async_search_scheduler
+from handlers.search_settings_handler import SEX_MAPPING, SearchSettingsHandler
+from services.vk_api.async_msg_service import AsyncMessageService
+from services.vk_api.async_vk_api_service import AsyncVKApiService
+
+async_vk_service = AsyncVKApiService()
+db_user_manager = AsyncDatabaseUserManager()
+
+
+class AsyncSearchSettingsHandler:
+    """
+    Асинхронный обработчик настройки поиска.
+
+    Повторяет шаги `SearchSettingsHandler` и использует те же правила
+    разбора ответов. Запросы к VK API и запись настроек в базу данных
+    (`AsyncDatabaseUserManager`) выполняются асинхронно, не блокируя
+    цикл событий.
+    """
+
+    def __init__(self):
+        self.__msg_service = AsyncMessageService()
+        # Хранение состояния настройки для каждого пользователя
+        self.__user_states: dict[int, dict] = {}
+
+    def is_in_search_settings(self, user_id: int) -> bool:
+        """Проверяет, находится ли пользователь в процессе настройки поиска."""
+        return user_id in self.__user_states
+
+    async def handle_search_settings(self, request: str, user_id: int) -> None:
+        """Обработчик настройки поиска."""
+
+        # Инициализация настройки поиска
+        if request in COMMANDS_CONFIG.get("configure_search_settings"):
+            await self.__start_search_settings(user_id)
+            return
+
+        # Получаем текущее состояние настройки пользователя
+        user_state = self.__user_states.get(user_id)
+        if not user_state:
+            return
+
+        # Обработка каждого шага настройки
+        current_step = user_state.get("step")
+        if current_step == "age":
+            await self.__handle_age_setting(user_id, request)
+        elif current_step == "sex":
+            await self.__handle_sex_setting(user_id, request)
+        elif current_step == "city":
+            await self.__handle_city_setting(user_id, request)
+        elif current_step == "relation":
+            await self.__handle_relation_setting(user_id, request)
+
+    async def __start_search_settings(self, user_id: int) -> None:
+        """Начинает процесс настройки поиска."""
+        self.__user_states[user_id] = {"step": "age"}
+        await self.__send(user_id, "configure_age", "configure_age")
+
+    async def __handle_age_setting(self, user_id: int, request: str) -> None:
+        """Обработка настройки возраста."""
+
+        settings_data, error_key = SearchSettingsHandler.parse_age_setting(
+            request
+        )
+        if error_key:
+            await self.__send(user_id, error_key, "configure_age")
+            return
+
+        await self.__update_settings(user_id, settings_data)
+
+        self.__user_states[user_id]["step"] = "sex"
+        await self.__send(user_id, "configure_sex", "configure_sex")
+
+    async def __handle_sex_setting(self, user_id: int, request: str) -> None:
+        """Обработка настройки пола."""
+
+        sex = SEX_MAPPING.get(request)
+        if sex is None:
+            await self.__send(user_id, "configure_sex_error", "configure_sex")
+            return
+
+        await self.__update_settings(user_id, {"sex": sex})
+
+        self.__user_states[user_id]["step"] = "city"
+        await self.__send(user_id, "configure_city")
+
+    async def __handle_city_setting(self, user_id: int, request: str) -> None:
+        """Обработка настройки города."""
+
+        city_info = await async_vk_service.get_city_info(request)
+        if not city_info:
+            await self.__send(user_id, "configure_city_not_found_error")
+            return
+
+        settings_data = {
+            "city_id": city_info.get("id"),
+            "city_title": city_info.get("title")
+        }
+        await self.__update_settings(user_id, settings_data)
+
+        self.__user_states[user_id]["step"] = "relation"
+        await self.__send(user_id, "configure_relation", "configure_relation")
+
+    async def __handle_relation_setting(self, user_id: int, request: str) \
+        -> None:
+        """Обработка настройки семейного положения."""
+
+        if not SearchSettingsHandler.is_valid_relation(request):
+            await self.__send(
+                user_id, "configure_relation_error", "configure_relation"
+            )
+            return
+
+        await self.__update_settings(user_id, {"relation": int(request)})
+
+        del self.__user_states[user_id]  # Очищаем состояние пользователя
+        await self.__send(
+            user_id, "configure_search_settings_success", "main_menu"
+        )
+
+    async def __update_settings(self, user_id: int, settings_data: dict) \
+        -> None:
+        """Сохраняет настройки и отменяет поиск, если они изменились."""
+        if await db_user_manager.update_user_settings(user_id, settings_data):
+            # Результаты поиска по старым настройкам больше не нужны
+            await async_search_scheduler.cancel(user_id)
+
+    async def __send(
+        self, user_id: int, msg_key: str, keyboard_key: str | None = None
+    ) -> None:
+        """Отправляет сообщение из `MESSAGES_CONFIG` с клавиатурой."""
+        await self.__msg_service.send_message(
+            user_id,
+            msg=MESSAGES_CONFIG.get(msg_key, MESSAGES_CONFIG.get("error")),
+            btns=KEYBOARD_CONFIG.get(keyboard_key) if keyboard_key else None,
+        )
@@ -0,0 +1,638 @@
+"""
+Инвертированный индекс кандидатов в мэтчи.
+
+Каждый поиск заново просматривает участников групп, хотя они уже были
+прочитаны другими поисками. Индекс запоминает прочитанных участников и
+отвечает на запрос настроек поиска без обхода групп.
+
+Участник индексируется, если ему можно написать личное сообщение и у
+него указан город, — остальные не подходят ни под одни настройки.
+Строки индекса нумеруются по порядку добавления, а для каждого ключа
+(`city_id`, `sex`, год рождения, `relation`) хранится отсортированный
+массив номеров строк (список вхождений). Год рождения 0 означает, что
+год неизвестен. Год рождения и семейное положение в ключе могут быть
+None — "любой": так запрос без фильтра по возрасту или семейному
+положению читает один список вместо сотни.
+
+Запрос настроек поиска объединяет списки вхождений ключей, подходящих
+по полу, семейному положению и годам рождения диапазона возраста, и
+проверяет точную дату рождения. Из каждого списка читается только
+начало, достаточное для `limit` первых строк, поэтому время запроса не
+зависит от количества участников.
+
+Индекс пополняется страницами по мере чтения групп (`add_page()`) без
+перестроения: новые строки дописываются в конец списков вхождений.
+Если у уже известного участника изменились поля, его прежняя строка
+помечается удаленной и добавляется новая. Строка, которую не
+подтверждала ни одна страница дольше `max_age` секунд, устаревает и в
+запросах не участвует.
+
+Индекс сжимается (`compact()`): удаленные и устаревшие строки
+отбрасываются, а списки вхождений строятся заново. Сжатие выполняется
+само, когда удаленных строк больше половины, когда строки устарели или
+когда достигнуто `max_rows`. Источник данных (снимок группы или
+страница профилей) освобождается, как только на него не ссылается ни
+одна строка, поэтому отображения замененных снимков закрываются.
+
+### Переменные окружения:
+- `CANDIDATE_INDEX_MAX_ROWS`: Максимальное количество строк индекса.
+  Когда оно достигнуто и сжатие не освободило места, новые участники
+  не индексируются.
+- `MEMBER_SNAPSHOT_TTL`: Время в секундах, после которого
+  неподтвержденная строка устаревает.
+
+### Пример использования:
+```python
+index = get_candidate_index()
+index.add_page(page)
+matches = index.query(search_settings, limit=25, exclude_ids=known_ids)
+```
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Container
+
+import numpy as np
+
+from db.models.models import UserSearchSettings
+from handlers.member_filter import (
+    MemberColumns, birth_date_bounds, format_birth_date, is_age_filter_set
+)
+from handlers.member_snapshot import SNAPSHOT_TTL, MemberSnapshot, SnapshotPage
+
+MAX_ROWS = int(os.getenv("CANDIDATE_INDEX_MAX_ROWS", "5000000"))
+
+# Доля удаленных строк, после которой индекс сжимается
+COMPACT_DEAD_RATIO = 0.5
+
+# Значения пола в профиле: 0 — не указан, 1 — женский, 2 — мужской
+SEXES = (0, 1, 2)
+
+
+class _GrowableArray:
+    """Массив NumPy с дописыванием в конец за амортизированное O(1)."""
+
+    __slots__ = ("data", "size")
+
+    def __init__(self, dtype: type, capacity: int = 16) -> None:
+        self.data = np.empty(capacity, dtype)
+        self.size = 0
+
+    def extend(self, values: list | np.ndarray) -> None:
+        """Дописывает значения в конец массива."""
+
+        end = self.size + len(values)
+        if end > len(self.data):
+            grown = np.empty(max(end, len(self.data) * 2), self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:end] = values
+        self.size = end
+
+    def view(self) -> np.ndarray:
+        """Заполненная часть массива без копирования."""
+        return self.data[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        """Объем выделенной памяти в байтах."""
+        return self.data.nbytes
+
+
+class CandidateIndex:
+    """
+    Инвертированный индекс кандидатов по городу, полу, году рождения и
+    семейному положению.
+
+    ### Аргументы:
+    - max_rows (int): Максимальное количество строк индекса.
+    - max_age (float): Время в секундах, после которого строка, не
+      подтвержденная страницей участников, устаревает. 0 — строки не
+      устаревают.
+
+    ### Методы:
+    - `add_page()`: Добавляет страницу участников.
+    - `query()`: Находит кандидатов для настроек поиска.
+    - `compact()`: Удаляет удаленные и устаревшие строки.
+    - `stats()`: Возвращает статистику индекса.
+    """
+
+    # Столбцы строк индекса и их типы
+    _COLUMNS = {
+        "id": np.int64,
+        "city_id": np.int32,
+        "sex": np.int8,
+        "birth_date": np.int32,
+        "relation": np.int8,
+        "alive": np.bool_,
+        "source": np.int32,
+        "source_row": np.int64,
+        # Время последнего подтверждения строки (Unix time)
+        "seen_at": np.uint32,
+    }
+
+    def __init__(
+        self, max_rows: int = MAX_ROWS, max_age: float = SNAPSHOT_TTL
+    ) -> None:
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.__columns = {
+            name: _GrowableArray(dtype)
+            for name, dtype in self._COLUMNS.items()
+        }
+        self.__row_by_id: dict[int, int] = {}
+        self.__postings: dict[tuple, _GrowableArray] = {}
+        # Источники данных строк: снимки групп или списки профилей
+        # (имя, фамилия, закрыт ли профиль) страниц `groups.getMembers`.
+        # Освобожденный источник заменяется None до сжатия индекса
+        self.__sources: list[MemberSnapshot | list[tuple] | None] = []
+        self.__source_rows: list[int] = []
+        self.__snapshot_sources: dict[int, int] = {}
+        self.__dead_rows = 0
+        # Время подтверждения самой старой строки на момент сжатия
+        self.__oldest_seen = int(time.time())
+        self.__lock = threading.Lock()
+        self.__counters = dict.fromkeys(
+            (
+                "added", "updated", "removed", "skipped", "expired",
+                "compactions", "queries"
+            ),
+            0
+        )
+        self.__query_time = 0.0
+
+    def __len__(self) -> int:
+        """Количество действующих строк."""
+        with self.__lock:
+            return self.__live_rows()
+
+    def add_page(self, page: list[dict] | SnapshotPage) -> int:
+        """
+        Добавляет страницу участников.
+
+        ### Аргументы:
+        - page (list[dict] | SnapshotPage): Страница `groups.getMembers`
+          или страница снимка группы.
+
+        ### Возвращает:
+        - int: Количество добавленных строк.
+        """
+
+        if not len(page):
+            return 0
+
+        is_snapshot = isinstance(page, SnapshotPage)
+        columns = page if is_snapshot else MemberColumns.from_page(page)
+        ids = columns.id.tolist()
+        cities = columns.city_id.tolist()
+        sexes = columns.sex.tolist()
+        birth_dates = columns.birth_date.tolist()
+        relations = columns.relation.tolist()
+        can_write = columns.can_write.tolist()
+        snapshot_rows = page.snapshot_rows().tolist() if is_snapshot else None
+
+        now = int(time.time())
+        with self.__lock:
+            if self.__should_compact(len(page), now):
+                self.__compact(now)
+
+            if is_snapshot:
+                source = self.__snapshot_source(page.snapshot)
+            else:
+                # Источник страницы создается при первой добавленной строке
+                source = None
+                profiles = []
+
+            existing = self.__columns
+            new_rows = {name: [] for name in self._COLUMNS}
+            postings: defaultdict[tuple, list[int]] = defaultdict(list)
+            next_row = existing["id"].size
+            pending = set()
+            released = set()
+
+            for idx, member_id in enumerate(ids):
+                if member_id in pending:
+                    continue
+
+                key = (
+                    cities[idx], sexes[idx], birth_dates[idx] // 10000,
+                    relations[idx]
+                )
+                is_candidate = can_write[idx] == 1 and cities[idx] != 0
+
+                row = self.__row_by_id.get(member_id)
+                if row is not None and existing["alive"].data[row]:
+                    old_source = int(existing["source"].data[row])
+                    if is_candidate and self.__row_matches(
+                        row, key, birth_dates[idx]
+                    ):
+                        existing["seen_at"].data[row] = now
+                        if is_snapshot and old_source != source:
+                            # Строка переходит на свежий снимок
+                            existing["source"].data[row] = source
+                            existing["source_row"].data[row] = (
+                                snapshot_rows[idx]
+                            )
+                            self.__source_rows[source] += 1
+                            self.__source_rows[old_source] -= 1
+                            released.add(old_source)
+                        continue
+
+                    existing["alive"].data[row] = False
+                    self.__dead_rows += 1
+                    self.__source_rows[old_source] -= 1
+                    released.add(old_source)
+                    self.__counters[
+                        "updated" if is_candidate else "removed"
+                    ] += 1
+
+                if not is_candidate:
+                    continue
+                if next_row >= self.max_rows:
+                    self.__counters["skipped"] += 1
+                    continue
+
+                if is_snapshot:
+                    source_row = snapshot_rows[idx]
+                else:
+                    if source is None:
+                        source = self.__add_source(profiles)
+                    member = page[idx]
+                    source_row = len(profiles)
+                    profiles.append((
+                        member.get("first_name", ""),
+                        member.get("last_name", ""),
+                        bool(member.get("is_closed", False)),
+                    ))
+
+                for name, value in (
+                    ("id", member_id), ("city_id", cities[idx]),
+                    ("sex", sexes[idx]), ("birth_date", birth_dates[idx]),
+                    ("relation", relations[idx]), ("alive", True),
+                    ("source", source), ("source_row", source_row),
+                    ("seen_at", now),
+                ):
+                    new_rows[name].append(value)
+                city_id, sex, year, relation = key
+                for posting_key in (
+                    key, (city_id, sex, year, None),
+                    (city_id, sex, None, relation), (city_id, sex, None, None)
+                ):
+                    postings[posting_key].append(next_row)
+                self.__row_by_id[member_id] = next_row
+                self.__source_rows[source] += 1
+                pending.add(member_id)
+                next_row += 1
+
+            for name, values in new_rows.items():
+                existing[name].extend(values)
+            for key, rows in postings.items():
+                posting = self.__postings.get(key)
+                if posting is None:
+                    posting = self.__postings[key] = _GrowableArray(np.uint32)
+                posting.extend(rows)
+
+            if source is not None:
+                released.add(source)
+            for unused in released:
+                if self.__source_rows[unused] == 0:
+                    self.__release_source(unused)
+
+            added = len(new_rows["id"])
+            self.__counters["added"] += added
+            return added
+
+    def query(
+        self,
+        search_settings: UserSearchSettings,
+        limit: int,
+        exclude_ids: Container[int] = ()
+    ) -> list[dict]:
+        """
+        Находит кандидатов, подходящих под настройки поиска.
+
+        ### Аргументы:
+        - search_settings (UserSearchSettings): Настройки поиска.
+        - limit (int): Максимальное количество кандидатов.
+        - exclude_ids (Container[int]): VK ID, которые нужно пропустить,
+          например уже сохраненные мэтчи пользователя.
+
+        ### Возвращает:
+        - list[dict]: Кандидаты в порядке добавления в индекс, в формате
+          `groups.getMembers`.
+        """
+
+        started = time.perf_counter()
+        is_age_set = is_age_filter_set(search_settings)
+        years = [None]
+        if is_age_set:
+            lower, upper = birth_date_bounds(
+                search_settings.age_min, search_settings.age_max
+            )
+            years = range(lower // 10000, upper // 10000 + 1)
+        sexes = [search_settings.sex] if search_settings.sex else SEXES
+        relation = search_settings.relation or None
+
+        with self.__lock:
+            postings = [
+                posting for posting in (
+                    self.__postings.get(
+                        (search_settings.city_id, sex, year, relation)
+                    )
+                    for sex in sexes for year in years
+                )
+                if posting is not None
+            ]
+
+            alive = self.__columns["alive"].data
+            seen_at = self.__columns["seen_at"].data
+            birth_dates = self.__columns["birth_date"].data
+            ids = self.__columns["id"].data
+            seen_after = time.time() - self.max_age
+
+            prefix = limit
+            while True:
+                rows = np.concatenate(
+                    [posting.data[:min(posting.size, prefix)]
+                     for posting in postings]
+                    or [np.zeros(0, np.uint32)]
+                )
+                mask = alive[rows]
+                if self.max_age > 0:
+                    mask &= seen_at[rows] >= seen_after
+                if is_age_set:
+                    row_dates = birth_dates[rows]
+                    mask &= (row_dates > lower) & (row_dates <= upper)
+                rows = np.sort(rows[mask])
+
+                found = []
+                for row, member_id in zip(rows.tolist(), ids[rows].tolist()):
+                    if member_id in exclude_ids:
+                        continue
+                    found.append(row)
+                    if len(found) == limit:
+                        break
+
+                # Непрочитанные строки списка больше его последней
+                # прочитанной строки: если она не меньше последней
+                # найденной, дочитывать список не нужно
+                unread_bound = min(
+                    (
+                        int(posting.data[prefix - 1]) for posting in postings
+                        if posting.size > prefix
+                    ),
+                    default=None
+                )
+                if unread_bound is None or (
+                    len(found) == limit and found[-1] <= unread_bound
+                ):
+                    break
+                prefix *= 2
+
+            matches = [self.__member(row) for row in found]
+            self.__counters["queries"] += 1
+            self.__query_time += time.perf_counter() - started
+        return matches
+
+    def compact(self) -> int:
+        """
+        Удаляет удаленные и устаревшие строки и освобождает источники,
+        на которые больше не ссылаются строки.
+
+        ### Возвращает:
+        - int: Количество удаленных строк.
+        """
+        with self.__lock:
+            return self.__compact(int(time.time()))
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику индекса.
+
+        ### Возвращает:
+        - dict: Количество строк (`rows`, `live_rows`), ключей и
+          источников данных (`sources`), занятая массивами память
+          `bytes`, счетчики `added`, `updated`, `removed`, `skipped`,
+          `expired` (строк, удаленных сжатием как устаревшие),
+          `compactions`, `queries` и среднее время запроса
+          `avg_query_ms`.
+        """
+
+        with self.__lock:
+            counters = dict(self.__counters)
+            return {
+                "rows": self.__columns["id"].size,
+                "live_rows": self.__live_rows(),
+                "keys": len(self.__postings),
+                "sources": len(self.__sources) - self.__sources.count(None),
+                "bytes": sum(
+                    array.nbytes for array in (
+                        *self.__columns.values(), *self.__postings.values()
+                    )
+                ),
+                **counters,
+                "avg_query_ms": round(
+                    self.__query_time / counters["queries"] * 1e3, 3
+                ) if counters["queries"] else 0.0,
+            }
+
+    def __live_rows(self) -> int:
+        """Количество действующих строк. Вызывается под блокировкой."""
+        return int(np.count_nonzero(self.__columns["alive"].view()))
+
+    def __row_matches(self, row: int, key: tuple, birth_date: int) -> bool:
+        """Совпадают ли поля строки с новыми значениями."""
+        columns = self.__columns
+        return (
+            columns["birth_date"].data[row] == birth_date
+            and (
+                columns["city_id"].data[row], columns["sex"].data[row],
+                columns["birth_date"].data[row] // 10000,
+                columns["relation"].data[row]
+            ) == key
+        )
+
+    def __should_compact(self, incoming: int, now: int) -> bool:
+        """
+        Нужно ли сжать индекс перед добавлением `incoming` строк.
+        Вызывается под блокировкой.
+        """
+
+        rows = self.__columns["id"].size
+        is_stale = self.max_age > 0 and now - self.__oldest_seen > self.max_age
+        if not rows or not (self.__dead_rows or is_stale):
+            return False
+        return (
+            is_stale
+            or self.__dead_rows > rows * COMPACT_DEAD_RATIO
+            or (
+                rows + incoming > self.max_rows
+                and self.__dead_rows >= incoming
+            )
+        )
+
+    def __compact(self, now: int) -> int:
+        """
+        Перестраивает индекс из действующих строк. Вызывается под
+        блокировкой.
+
+        Порядок строк сохраняется, поэтому списки вхождений остаются
+        отсортированными.
+        """
+
+        old = {name: array.view() for name, array in self.__columns.items()}
+        keep = old["alive"].copy()
+        if self.max_age > 0:
+            fresh = old["seen_at"] >= now - self.max_age
+            self.__counters["expired"] += int(np.count_nonzero(keep & ~fresh))
+            keep &= fresh
+        rows = np.flatnonzero(keep)
+        dropped = len(keep) - len(rows)
+
+        # Источники без действующих строк отбрасываются, остальные
+        # перенумеровываются по порядку
+        sources = old["source"][rows]
+        used = np.unique(sources)
+        renumber = np.zeros(len(self.__sources), np.int32)
+        renumber[used] = np.arange(len(used), dtype=np.int32)
+        self.__sources = [self.__sources[source] for source in used.tolist()]
+        self.__source_rows = np.bincount(
+            renumber[sources], minlength=len(used)
+        ).tolist()
+        self.__snapshot_sources = {
+            id(source): number
+            for number, source in enumerate(self.__sources)
+            if isinstance(source, MemberSnapshot)
+        }
+
+        columns = {}
+        for name, dtype in self._COLUMNS.items():
+            values = renumber[sources] if name == "source" else old[name][rows]
+            columns[name] = _GrowableArray(dtype, max(16, len(rows)))
+            columns[name].extend(values)
+        self.__columns = columns
+        self.__row_by_id = dict(
+            zip(columns["id"].view().tolist(), range(len(rows)))
+        )
+        self.__postings = self.__build_postings()
+        self.__dead_rows = 0
+        self.__oldest_seen = (
+            int(columns["seen_at"].view().min()) if len(rows) else now
+        )
+        self.__counters["compactions"] += 1
+        return dropped
+
+    def __build_postings(self) -> dict[tuple, "_GrowableArray"]:
+        """Строит списки вхождений строк. Вызывается под блокировкой."""
+
+        columns = self.__columns
+        # Ключ упаковывается в одно число, чтобы строки группировались
+        # одной сортировкой
+        base = (
+            columns["city_id"].view().astype(np.int64) * 256
+            + columns["sex"].view()
+        )
+        years = columns["birth_date"].view() // 10000
+        relations = columns["relation"].view().astype(np.int64)
+
+        postings = {}
+        # Ключи с годом рождения и семейным положением или "любым" (None)
+        for with_year, with_relation in (
+            (True, True), (True, False), (False, True), (False, False)
+        ):
+            codes = base * 10000
+            if with_year:
+                codes += years
+            codes = codes * 256
+            if with_relation:
+                codes += relations
+
+            if not len(codes):
+                break
+            order = np.argsort(codes, kind="stable")
+            sorted_codes = codes[order]
+            bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+            keys = sorted_codes[np.concatenate(([0], bounds))].tolist()
+            for code, rows in zip(keys, np.split(order, bounds)):
+                code, relation = divmod(code, 256)
+                code, year = divmod(code, 10000)
+                city_id, sex = divmod(code, 256)
+                posting = _GrowableArray(np.uint32, max(16, len(rows)))
+                posting.extend(rows)
+                postings[(
+                    city_id, sex,
+                    year if with_year else None,
+                    relation if with_relation else None
+                )] = posting
+        return postings
+
+    def __add_source(self, source: MemberSnapshot | list[tuple]) -> int:
+        """Регистрирует источник данных. Вызывается под блокировкой."""
+        self.__sources.append(source)
+        self.__source_rows.append(0)
+        return len(self.__sources) - 1
+
+    def __release_source(self, number: int) -> None:
+        """
+        Освобождает источник без строк. Вызывается под блокировкой.
+
+        Номер источника не переиспользуется до сжатия индекса.
+        """
+
+        source = self.__sources[number]
+        if isinstance(source, MemberSnapshot):
+            self.__snapshot_sources.pop(id(source), None)
+        self.__sources[number] = None
+
+    def __snapshot_source(self, snapshot: MemberSnapshot) -> int:
+        """Номер источника для снимка. Вызывается под блокировкой."""
+
+        # Пока снимок хранится в `__sources`, его id не переиспользуется
+        source = self.__snapshot_sources.get(id(snapshot))
+        if source is None:
+            source = self.__add_source(snapshot)
+            self.__snapshot_sources[id(snapshot)] = source
+        return source
+
+    def __member(self, row: int) -> dict:
+        """Словарь участника строки `row`. Вызывается под блокировкой."""
+
+        columns = self.__columns
+        source = self.__sources[columns["source"].data[row]]
+        source_row = int(columns["source_row"].data[row])
+        if isinstance(source, MemberSnapshot):
+            return source.member(source_row)
+
+        first_name, last_name, is_closed = source[source_row]
+        member = {
+            "id": int(columns["id"].data[row]),
+            "first_name": first_name,
+            "last_name": last_name,
+            "is_closed": is_closed,
+            "sex": int(columns["sex"].data[row]),
+            "city": {"id": int(columns["city_id"].data[row])},
+            "relation": int(columns["relation"].data[row]),
+            "can_write_private_message": 1,
+        }
+        bdate = format_birth_date(int(columns["birth_date"].data[row]))
+        if bdate:
+            member["bdate"] = bdate
+        return member
+
+
+_shared_index: CandidateIndex | None = None
+_shared_index_lock = threading.Lock()
+
+
+def get_candidate_index() -> CandidateIndex:
+    """Возвращает общий для процесса индекс кандидатов."""
+
+    global _shared_index
+    if _shared_index is None:
+        with _shared_index_lock:
+            if _shared_index is None:
+                _shared_index = CandidateIndex()
+    return _shared_index
@@ -0,0 +1,247 @@
+"""
+Маршрутизатор команд бота.
+
+Таблица маршрутов строится один раз при запуске бота из `COMMANDS_CONFIG`
+(текстовые команды) и `KEYBOARD_CONFIG` (поле `command` в payload кнопок).
+Поиск обработчика для сообщения — одно обращение к словарю, поэтому
+добавление новых команд не увеличивает стоимость обработки сообщения.
+
+Перед обработчиком выполняется цепочка middleware. Middleware — это
+вызываемый объект `middleware(context, call_next)`, который может
+обработать сообщение сам или передать его дальше через
+`call_next(context)`. Результат обработчика возвращается без изменений,
+поэтому маршрутизатор одинаково работает с обычными и корутинными
+обработчиками.
+
+### Пример использования:
+```python
+router = CommandRouter.from_config(
+    COMMANDS_CONFIG, KEYBOARD_CONFIG, fallback=handle_unknown
+)
+router.add_route("start", handle_start)
+router.use(logging_middleware)
+router.compile()
+router.dispatch(request, message)
+```
+"""
+
+import json
+from functools import lru_cache, partial
+from typing import Any, Callable
+
+Handler = Callable[["RouteContext"], Any]
+Middleware = Callable[["RouteContext", Handler], Any]
+
+
+@lru_cache(maxsize=1024)
+def _parse_payload_string(payload: str) -> str | None:
+    """
+    Разбирает строку payload. Кнопки бота отправляют небольшой набор
+    одинаковых строк, поэтому результат разбора кэшируется.
+    """
+
+    try:
+        return _get_command(json.loads(payload))
+    except ValueError:
+        return None
+
+
+def _get_command(payload) -> str | None:
+    """Возвращает строковое поле `command` словаря payload."""
+    if not isinstance(payload, dict):
+        return None
+    command = payload.get("command")
+    return command if isinstance(command, str) else None
+
+
+class RouteContext:
+    """
+    Контекст обработки сообщения.
+
+    ### Атрибуты:
+    - user_id (int): ID пользователя.
+    - request (str): Нормализованный текст сообщения.
+    - message: Исходное сообщение (`IncomingMessage`).
+    - command (str | None): Имя найденной команды или None.
+    """
+
+    __slots__ = ("user_id", "request", "message", "command")
+
+    def __init__(
+        self, user_id: int, request: str, message, command: str | None
+    ) -> None:
+        self.user_id = user_id
+        self.request = request
+        self.message = message
+        self.command = command
+
+
+class CommandRouter:
+    """
+    Маршрутизатор команд с предварительно собранной таблицей маршрутов.
+
+    ### Аргументы:
+    - fallback (Callable): Обработчик сообщений без команды.
+
+    ### Методы:
+    - `add_alias()`: Связывает текст сообщения с командой.
+    - `add_payload_alias()`: Связывает поле `command` payload с командой.
+    - `add_route()`: Регистрирует обработчик команды.
+    - `use()`: Добавляет middleware в конец цепочки.
+    - `compile()`: Собирает цепочку middleware.
+    - `resolve()`: Определяет команду сообщения.
+    - `dispatch()`: Передает сообщение в цепочку обработки.
+    """
+
+    def __init__(self, fallback: Handler) -> None:
+        self.fallback = fallback
+        self.__text_index: dict[str, str] = {}
+        self.__payload_index: dict[str, str] = {}
+        self.__handlers: dict[str, Handler] = {}
+        self.__middlewares: list[Middleware] = []
+        self.__chain: Handler | None = None
+
+    @classmethod
+    def from_config(
+        cls,
+        commands_config: dict[str, list[str]],
+        keyboard_config: dict[str, dict],
+        fallback: Handler
+    ) -> "CommandRouter":
+        """
+        Создает маршрутизатор с индексами команд из конфигураций бота.
+
+        Текстовые алиасы берутся из `commands_config`. Команды payload
+        кнопок сопоставляются с командами бота по имени, а если такого
+        имени нет — по тексту кнопки (например, payload `configure` кнопки
+        "Настроить поиск" ведет к команде `configure_search_settings`).
+        """
+
+        router = cls(fallback)
+
+        for command, aliases in commands_config.items():
+            router.add_alias(command, *aliases)
+
+        for keyboard in keyboard_config.values():
+            for button in cls.__iter_buttons(keyboard.get("actions", [])):
+                payload_command = cls.parse_payload_command(
+                    button.get("payload")
+                )
+                if payload_command is None:
+                    continue
+
+                command = (
+                    payload_command
+                    if payload_command in commands_config
+                    else router.resolve_text(button.get("label", ""))
+                )
+                if command is not None:
+                    router.add_payload_alias(payload_command, command)
+
+        return router
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Приводит текст сообщения к виду, в котором хранятся алиасы."""
+        return text.strip().lower()
+
+    @staticmethod
+    def parse_payload_command(payload: str | dict | None) -> str | None:
+        """Возвращает поле `command` из payload кнопки, если оно есть."""
+
+        if not payload:
+            return None
+
+        if isinstance(payload, str):
+            return _parse_payload_string(payload)
+
+        return _get_command(payload)
+
+    def add_alias(self, command: str, *aliases: str) -> None:
+        """Связывает тексты сообщений с командой."""
+        for alias in aliases:
+            self.__text_index[self.normalize(alias)] = command
+
+    def add_payload_alias(self, payload_command: str, command: str) -> None:
+        """Связывает поле `command` payload с командой."""
+        self.__payload_index[payload_command] = command
+
+    def add_route(self, command: str, handler: Handler) -> None:
+        """Регистрирует обработчик команды."""
+        self.__handlers[command] = handler
+        self.__chain = None
+
+    def use(self, middleware: Middleware) -> None:
+        """Добавляет middleware в конец цепочки."""
+        self.__middlewares.append(middleware)
+        self.__chain = None
+
+    def compile(self) -> None:
+        """
+        Собирает цепочку middleware вокруг обработчика маршрутов.
+
+        Первое добавленное middleware выполняется первым.
+        """
+
+        chain = self.__handle
+        for middleware in reversed(self.__middlewares):
+            chain = partial(middleware, call_next=chain)
+        self.__chain = chain
+
+    def resolve_text(self, request: str) -> str | None:
+        """Возвращает команду по тексту сообщения."""
+        return self.__text_index.get(self.normalize(request))
+
+    def resolve(self, request: str, payload: str | dict | None = None) \
+        -> str | None:
+        """
+        Определяет команду сообщения.
+
+        Команда из payload кнопки имеет приоритет над текстом сообщения.
+        """
+
+        if payload:
+            command = self.__payload_index.get(
+                self.parse_payload_command(payload)
+            )
+            if command is not None:
+                return command
+
+        return self.__text_index.get(request)
+
+    def dispatch(self, request: str, message) -> Any:
+        """
+        Передает сообщение в цепочку обработки.
+
+        ### Аргументы:
+        - request (str): Нормализованный текст сообщения.
+        - message: Сообщение с полями `user_id` и `payload`.
+
+        ### Возвращает:
+        - Результат обработчика (для корутинных обработчиков — корутину).
+        """
+
+        if self.__chain is None:
+            self.compile()
+
+        context = RouteContext(
+            message.user_id,
+            request,
+            message,
+            self.resolve(request, getattr(message, "payload", None))
+        )
+        return self.__chain(context)
+
+    def __handle(self, context: RouteContext) -> Any:
+        """Вызывает обработчик найденной команды."""
+        handler = self.__handlers.get(context.command, self.fallback)
+        return handler(context)
+
+    @staticmethod
+    def __iter_buttons(actions: list):
+        """Перебирает кнопки клавиатуры, включая разбитые по строкам."""
+        for action in actions:
+            if isinstance(action, list):
+                yield from action
+            else:
+                yield action
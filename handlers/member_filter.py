@@ -0,0 +1,197 @@
+"""
+Векторизованный отбор кандидатов по настройкам поиска.
+
+Условие поиска вычисляется для всех участников страницы сразу по
+столбцам NumPy (`MemberColumns`) вместо вызова
+`SearchHandler.is_member_matching` для каждого участника. Проверка
+столбцов в десятки раз быстрее, но перевод страницы словарей в столбцы
+дороже проверки словарей по одному, поэтому векторизованный отбор
+выгоден для данных, которые уже хранятся столбцами, — снимков групп
+(`handlers.member_snapshot`).
+
+Условие поиска (общее для обоих вариантов):
+- пол совпадает с выбранным (0 — любой пол);
+- город совпадает с городом поиска;
+- участнику можно написать личное сообщение;
+- возраст входит в диапазон `age_min`-`age_max`. Возраст считается по
+  полной дате рождения `bdate` ("Д.М.ГГГГ"). Если год рождения скрыт
+  ("Д.М") или даты нет, участник проходит только при диапазоне по
+  умолчанию (`AGE_MIN`-`AGE_MAX`), то есть когда возраст не важен;
+- семейное положение совпадает с выбранным (0 — не важно).
+
+### Пример использования:
+```python
+mask = match_mask(MemberColumns.from_page(page), search_settings)
+matches = [member for member, ok in zip(page, mask) if ok]
+```
+"""
+
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+from db.models.models import UserSearchSettings
+
+# Диапазон возраста по умолчанию: фильтрация по возрасту не нужна
+AGE_MIN = 18
+AGE_MAX = 99
+
+
+@lru_cache(maxsize=65536)
+def parse_birth_date(bdate: str | None) -> int:
+    """
+    Переводит `bdate` в число ГГГГММДД.
+
+    ### Возвращает:
+    - int: Дата рождения в виде ГГГГММДД или 0, если год рождения
+      неизвестен.
+    """
+
+    if not bdate:
+        return 0
+
+    parts = bdate.split(".")
+    if len(parts) != 3:
+        return 0
+
+    try:
+        day, month, year = map(int, parts)
+    except ValueError:
+        return 0
+    return year * 10000 + month * 100 + day
+
+
+def format_birth_date(birth_date: int) -> str | None:
+    """Переводит число ГГГГММДД обратно в `bdate` ("Д.М.ГГГГ")."""
+
+    if not birth_date:
+        return None
+    year, month_day = divmod(birth_date, 10000)
+    month, day = divmod(month_day, 100)
+    return f"{day}.{month}.{year}"
+
+
+def birth_date_bounds(age_min: int, age_max: int, today: date | None = None) \
+    -> tuple[int, int]:
+    """
+    Границы даты рождения ГГГГММДД для диапазона возраста.
+
+    Возраст не меньше `age_min`, если человек родился не позже, чем
+    `age_min` лет назад, и не больше `age_max`, если родился позже, чем
+    `age_max + 1` лет назад.
+
+    ### Возвращает:
+    - tuple: Пара (нижняя граница не включительно, верхняя включительно).
+    """
+
+    today = today or date.today()
+    month_day = today.month * 100 + today.day
+    return (
+        (today.year - age_max - 1) * 10000 + month_day,
+        (today.year - age_min) * 10000 + month_day,
+    )
+
+
+def is_age_filter_set(search_settings: UserSearchSettings) -> bool:
+    """Проверяет, сужен ли диапазон возраста относительно умолчания."""
+    return search_settings.age_min > AGE_MIN \
+        or search_settings.age_max < AGE_MAX
+
+
+class MemberColumns:
+    """
+    Поля страницы участников в виде столбцов NumPy.
+
+    ### Атрибуты:
+    - id (np.ndarray): VK ID участников.
+    - sex, city_id, can_write, relation (np.ndarray): Поля профиля.
+      Отсутствующие значения равны 0.
+    - birth_date (np.ndarray): Дата рождения ГГГГММДД, 0 — год неизвестен.
+    """
+
+    __slots__ = ("id", "sex", "city_id", "can_write", "relation", "birth_date")
+
+    def __init__(
+        self,
+        id: np.ndarray,  # pylint: disable=redefined-builtin
+        sex: np.ndarray,
+        city_id: np.ndarray,
+        can_write: np.ndarray,
+        relation: np.ndarray,
+        birth_date: np.ndarray
+    ) -> None:
+        self.id = id
+        self.sex = sex
+        self.city_id = city_id
+        self.can_write = can_write
+        self.relation = relation
+        self.birth_date = birth_date
+
+    @classmethod
+    def from_page(cls, page: list[dict]) -> "MemberColumns":
+        """Создает столбцы из страницы участников `groups.getMembers`."""
+
+        size = len(page)
+        return cls(
+            id=np.fromiter(
+                (member["id"] for member in page), np.int64, size
+            ),
+            sex=np.fromiter(
+                (member.get("sex", 0) for member in page), np.int8, size
+            ),
+            city_id=np.fromiter(
+                ((member.get("city") or {}).get("id", 0) for member in page),
+                np.int64, size
+            ),
+            can_write=np.fromiter(
+                (
+                    member.get("can_write_private_message", 0)
+                    for member in page
+                ),
+                np.int8, size
+            ),
+            relation=np.fromiter(
+                (member.get("relation", 0) for member in page), np.int8, size
+            ),
+            birth_date=np.fromiter(
+                (parse_birth_date(member.get("bdate")) for member in page),
+                np.int32, size
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.sex)
+
+
+def match_mask(
+    columns: MemberColumns,
+    search_settings: UserSearchSettings,
+    today: date | None = None
+) -> np.ndarray:
+    """
+    Вычисляет условие поиска для всех участников страницы.
+
+    ### Аргументы:
+    - columns (MemberColumns): Столбцы страницы. Подходит любой объект с
+      теми же атрибутами, например `handlers.member_snapshot.SnapshotPage`.
+    - search_settings (UserSearchSettings): Настройки поиска.
+    - today (date, optional): Дата, на которую считается возраст.
+
+    ### Возвращает:
+    - np.ndarray: Булев массив, True — участник подходит.
+    """
+
+    mask = (columns.city_id == search_settings.city_id) \
+        & (columns.can_write == 1)
+    if search_settings.sex:
+        mask &= columns.sex == search_settings.sex
+    if search_settings.relation:
+        mask &= columns.relation == search_settings.relation
+
+    if is_age_filter_set(search_settings):
+        lower, upper = birth_date_bounds(
+            search_settings.age_min, search_settings.age_max, today
+        )
+        mask &= (columns.birth_date > lower) & (columns.birth_date <= upper)
+    return mask
@@ -0,0 +1,775 @@
+"""
+Колоночные снимки участников групп на диске.
+
+Страница `groups.getMembers` — список словарей с вложенными `city` и
+`last_seen`, и несколько крупных групп в памяти занимают гигабайты.
+Снимок хранит участников группы столбцами: числовые поля — массивами
+фиксированной ширины, имена — общим блоком байтов UTF-8 со смещениями
+строк. Снимок записывается один раз, а читается через `mmap` всеми
+процессами бота: данные лежат в страничном кэше ОС в одном экземпляре
+и загружаются с диска по мере чтения.
+
+Формат — каталог версии `<group_id>.<версия>` в `MEMBER_SNAPSHOT_DIR`,
+на который указывает символическая ссылка `<group_id>`:
+- `meta.json`: версия формата, ID группы, количество участников, время
+  создания и время последнего полного чтения группы;
+- `<столбец>.npy`: столбцы `COLUMNS`. Дата рождения хранится числом
+  ГГГГММДД (0 — год неизвестен), год рождения — `birth_date // 10000`;
+- `<строка>.offsets.npy` и `<строка>.blob.npy`: смещения строк
+  `STRING_COLUMNS` (на одно больше, чем участников) и их байты.
+
+Новый снимок записывается в новый каталог версии, после чего ссылка
+`<group_id>` атомарно переключается на него (`os.replace`), поэтому по
+пути снимка всегда лежит либо старый снимок, либо новый. Каталог старой
+версии остается на диске еще `OLD_VERSION_GRACE` секунд, чтобы
+читатель, уже открывший ее по ссылке, успел загрузить все файлы, и
+удаляется при одной из следующих записей снимка группы. Уже открытые
+отображения старого снимка остаются рабочими до закрытия.
+
+Снимок можно дополнить (`SnapshotStore.refresh()`): читаются только
+смещения после последней страницы снимка. `groups.getMembers` отдает
+участников по возрастанию ID, поэтому так находятся новые страницы VK,
+а вступившие в группу старые страницы и вышедшие участники учитываются
+при полном чтении группы не реже раза в `full_interval` секунд.
+
+Страница снимка (`SnapshotPage`) — срез столбцов без копирования.
+`SearchHandler.filter_members` вычисляет по ней условие поиска
+(`handlers.member_filter.match_mask`) и создает словари только для
+подошедших участников.
+
+### Переменные окружения:
+- `MEMBER_SNAPSHOT_DIR`: Каталог снимков.
+- `MEMBER_SNAPSHOT_TTL`: Время в секундах, после которого снимок
+  устаревает и группа читается через VK API.
+
+### Пример использования:
+```python
+store = get_snapshot_store()
+store.crawl(vk_service, group_id)
+
+snapshot = store.open(group_id)
+with SnapshotMemberStream(snapshot) as stream:
+    for page in stream.pages():
+        matches.extend(filter_members(page, search_settings))
+```
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from typing import AsyncIterator, Iterable, Iterator
+
+import numpy as np
+
+from handlers.member_filter import format_birth_date, parse_birth_date
+from services.formatters.module_formatters import get_module_part
+from services.vk_api.member_stream import MEMBERS_PAGE_SIZE
+from services.vk_api.vk_api_service import VKApiService
+from utils.logging.setup import setup_logger
+
+SNAPSHOT_DIR = os.getenv("MEMBER_SNAPSHOT_DIR", "data/snapshots")
+SNAPSHOT_TTL = float(os.getenv("MEMBER_SNAPSHOT_TTL", "86400"))
+
+FORMAT_VERSION = 1
+
+# Сколько раз открывается снимок, версия которого удалена во время чтения
+OPEN_ATTEMPTS = 3
+# Сколько секунд хранится каталог версии после замены снимка
+OLD_VERSION_GRACE = 60.0
+
+# Числовые столбцы снимка и их типы
+COLUMNS = {
+    "id": np.int64,
+    "sex": np.int8,
+    "city_id": np.int32,
+    "birth_date": np.int32,
+    "relation": np.int8,
+    "can_write": np.int8,
+    "is_closed": np.int8,
+    "last_seen": np.uint32,
+}
+STRING_COLUMNS = ("first_name", "last_name")
+
+logger = setup_logger(
+    module_name=get_module_part(__name__, idx=0), logger_name=__name__
+)
+
+
+# Значения числовых столбцов из словаря участника `groups.getMembers`
+_EXTRACTORS = {
+    "id": lambda member: member["id"],
+    "sex": lambda member: member.get("sex", 0),
+    "city_id": lambda member: (member.get("city") or {}).get("id", 0),
+    "birth_date": lambda member: parse_birth_date(member.get("bdate")),
+    "relation": lambda member: member.get("relation", 0),
+    "can_write": lambda member: member.get("can_write_private_message", 0),
+    "is_closed": lambda member: int(member.get("is_closed", False)),
+    "last_seen": lambda member: (member.get("last_seen") or {}).get("time", 0),
+}
+
+
+class SnapshotWriter:
+    """
+    Собирает столбцы снимка из страниц участников.
+
+    В памяти хранятся уже сжатые столбцы страниц, а не словари.
+
+    ### Методы:
+    - `add_page()`: Добавляет страницу участников.
+    - `add_snapshot()`: Добавляет всех участников снимка.
+    - `write()`: Записывает снимок в каталог.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.__columns: dict[str, list[np.ndarray]] = {
+            name: [] for name in COLUMNS
+        }
+        self.__lengths: dict[str, list[np.ndarray]] = {
+            name: [] for name in STRING_COLUMNS
+        }
+        self.__blobs: dict[str, list[bytes]] = {
+            name: [] for name in STRING_COLUMNS
+        }
+
+    def add_page(self, page: list[dict]) -> None:
+        """Добавляет страницу `groups.getMembers`."""
+
+        size = len(page)
+        for name, dtype in COLUMNS.items():
+            self.__columns[name].append(
+                np.fromiter(map(_EXTRACTORS[name], page), dtype, size)
+            )
+        for name in STRING_COLUMNS:
+            encoded = [(member.get(name) or "").encode() for member in page]
+            self.__lengths[name].append(
+                np.fromiter(map(len, encoded), np.int64, size)
+            )
+            self.__blobs[name].append(b"".join(encoded))
+        self.count += size
+
+    def add_snapshot(self, snapshot: "MemberSnapshot") -> None:
+        """Добавляет столбцы снимка без преобразования в словари."""
+
+        for name in COLUMNS:
+            self.__columns[name].append(np.array(snapshot.columns[name]))
+        for name in STRING_COLUMNS:
+            offsets, blob = snapshot.strings(name)
+            self.__lengths[name].append(np.diff(offsets))
+            self.__blobs[name].append(blob.tobytes())
+        self.count += len(snapshot)
+
+    def write(
+        self, path: str, group_id: int, crawled_at: float | None = None
+    ) -> None:
+        """
+        Записывает снимок в каталог `path`.
+
+        Снимок собирается в новом каталоге версии рядом с `path`, после
+        чего символическая ссылка `path` атомарно переключается на него.
+        Каталоги версий, замененных больше `OLD_VERSION_GRACE` секунд
+        назад, удаляются, а прежняя версия остается для читателей,
+        которые уже открывают ее.
+
+        ### Аргументы:
+        - path (str): Путь снимка (символическая ссылка на версию).
+        - group_id (int): ID группы.
+        - crawled_at (float, optional): Время последнего полного чтения
+          группы. По умолчанию — время записи.
+        """
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        tmp_path = (
+            f"{path}.{time.time_ns()}-{os.getpid()}-{threading.get_ident()}"
+        )
+        link_path = f"{tmp_path}.link"
+        os.makedirs(tmp_path)
+
+        try:
+            for name, dtype in COLUMNS.items():
+                np.save(
+                    os.path.join(tmp_path, f"{name}.npy"),
+                    self.__concat(self.__columns[name], dtype)
+                )
+            for name in STRING_COLUMNS:
+                offsets = np.zeros(self.count + 1, np.int64)
+                np.cumsum(
+                    self.__concat(self.__lengths[name], np.int64),
+                    out=offsets[1:]
+                )
+                np.save(os.path.join(tmp_path, f"{name}.offsets.npy"), offsets)
+                np.save(
+                    os.path.join(tmp_path, f"{name}.blob.npy"),
+                    np.frombuffer(b"".join(self.__blobs[name]), np.uint8)
+                )
+
+            created_at = time.time()
+            meta = {
+                "version": FORMAT_VERSION,
+                "group_id": group_id,
+                "count": self.count,
+                "created_at": created_at,
+                "crawled_at": crawled_at or created_at,
+            }
+            with open(
+                os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8"
+            ) as file:
+                json.dump(meta, file)
+
+            old_path = None
+            if os.path.islink(path):
+                old_path = os.path.realpath(path)
+            elif os.path.isdir(path):
+                # Снимок прежнего формата без ссылки: пути не будет только
+                # на время переименования
+                old_path = f"{tmp_path}.old"
+                os.replace(path, old_path)
+
+            os.symlink(os.path.basename(tmp_path), link_path)
+            os.replace(link_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if os.path.lexists(link_path):
+                os.remove(link_path)
+            raise
+
+        current_path = os.path.realpath(path)
+        if old_path is not None and old_path != current_path \
+                and os.path.isdir(old_path):
+            # Время замены версии отсчитывается от изменения каталога
+            os.utime(old_path)
+        self.__remove_old_versions(path, current_path)
+
+    @staticmethod
+    def __remove_old_versions(path: str, current_path: str) -> None:
+        """Удаляет каталоги версий, замененных больше `OLD_VERSION_GRACE`."""
+
+        prefix = f"{os.path.basename(path)}."
+        current_name = os.path.basename(current_path)
+        expired_at = time.time() - OLD_VERSION_GRACE
+        with os.scandir(os.path.dirname(os.path.abspath(path))) as entries:
+            for entry in entries:
+                if not entry.name.startswith(prefix) \
+                        or not entry.is_dir(follow_symlinks=False) \
+                        or entry.name == current_name:
+                    continue
+                try:
+                    if entry.stat(follow_symlinks=False).st_mtime \
+                            < expired_at:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    def __concat(chunks: list[np.ndarray], dtype: type) -> np.ndarray:
+        """Объединяет столбцы страниц."""
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype)
+
+
+class MemberSnapshot:
+    """
+    Снимок участников группы, отображенный в память.
+
+    Все файлы читаются из одного каталога версии, на который указывает
+    `path` в момент открытия.
+
+    ### Аргументы:
+    - path (str): Путь снимка.
+
+    ### Атрибуты:
+    - group_id (int): ID группы.
+    - created_at (float): Время создания снимка (Unix time).
+    - crawled_at (float): Время последнего полного чтения группы.
+
+    ### Методы:
+    - `page()`: Страница снимка по диапазону строк.
+    - `member()`: Словарь участника в формате `groups.getMembers`.
+    - `age()`: Возраст снимка в секундах.
+
+    ### Исключения:
+    - ValueError: Если версия формата не поддерживается.
+    """
+
+    def __init__(self, path: str) -> None:
+        path = os.path.realpath(path)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as file:
+            meta = json.load(file)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Неподдерживаемая версия снимка: {meta.get('version')}."
+            )
+
+        self.path = path
+        self.group_id = meta["group_id"]
+        self.created_at = meta["created_at"]
+        self.crawled_at = meta.get("crawled_at", self.created_at)
+        self.__count = meta["count"]
+        self.columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in COLUMNS
+        }
+        self.__offsets = {
+            name: np.load(
+                os.path.join(path, f"{name}.offsets.npy"), mmap_mode="r"
+            )
+            for name in STRING_COLUMNS
+        }
+        self.__blobs = {
+            name: np.load(
+                os.path.join(path, f"{name}.blob.npy"), mmap_mode="r"
+            )
+            for name in STRING_COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return self.__count
+
+    @property
+    def nbytes(self) -> int:
+        """Объем снимка на диске в байтах."""
+        return sum(
+            array.nbytes for array in (
+                *self.columns.values(),
+                *self.__offsets.values(),
+                *self.__blobs.values(),
+            )
+        )
+
+    def age(self) -> float:
+        """Возраст снимка в секундах."""
+        return time.time() - self.created_at
+
+    def page(self, start: int, stop: int) -> "SnapshotPage":
+        """Страница участников со строк `start`-`stop` без копирования."""
+        return SnapshotPage(self, start, min(stop, self.__count))
+
+    def string(self, name: str, row: int) -> str:
+        """Строка столбца `name` участника в строке `row`."""
+        offsets = self.__offsets[name]
+        start, stop = offsets[row], offsets[row + 1]
+        return self.__blobs[name][start:stop].tobytes().decode()
+
+    def strings(self, name: str) -> tuple[np.ndarray, np.ndarray]:
+        """Смещения и байты строкового столбца `name`."""
+        return self.__offsets[name], self.__blobs[name]
+
+    def member(self, row: int) -> dict:
+        """
+        Словарь участника в формате `groups.getMembers`.
+
+        Дата рождения без года в снимке не хранится, поэтому у таких
+        участников нет поля `bdate`.
+        """
+
+        columns = self.columns
+        member = {
+            "id": int(columns["id"][row]),
+            "first_name": self.string("first_name", row),
+            "last_name": self.string("last_name", row),
+            "sex": int(columns["sex"][row]),
+            "relation": int(columns["relation"][row]),
+            "can_write_private_message": int(columns["can_write"][row]),
+            "is_closed": bool(columns["is_closed"][row]),
+        }
+        city_id = int(columns["city_id"][row])
+        if city_id:
+            member["city"] = {"id": city_id}
+        bdate = format_birth_date(int(columns["birth_date"][row]))
+        if bdate:
+            member["bdate"] = bdate
+        last_seen = int(columns["last_seen"][row])
+        if last_seen:
+            member["last_seen"] = {"time": last_seen}
+        return member
+
+
+class SnapshotPage:
+    """
+    Страница снимка: срез столбцов без копирования.
+
+    Атрибуты `id`, `sex`, `city_id`, `can_write`, `relation` и
+    `birth_date` совпадают с `handlers.member_filter.MemberColumns`,
+    поэтому страница передается в `match_mask` напрямую.
+
+    ### Аргументы:
+    - snapshot (MemberSnapshot): Снимок.
+    - start, stop (int): Диапазон строк снимка.
+    - rows (np.ndarray, optional): Номера строк внутри диапазона, если
+      страница содержит не все строки (например, без повторов).
+
+    ### Методы:
+    - `take()`: Страница из части строк.
+    - `materialize()`: Словари участников по номерам строк страницы.
+    - `snapshot_rows()`: Номера строк снимка по номерам строк страницы.
+    """
+
+    __slots__ = ("snapshot", "start", "stop", "rows")
+
+    def __init__(
+        self,
+        snapshot: MemberSnapshot,
+        start: int,
+        stop: int,
+        rows: np.ndarray | None = None
+    ) -> None:
+        self.snapshot = snapshot
+        self.start = start
+        self.stop = stop
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return self.stop - self.start if self.rows is None else len(self.rows)
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        if name not in COLUMNS:
+            raise AttributeError(name)
+        column = self.snapshot.columns[name][self.start:self.stop]
+        return column if self.rows is None else column[self.rows]
+
+    def take(self, indices: Iterable[int]) -> "SnapshotPage":
+        """Страница из строк `indices` текущей страницы."""
+        return SnapshotPage(
+            self.snapshot, self.start, self.stop,
+            self.snapshot_rows(indices) - self.start
+        )
+
+    def materialize(self, indices: Iterable[int] | None = None) -> list[dict]:
+        """
+        Словари участников по номерам строк страницы.
+
+        ### Аргументы:
+        - indices (Iterable[int], optional): Номера строк. По умолчанию
+          все строки страницы.
+        """
+
+        return [
+            self.snapshot.member(row)
+            for row in self.snapshot_rows(indices).tolist()
+        ]
+
+    def snapshot_rows(self, indices: Iterable[int] | None = None) \
+        -> np.ndarray:
+        """
+        Номера строк снимка для номеров строк страницы.
+
+        ### Аргументы:
+        - indices (Iterable[int], optional): Номера строк страницы. По
+          умолчанию все строки страницы.
+        """
+
+        if indices is None:
+            indices = range(len(self))
+        indices = np.asarray(indices, np.int64)
+        if self.rows is not None:
+            indices = self.rows[indices]
+        return indices + self.start
+
+
+class _SnapshotStreamState:
+    """Общая логика синхронного и асинхронного потоков снимка."""
+
+    def __init__(
+        self,
+        snapshot: MemberSnapshot,
+        offset: int = 0,
+        page_size: int = MEMBERS_PAGE_SIZE
+    ) -> None:
+        self.snapshot = snapshot
+        self.offset = offset
+        self.total = len(snapshot)
+        self.page_size = page_size
+        self.closed = False
+        self._counters = dict.fromkeys(("pages", "members"), 0)
+
+    def stats(self) -> dict:
+        """Возвращает статистику потока в формате `GroupMemberStream`."""
+        return {
+            "offset": self.offset,
+            "total": self.total,
+            "snapshot_age": round(self.snapshot.age(), 1),
+            "discarded_pages": 0,
+            **self._counters,
+        }
+
+    @property
+    def exhausted(self) -> bool:
+        """Снимок прочитан до конца."""
+        return self.offset >= self.total
+
+    def start(self) -> None:
+        """Совместимость с `GroupMemberStream`: загружать заранее нечего."""
+
+    def _next_page(self) -> SnapshotPage | None:
+        """Следующая страница или None, если снимок прочитан."""
+
+        if self.closed or self.offset >= self.total:
+            return None
+
+        page = self.snapshot.page(self.offset, self.offset + self.page_size)
+        self.offset = page.stop
+        self._counters["pages"] += 1
+        self._counters["members"] += len(page)
+        return page
+
+
+class SnapshotMemberStream(_SnapshotStreamState):
+    """
+    Поток участников группы из снимка.
+
+    Повторяет интерфейс `GroupMemberStream`, но отдает страницы
+    `SnapshotPage` и не обращается к VK API.
+
+    ### Аргументы:
+    - snapshot (MemberSnapshot): Снимок группы.
+    - offset (int): Смещение первого участника.
+    - page_size (int): Размер страницы.
+    """
+
+    def pages(self) -> Iterator[SnapshotPage]:
+        """Генератор страниц снимка."""
+        while (page := self._next_page()) is not None:
+            yield page
+
+    def __iter__(self) -> Iterator[dict]:
+        for page in self.pages():
+            yield from page.materialize()
+
+    def close(self) -> None:
+        """Останавливает чтение."""
+        self.closed = True
+
+    def __enter__(self) -> "SnapshotMemberStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncSnapshotMemberStream(_SnapshotStreamState):
+    """Асинхронный аналог `SnapshotMemberStream`."""
+
+    async def pages(self) -> AsyncIterator[SnapshotPage]:
+        """Асинхронная версия `SnapshotMemberStream.pages()`."""
+        while (page := self._next_page()) is not None:
+            yield page
+
+    async def __aiter__(self) -> AsyncIterator[dict]:
+        async for page in self.pages():
+            for member in page.materialize():
+                yield member
+
+    async def aclose(self) -> None:
+        """Останавливает чтение."""
+        self.closed = True
+
+    async def __aenter__(self) -> "AsyncSnapshotMemberStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+class SnapshotStore:
+    """
+    Каталог снимков участников групп.
+
+    Открытые снимки кэшируются процессом и переоткрываются, когда снимок
+    на диске заменен новым.
+
+    ### Аргументы:
+    - root (str): Каталог снимков.
+    - ttl (float): Время в секундах, после которого снимок не
+      используется. 0 — снимки не используются.
+
+    ### Методы:
+    - `open()`: Открывает действующий снимок группы.
+    - `write()`: Записывает снимок из страниц участников.
+    - `crawl()`: Читает группу через VK API и записывает ее снимок.
+    - `refresh()`: Дополняет снимок новыми участниками группы.
+    - `stats()`: Возвращает сведения об открытых снимках.
+    """
+
+    def __init__(
+        self, root: str = SNAPSHOT_DIR, ttl: float = SNAPSHOT_TTL
+    ) -> None:
+        self.root = root
+        self.ttl = ttl
+        self.__opened: dict[int, MemberSnapshot] = {}
+        self.__lock = threading.Lock()
+
+    def path(self, group_id: int) -> str:
+        """Каталог снимка группы."""
+        return os.path.join(self.root, str(int(group_id)))
+
+    def open(self, group_id: int) -> MemberSnapshot | None:
+        """
+        Открывает снимок группы.
+
+        ### Возвращает:
+        - MemberSnapshot | None: Снимок или None, если его нет, он
+          устарел или не читается.
+        """
+
+        if self.ttl <= 0:
+            return None
+        return self.__load(group_id, self.ttl)
+
+    def __load(self, group_id: int, max_age: float | None = None) \
+        -> MemberSnapshot | None:
+        """
+        Открывает снимок группы не старше `max_age` секунд.
+
+        None в `max_age` — снимок любого возраста.
+        """
+
+        path = self.path(group_id)
+        try:
+            with open(
+                os.path.join(path, "meta.json"), encoding="utf-8"
+            ) as file:
+                created_at = json.load(file)["created_at"]
+        except (OSError, ValueError, KeyError):
+            return None
+        if max_age is not None and time.time() - created_at > max_age:
+            return None
+
+        with self.__lock:
+            snapshot = self.__opened.get(group_id)
+            if snapshot is not None and snapshot.created_at == created_at:
+                return snapshot
+
+        for attempt in range(1, OPEN_ATTEMPTS + 1):
+            try:
+                snapshot = MemberSnapshot(path)
+                break
+            except FileNotFoundError as e:
+                # Версию удалили после переключения ссылки, открываем новую
+                if attempt == OPEN_ATTEMPTS:
+                    logger.warning(
+                        "Снимок группы %s не читается: %s", group_id, e
+                    )
+                    return None
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Снимок группы %s не читается: %s", group_id, e)
+                return None
+
+        with self.__lock:
+            self.__opened[group_id] = snapshot
+        return snapshot
+
+    def write(self, group_id: int, pages: Iterable[list[dict]]) \
+        -> MemberSnapshot:
+        """Записывает снимок группы из страниц участников."""
+
+        writer = SnapshotWriter()
+        for page in pages:
+            writer.add_page(page)
+        writer.write(self.path(group_id), group_id)
+
+        logger.info(
+            "Записан снимок группы %s: %d участников.", group_id, writer.count
+        )
+        return MemberSnapshot(self.path(group_id))
+
+    def crawl(self, vk_service: VKApiService, group_id: int) \
+        -> MemberSnapshot:
+        """
+        Читает всех участников группы и записывает ее снимок.
+
+        ### Исключения:
+        - VKAPIError: Если страницу участников не удалось получить.
+        """
+        with vk_service.iter_group_members(group_id) as stream:
+            return self.write(group_id, stream.pages())
+
+    def refresh(
+        self,
+        vk_service: VKApiService,
+        group_id: int,
+        full_interval: float = SNAPSHOT_TTL
+    ) -> MemberSnapshot:
+        """
+        Обновляет снимок группы, читая только новые смещения.
+
+        Чтение начинается со страницы перед концом снимка: если часть
+        участников вышла из группы, смещения сдвигаются, и перекрытие не
+        дает пропустить участников на границе. Уже известные участники
+        отбрасываются по ID. Если снимка нет или группа не читалась
+        целиком дольше `full_interval` секунд, группа читается заново.
+
+        ### Аргументы:
+        - vk_service (VKApiService): Сервис VK API.
+        - group_id (int): ID группы.
+        - full_interval (float): Наибольший интервал между полными
+          чтениями группы в секундах.
+
+        ### Возвращает:
+        - MemberSnapshot: Обновленный снимок.
+
+        ### Исключения:
+        - VKAPIError: Если страницу участников не удалось получить.
+        """
+
+        snapshot = self.__load(group_id)
+        if snapshot is None \
+                or time.time() - snapshot.crawled_at > full_interval:
+            return self.crawl(vk_service, group_id)
+
+        writer = SnapshotWriter()
+        writer.add_snapshot(snapshot)
+        known_ids = snapshot.columns["id"]
+        offset = max(0, len(snapshot) - MEMBERS_PAGE_SIZE)
+        with vk_service.iter_group_members(group_id, offset) as stream:
+            for page in stream.pages():
+                ids = np.fromiter(
+                    (member["id"] for member in page), np.int64, len(page)
+                )
+                is_new = ~np.isin(ids, known_ids)
+                writer.add_page([
+                    member for member, new in zip(page, is_new) if new
+                ])
+        added = writer.count - len(snapshot)
+        writer.write(self.path(group_id), group_id, snapshot.crawled_at)
+
+        logger.info(
+            "Дополнен снимок группы %s: %d новых участников.", group_id, added
+        )
+        return MemberSnapshot(self.path(group_id))
+
+    def stats(self) -> dict:
+        """
+        Возвращает сведения об открытых снимках.
+
+        ### Возвращает:
+        - dict: Для каждой группы количество участников, объем в байтах и
+          возраст снимка в секундах.
+        """
+
+        with self.__lock:
+            snapshots = dict(self.__opened)
+        return {
+            group_id: {
+                "members": len(snapshot),
+                "bytes": snapshot.nbytes,
+                "age": round(snapshot.age(), 1),
+            }
+            for group_id, snapshot in snapshots.items()
+        }
+
+
+_shared_store: SnapshotStore | None = None
+_shared_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """Возвращает общий для процесса каталог снимков."""
+
+    global _shared_store
+    if _shared_store is None:
+        with _shared_store_lock:
+            if _shared_store is None:
+                _shared_store = SnapshotStore()
+    return _shared_store
@@ -0,0 +1,303 @@
+"""
+Способы поиска кандидатов в мэтчи.
+
+Способ поиска определяет, откуда берутся кандидаты, и отдает их потоком
+страниц (`GroupMemberStream`). Отбор подходящих кандидатов, остановка
+поиска и сообщения о ходе поиска остаются в `SearchHandler` и одинаковы
+для всех способов.
+
+- `groups` (`GroupScanEngine`): обход участников крупнейшей группы
+  города и фильтрация на стороне бота. В режиме `execute` страницы
+  читаются и фильтруются программой VKScript, и VK возвращает только
+  подходящих участников нескольких страниц за один запрос. Поиск
+  идет по `SEARCH_GROUPS_COUNT` крупнейшим группам города, по
+  несколько групп одновременно (`SEARCH_GROUPS_CONCURRENCY`), а
+  участник нескольких групп учитывается один раз. Группа, для
+  которой есть действующий снимок (`handlers.member_snapshot`),
+  читается из него без запросов к VK. Поиск продолжается со смещений
+  групп, на которых остановился предыдущий поиск пользователя
+  (курсоры поиска, `stream.cursors`).
+- `users_search` (`UsersSearchEngine`): метод `users.search`, который
+  сам отбирает пользователей по городу, полу, возрасту и семейному
+  положению. VK отдает не больше 1000 результатов на запрос.
+
+Способ поиска выбирается пользователем (поле `search_engine` настроек
+поиска). Если он не выбран, используется способ из переменной окружения
+`SEARCH_ENGINE` (по умолчанию `groups`). Режим обхода группы задается
+переменной `SEARCH_GROUP_SCAN_MODE`: `pages` (по умолчанию) или
+`execute`.
+
+### Пример использования:
+```python
+engine = get_search_engine(search_settings.search_engine)
+with engine.open_stream(vk_service, search_settings) as stream:
+    for page in stream.pages():
+        ...
+```
+"""
+
+import os
+from typing import TYPE_CHECKING
+
+from db.models.models import UserSearchSettings
+from handlers.member_snapshot import (
+    AsyncSnapshotMemberStream, SnapshotMemberStream, SnapshotStore,
+    get_snapshot_store
+)
+from services.vk_api.member_stream import (
+    DEFAULT_GROUP_CONCURRENCY, AsyncGroupMemberStream,
+    AsyncMultiGroupMemberStream, GroupMemberStream, MultiGroupMemberStream
+)
+from services.vk_api.vk_api_service import VKAPIError, VKApiService
+
+if TYPE_CHECKING:
+    # Асинхронный сервис требует aiohttp, который не нужен синхронному боту
+    from services.vk_api.async_vk_api_service import AsyncVKApiService
+
+DEFAULT_SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "groups")
+GROUP_SCAN_MODE = os.getenv("SEARCH_GROUP_SCAN_MODE", "pages")
+GROUPS_COUNT = int(os.getenv("SEARCH_GROUPS_COUNT", "3"))
+
+
+class SearchEngine:
+    """
+    Базовый класс способа поиска.
+
+    ### Атрибуты:
+    - name (str): Название способа в настройках пользователя.
+    - title (str): Название для сообщений пользователю.
+
+    ### Методы:
+    - `open_stream()`: Открывает поток кандидатов.
+    - `open_stream_async()`: Асинхронная версия `open_stream()`.
+    - `get_cursors()`: Курсоры поиска по прочитанному потоку.
+    """
+
+    name = ""
+    title = ""
+
+    def open_stream(
+        self,
+        vk_service: VKApiService,
+        search_settings: UserSearchSettings,
+        cursors: dict[int, int] | None = None
+    ) -> GroupMemberStream:
+        """
+        Открывает поток кандидатов для настроек поиска.
+
+        ### Аргументы:
+        - vk_service (VKApiService): Сервис VK API.
+        - search_settings (UserSearchSettings): Настройки поиска.
+        - cursors (dict[int, int], optional): Смещения, с которых
+          продолжается чтение, по ID источников (групп). Способ поиска
+          без курсоров их не учитывает.
+
+        ### Исключения:
+        - VKAPIError: Если искать негде (например, у города нет группы).
+        """
+        raise NotImplementedError
+
+    async def open_stream_async(
+        self,
+        vk_service: "AsyncVKApiService",
+        search_settings: UserSearchSettings,
+        cursors: dict[int, int] | None = None
+    ) -> AsyncGroupMemberStream:
+        """Асинхронная версия `open_stream()`."""
+        raise NotImplementedError
+
+    def get_cursors(self, stream) -> dict[int, int]:
+        """
+        Смещения первых непрочитанных кандидатов потока по ID источников.
+
+        Пустой словарь — способ поиска не продолжает чтение с места
+        остановки.
+        """
+        return {}
+
+
+class GroupScanEngine(SearchEngine):
+    """
+    Обход участников крупнейших групп города.
+
+    ### Аргументы:
+    - mode (str): `pages` — участники загружаются целыми страницами,
+      `execute` — фильтруются на стороне VK
+      (`VKApiService.iter_group_members_filtered`).
+    - groups_count (int): Количество групп.
+    - concurrency (int): Количество одновременно читаемых групп.
+    - snapshot_store (SnapshotStore, optional): Каталог снимков групп.
+      По умолчанию общий для процесса.
+    """
+
+    name = "groups"
+    title = "участники групп города"
+
+    def __init__(
+        self,
+        mode: str = GROUP_SCAN_MODE,
+        groups_count: int = GROUPS_COUNT,
+        concurrency: int = DEFAULT_GROUP_CONCURRENCY,
+        snapshot_store: SnapshotStore | None = None
+    ) -> None:
+        if mode not in ("pages", "execute"):
+            raise ValueError(f"Неизвестный режим обхода группы: {mode}.")
+        if groups_count < 1:
+            raise ValueError("Количество групп должно быть больше 0.")
+
+        self.mode = mode
+        self.groups_count = groups_count
+        self.concurrency = concurrency
+        self.snapshot_store = snapshot_store or get_snapshot_store()
+
+    def open_stream(
+        self,
+        vk_service: VKApiService,
+        search_settings: UserSearchSettings,
+        cursors: dict[int, int] | None = None
+    ) -> MultiGroupMemberStream:
+        group_info = vk_service.get_group_info(
+            search_settings.city_id, search_settings.city_title,
+            self.groups_count
+        )
+        streams = self.__open_groups(
+            vk_service, group_info, search_settings, cursors or {},
+            SnapshotMemberStream
+        )
+        return MultiGroupMemberStream(streams, self.concurrency)
+
+    async def open_stream_async(
+        self,
+        vk_service: "AsyncVKApiService",
+        search_settings: UserSearchSettings,
+        cursors: dict[int, int] | None = None
+    ) -> AsyncMultiGroupMemberStream:
+        group_info = await vk_service.get_group_info(
+            search_settings.city_id, search_settings.city_title,
+            self.groups_count
+        )
+        streams = self.__open_groups(
+            vk_service, group_info, search_settings, cursors or {},
+            AsyncSnapshotMemberStream
+        )
+        return AsyncMultiGroupMemberStream(streams, self.concurrency)
+
+    def get_cursors(
+        self, stream: MultiGroupMemberStream | AsyncMultiGroupMemberStream
+    ) -> dict[int, int]:
+        return stream.cursors
+
+    def __open_groups(
+        self,
+        vk_service: VKApiService,
+        group_info: list[dict],
+        search_settings: UserSearchSettings,
+        cursors: dict[int, int],
+        snapshot_stream_class: type
+    ) -> dict[int, GroupMemberStream | AsyncGroupMemberStream]:
+        """
+        Открывает потоки участников найденных групп в выбранном режиме.
+
+        Чтение группы начинается со смещения из `cursors`. Группа с
+        действующим снимком читается из снимка потоком
+        `snapshot_stream_class`.
+
+        ### Исключения:
+        - VKAPIError: Если у города не найдено ни одной группы.
+        """
+
+        if not group_info:
+            raise VKAPIError(
+                f"Не найдена группа города {search_settings.city_title}."
+            )
+
+        streams = {}
+        for group in group_info[:self.groups_count]:
+            group_id = group.get("id")
+            offset = cursors.get(group_id, 0)
+            snapshot = self.snapshot_store.open(group_id)
+            if snapshot is not None:
+                streams[group_id] = snapshot_stream_class(snapshot, offset)
+            elif self.mode == "execute":
+                streams[group_id] = vk_service.iter_group_members_filtered(
+                    group_id, search_settings.sex, search_settings.city_id,
+                    offset
+                )
+            else:
+                streams[group_id] = vk_service.iter_group_members(
+                    group_id, offset
+                )
+        return streams
+
+
+class UsersSearchEngine(SearchEngine):
+    """
+    Поиск пользователей методом `users.search`.
+
+    Порядок результатов `users.search` определяет VK, и он меняется между
+    запросами, поэтому курсоры поиска не используются.
+    """
+
+    name = "users_search"
+    title = "поиск ВКонтакте"
+
+    def open_stream(
+        self,
+        vk_service: VKApiService,
+        search_settings: UserSearchSettings,
+        cursors: dict[int, int] | None = None
+    ) -> GroupMemberStream:
+        return vk_service.iter_users_search(
+            self.build_criteria(search_settings)
+        )
+
+    async def open_stream_async(
+        self,
+        vk_service: "AsyncVKApiService",
+        search_settings: UserSearchSettings,
+        cursors: dict[int, int] | None = None
+    ) -> AsyncGroupMemberStream:
+        return vk_service.iter_users_search(
+            self.build_criteria(search_settings)
+        )
+
+    @staticmethod
+    def build_criteria(search_settings: UserSearchSettings) -> dict:
+        """
+        Переводит настройки поиска в параметры `users.search`.
+
+        Семейное положение 0 ("не указано") означает, что фильтровать по
+        нему не нужно.
+        """
+
+        criteria = {
+            "city": search_settings.city_id,
+            "sex": search_settings.sex,
+            "age_from": search_settings.age_min,
+            "age_to": search_settings.age_max,
+        }
+        if search_settings.relation:
+            criteria["status"] = search_settings.relation
+        return criteria
+
+
+SEARCH_ENGINES: dict[str, SearchEngine] = {
+    engine.name: engine for engine in (GroupScanEngine(), UsersSearchEngine())
+}
+
+
+def get_search_engine(name: str | None = None) -> SearchEngine:
+    """
+    Возвращает способ поиска по названию.
+
+    Неизвестное название или None означают способ по умолчанию.
+    """
+    return SEARCH_ENGINES.get(name) or SEARCH_ENGINES[DEFAULT_SEARCH_ENGINE]
+
+
+def get_next_search_engine(name: str | None = None) -> SearchEngine:
+    """Возвращает способ поиска, следующий за `name` по кругу."""
+
+    names = list(SEARCH_ENGINES)
+    current = get_search_engine(name).name
+    return SEARCH_ENGINES[names[(names.index(current) + 1) % len(names)]]
@@ -2,17 +2,36 @@
 
 import copy
 import json
+from typing import Container
+
+import numpy as np
 
 from config.bot_config import KEYBOARD_CONFIG, MESSAGES_CONFIG
 from db.managers.matches_manager import DatabaseMatchesManager
+from db.managers.search_cursor_manager import DatabaseSearchCursorManager
+from db.managers.seen_filter_manager import DatabaseSeenFilterManager
 from db.managers.user_manager import DatabaseUserManager
 from db.models.models import UserSearchSettings
+from db.session import unit_of_work
+from handlers.candidate_index import get_candidate_index
+from handlers.member_filter import (
+    birth_date_bounds, is_age_filter_set, match_mask, parse_birth_date
+)
+from handlers.member_snapshot import SnapshotPage
+from handlers.search_engines import get_next_search_engine, get_search_engine
+from services.dispatch.search_scheduler import SearchJob, SearchScheduler
 from services.formatters.module_formatters import get_module_part
 from services.vk_api.msg_service import MessageService
-from services.vk_api.vk_api_service import VKApiService
+from services.vk_api.vk_api_service import VKAPIError, VKApiService
+from utils.collections import BloomFilter
 from utils.logging.setup import setup_logger
 
 vk_service = VKApiService()
+search_scheduler = SearchScheduler()
+candidate_index = get_candidate_index()
+
+# Поиск останавливается, когда найдено столько мэтчей
+MATCHES_TARGET = 25
 
 logger = setup_logger(
     module_name=get_module_part(__name__, idx=0), logger_name=__name__
@@ -25,7 +44,29 @@ class SearchHandler:
     __msg_service = MessageService()
 
     def start_searching(self, user_id: int) -> None:
-        """Обработка команды поиска."""
+        """
+        Обработка команды поиска.
+
+        Поиск ставится в очередь планировщика `search_scheduler` и
+        выполняется в фоне. Повторная команда во время поиска не запускает
+        второй поиск.
+        """
+        search_scheduler.submit(user_id, self.run_search, user_id)
+
+    def run_search(self, job: SearchJob, user_id: int) -> None:
+        """
+        Выполняет поиск мэтчей и показывает результаты.
+
+        Вызывается планировщиком поиска. Между этапами поиска проверяется
+        отмена задачи, поэтому устаревший поиск не сохраняет результаты.
+        Чтение групп продолжается с курсоров предыдущего поиска, а после
+        сохранения мэтчей курсоры сдвигаются на прочитанные страницы.
+
+        С базой данных поиск работает короткими единицами работы
+        (`db.session.unit_of_work()`): чтение настроек, фильтра и курсоров
+        до обхода групп и сохранение мэтчей и курсоров после него.
+        Соединение с базой данных не занято, пока поиск ждет VK API.
+        """
 
         self.__msg_service.send_message(
             user_id,
@@ -34,16 +75,23 @@ class SearchHandler:
             )
         )
 
-        db_user_manager = DatabaseUserManager()
-        search_settings = db_user_manager.get_user_search_settings(user_id)
+        cursor_manager = DatabaseSearchCursorManager()
+        with unit_of_work():
+            search_settings = DatabaseUserManager().get_user_search_settings(
+                user_id
+            )
+            seen = DatabaseSeenFilterManager().get_seen_filter(user_id)
+            cursors = cursor_manager.get_cursors(user_id, search_settings)
 
-        group_info = self.search_group_handler(search_settings)
-        group_members = self.search_user_group_handler(group_info)
         matches = self.search_result_handler(
-            group_members, search_settings, group_info
+            search_settings, job, seen, cursors
         )
 
+        job.raise_if_cancelled()
+        # Мэтчи сохраняются своими единицами работы: между проверкой
+        # сохраненных мэтчей и вставкой запрашиваются фотографии
         self.load_matches_to_db(user_id, matches)
+        cursor_manager.save_cursors(user_id, search_settings, cursors)
 
         self.__msg_service.send_message(
             user_id,
@@ -51,64 +99,150 @@ class SearchHandler:
                 "end_searching_matches", MESSAGES_CONFIG.get("error")
             )
         )
-
-    def search_group_handler(self, search_settings: UserSearchSettings) \
-        -> list[dict]:
-        """Обработка команды поиска групп."""
-        return vk_service.get_group_info(
-            search_settings.city_id, search_settings.city_title
-        )
-
-    def search_user_group_handler(self, group_info: list[dict], offset: int = 0) \
-        -> list[dict]:
-        """Обработка команды поиска групп пользователя."""
-        return vk_service.get_group_members(group_info[0].get("id"), offset)
+        self.show_matches(user_id)
 
     def search_result_handler(
         self,
-        group_members: list[dict],
         search_settings: UserSearchSettings,
-        group_info: list[dict]
+        job: SearchJob | None = None,
+        exclude_ids: Container[int] = frozenset(),
+        cursors: dict[int, int] | None = None
     ) -> list[dict]:
-        """Обработка команды поиска результата."""
+        """
+        Находит кандидатов, подходящих под настройки поиска.
+
+        Сначала кандидаты ищутся в индексе уже прочитанных участников
+        (`handlers.candidate_index`). Если их меньше `MATCHES_TARGET`,
+        кандидаты читаются потоком выбранного пользователем способа поиска
+        (см. `handlers.search_engines`): следующие страницы загружаются,
+        пока фильтруется текущая, а загрузка останавливается, как только
+        найдено `MATCHES_TARGET` мэтчей. Прочитанные страницы пополняют
+        индекс. Если передана задача поиска, перед каждой страницей
+        проверяется ее отмена, а пользователю периодически отправляется
+        прогресс.
+
+        ### Аргументы:
+        - search_settings (UserSearchSettings): Настройки поиска.
+        - job (SearchJob, optional): Задача поиска.
+        - exclude_ids (Container[int]): VK ID, которые не нужно
+          возвращать, например фильтр мэтчей пользователя
+          (`BloomFilter`).
+        - cursors (dict[int, int], optional): Курсоры поиска — смещения
+          групп, с которых продолжается чтение. После чтения словарь
+          обновляется смещениями первых непрочитанных участников.
+
+        ### Исключения:
+        - VKAPIError: Если не удалось получить первую страницу. Ошибка на
+          следующих страницах останавливает поиск с уже найденными
+          мэтчами.
+        """
+
+        matches = self.find_indexed_matches(search_settings, exclude_ids)
+        if len(matches) >= MATCHES_TARGET:
+            logger.info(
+                "Найдено %d мэтчей в индексе кандидатов.", len(matches)
+            )
+            return matches
+        seen_ids = {match["id"] for match in matches}
 
-        logger.info(
-            "Всего было найдено %d пользователей в группе.", len(group_members)
-        )
+        engine = get_search_engine(search_settings.search_engine)
+        logger.info("Поиск мэтчей способом %s.", engine.name)
 
-        filtered_members = self.filter_members(group_members, search_settings)
+        with engine.open_stream(
+            vk_service, search_settings, cursors
+        ) as stream:
+            try:
+                for page in stream.pages():
+                    if job is not None:
+                        job.raise_if_cancelled()
+                        job.progress(MESSAGES_CONFIG.get(
+                            "search_progress", MESSAGES_CONFIG.get("error")
+                        ) % (stream.offset, len(matches)))
+
+                    matches.extend(self.collect_page_matches(
+                        page, search_settings, seen_ids, exclude_ids
+                    ))
+                    if len(matches) >= MATCHES_TARGET:
+                        break
+            except VKAPIError as e:
+                if not stream.offset:
+                    raise
+                # Уже найденные участники сохраняются, но неудавшийся
+                # запрос не считается концом списка участников
+                logger.error(
+                    "Поиск остановлен на смещении %d из-за ошибки VK API: %s",
+                    stream.offset, e
+                )
 
+        if cursors is not None:
+            cursors.update(engine.get_cursors(stream))
         logger.info(
-            "Отфильтровано %d пользователей, удовлетворяющих условиям поиска.",
-            len(filtered_members)
+            "Проверено %d кандидатов, отфильтровано %d, "
+            "удовлетворяющих условиям поиска.",
+            stream.offset, len(matches)
         )
+        return matches
 
-        filtered_members = self.fetch_additional_members(
-            group_info,
-            search_settings,
-            filtered_members,
-            0
+    def find_indexed_matches(
+        self,
+        search_settings: UserSearchSettings,
+        exclude_ids: Container[int] = frozenset()
+    ) -> list[dict]:
+        """Находит до `MATCHES_TARGET` кандидатов в индексе кандидатов."""
+        return candidate_index.query(
+            search_settings, MATCHES_TARGET, exclude_ids
         )
 
-        return filtered_members
+    def collect_page_matches(
+        self,
+        page: list[dict] | SnapshotPage,
+        search_settings: UserSearchSettings,
+        seen_ids: set[int],
+        exclude_ids: Container[int] = frozenset()
+    ) -> list[dict]:
+        """
+        Добавляет страницу в индекс кандидатов и возвращает подходящих
+        участников, которых нет в `seen_ids` и `exclude_ids`.
 
-    def show_matches(self, user_id: int, match_index: int = 0) -> None:
-        """Показывает найденные мэтчи пользователя по одному."""
+        `seen_ids` пополняется возвращенными участниками.
+        """
 
-        matches = self.get_user_matches(user_id)
-        if not matches:
+        candidate_index.add_page(page)
+        matches = [
+            member for member in self.filter_members(
+                page, search_settings, exclude_ids
+            )
+            if member["id"] not in seen_ids
+        ]
+        seen_ids.update(member["id"] for member in matches)
+        return matches
+
+    def show_matches(self, user_id: int, after_id: int = 0) -> None:
+        """
+        Показывает найденные мэтчи пользователя по одному.
+
+        ### Аргументы:
+        - user_id (int): ID пользователя.
+        - after_id (int): `Matches.id` показанного мэтча из кнопки
+          "Следующий". 0 — показ с первого мэтча.
+        """
+
+        match, has_next = self.get_next_match(user_id, after_id)
+        if match is None and after_id:
+            logger.info("Мэтчей после %d нет, показ с начала", after_id)
+            match, has_next = self.get_next_match(user_id)
+            after_id = 0
+        if match is None:
             self.handle_no_matches(user_id)
             return
 
-        match_index = self.validate_match_index(match_index, len(matches))
-        if match_index == 0:
-            self.send_start_message(user_id, len(matches))
-
-        match_msg, attachment = self.format_match_message(matches[match_index])
+        if after_id == 0:
+            self.send_start_message(
+                user_id, DatabaseMatchesManager().count_user_matches(user_id)
+            )
 
-        keyboard = self.get_keyboard_for_match_navigation(
-            match_index, len(matches)
-        )
+        match_msg, attachment = self.format_match_message(match)
+        keyboard = self.get_keyboard_for_match_navigation(match.id, has_next)
 
         self.__msg_service.send_message(
             user_id,
@@ -117,73 +251,129 @@ class SearchHandler:
             attachment=attachment
         )
 
+    def switch_search_engine(self, user_id: int) -> None:
+        """
+        Переключает способ поиска пользователя на следующий.
+
+        Поиск, запущенный с прежним способом, отменяется.
+        """
+
+        db_user_manager = DatabaseUserManager()
+        settings = db_user_manager.get_user_search_settings(user_id)
+        engine = get_next_search_engine(
+            settings.search_engine if settings else None
+        )
+        if db_user_manager.update_user_settings(
+            user_id, {"search_engine": engine.name}
+        ):
+            search_scheduler.cancel(user_id)
+
+        self.__msg_service.send_message(
+            user_id,
+            msg=MESSAGES_CONFIG.get(
+                "search_engine_switched", MESSAGES_CONFIG.get("error")
+            ) % engine.title,
+            btns=KEYBOARD_CONFIG["main_menu"]
+        )
+
     def filter_members(
         self,
-        group_members: list[dict],
-        search_settings: UserSearchSettings
+        group_members: list[dict] | SnapshotPage,
+        search_settings: UserSearchSettings,
+        exclude_ids: Container[int] = frozenset()
     ) -> list[dict]:
-        """Фильтрует участников на основе настроек поиска."""
-        return [
+        """
+        Фильтрует участников на основе настроек поиска.
+
+        Страница снимка группы (`SnapshotPage`) проверяется целиком по
+        столбцам (`handlers.member_filter.match_mask`), а словари
+        создаются только для подошедших участников. Страницы
+        `groups.getMembers` приходят словарями, и для них проверка
+        каждого участника быстрее: перевод словарей в столбцы дороже
+        самой проверки.
+
+        Подошедшие участники из `exclude_ids` отбрасываются до создания
+        словарей и сохранения мэтчей.
+        """
+
+        if isinstance(group_members, SnapshotPage):
+            rows = np.flatnonzero(match_mask(group_members, search_settings))
+            if exclude_ids and rows.size:
+                rows = rows[~self.find_excluded(
+                    group_members.id[rows], exclude_ids
+                )]
+            return group_members.materialize(rows)
+
+        matches = [
             member for member in group_members
             if self.is_member_matching(member, search_settings)
         ]
-
-    def fetch_additional_members(
-        self,
-        group_info: list[dict],
-        search_settings: UserSearchSettings,
-        filtered_members: list[dict],
-        offset: int
-    ) -> list[dict]:
-        """Получает дополнительных участников, если найдено менее 25."""
-        while len(filtered_members) < 25:
-            logger.info(
-                "Найдено менее 25 пользователей, выполняется новый поиск..."
-            )
-            group_members = self.search_user_group_handler(group_info, offset)
-            logger.info(
-                "Всего было найдено %d пользователей в группе.",
-                len(group_members)
+        if exclude_ids and matches:
+            is_excluded = self.find_excluded(
+                [member["id"] for member in matches], exclude_ids
             )
+            matches = [
+                member for member, excluded in zip(matches, is_excluded)
+                if not excluded
+            ]
+        return matches
 
-            filtered_members.extend(self.filter_members(
-                group_members, search_settings
-            ))
+    @staticmethod
+    def find_excluded(
+        member_ids: list[int] | np.ndarray, exclude_ids: Container[int]
+    ) -> np.ndarray:
+        """
+        Булев массив: есть ли ID участника в `exclude_ids`.
+
+        Фильтр Блума проверяет все ID одним вызовом.
+        """
+
+        if isinstance(exclude_ids, BloomFilter):
+            return exclude_ids.contains_many(member_ids)
+        return np.fromiter(
+            (member_id in exclude_ids for member_id in member_ids),
+            bool, len(member_ids)
+        )
 
-            logger.info(
-                "Отфильтровано %d пользователей, удовлетворяющих условиям поиска.",
-                len(filtered_members)
-            )
+    @staticmethod
+    def is_within_age_range(
+        member: dict, search_settings: UserSearchSettings
+    ) -> bool:
+        """
+        Проверка возраста.
 
-            offset += len(group_members)
+        Участник без года рождения проходит, только если диапазон
+        возраста не сужен относительно умолчания.
+        """
 
-            if len(group_members) < 1000:
-                logger.info("Достигнут конец списка участников группы.")
-                break
+        if not is_age_filter_set(search_settings):
+            return True
 
-        return filtered_members
+        lower, upper = birth_date_bounds(
+            search_settings.age_min, search_settings.age_max
+        )
+        return lower < parse_birth_date(member.get("bdate")) <= upper
 
-    @staticmethod
-    def is_member_matching(member: dict, search_settings: UserSearchSettings) \
-        -> bool:
+    @classmethod
+    def is_member_matching(
+        cls, member: dict, search_settings: UserSearchSettings
+    ) -> bool:
         """Проверяет, соответствует ли участник критериям поиска."""
         return (
-            member.get("sex") == search_settings.sex
-            and member.get("city", {}).get("id", 0) == search_settings.city_id
+            (member.get("city") or {}).get("id", 0) == search_settings.city_id
             and member.get("can_write_private_message", 0) == 1
+            and search_settings.sex in (0, member.get("sex"))
+            and search_settings.relation in (0, member.get("relation"))
+            and cls.is_within_age_range(member, search_settings)
         )
 
     def load_matches_to_db(self, user_id: int, matches: list[dict]) -> None:
         """Загрузка найденных мэтчей в базу данных."""
         DatabaseMatchesManager().save_user_match(user_id, matches)
 
-    def is_within_age_range(self, member, search_settings) -> bool:
-        """Проверка возраста."""
-
-    def get_user_matches(self, user_id: int) -> list:
-        """Получает мэтчи пользователя из базы данных."""
-        matches_manager = DatabaseMatchesManager()
-        return matches_manager.get_user_matches(user_id)
+    def get_next_match(self, user_id: int, after_id: int = 0) -> tuple:
+        """Получает из базы данных мэтч пользователя после `after_id`."""
+        return DatabaseMatchesManager().get_next_match(user_id, after_id)
 
     def handle_no_matches(self, user_id: int) -> None:
         """Обрабатывает случай, когда нет найденных мэтчей."""
@@ -195,16 +385,6 @@ class SearchHandler:
             btns=KEYBOARD_CONFIG["main_menu"]
         )
 
-    def validate_match_index(self, match_index: int, total_matches: int) -> int:
-        """Проверяет валидность индекса мэтча."""
-        if match_index >= total_matches:
-            logger.info(
-                "Индекс %d превышает количество мэтчей, сброс на начало",
-                match_index
-            )
-            return 0
-        return match_index
-
     def send_start_message(self, user_id: int, total_matches: int) -> None:
         """Отправляет сообщение о начале показа мэтчей."""
         self.__msg_service.send_message(
@@ -234,25 +414,23 @@ class SearchHandler:
         return match_msg, attachment
 
     def get_keyboard_for_match_navigation(
-        self, match_index: int, total_matches: int
+        self, match_id: int, has_next: bool
         ) -> dict:
-        """Определяет, какую клавиатуру показывать."""
+        """
+        Определяет, какую клавиатуру показывать.
 
-        keyboard_name = (
-            "match_navigation"
-            if match_index < total_matches - 1
-            else "main_menu"
-        )
+        Кнопка "Следующий" передает `Matches.id` показанного мэтча.
+        """
+
+        keyboard_name = "match_navigation" if has_next else "main_menu"
         logger.info(
-            "Используется клавиатура %s для индекса %d из %d", 
-            keyboard_name, match_index, total_matches
+            "Используется клавиатура %s для мэтча %d", keyboard_name, match_id
         )
 
         keyboard = copy.deepcopy(KEYBOARD_CONFIG[keyboard_name])
         if keyboard_name == "match_navigation":
-            # Форматируем payload для следующего индекса
             keyboard["actions"][0]["payload"] = (
-                keyboard["actions"][0]["payload"] % match_index
+                keyboard["actions"][0]["payload"] % match_id
             )
 
         return keyboard
@@ -265,9 +443,8 @@ class SearchHandler:
             try:
                 payload = json.loads(payload_str)
                 logger.info("Получен payload: %s", payload)
-                current_index = int(payload.get('match_index', 0))
-                next_index = current_index + 1
-                self.show_matches(user_id, next_index)
+                # Кнопки старого формата (`match_index`) начинают с начала
+                self.show_matches(user_id, int(payload.get("after_id", 0)))
             except (json.JSONDecodeError, ValueError) as e:
                 logger.error("Ошибка при обработке payload: %s", str(e))
                 self.__msg_service.send_message(
@@ -4,12 +4,18 @@ import re
 
 from config.bot_config import COMMANDS_CONFIG, KEYBOARD_CONFIG, MESSAGES_CONFIG
 from db.managers.user_manager import DatabaseUserManager
+from handlers.search_handler import search_scheduler
 from services.vk_api.msg_service import MessageService
 from services.vk_api.vk_api_service import VKApiService
 
 vk_service = VKApiService()
 db_user_manager = DatabaseUserManager()
 
+SEX_MAPPING = {"любой": 0, "женский": 1, "мужской": 2}
+
+# Команды, которые обрабатываются даже во время настройки поиска
+SETTINGS_BYPASS_COMMANDS = frozenset({"start", "configure_search_settings"})
+
 
 class SearchSettingsHandler:
     """Обработчик настройки поиска."""
@@ -47,6 +53,35 @@ class SearchSettingsHandler:
         elif current_step == "relation":
             self.__handle_relation_setting(user_id, request)
 
+    @staticmethod
+    def parse_age_setting(request: str) -> tuple[dict, str | None]:
+        """
+        Разбирает ответ пользователя на шаге настройки возраста.
+
+        ### Возвращает:
+        - tuple: Пара из словаря настроек и ключа сообщения об ошибке из
+          `MESSAGES_CONFIG`. Если ответ корректен, ключ ошибки равен None.
+        """
+
+        if request == "пропустить":
+            return {"age_min": 18, "age_max": 99}, None
+
+        # Проверка формата возраста (например, "18-25")
+        age_match = re.match(r'^(\d+)-(\d+)$', request)
+        if not age_match:
+            return {}, "configure_age_format_error"
+
+        age_min, age_max = map(int, age_match.groups())
+        if not 18 <= age_min <= age_max <= 99:
+            return {}, "configure_age_out_of_range_error"
+
+        return {"age_min": age_min, "age_max": age_max}, None
+
+    @staticmethod
+    def is_valid_relation(request: str) -> bool:
+        """Проверяет ответ пользователя на шаге выбора семейного положения."""
+        return request is not None and bool(re.match(r"^[0-8]$", request))
+
     def __start_search_settings(self, user_id: int) -> None:
         """Начинает процесс настройки поиска."""
         self.__user_states[user_id] = {"step": "age"}
@@ -61,40 +96,19 @@ class SearchSettingsHandler:
     def __handle_age_setting(self, user_id: int, request: str) -> None:
         """Обработка настройки возраста."""
 
-        settings_data = {}
-
-        if request == "пропустить":
-            settings_data = {"age_min": 18, "age_max": 99}
-        else:
-            # Проверка формата возраста (например, "18-25")
-            age_match = re.match(r'^(\d+)-(\d+)$', request)
-            if not age_match:
-                self.__msg_service.send_message(
-                    user_id,
-                    msg=MESSAGES_CONFIG.get(
-                        "configure_age_format_error",
-                        MESSAGES_CONFIG.get("error")
-                    ),
-                    btns=KEYBOARD_CONFIG.get("configure_age", None),
-                )
-                return
-
-            age_min, age_max = map(int, age_match.groups())
-            if not 18 <= age_min <= age_max <= 99:
-                self.__msg_service.send_message(
-                    user_id,
-                    msg=MESSAGES_CONFIG.get(
-                        "configure_age_out_of_range_error",
-                        MESSAGES_CONFIG.get("error")
-                    ),
-                    btns=KEYBOARD_CONFIG.get("configure_age", None),
-                )
-                return
-
-            settings_data = {"age_min": age_min, "age_max": age_max}
+        settings_data, error_key = self.parse_age_setting(request)
+        if error_key:
+            self.__msg_service.send_message(
+                user_id,
+                msg=MESSAGES_CONFIG.get(
+                    error_key, MESSAGES_CONFIG.get("error")
+                ),
+                btns=KEYBOARD_CONFIG.get("configure_age", None),
+            )
+            return
 
         # Сохраняем настройки возраста
-        db_user_manager.update_user_settings(user_id, settings_data)
+        self.__update_settings(user_id, settings_data)
 
         # Переходим к настройке пола
         self.__user_states[user_id]["step"] = "sex"
@@ -109,9 +123,7 @@ class SearchSettingsHandler:
     def __handle_sex_setting(self, user_id: int, request: str) -> None:
         """Обработка настройки пола."""
 
-        sex_mapping = {"любой": 0, "женский": 1, "мужской": 2}
-
-        sex = sex_mapping.get(request)
+        sex = SEX_MAPPING.get(request)
         if sex is None:
             self.__msg_service.send_message(
                 user_id,
@@ -123,7 +135,7 @@ class SearchSettingsHandler:
             return
 
         # Сохраняем настройку пола
-        db_user_manager.update_user_settings(user_id, {"sex": sex})
+        self.__update_settings(user_id, {"sex": sex})
 
         # Переходим к настройке города
         self.__user_states[user_id]["step"] = "city"
@@ -156,7 +168,7 @@ class SearchSettingsHandler:
             "city_id": city_info.get("id"),
             "city_title": city_info.get("title")
         }
-        db_user_manager.update_user_settings(user_id, settings_data)
+        self.__update_settings(user_id, settings_data)
 
         # Переходим к настройке семейного положения
         self.__user_states[user_id]["step"] = "relation"
@@ -171,7 +183,7 @@ class SearchSettingsHandler:
     def __handle_relation_setting(self, user_id: int, request: str) -> None:
         """Обработка настройки семейного положения."""
 
-        if not re.match(r"^[0-8]$", request) or request is None:
+        if not self.is_valid_relation(request):
             self.__msg_service.send_message(
                 user_id,
                 msg=MESSAGES_CONFIG.get(
@@ -182,7 +194,7 @@ class SearchSettingsHandler:
             return
 
         # Сохраняем настройку семейного положения
-        db_user_manager.update_user_settings(user_id, {"relation": int(request)})
+        self.__update_settings(user_id, {"relation": int(request)})
 
         # Завершаем настройку
         del self.__user_states[user_id]  # Очищаем состояние пользователя
@@ -194,3 +206,10 @@ class SearchSettingsHandler:
             ),
             btns=KEYBOARD_CONFIG.get("main_menu", None),
         )
+
+    @staticmethod
+    def __update_settings(user_id: int, settings_data: dict) -> None:
+        """Сохраняет настройки и отменяет поиск, если они изменились."""
+        if db_user_manager.update_user_settings(user_id, settings_data):
+            # Результаты поиска по старым настройкам больше не нужны
+            search_scheduler.cancel(user_id)
@@ -0,0 +1,295 @@
+"""
+Фоновое обновление снимков групп популярных городов.
+
+Первый поиск в городе без снимка читает группы через VK API, пока
+пользователь ждет результат. Обходчик заранее поддерживает снимки
+(`handlers.member_snapshot`) групп городов, в которых ищет больше всего
+пользователей (распределение `city_id` в настройках поиска), поэтому
+поиск по команде читает группы из снимков и индекса кандидатов.
+
+Проход обходчика повторяется каждые `interval` секунд:
+
+- выбираются `cities` самых популярных городов и их группы — те же, что
+  найдет `GroupScanEngine`;
+- снимок каждой группы дополняется новыми участниками
+  (`SnapshotStore.refresh()`), а раз в `full_interval` секунд группа
+  читается целиком;
+- участники обновленного снимка добавляются в индекс кандидатов.
+
+Запросы обходчика идут через общий ограничитель частоты от имени
+отдельного пользователя `CRAWLER_USER_ID`, поэтому в очереди
+ограничителя он получает не больше одной доли наравне с каждым
+ищущим пользователем. Кроме того, за проход читается не больше
+`max_pages` страниц: когда лимит исчерпан, следующие группы ждут
+следующего прохода.
+
+### Переменные окружения:
+- `SNAPSHOT_CRAWLER_INTERVAL`: Интервал между проходами в секундах.
+  0 отключает обходчик. Должен быть меньше `MEMBER_SNAPSHOT_TTL`, иначе
+  снимки успевают устареть.
+- `SNAPSHOT_CRAWLER_CITIES`: Количество городов.
+- `SNAPSHOT_CRAWLER_FULL_INTERVAL`: Наибольший интервал между полными
+  чтениями группы в секундах.
+- `SNAPSHOT_CRAWLER_MAX_PAGES`: Наибольшее количество страниц
+  участников за проход.
+
+### Пример использования:
+```python
+snapshot_crawler.start()
+...
+print(snapshot_crawler.stats())
+snapshot_crawler.shutdown()
+```
+"""
+
+import os
+import threading
+import time
+
+from db.managers.user_manager import DatabaseUserManager
+from db.session import unit_of_work
+from handlers.candidate_index import CandidateIndex, get_candidate_index
+from handlers.member_snapshot import (
+    MemberSnapshot, SnapshotStore, get_snapshot_store
+)
+from handlers.search_engines import GROUPS_COUNT
+from services.formatters.module_formatters import get_module_part
+from services.vk_api.member_stream import MEMBERS_PAGE_SIZE
+from services.vk_api.rate_limiter import user_context
+from services.vk_api.vk_api_service import VKAPIError, VKApiService
+from utils.logging.setup import setup_logger
+
+CRAWLER_INTERVAL = float(os.getenv("SNAPSHOT_CRAWLER_INTERVAL", "3600"))
+CRAWLER_CITIES = int(os.getenv("SNAPSHOT_CRAWLER_CITIES", "5"))
+CRAWLER_FULL_INTERVAL = float(
+    os.getenv("SNAPSHOT_CRAWLER_FULL_INTERVAL", "604800")
+)
+CRAWLER_MAX_PAGES = int(os.getenv("SNAPSHOT_CRAWLER_MAX_PAGES", "3000"))
+
+# Пользователь, от имени которого обходчик ждет в очереди ограничителя.
+# ID страниц VK начинаются с 1, поэтому 0 не совпадает ни с кем.
+CRAWLER_USER_ID = 0
+
+
+class SnapshotCrawler:
+    """
+    Фоновый поток, обновляющий снимки групп популярных городов.
+
+    ### Аргументы:
+    - vk_service (VKApiService, optional): Сервис VK API.
+    - store (SnapshotStore, optional): Каталог снимков. По умолчанию
+      общий для процесса.
+    - index (CandidateIndex, optional): Индекс кандидатов. По умолчанию
+      общий для процесса.
+    - interval (float): Интервал между проходами в секундах.
+    - cities (int): Количество городов.
+    - groups_count (int): Количество групп города.
+    - full_interval (float): Наибольший интервал между полными чтениями
+      группы в секундах.
+    - max_pages (int): Наибольшее количество страниц за проход.
+
+    ### Методы:
+    - `start()`: Запускает фоновый поток.
+    - `run_once()`: Выполняет один проход в текущем потоке.
+    - `stats()`: Возвращает статистику обходчика.
+    - `shutdown()`: Останавливает фоновый поток.
+    """
+
+    def __init__(
+        self,
+        vk_service: VKApiService | None = None,
+        store: SnapshotStore | None = None,
+        index: CandidateIndex | None = None,
+        interval: float = CRAWLER_INTERVAL,
+        cities: int = CRAWLER_CITIES,
+        groups_count: int = GROUPS_COUNT,
+        full_interval: float = CRAWLER_FULL_INTERVAL,
+        max_pages: int = CRAWLER_MAX_PAGES
+    ) -> None:
+        self.vk_service = vk_service or VKApiService()
+        self.store = store or get_snapshot_store()
+        self.index = get_candidate_index() if index is None else index
+        self.interval = interval
+        self.cities = cities
+        self.groups_count = groups_count
+        self.full_interval = full_interval
+        self.max_pages = max_pages
+
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+        self.__stop = threading.Event()
+        self.__thread: threading.Thread | None = None
+        self.__lock = threading.Lock()
+        self.__counters = dict.fromkeys(
+            ("passes", "refreshed", "crawled", "deferred", "failed", "pages"),
+            0
+        )
+        self.__last_pass: dict = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Обходчик включен."""
+        return self.interval > 0 and self.cities > 0
+
+    def start(self) -> None:
+        """Запускает фоновый поток. Первый проход начинается сразу."""
+
+        if not self.enabled or self.__thread is not None:
+            return
+
+        self.__stop.clear()
+        self.__thread = threading.Thread(
+            target=self.__loop, name="snapshot-crawler", daemon=True
+        )
+        self.__thread.start()
+        self.logger.info(
+            "Обходчик снимков запущен: %d городов каждые %.0f с.",
+            self.cities, self.interval
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Останавливает фоновый поток.
+
+        Поток завершается после группы, которую читает сейчас.
+
+        ### Аргументы:
+        - wait (bool): Дождаться завершения потока.
+        """
+
+        thread = self.__thread
+        if thread is None:
+            return
+
+        self.__stop.set()
+        if wait:
+            thread.join()
+        self.__thread = None
+
+    def run_once(self) -> dict:
+        """
+        Выполняет один проход обходчика.
+
+        ### Возвращает:
+        - dict: Итоги прохода: города, обновленные и отложенные группы,
+          прочитанные страницы и длительность в секундах.
+        """
+
+        started = time.monotonic()
+        with unit_of_work():
+            cities = DatabaseUserManager().get_popular_cities(self.cities)
+        result = dict.fromkeys(
+            ("refreshed", "crawled", "deferred", "failed", "pages"), 0
+        )
+        result["cities"] = [city_id for city_id, _, _ in cities]
+
+        with user_context(CRAWLER_USER_ID):
+            for city_id, city_title, _ in cities:
+                if self.__stop.is_set():
+                    break
+                try:
+                    groups = self.vk_service.get_group_info(
+                        city_id, city_title, self.groups_count
+                    )
+                except VKAPIError as e:
+                    self.logger.warning(
+                        "Не удалось найти группы города %s: %s", city_id, e
+                    )
+                    result["failed"] += 1
+                    continue
+
+                for group in groups[:self.groups_count]:
+                    if self.__stop.is_set():
+                        break
+                    if result["pages"] >= self.max_pages:
+                        result["deferred"] += 1
+                        continue
+                    self.__refresh_group(group["id"], result)
+
+        result["duration"] = round(time.monotonic() - started, 3)
+        with self.__lock:
+            self.__counters["passes"] += 1
+            for key in ("refreshed", "crawled", "deferred", "failed", "pages"):
+                self.__counters[key] += result[key]
+            self.__last_pass = result
+
+        self.logger.info(
+            "Проход обходчика снимков: городов %d, дополнено %d, прочитано "
+            "целиком %d, отложено %d, ошибок %d, страниц %d за %.1f с.",
+            len(cities), result["refreshed"], result["crawled"],
+            result["deferred"], result["failed"], result["pages"],
+            result["duration"]
+        )
+        return result
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику обходчика.
+
+        ### Возвращает:
+        - dict: Счетчики всех проходов (`passes`, `refreshed`, `crawled`,
+          `deferred`, `failed`, `pages`) и итоги последнего прохода
+          (`last_pass`).
+        """
+
+        with self.__lock:
+            return {
+                "enabled": self.enabled,
+                **self.__counters,
+                "last_pass": dict(self.__last_pass),
+            }
+
+    def __loop(self) -> None:
+        """Повторяет проходы, пока обходчик не остановлен."""
+
+        while not self.__stop.is_set():
+            try:
+                self.run_once()
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Ошибка прохода обходчика снимков.")
+            self.__stop.wait(self.interval)
+
+    def __refresh_group(self, group_id: int, result: dict) -> None:
+        """Обновляет снимок группы и добавляет его в индекс кандидатов."""
+
+        try:
+            old_count, old_crawled_at = self.__snapshot_state(
+                self.store.path(group_id)
+            )
+            snapshot = self.store.refresh(
+                self.vk_service, group_id, self.full_interval
+            )
+        except VKAPIError as e:
+            self.logger.warning(
+                "Не удалось обновить снимок группы %s: %s", group_id, e
+            )
+            result["failed"] += 1
+            return
+
+        if snapshot.crawled_at != old_crawled_at:
+            result["crawled"] += 1
+            read = len(snapshot)
+        else:
+            result["refreshed"] += 1
+            read = len(snapshot) - max(0, old_count - MEMBERS_PAGE_SIZE)
+        result["pages"] += read // MEMBERS_PAGE_SIZE + 1
+
+        # Страницами, чтобы поиски не ждали индекс все время добавления
+        for start in range(0, len(snapshot), MEMBERS_PAGE_SIZE):
+            self.index.add_page(
+                snapshot.page(start, start + MEMBERS_PAGE_SIZE)
+            )
+
+    @staticmethod
+    def __snapshot_state(path: str) -> tuple[int, float | None]:
+        """Количество участников и время полного чтения снимка на диске."""
+        try:
+            snapshot = MemberSnapshot(path)
+        except (OSError, ValueError, KeyError):
+            return 0, None
+        return len(snapshot), snapshot.crawled_at
+
+
+snapshot_crawler = SnapshotCrawler()
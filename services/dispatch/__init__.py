@@ -0,0 +1,14 @@
+"""
+Пакет для диспетчеризации событий бота по рабочим потокам.
+
+Асинхронные диспетчер и планировщик требуют `aiohttp` и импортируются
+из своих модулей (`async_event_dispatcher`, `async_search_scheduler`).
+"""
+
+from .event_dispatcher import EventDispatcher
+from .search_scheduler import SearchScheduler
+
+__all__ = [
+    "EventDispatcher",
+    "SearchScheduler",
+]
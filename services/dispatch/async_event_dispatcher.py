@@ -0,0 +1,189 @@
+"""
+Асинхронный диспетчер событий бота.
+
+Асинхронный аналог `EventDispatcher`: задачи одного пользователя
+выполняются строго по очереди, задачи разных пользователей — конкурентно
+в пределах одного цикла событий. Вместо потоков используется
+ограниченное число задач `asyncio`, поэтому тысячи ожидающих ответа VK
+диалогов не требуют отдельного потока на каждый запрос.
+
+### Пример использования:
+```python
+dispatcher = AsyncEventDispatcher(workers=100)
+await dispatcher.start()
+await dispatcher.submit(user_id, handler, request, event)
+await dispatcher.shutdown()
+```
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from services.dispatch.event_dispatcher import (
+    DEFAULT_MAX_QUEUE_SIZE, WorkerStats
+)
+from services.formatters.module_formatters import get_module_part
+from services.vk_api.rate_limiter import user_context
+from utils.logging.setup import setup_logger
+
+DEFAULT_ASYNC_WORKERS = int(os.getenv("BOT_ASYNC_WORKERS", "100"))
+
+
+class AsyncEventDispatcher:
+    """
+    Асинхронный диспетчер событий с упорядочиванием задач по пользователям.
+
+    ### Аргументы:
+    - workers (int): Количество конкурентно выполняемых задач.
+    - max_queue_size (int): Максимальное количество ожидающих задач. При
+      переполнении корутина `submit` ожидает освобождения места.
+
+    ### Методы:
+    - `start()`: Запускает рабочие задачи.
+    - `submit()`: Ставит корутину пользователя в очередь.
+    - `queue_depth()`: Возвращает количество ожидающих задач.
+    - `stats()`: Возвращает статистику диспетчера и рабочих задач.
+    - `shutdown()`: Дожидается выполнения очереди и останавливает задачи.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_ASYNC_WORKERS,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE
+    ) -> None:
+        if workers < 1:
+            raise ValueError("Количество рабочих задач должно быть больше 0.")
+        if max_queue_size < 1:
+            raise ValueError("Размер очереди должен быть больше 0.")
+
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+
+        self.__pending: dict[int, deque] = {}
+        self.__pending_count = 0
+        self.__not_full: asyncio.Condition | None = None
+        self.__ready: asyncio.Queue | None = None
+        self.__tasks: list[asyncio.Task] = []
+        self.__worker_stats: list[WorkerStats] = []
+        self.__submitted = 0
+
+    async def start(self) -> None:
+        """Запускает рабочие задачи в текущем цикле событий."""
+
+        if self.__tasks:
+            return
+
+        self.__not_full = asyncio.Condition()
+        self.__ready = asyncio.Queue()
+
+        for idx in range(self.workers):
+            stats = WorkerStats(f"async-dispatcher-worker-{idx}")
+            self.__worker_stats.append(stats)
+            self.__tasks.append(asyncio.create_task(self.__work(stats)))
+
+        self.logger.info(
+            "Асинхронный диспетчер запущен с %d задачами.", self.workers
+        )
+
+    async def submit(
+        self,
+        user_id: int,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        **kwargs: Any
+    ) -> None:
+        """
+        Ставит корутинную функцию пользователя в очередь на выполнение.
+
+        ### Исключения:
+        - RuntimeError: Если диспетчер не запущен.
+        """
+
+        if not self.__tasks:
+            raise RuntimeError("Диспетчер событий не запущен.")
+
+        async with self.__not_full:
+            await self.__not_full.wait_for(
+                lambda: self.__pending_count < self.max_queue_size
+            )
+
+            user_tasks = self.__pending.get(user_id)
+            is_scheduled = user_tasks is not None
+            if not is_scheduled:
+                user_tasks = self.__pending[user_id] = deque()
+
+            user_tasks.append((func, args, kwargs))
+            self.__pending_count += 1
+            self.__submitted += 1
+
+        if not is_scheduled:
+            self.__ready.put_nowait(user_id)
+
+    def queue_depth(self) -> int:
+        """Возвращает количество задач, ожидающих выполнения."""
+        return self.__pending_count
+
+    def stats(self) -> dict:
+        """Возвращает статистику в формате `EventDispatcher.stats()`."""
+        return {
+            "queue_depth": self.__pending_count,
+            "users_pending": len(self.__pending),
+            "submitted": self.__submitted,
+            "workers": [stats.as_dict() for stats in self.__worker_stats],
+        }
+
+    async def shutdown(self) -> None:
+        """Дожидается выполнения очереди и останавливает рабочие задачи."""
+
+        if not self.__tasks:
+            return
+
+        async with self.__not_full:
+            await self.__not_full.wait_for(lambda: not self.__pending_count)
+
+        for task in self.__tasks:
+            task.cancel()
+        await asyncio.gather(*self.__tasks, return_exceptions=True)
+        self.__tasks.clear()
+
+        self.logger.info("Асинхронный диспетчер остановлен.")
+
+    async def __work(self, stats: WorkerStats) -> None:
+        """Цикл рабочей задачи."""
+
+        while True:
+            user_id = await self.__ready.get()
+            func, args, kwargs = self.__pending[user_id].popleft()
+
+            stats.task_started_at = time.monotonic()
+            try:
+                with user_context(user_id):
+                    await func(*args, **kwargs)
+            except Exception as e:
+                stats.failed += 1
+                self.logger.error(
+                    "Ошибка при обработке события пользователя %s:\n%s",
+                    user_id, e, exc_info=True
+                )
+            finally:
+                stats.busy_time += time.monotonic() - stats.task_started_at
+                stats.task_started_at = None
+                stats.processed += 1
+
+            async with self.__not_full:
+                self.__pending_count -= 1
+                self.__not_full.notify_all()
+
+                has_more = bool(self.__pending[user_id])
+                if not has_more:
+                    del self.__pending[user_id]
+
+            if has_more:
+                self.__ready.put_nowait(user_id)
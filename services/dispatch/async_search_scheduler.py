@@ -0,0 +1,240 @@
+"""
+Асинхронный планировщик фоновых задач поиска мэтчей.
+
+Асинхронный аналог `SearchScheduler` с теми же правилами: одна задача на
+пользователя, общий лимит одновременных поисков, сообщения о ходе поиска
+и отмена. Каждая задача — это `asyncio.Task`, ожидающая свободного места
+на семафоре, поэтому отмена работает и для ожидающих, и для
+выполняющихся задач без контрольных точек.
+
+### Пример использования:
+```python
+scheduler = AsyncSearchScheduler(max_concurrent=2)
+job, is_new = await scheduler.submit(user_id, run_search, user_id)
+await scheduler.cancel(user_id)
+print(scheduler.stats())
+await scheduler.shutdown()
+```
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+from config.bot_config import MESSAGES_CONFIG
+from services.dispatch.search_scheduler import (
+    DEFAULT_MAX_CONCURRENT_SEARCHES, DEFAULT_PROGRESS_INTERVAL,
+    SEARCH_BUCKETS, SearchJob
+)
+from services.formatters.module_formatters import get_module_part
+from services.vk_api.async_msg_service import AsyncMessageService
+from services.vk_api.rate_limiter import user_context
+from utils.logging.setup import setup_logger
+from utils.metrics import Histogram
+
+
+class AsyncSearchJob(SearchJob):
+    """Задача поиска асинхронного планировщика."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.task: asyncio.Task | None = None
+
+    async def progress(self, msg: str, force: bool = False) -> None:
+        """Асинхронный аналог `SearchJob.progress()`."""
+        result = super().progress(msg, force)
+        if result is not None:
+            await result
+
+
+class AsyncSearchScheduler:
+    """
+    Асинхронный планировщик задач поиска.
+
+    Функция задачи — корутинная функция `func(job, *args, **kwargs)`.
+
+    ### Аргументы:
+    - max_concurrent (int): Максимальное количество одновременно
+      выполняемых задач.
+    - msg_service (AsyncMessageService, optional): Сервис для отправки
+      сообщений пользователю.
+    - progress_interval (float): Минимальный интервал между сообщениями
+      о ходе поиска в секундах.
+
+    ### Методы:
+    - `submit()`: Создает задачу поиска пользователя.
+    - `cancel()`: Отменяет задачу пользователя.
+    - `get_job()`: Возвращает активную задачу пользователя.
+    - `stats()`: Возвращает статистику в формате `SearchScheduler.stats()`.
+    - `shutdown()`: Отменяет все задачи.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_SEARCHES,
+        msg_service: AsyncMessageService | None = None,
+        progress_interval: float = DEFAULT_PROGRESS_INTERVAL
+    ) -> None:
+        if max_concurrent < 1:
+            raise ValueError(
+                "Количество одновременных поисков должно быть больше 0."
+            )
+
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+        self.max_concurrent = max_concurrent
+        self.progress_interval = progress_interval
+        self.msg_service = msg_service or AsyncMessageService()
+
+        # Семафор создается в цикле событий при первой задаче
+        self.__semaphore: asyncio.Semaphore | None = None
+        self.__jobs: dict[int, AsyncSearchJob] = {}
+        self.__running = 0
+        self.__queued = 0
+        self.__counters = dict.fromkeys(
+            ("submitted", "coalesced", "completed", "failed", "cancelled"), 0
+        )
+        self.__queue_time = Histogram(SEARCH_BUCKETS)
+        self.__run_time = Histogram(SEARCH_BUCKETS)
+        self.__latency = Histogram(SEARCH_BUCKETS)
+
+    async def submit(
+        self,
+        user_id: int,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        **kwargs: Any
+    ) -> tuple[AsyncSearchJob, bool]:
+        """
+        Создает задачу поиска пользователя.
+
+        ### Возвращает:
+        - tuple: Задача пользователя и флаг, была ли она создана этим
+          вызовом.
+        """
+
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        job = self.__jobs.get(user_id)
+        if job is not None and job.is_active:
+            self.__counters["coalesced"] += 1
+            await self.__send(user_id, "search_already_running")
+            return job, False
+
+        job = AsyncSearchJob(
+            user_id, func, args, kwargs,
+            notify=self.msg_service.send_message,
+            progress_interval=self.progress_interval
+        )
+        self.__jobs[user_id] = job
+        self.__counters["submitted"] += 1
+        self.__queued += 1
+        job.task = asyncio.create_task(self.__run(job))
+
+        position = self.__queued + self.__running - self.max_concurrent
+        if position > 0:
+            await self.__send(user_id, "search_queued", position)
+
+        return job, True
+
+    async def cancel(self, user_id: int, notify: bool = True) -> bool:
+        """
+        Отменяет задачу пользователя.
+
+        ### Возвращает:
+        - bool: True, если активная задача была отменена.
+        """
+
+        job = self.__jobs.get(user_id)
+        if job is None or not job.is_active:
+            return False
+
+        job.cancel()
+        job.task.cancel()
+
+        self.logger.info("Поиск пользователя %s отменен.", user_id)
+        if notify:
+            await self.__send(user_id, "search_cancelled")
+        return True
+
+    def get_job(self, user_id: int) -> AsyncSearchJob | None:
+        """Возвращает активную задачу пользователя или None."""
+        job = self.__jobs.get(user_id)
+        return job if job is not None and job.is_active else None
+
+    def stats(self) -> dict:
+        """Возвращает статистику в формате `SearchScheduler.stats()`."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.__running,
+            "queued": self.__queued,
+            **self.__counters,
+            "queue_time": self.__queue_time.as_dict(),
+            "run_time": self.__run_time.as_dict(),
+            "latency": self.__latency.as_dict(),
+        }
+
+    async def shutdown(self) -> None:
+        """Отменяет все задачи и дожидается их завершения."""
+
+        tasks = [job.task for job in self.__jobs.values()]
+        for job in self.__jobs.values():
+            job.cancel()
+            job.task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.logger.info("Асинхронный планировщик поиска остановлен.")
+
+    async def __run(self, job: AsyncSearchJob) -> None:
+        """Выполняет задачу после получения места на семафоре."""
+
+        status = "done"
+        try:
+            async with self.__semaphore:
+                self.__queued -= 1
+                job.status = "running"
+                job.started_at = time.monotonic()
+                self.__queue_time.observe(job.started_at - job.submitted_at)
+                self.__running += 1
+                try:
+                    with user_context(job.user_id):
+                        await job.func(job, *job.args, **job.kwargs)
+                finally:
+                    self.__running -= 1
+                    self.__run_time.observe(time.monotonic() - job.started_at)
+        except asyncio.CancelledError:
+            status = "cancelled"
+            if job.started_at is None:
+                self.__queued -= 1
+        except Exception as e:
+            status = "failed"
+            self.logger.error(
+                "Ошибка поиска пользователя %s:\n%s",
+                job.user_id, e, exc_info=True
+            )
+            await self.__send(job.user_id, "search_failed")
+        finally:
+            job.status = status
+            job.finished_at = time.monotonic()
+            self.__latency.observe(job.finished_at - job.submitted_at)
+            self.__counters["completed" if status == "done" else status] += 1
+            if self.__jobs.get(job.user_id) is job:
+                del self.__jobs[job.user_id]
+
+    async def __send(self, user_id: int, msg_key: str, *msg_args: Any) \
+        -> None:
+        """Отправляет пользователю сообщение из `MESSAGES_CONFIG`."""
+
+        msg = MESSAGES_CONFIG.get(msg_key, MESSAGES_CONFIG.get("error"))
+        try:
+            await self.msg_service.send_message(
+                user_id, msg=msg % msg_args if msg_args else msg
+            )
+        except Exception as e:
+            self.logger.error(
+                "Не удалось отправить сообщение пользователю %s: %s",
+                user_id, e
+            )
@@ -0,0 +1,261 @@
+"""
+Диспетчер событий бота с пулом рабочих потоков.
+
+Этот модуль содержит класс `EventDispatcher`, который распределяет задачи
+по ограниченному пулу рабочих потоков. Задачи одного пользователя
+выполняются строго по очереди и в порядке поступления, а задачи разных
+пользователей — параллельно. Благодаря этому долгий поиск одного
+пользователя не блокирует обработку сообщений остальных.
+
+### Пример использования:
+```python
+dispatcher = EventDispatcher(workers=8, max_queue_size=1000)
+dispatcher.start()
+dispatcher.submit(user_id, handler, request, event)
+print(dispatcher.stats())
+dispatcher.shutdown()
+```
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+from services.formatters.module_formatters import get_module_part
+from services.vk_api.rate_limiter import user_context
+from utils.logging.setup import setup_logger
+
+DEFAULT_WORKERS = int(os.getenv("BOT_WORKERS", "8"))
+DEFAULT_MAX_QUEUE_SIZE = int(os.getenv("BOT_MAX_QUEUE_SIZE", "1000"))
+
+
+class WorkerStats:
+    """Статистика одного рабочего потока."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.busy_time = 0.0
+        self.processed = 0
+        self.failed = 0
+        self.task_started_at: float | None = None
+
+    def as_dict(self) -> dict:
+        """Возвращает статистику в виде словаря."""
+
+        current_busy = (
+            time.monotonic() - self.task_started_at
+            if self.task_started_at is not None
+            else 0.0
+        )
+        return {
+            "name": self.name,
+            "busy_time": round(self.busy_time + current_busy, 6),
+            "processed": self.processed,
+            "failed": self.failed,
+            "is_busy": self.task_started_at is not None,
+        }
+
+
+class EventDispatcher:
+    """
+    Диспетчер событий с упорядочиванием задач по пользователям.
+
+    Для каждого пользователя ведется собственная очередь задач. В общую
+    очередь готовности попадает ID пользователя, а не отдельная задача,
+    поэтому в каждый момент времени задачи одного пользователя обрабатывает
+    не более одного потока.
+
+    ### Аргументы:
+    - workers (int): Количество рабочих потоков.
+    - max_queue_size (int): Максимальное количество ожидающих задач. При
+      переполнении метод `submit` блокируется до освобождения места.
+
+    ### Методы:
+    - `start()`: Запускает рабочие потоки.
+    - `submit()`: Ставит задачу пользователя в очередь.
+    - `queue_depth()`: Возвращает количество ожидающих задач.
+    - `stats()`: Возвращает статистику диспетчера и рабочих потоков.
+    - `shutdown()`: Останавливает рабочие потоки.
+    """
+
+    __STOP = object()
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE
+    ) -> None:
+        if workers < 1:
+            raise ValueError(
+                "Количество рабочих потоков должно быть больше 0."
+            )
+        if max_queue_size < 1:
+            raise ValueError("Размер очереди должен быть больше 0.")
+
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+
+        self.__lock = threading.Lock()
+        self.__not_full = threading.Condition(self.__lock)
+        self.__pending: dict[int, deque] = {}
+        self.__pending_count = 0
+        self.__ready: queue.SimpleQueue = queue.SimpleQueue()
+        self.__threads: list[threading.Thread] = []
+        self.__worker_stats: list[WorkerStats] = []
+        self.__submitted = 0
+        self.__is_running = False
+
+    def start(self) -> None:
+        """Запускает рабочие потоки."""
+
+        with self.__lock:
+            if self.__is_running:
+                return
+            self.__is_running = True
+
+        for idx in range(self.workers):
+            stats = WorkerStats(f"dispatcher-worker-{idx}")
+            thread = threading.Thread(
+                target=self.__work, args=(stats,), name=stats.name, daemon=True
+            )
+            self.__worker_stats.append(stats)
+            self.__threads.append(thread)
+            thread.start()
+
+        self.logger.info("Диспетчер запущен с %d потоками.", self.workers)
+
+    def submit(
+        self,
+        user_id: int,
+        func: Callable[..., Any],
+        *args: Any,
+        **kwargs: Any
+    ) -> None:
+        """
+        Ставит задачу пользователя в очередь на выполнение.
+
+        ### Аргументы:
+        - user_id (int): ID пользователя, задачи которого должны выполняться
+          по порядку.
+        - func (Callable): Вызываемый объект.
+        - *args, **kwargs: Аргументы вызываемого объекта.
+
+        ### Исключения:
+        - RuntimeError: Если диспетчер не запущен.
+        """
+
+        with self.__not_full:
+            if not self.__is_running:
+                raise RuntimeError("Диспетчер событий не запущен.")
+
+            while self.__pending_count >= self.max_queue_size:
+                self.__not_full.wait()
+
+            user_tasks = self.__pending.get(user_id)
+            is_scheduled = user_tasks is not None
+            if not is_scheduled:
+                user_tasks = self.__pending[user_id] = deque()
+
+            user_tasks.append((func, args, kwargs))
+            self.__pending_count += 1
+            self.__submitted += 1
+
+        # Пользователь попадает в очередь готовности только один раз:
+        # остальные его задачи заберет тот же поток после текущей.
+        if not is_scheduled:
+            self.__ready.put(user_id)
+
+    def queue_depth(self) -> int:
+        """Возвращает количество задач, ожидающих выполнения."""
+        with self.__lock:
+            return self.__pending_count
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику диспетчера.
+
+        ### Возвращает:
+        - dict: Словарь с ключами `queue_depth` (ожидающие задачи),
+          `users_pending` (пользователи с задачами в работе или очереди),
+          `submitted` (всего принято задач) и `workers` (статистика
+          каждого потока: суммарное время занятости в секундах,
+          количество выполненных и упавших задач).
+        """
+
+        with self.__lock:
+            return {
+                "queue_depth": self.__pending_count,
+                "users_pending": len(self.__pending),
+                "submitted": self.__submitted,
+                "workers": [stats.as_dict() for stats in self.__worker_stats],
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Останавливает рабочие потоки.
+
+        ### Аргументы:
+        - wait (bool): Дождаться выполнения всех задач, уже поставленных
+          в очередь, и завершения потоков. По умолчанию True.
+        """
+
+        with self.__not_full:
+            if not self.__is_running:
+                return
+            self.__is_running = False
+
+            while wait and self.__pending_count:
+                self.__not_full.wait()
+
+        for _ in self.__threads:
+            self.__ready.put(self.__STOP)
+
+        if wait:
+            for thread in self.__threads:
+                thread.join()
+
+        self.logger.info("Диспетчер остановлен.")
+
+    def __work(self, stats: WorkerStats) -> None:
+        """Цикл рабочего потока."""
+
+        while True:
+            user_id = self.__ready.get()
+            if user_id is self.__STOP:
+                return
+
+            with self.__lock:
+                func, args, kwargs = self.__pending[user_id].popleft()
+
+            stats.task_started_at = time.monotonic()
+            try:
+                with user_context(user_id):
+                    func(*args, **kwargs)
+            except Exception as e:
+                stats.failed += 1
+                self.logger.error(
+                    "Ошибка при обработке события пользователя %s:\n%s",
+                    user_id, e, exc_info=True
+                )
+            finally:
+                stats.busy_time += time.monotonic() - stats.task_started_at
+                stats.task_started_at = None
+                stats.processed += 1
+
+            with self.__not_full:
+                self.__pending_count -= 1
+                self.__not_full.notify_all()
+
+                has_more = bool(self.__pending[user_id])
+                if not has_more:
+                    del self.__pending[user_id]
+
+            if has_more:
+                self.__ready.put(user_id)
@@ -0,0 +1,414 @@
+"""
+Планировщик фоновых задач поиска мэтчей.
+
+Поиск (обход участников группы, фильтрация и сохранение результатов)
+выполняется не в обработчике сообщения, а как задача планировщика:
+
+- для каждого пользователя одновременно существует не более одной
+  задачи. Повторный запуск поиска, пока предыдущий не завершен,
+  объединяется с уже существующей задачей;
+- одновременно выполняется не более `max_concurrent` задач, остальные
+  ждут в общей очереди в порядке поступления;
+- о постановке в очередь, повторном запуске и отмене пользователь
+  получает сообщения через `MessageService`, а сама задача может
+  сообщать о ходе поиска через `SearchJob.progress()`;
+- задачу можно отменить (например, при изменении настроек поиска).
+  Выполняющаяся задача проверяет отмену в контрольных точках через
+  `SearchJob.raise_if_cancelled()`.
+
+### Пример использования:
+```python
+scheduler = SearchScheduler(max_concurrent=2)
+scheduler.start()
+job, is_new = scheduler.submit(user_id, run_search, user_id)
+scheduler.cancel(user_id)
+print(scheduler.stats())
+scheduler.shutdown()
+```
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+from config.bot_config import MESSAGES_CONFIG
+from services.formatters.module_formatters import get_module_part
+from services.vk_api.msg_service import MessageService
+from services.vk_api.rate_limiter import user_context
+from utils.logging.setup import setup_logger
+from utils.metrics import Histogram
+
+DEFAULT_MAX_CONCURRENT_SEARCHES = int(os.getenv("SEARCH_MAX_CONCURRENT", "2"))
+DEFAULT_PROGRESS_INTERVAL = float(os.getenv("SEARCH_PROGRESS_INTERVAL", "10"))
+
+# Границы корзин гистограмм длительностей задач в секундах: поиск
+# длится от секунд до десятков минут
+SEARCH_BUCKETS = (
+    0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0
+)
+
+
+class SearchCancelled(Exception):
+    """Задача поиска отменена."""
+
+
+class SearchJob:
+    """
+    Задача поиска одного пользователя.
+
+    ### Атрибуты:
+    - user_id (int): ID пользователя.
+    - status (str): `queued`, `running`, `done`, `failed` или `cancelled`.
+    - submitted_at, started_at, finished_at (float | None): Моменты
+      постановки в очередь, начала и завершения (`time.monotonic()`).
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        func: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        notify: Callable[[int, str], Any],
+        progress_interval: float = DEFAULT_PROGRESS_INTERVAL
+    ) -> None:
+        self.user_id = user_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.status = "queued"
+        self.submitted_at = time.monotonic()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+
+        self.__notify = notify
+        self.__progress_interval = progress_interval
+        self.__last_progress_at = self.submitted_at
+        self.__cancelled = threading.Event()
+
+    @property
+    def is_active(self) -> bool:
+        """Задача ожидает выполнения или выполняется и не отменена."""
+        return self.status in ("queued", "running") and not self.is_cancelled()
+
+    def is_cancelled(self) -> bool:
+        """Проверяет, запрошена ли отмена задачи."""
+        return self.__cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Запрашивает отмену задачи."""
+        self.__cancelled.set()
+
+    def raise_if_cancelled(self) -> None:
+        """
+        Контрольная точка отмены.
+
+        ### Исключения:
+        - SearchCancelled: Если отмена задачи запрошена.
+        """
+        if self.is_cancelled():
+            raise SearchCancelled(
+                f"Поиск пользователя {self.user_id} отменен."
+            )
+
+    def progress(self, msg: str, force: bool = False) -> Any:
+        """
+        Отправляет пользователю сообщение о ходе поиска.
+
+        Сообщения отправляются не чаще одного раза в `progress_interval`
+        секунд, чтобы не засыпать диалог. Сообщения с `force=True`
+        отправляются всегда.
+        """
+
+        now = time.monotonic()
+        if not force \
+                and now - self.__last_progress_at < self.__progress_interval:
+            return None
+
+        self.__last_progress_at = now
+        return self.__notify(self.user_id, msg)
+
+
+class SearchScheduler:
+    """
+    Планировщик задач поиска с пулом рабочих потоков.
+
+    Функция задачи вызывается как `func(job, *args, **kwargs)`, где `job` —
+    объект `SearchJob` для проверки отмены и отправки прогресса.
+
+    ### Аргументы:
+    - max_concurrent (int): Максимальное количество одновременно
+      выполняемых задач.
+    - msg_service (MessageService, optional): Сервис для отправки сообщений
+      пользователю. По умолчанию создается новый.
+    - progress_interval (float): Минимальный интервал между сообщениями
+      о ходе поиска в секундах.
+
+    ### Методы:
+    - `start()`: Запускает рабочие потоки.
+    - `submit()`: Ставит задачу поиска пользователя в очередь.
+    - `cancel()`: Отменяет задачу пользователя.
+    - `get_job()`: Возвращает активную задачу пользователя.
+    - `stats()`: Возвращает статистику планировщика.
+    - `shutdown()`: Останавливает рабочие потоки.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_SEARCHES,
+        msg_service: MessageService | None = None,
+        progress_interval: float = DEFAULT_PROGRESS_INTERVAL
+    ) -> None:
+        if max_concurrent < 1:
+            raise ValueError(
+                "Количество одновременных поисков должно быть больше 0."
+            )
+
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+        self.max_concurrent = max_concurrent
+        self.progress_interval = progress_interval
+        self.msg_service = msg_service or MessageService()
+
+        self.__cond = threading.Condition()
+        self.__queue: deque[SearchJob] = deque()
+        self.__jobs: dict[int, SearchJob] = {}
+        self.__threads: list[threading.Thread] = []
+        self.__running = 0
+        self.__is_running = False
+        self.__counters = dict.fromkeys(
+            ("submitted", "coalesced", "completed", "failed", "cancelled"), 0
+        )
+        self.__queue_time = Histogram(SEARCH_BUCKETS)
+        self.__run_time = Histogram(SEARCH_BUCKETS)
+        self.__latency = Histogram(SEARCH_BUCKETS)
+
+    def start(self) -> None:
+        """Запускает рабочие потоки."""
+
+        with self.__cond:
+            if self.__is_running:
+                return
+            self.__is_running = True
+
+        for idx in range(self.max_concurrent):
+            thread = threading.Thread(
+                target=self.__work, name=f"search-worker-{idx}", daemon=True
+            )
+            self.__threads.append(thread)
+            thread.start()
+
+        self.logger.info(
+            "Планировщик поиска запущен, одновременных поисков: %d.",
+            self.max_concurrent
+        )
+
+    def submit(
+        self,
+        user_id: int,
+        func: Callable[..., Any],
+        *args: Any,
+        **kwargs: Any
+    ) -> tuple[SearchJob, bool]:
+        """
+        Ставит задачу поиска пользователя в очередь.
+
+        Если у пользователя уже есть неотмененная задача, новая не
+        создается, а пользователь получает сообщение о том, что поиск уже
+        идет.
+
+        ### Возвращает:
+        - tuple: Задача пользователя и флаг, была ли она создана этим
+          вызовом.
+
+        ### Исключения:
+        - RuntimeError: Если планировщик не запущен.
+        """
+
+        with self.__cond:
+            if not self.__is_running:
+                raise RuntimeError("Планировщик поиска не запущен.")
+
+            job = self.__jobs.get(user_id)
+            if job is not None and job.is_active:
+                self.__counters["coalesced"] += 1
+                is_new = False
+            else:
+                job = SearchJob(
+                    user_id, func, args, kwargs,
+                    notify=self.msg_service.send_message,
+                    progress_interval=self.progress_interval
+                )
+                self.__jobs[user_id] = job
+                self.__queue.append(job)
+                self.__counters["submitted"] += 1
+                self.__cond.notify()
+                is_new = True
+
+            # Задачи, которые не достанутся свободным потокам сразу
+            position = len(self.__queue) + self.__running - self.max_concurrent
+
+        if not is_new:
+            self.__send(user_id, "search_already_running")
+        elif position > 0:
+            self.__send(user_id, "search_queued", position)
+
+        return job, is_new
+
+    def cancel(self, user_id: int, notify: bool = True) -> bool:
+        """
+        Отменяет задачу пользователя.
+
+        Ожидающая задача удаляется из очереди, выполняющаяся — завершится
+        в ближайшей контрольной точке.
+
+        ### Аргументы:
+        - user_id (int): ID пользователя.
+        - notify (bool): Отправить пользователю сообщение об отмене.
+
+        ### Возвращает:
+        - bool: True, если активная задача была отменена.
+        """
+
+        with self.__cond:
+            job = self.__jobs.get(user_id)
+            if job is None or not job.is_active:
+                return False
+
+            job.cancel()
+            if job.status == "queued":
+                self.__queue.remove(job)
+                self.__finish(job, "cancelled")
+
+        self.logger.info("Поиск пользователя %s отменен.", user_id)
+        if notify:
+            self.__send(user_id, "search_cancelled")
+        return True
+
+    def get_job(self, user_id: int) -> SearchJob | None:
+        """Возвращает активную задачу пользователя или None."""
+        with self.__cond:
+            job = self.__jobs.get(user_id)
+            return job if job is not None and job.is_active else None
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику планировщика.
+
+        ### Возвращает:
+        - dict: Словарь с ключами `running` и `queued` (текущие задачи),
+          счетчиками `submitted`, `coalesced`, `completed`, `failed`,
+          `cancelled` и гистограммами длительностей в секундах
+          (`Histogram.as_dict()`): `queue_time` (ожидание в очереди),
+          `run_time` (выполнение) и `latency` (от постановки в очередь до
+          завершения).
+        """
+
+        with self.__cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "running": self.__running,
+                "queued": len(self.__queue),
+                **self.__counters,
+                "queue_time": self.__queue_time.as_dict(),
+                "run_time": self.__run_time.as_dict(),
+                "latency": self.__latency.as_dict(),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Останавливает рабочие потоки.
+
+        Все задачи отменяются без уведомления пользователей: ожидающие
+        удаляются из очереди, выполняющиеся завершаются в ближайшей
+        контрольной точке.
+
+        ### Аргументы:
+        - wait (bool): Дождаться завершения выполняющихся задач.
+        """
+
+        with self.__cond:
+            if not self.__is_running:
+                return
+            self.__is_running = False
+
+            for job in self.__jobs.values():
+                job.cancel()
+            while self.__queue:
+                job = self.__queue.popleft()
+                job.cancel()
+                self.__finish(job, "cancelled")
+            self.__cond.notify_all()
+
+        if wait:
+            for thread in self.__threads:
+                thread.join()
+
+        self.logger.info("Планировщик поиска остановлен.")
+
+    def __work(self) -> None:
+        """Цикл рабочего потока."""
+
+        while True:
+            with self.__cond:
+                while self.__is_running and not self.__queue:
+                    self.__cond.wait()
+                if not self.__queue:
+                    return
+
+                job = self.__queue.popleft()
+                job.status = "running"
+                job.started_at = time.monotonic()
+                self.__queue_time.observe(job.started_at - job.submitted_at)
+                self.__running += 1
+
+            status = "done"
+            try:
+                job.raise_if_cancelled()
+                with user_context(job.user_id):
+                    job.func(job, *job.args, **job.kwargs)
+            except SearchCancelled:
+                status = "cancelled"
+            except Exception as e:
+                status = "failed"
+                self.logger.error(
+                    "Ошибка поиска пользователя %s:\n%s",
+                    job.user_id, e, exc_info=True
+                )
+
+            with self.__cond:
+                self.__running -= 1
+                self.__run_time.observe(time.monotonic() - job.started_at)
+                self.__finish(job, status)
+
+            if status == "failed":
+                self.__send(job.user_id, "search_failed")
+
+    def __finish(self, job: SearchJob, status: str) -> None:
+        """Завершает задачу. Вызывается под блокировкой."""
+
+        job.status = status
+        job.finished_at = time.monotonic()
+        self.__latency.observe(job.finished_at - job.submitted_at)
+        self.__counters["completed" if status == "done" else status] += 1
+
+        if self.__jobs.get(job.user_id) is job:
+            del self.__jobs[job.user_id]
+
+    def __send(self, user_id: int, msg_key: str, *msg_args: Any) -> None:
+        """Отправляет пользователю сообщение из `MESSAGES_CONFIG`."""
+
+        msg = MESSAGES_CONFIG.get(msg_key, MESSAGES_CONFIG.get("error"))
+        try:
+            self.msg_service.send_message(
+                user_id, msg=msg % msg_args if msg_args else msg
+            )
+        except Exception as e:
+            self.logger.error(
+                "Не удалось отправить сообщение пользователю %s: %s",
+                user_id, e
+            )
@@ -1,18 +1,30 @@
 """Форматирование данных мэтчей для записи в базу данных."""
 
-import time
-
 from services.formatters.db_user_formatter import DatabaseUserFormatServices
 from services.vk_api.vk_api_service import VKApiService
 
+vk_service = VKApiService()
+
 
 class MatchFormatter:
-    """Класс для форматирования мэтчей для записи в базу данных."""
+    """
+    Класс для форматирования мэтчей для записи в базу данных.
+
+    ### Аргументы:
+    - match (dict): Данные мэтча из VK API.
+    - vk_api_service (VKApiService, optional): Сервис для запроса
+      фотографий. По умолчанию общий сервис модуля `vk_service`.
+    """
 
-    def __init__(self, match: dict[str, str | int]):
+    user_formatter = DatabaseUserFormatServices()
+
+    def __init__(
+        self,
+        match: dict[str, str | int],
+        vk_api_service: VKApiService | None = None
+    ):
         self.match = match
-        self.user_formatter = DatabaseUserFormatServices()
-        self.vk_api_service = VKApiService()
+        self.vk_api_service = vk_api_service or vk_service
 
     def format(self) -> dict:
         """Форматирует мэтч для записи в базу данных."""
@@ -31,10 +43,8 @@ class MatchFormatter:
         if is_closed:
             return None
 
-        time.sleep(1) # Пауза в 1 секунду, чтобы избежать ограничений API ВК.
-
-        photo_data = self.vk_api_service.get_user_photos(match_vk_id, rev=1)
-        return photo_data.get("items", [{"id": None}])[0].get("id")
+        photo_ids = self.vk_api_service.get_profile_photo_ids([match_vk_id])
+        return photo_ids.get(match_vk_id)
 
     def create_formatted_match_dict(
         self, match_vk_id: int, photo_id: int | None
@@ -52,3 +62,28 @@ class MatchFormatter:
 def format_matches(match: dict[str, str | int]) -> dict:
     """Форматирует список мэтчей для записи в базу данных."""
     return MatchFormatter(match).format() if match else {}
+
+
+def format_matches_batch(matches: list[dict[str, str | int]]) -> list[dict]:
+    """
+    Форматирует список мэтчей для записи в базу данных.
+
+    ID фотографий открытых профилей запрашиваются пакетно через
+    `VKApiService.get_profile_photo_ids`, поэтому 25 мэтчей требуют одного
+    запроса к API вместо 25.
+    """
+
+    matches = [match for match in matches if match]
+    open_ids = [
+        match.get("id") for match in matches if not match.get("is_closed")
+    ]
+    photo_ids = (
+        vk_service.get_profile_photo_ids(open_ids) if open_ids else {}
+    )
+
+    return [
+        MatchFormatter(match).create_formatted_match_dict(
+            match.get("id"), photo_ids.get(match.get("id"))
+        )
+        for match in matches
+    ]
@@ -0,0 +1,155 @@
+"""Асинхронный транспорт Bots Long Poll ВКонтакте."""
+
+import asyncio
+import os
+from typing import Callable
+
+import aiohttp
+from vk_api.bot_longpoll import VkBotEvent
+
+from services.formatters.module_formatters import get_module_part
+from services.vk_api.async_vk_api_service import AsyncVKApiService
+from services.vk_api.bots_longpoll import BotsLongPollState
+from services.vk_api.longpoll_checkpoint import LongPollCheckpoint
+from utils.logging.setup import setup_logger
+
+
+class AsyncBotsLongPoll:
+    """
+    Асинхронный транспорт Bots Long Poll с сохранением позиции.
+
+    Получает события через `aiohttp`, а разбор ответов, обработку
+    ошибок `failed` и сохранение `ts` выполняет тот же
+    `BotsLongPollState`, что и синхронный `BotsLongPoll`.
+
+    ### Пример использования:
+    ```python
+    longpoll = AsyncBotsLongPoll(group_token)
+    async for event in longpoll.listen():
+        release = longpoll.hold()
+        await dispatcher.submit(user_id, handle, event, release)
+    ```
+    """
+
+    def __init__(
+        self,
+        group_token: str = os.getenv("VK_GROUP_TOKEN"),
+        group_id: int | None = None,
+        wait: int = 25,
+        checkpoint: LongPollCheckpoint | None = None
+    ) -> None:
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+        self.api = AsyncVKApiService(token=group_token, token_class="group")
+        self.group_id = group_id or os.getenv("VK_GROUP_ID")
+        self.wait = wait
+        self.checkpoint = checkpoint or LongPollCheckpoint()
+        self.state: BotsLongPollState | None = None
+        self.__batch: int | None = None
+
+    async def close(self) -> None:
+        """Закрывает HTTP-сессию транспорта."""
+        await self.api.close()
+
+    async def resolve_group_id(self) -> int:
+        """Определяет ID сообщества по ключу доступа."""
+
+        groups = await self.api.call_method("groups.getById")
+        if isinstance(groups, dict):
+            groups = groups.get("groups", [])
+        if not groups:
+            raise ConnectionError("Не удалось определить ID сообщества.")
+
+        return groups[0]["id"]
+
+    async def update_longpoll_server(self, update_ts: bool = True) -> None:
+        """Запрашивает адрес сервера и ключ (и при необходимости `ts`)."""
+        response = await self.api.call_method(
+            "groups.getLongPollServer", self.state.server_params()
+        )
+        self.state.apply_server(response, update_ts)
+
+    async def check(self) -> list[VkBotEvent]:
+        """Получает события от сервера один раз."""
+
+        if self.state is None:
+            group_id = self.group_id or await self.resolve_group_id()
+            self.state = BotsLongPollState(
+                int(group_id), self.checkpoint, self.wait
+            )
+
+        if self.state.server is None:
+            if self.state.resumed:
+                self.logger.info(
+                    "Возобновление longpoll с ts=%s.", self.state.ts
+                )
+            await self.update_longpoll_server(update_ts=False)
+
+        session = self.api.get_session()
+        async with session.get(
+            self.state.server,
+            params={
+                key: str(value)
+                for key, value in self.state.check_params().items()
+            },
+            timeout=aiohttp.ClientTimeout(total=self.wait + 10),
+        ) as response:
+            data = await response.json(content_type=None)
+
+        events, action = self.state.handle_response(data)
+
+        if action is not None:
+            self.logger.warning("Longpoll требует переподключения: %s", action)
+            await asyncio.sleep(self.state.next_reconnect_delay())
+            await self.update_longpoll_server(
+                update_ts=action == BotsLongPollState.ACTION_REFRESH_ALL
+            )
+
+        return events
+
+    def hold(self) -> Callable[[], None]:
+        """Откладывает сохранение позиции, как `BotsLongPoll.hold()`."""
+
+        batch = self.__batch
+        if batch is None:
+            raise RuntimeError("Нет события, полученного из listen().")
+
+        self.state.hold(batch)
+        return lambda: self.state.release(batch)
+
+    async def listen(self):
+        """
+        Слушает сервер и возвращает события по мере их поступления.
+
+        Позиция сохраняется после того, как все события очередного ответа
+        были переданы потребителю и обработаны (см. `hold()`).
+        """
+
+        while True:
+            try:
+                events = await self.check()
+            except (
+                aiohttp.ClientError, asyncio.TimeoutError,
+                ValueError, ConnectionError
+            ) as e:
+                delay = (
+                    self.state.next_reconnect_delay() if self.state else 1.0
+                )
+                self.logger.error(
+                    "Ошибка longpoll-запроса, повтор через %.1f с: %s",
+                    delay, e
+                )
+                await asyncio.sleep(delay)
+                if self.state:
+                    self.state.server = None
+                continue
+
+            # Если потребитель прервал чтение пакета, пакет не
+            # освобождается: его события будут прочитаны повторно.
+            batch = self.__batch = self.state.begin_batch()
+            for event in events:
+                yield event
+            self.__batch = None
+            self.state.release(batch)
@@ -0,0 +1,60 @@
+"""Асинхронный сервис для работы с сообщениями бота."""
+
+import os
+
+from vk_api.utils import get_random_id
+
+from services.vk_api.async_vk_api_service import AsyncVKApiService
+from services.vk_api.msg_service import MessageService
+
+
+class AsyncMessageService(MessageService):
+    """
+    Асинхронный класс для работы с сообщениями бота.
+
+    Разметка клавиатуры формируется так же, как в `MessageService`, а
+    сообщение отправляется через `AsyncVKApiService` с ключом доступа
+    сообщества.
+    """
+
+    def __init__(self, group_token: str = os.getenv("VK_GROUP_TOKEN")) -> None:
+        super().__init__(group_token)
+        self.api = AsyncVKApiService(token=group_token, token_class="group")
+
+    async def close(self) -> None:
+        """Закрывает HTTP-сессию сервиса."""
+        await self.api.close()
+
+    async def send_message(
+        self,
+        user_id: int,
+        msg: str,
+        btns: dict = None,
+        attachment: str = None
+        ) -> None:
+        """
+        Асинхронная отправка сообщения пользователю в чате.
+
+        Аргументы совпадают с `MessageService.send_message`. Повторы
+        запроса при сетевых ошибках отправляют тот же `random_id`, поэтому
+        VK не доставит сообщение дважды.
+
+        ### Примеры:
+        ```python
+        >>> await send_message(123456, "Привет!")
+        ```
+        """
+
+        if btns is not None:
+            btns = self._create_markup(btns)
+
+        await self.api.call_method(
+            "messages.send",
+            {
+                "user_id": user_id,
+                "message": msg,
+                "keyboard": btns,
+                "attachment": attachment,
+                "random_id": get_random_id()
+            }
+        )
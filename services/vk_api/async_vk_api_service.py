@@ -0,0 +1,271 @@
+"""Асинхронный сервис для работы с API ВКонтакте."""
+
+import asyncio
+
+import aiohttp
+
+from services.vk_api.member_stream import (
+    DEFAULT_PREFETCH, MEMBERS_PAGE_SIZE, AsyncGroupMemberStream
+)
+from services.vk_api.resilience import CircuitOpenError, get_circuit_breaker
+from services.vk_api.vk_api_service import (
+    EXECUTE_MEMBER_PAGES, MEMBER_FIELDS, USERS_SEARCH_MAX_RESULTS,
+    USERS_SEARCH_PAGE_SIZE, APIResult, VKAPIError, VKApiService
+)
+
+
+class AsyncVKApiService(VKApiService):
+    """
+    Асинхронный сервис для работы с API ВКонтакте.
+
+    Повторяет методы `VKApiService`, но выполняет HTTP-запросы через
+    `aiohttp`, не блокируя цикл событий. Все публичные методы являются
+    корутинами. Сессия `aiohttp` создается лениво внутри запущенного
+    цикла событий и должна быть закрыта методом `close()`.
+
+    ### Аргументы:
+    - token (str, optional): Ключ доступа. По умолчанию берется из
+      переменной окружения `VK_TOKEN`.
+    - session (aiohttp.ClientSession, optional): Внешняя сессия. Если не
+      передана, сервис создаст и будет владеть собственной.
+    - token_class (str): Тип ключа для ограничителя частоты: `user` или
+      `group`.
+    """
+
+    def __init__(
+        self,
+        token: str | None = None,
+        session: aiohttp.ClientSession | None = None,
+        token_class: str = "user"
+    ) -> None:
+        super().__init__(token, token_class=token_class)
+        self.__session = session
+        self.__owns_session = session is None
+
+    async def close(self) -> None:
+        """Закрывает собственную HTTP-сессию сервиса."""
+        if self.__owns_session and self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    async def call_method(self, method: str, params: dict | None = None) \
+        -> dict | list:
+        """Асинхронная версия `VKApiService.call_method`."""
+
+        response = await self._make_request(method, dict(params or {}))
+        return response.get("response", {})
+
+    async def get_user_info(self, user_id: int) -> dict:
+        """Получение информации о пользователе по его ID."""
+
+        params = {"user_ids": user_id, "fields": "city,sex"}
+
+        response = await self._make_request("users.get", params)
+        return response.get("response", [])[0]
+
+    async def get_user_photos(
+        self, user_id: int, album: str = "profile", rev: int = 0
+        ) -> dict:
+        """Получение информации о фотографиях пользователя."""
+
+        params = {"owner_id": user_id, "album_id": album, "rev": rev}
+
+        response = await self._make_request("photos.get", params)
+        return response.get("response", {})
+
+    async def get_city_info(self, query: str) -> dict:
+        """Получение информации о городе по его названию через API VK."""
+
+        params = {
+            "country_id": 1,
+            "q": query,
+            "count": 1,
+            "need_all": 0
+        }
+
+        response = await self._make_request("database.getCities", params)
+        items = response.get("response", {}).get("items", [])
+
+        if items:
+            city = items[0]
+            return {"id": city["id"], "title": city["title"]}
+
+        return {}
+
+    async def get_group_info(
+        self, city_id: int, query: str, count: int = 1
+    ) -> list[dict]:
+        """Асинхронная версия `VKApiService.get_group_info`."""
+
+        params = {
+            "q": query,
+            "city_id": city_id,
+            "sort": 6,
+            "count": count,
+        }
+
+        response = await self._make_request("groups.search", params)
+        return response.get("response", {}).get("items", [])
+
+    async def get_group_members(self, group_id: int, offset: int = 0) \
+        -> list[dict]:
+        """Получение списка участников группы."""
+        return (await self.fetch_group_members(group_id, offset)).items
+
+    async def fetch_group_members(self, group_id: int, offset: int = 0) \
+        -> APIResult:
+        """Асинхронная версия `VKApiService.fetch_group_members`."""
+        return await self.member_cache.fetch_page_async(
+            group_id, offset,
+            lambda: self.request(
+                "groups.getMembers",
+                self._group_members_params(group_id, offset)
+            )
+        )
+
+    def iter_group_members(
+        self,
+        group_id: int,
+        offset: int = 0,
+        prefetch: int = DEFAULT_PREFETCH
+    ) -> AsyncGroupMemberStream:
+        """Асинхронная версия `VKApiService.iter_group_members`."""
+        return AsyncGroupMemberStream(
+            lambda page_offset: self.fetch_group_members(
+                group_id, page_offset
+            ),
+            offset,
+            prefetch=prefetch
+        )
+
+    async def fetch_group_members_filtered(
+        self,
+        group_id: int,
+        offset: int,
+        sex: int,
+        city_id: int,
+        pages: int = EXECUTE_MEMBER_PAGES
+    ) -> APIResult:
+        """Асинхронная версия `VKApiService.fetch_group_members_filtered`."""
+        return self._check_filtered_members(await self.request(
+            "execute", {"code": self._filter_members_code(
+                group_id, offset, sex, city_id, pages
+            )}
+        ))
+
+    def iter_group_members_filtered(
+        self,
+        group_id: int,
+        sex: int,
+        city_id: int,
+        offset: int = 0,
+        pages: int = EXECUTE_MEMBER_PAGES,
+        prefetch: int = DEFAULT_PREFETCH
+    ) -> AsyncGroupMemberStream:
+        """Асинхронная версия `VKApiService.iter_group_members_filtered`."""
+        return AsyncGroupMemberStream(
+            lambda page_offset: self.fetch_group_members_filtered(
+                group_id, page_offset, sex, city_id, pages
+            ),
+            offset,
+            page_size=pages * MEMBERS_PAGE_SIZE,
+            prefetch=prefetch
+        )
+
+    async def search_users(self, **criteria: any) -> list[dict]:
+        """Асинхронная версия `VKApiService.search_users`."""
+        return (await self.fetch_users_search(criteria)).items
+
+    async def fetch_users_search(
+        self,
+        criteria: dict[str, any],
+        offset: int = 0,
+        count: int = USERS_SEARCH_PAGE_SIZE
+    ) -> APIResult:
+        """Асинхронная версия `VKApiService.fetch_users_search`."""
+        return await self.request("users.search", {
+            **criteria,
+            "count": count,
+            "offset": offset,
+            "fields": MEMBER_FIELDS,
+        })
+
+    def iter_users_search(
+        self,
+        criteria: dict[str, any],
+        page_size: int = USERS_SEARCH_PAGE_SIZE,
+        prefetch: int = DEFAULT_PREFETCH
+    ) -> AsyncGroupMemberStream:
+        """Асинхронная версия `VKApiService.iter_users_search`."""
+        return AsyncGroupMemberStream(
+            lambda page_offset: self.fetch_users_search(
+                criteria, page_offset, page_size
+            ),
+            page_size=page_size,
+            prefetch=prefetch,
+            limit=USERS_SEARCH_MAX_RESULTS
+        )
+
+    async def request(self, method: str, params: dict[str, any]) \
+        -> APIResult:
+        """Асинхронная версия `VKApiService.request`."""
+
+        url = self.api_url + method
+        params = self._prepare_params(params)
+        breaker = get_circuit_breaker(method)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            is_probe = False
+            try:
+                is_probe = breaker.before_request()
+                await self.rate_limiter.acquire_async()
+                session = self.get_session()
+                async with session.post(
+                    url,
+                    data={
+                        key: str(value)
+                        for key, value in params.items()
+                        if value is not None
+                    },
+                    headers={"User-Agent": "VKMatchSensei"},
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                ) as response:
+                    data = await response.json(content_type=None)
+                data = self._handle_response_errors(data)
+            except CircuitOpenError as e:
+                return self._fail(method, VKAPIError(str(e)))
+            except (aiohttp.ClientError, TimeoutError, ValueError) as e:
+                error = VKAPIError(f"Ошибка сети: {e}")
+            except VKAPIError as e:
+                error = e
+            except BaseException:
+                # Прерванный запрос (отмена задачи, KeyboardInterrupt) не
+                # является ни успехом, ни сбоем
+                if is_probe:
+                    breaker.release_probe()
+                raise
+            else:
+                breaker.record_success()
+                return APIResult(method, data)
+
+            delay = self._on_attempt_failed(method, breaker, error, attempt)
+            if delay is None:
+                return self._fail(method, error)
+            await asyncio.sleep(delay)
+
+    async def _make_request(self, method: str, params: dict[str, any]) \
+        -> dict[str, any]:
+        """
+        Базовый метод для выполнения асинхронных запросов к VK API
+        с обработкой ошибок.
+        """
+        return (await self.request(method, params)).data
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Возвращает HTTP-сессию, создавая ее при первом обращении."""
+        if self.__session is None or self.__session.closed:
+            self.__session = aiohttp.ClientSession()
+            self.__owns_session = True
+        return self.__session
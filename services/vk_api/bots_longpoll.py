@@ -0,0 +1,394 @@
+"""
+Транспорт Bots Long Poll с сохранением позиции и возобновлением.
+
+Этот модуль содержит реализацию Bots Long Poll API
+(`groups.getLongPollServer`), которая сохраняет последний обработанный
+`ts` и при запуске продолжает чтение событий с него. Благодаря этому
+после перезапуска бот не теряет сообщения пользователей.
+
+Позиция сохраняется только после обработки событий: каждый ответ
+сервера — это пакет событий, и сохраненный `ts` не обгоняет начало
+самого раннего пакета, события которого еще обрабатываются
+(`BotsLongPoll.hold()`). После падения необработанный пакет читается
+заново, поэтому его уже обработанные события могут повториться.
+
+### Классы:
+- `IncomingMessage`: Входящее сообщение пользователя.
+- `BotsLongPollState`: Состояние протокола, общее для синхронного и
+  асинхронного транспорта.
+- `BotsLongPoll`: Синхронный транспорт.
+
+### Обработка ошибок сервера:
+- `failed: 1` — история событий устарела: продолжаем с нового `ts`
+  без переподключения.
+- `failed: 2` — истек ключ: запрашиваем только новый ключ, сохраняя `ts`.
+- `failed: 3` — информация утеряна: запрашиваем новые ключ и `ts`.
+
+Повторные переподключения подряд выполняются с экспоненциальной
+задержкой и случайным разбросом, чтобы не устраивать шторм запросов.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+import requests
+from vk_api.bot_longpoll import VkBotEvent, VkBotEventType, VkBotLongPoll
+
+from services.formatters.module_formatters import get_module_part
+from services.vk_api.longpoll_checkpoint import LongPollCheckpoint
+from services.vk_api.vk_api_service import VKApiService
+from utils.logging.setup import setup_logger
+
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+
+class IncomingMessage:
+    """
+    Входящее сообщение пользователя.
+
+    Содержит поля, которые используют обработчики команд: `user_id`,
+    `text` и `payload` (строка JSON от кнопки клавиатуры или None).
+    """
+
+    __slots__ = ("user_id", "text", "payload")
+
+    def __init__(self, user_id: int, text: str, payload: str | None = None):
+        self.user_id = user_id
+        self.text = text
+        self.payload = payload
+
+    @classmethod
+    def from_event(cls, event: VkBotEvent) -> "IncomingMessage | None":
+        """
+        Создает сообщение из события Bots Long Poll.
+
+        ### Возвращает:
+        - IncomingMessage: Если событие — новое личное сообщение.
+        - None: Для остальных событий.
+        """
+
+        if event.type != VkBotEventType.MESSAGE_NEW or not event.message:
+            return None
+
+        message = event.message
+        user_id = message.get("from_id", 0)
+        if user_id <= 0 or message.get("peer_id") != user_id:
+            return None
+
+        return cls(user_id, message.get("text", ""), message.get("payload"))
+
+
+class BotsLongPollState:
+    """
+    Состояние протокола Bots Long Poll.
+
+    Не выполняет сетевых запросов: хранит адрес сервера, ключ и `ts`,
+    разбирает ответы сервера и решает, какое действие требуется.
+    Используется как синхронным, так и асинхронным транспортом.
+
+    Пакеты событий, которые еще обрабатываются, учитываются счетчиками
+    удержаний (`begin_batch()`, `hold()`, `release()`): сохраняется
+    `ts`, с которого был запрошен самый ранний такой пакет.
+
+    ### Аргументы:
+    - group_id (int): ID сообщества.
+    - checkpoint (LongPollCheckpoint): Хранилище позиции.
+    - wait (int): Время ожидания событий сервером в секундах.
+    """
+
+    #: Действия, которые транспорт должен выполнить после ответа сервера
+    ACTION_NONE = None
+    ACTION_REFRESH_KEY = "refresh_key"
+    ACTION_REFRESH_ALL = "refresh_all"
+
+    def __init__(
+        self, group_id: int, checkpoint: LongPollCheckpoint, wait: int = 25
+    ) -> None:
+        self.group_id = group_id
+        self.checkpoint = checkpoint
+        self.wait = wait
+
+        self.server = None
+        self.key = None
+        self.ts = checkpoint.load(group_id)
+        self.resumed = self.ts is not None
+        self.__saved_ts = self.ts
+        self.__failures = 0
+
+        # `ts` последнего запроса событий
+        self.request_ts = self.ts
+        # Номер пакета -> [ts запроса пакета, количество удержаний]
+        self.__batches: OrderedDict[int, list] = OrderedDict()
+        self.__next_batch = 0
+        self.__lock = threading.Lock()
+
+    def server_params(self) -> dict:
+        """Параметры запроса `groups.getLongPollServer`."""
+        return {"group_id": self.group_id}
+
+    def apply_server(self, response: dict, update_ts: bool = True) -> None:
+        """
+        Применяет ответ `groups.getLongPollServer`.
+
+        Если `ts` уже известен (например, восстановлен из хранилища), он
+        сохраняется, пока явно не запрошено его обновление.
+        """
+
+        if not response or "server" not in response:
+            raise ConnectionError("Не удалось получить Bots Long Poll сервер.")
+
+        self.server = response["server"]
+        self.key = response["key"]
+
+        if update_ts or self.ts is None:
+            self.ts = str(response["ts"])
+
+    def check_params(self) -> dict:
+        """Параметры запроса событий."""
+        self.request_ts = self.ts
+        return {
+            "act": "a_check", "key": self.key, "ts": self.ts, "wait": self.wait
+        }
+
+    def handle_response(self, data: dict) \
+        -> tuple[list[VkBotEvent], str | None]:
+        """
+        Разбирает ответ сервера событий.
+
+        ### Возвращает:
+        - tuple: Список событий и действие, которое нужно выполнить
+          транспорту (`ACTION_*`).
+        """
+
+        if "failed" not in data:
+            self.ts = str(data["ts"])
+            self.__failures = 0
+            return [self.parse_event(raw) for raw in data["updates"]], None
+
+        failed = data["failed"]
+        if failed == 1:
+            # История устарела: часть событий потеряна, но ключ действителен.
+            self.ts = str(data["ts"])
+            return [], self.ACTION_NONE
+        if failed == 2:
+            return [], self.ACTION_REFRESH_KEY
+        return [], self.ACTION_REFRESH_ALL
+
+    def begin_batch(self) -> int:
+        """
+        Регистрирует пакет событий последнего запроса (`request_ts`).
+
+        Пакет удерживается транспортом, пока его события передаются
+        потребителю, и освобождается вызовом `release()`.
+
+        ### Возвращает:
+        - int: Номер пакета.
+        """
+
+        with self.__lock:
+            batch = self.__next_batch
+            self.__next_batch += 1
+            self.__batches[batch] = [self.request_ts, 1]
+            return batch
+
+    def hold(self, batch: int) -> None:
+        """Добавляет удержание пакета до окончания обработки события."""
+        with self.__lock:
+            self.__batches[batch][1] += 1
+
+    def release(self, batch: int) -> None:
+        """Снимает удержание пакета и сохраняет позицию, если возможно."""
+
+        with self.__lock:
+            entry = self.__batches[batch]
+            entry[1] -= 1
+            if entry[1]:
+                return
+            del self.__batches[batch]
+        self.commit()
+
+    def commit(self) -> None:
+        """
+        Сохраняет позицию, если она изменилась с прошлого сохранения.
+
+        Позиция — `ts` запроса самого раннего необработанного пакета, а
+        если таких нет — текущий `ts`.
+        """
+
+        with self.__lock:
+            if self.__batches:
+                ts = next(iter(self.__batches.values()))[0]
+            else:
+                ts = self.ts
+            if ts is None or ts == self.__saved_ts:
+                return
+            self.checkpoint.save(self.group_id, ts)
+            self.__saved_ts = ts
+
+    def next_reconnect_delay(self) -> float:
+        """
+        Возвращает задержку перед очередным переподключением.
+
+        Первое переподключение выполняется сразу, последующие подряд —
+        с экспоненциально растущей задержкой и случайным разбросом.
+        """
+
+        self.__failures += 1
+        if self.__failures == 1:
+            return 0.0
+
+        delay = min(
+            RECONNECT_MAX_DELAY,
+            RECONNECT_BASE_DELAY * 2 ** (self.__failures - 2)
+        )
+        return delay * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def parse_event(raw_event: dict) -> VkBotEvent:
+        """Создает объект события `vk_api` по сырым данным."""
+        event_class = VkBotLongPoll.CLASS_BY_EVENT_TYPE.get(
+            raw_event.get("type"), VkBotLongPoll.DEFAULT_EVENT_CLASS
+        )
+        return event_class(raw_event)
+
+
+class BotsLongPoll:
+    """
+    Синхронный транспорт Bots Long Poll с сохранением позиции.
+
+    ### Аргументы:
+    - group_token (str): Ключ доступа сообщества.
+    - group_id (int, optional): ID сообщества. По умолчанию берется из
+      переменной окружения `VK_GROUP_ID`, а при ее отсутствии
+      определяется по ключу доступа.
+    - wait (int): Время ожидания событий сервером в секундах.
+    - checkpoint (LongPollCheckpoint, optional): Хранилище позиции.
+
+    ### Пример использования:
+    ```python
+    longpoll = BotsLongPoll(group_token)
+    for event in longpoll.listen():
+        release = longpoll.hold()
+        dispatcher.submit(user_id, handle, event, release)
+    ```
+    """
+
+    def __init__(
+        self,
+        group_token: str = os.getenv("VK_GROUP_TOKEN"),
+        group_id: int | None = None,
+        wait: int = 25,
+        checkpoint: LongPollCheckpoint | None = None
+    ) -> None:
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+        self.api = VKApiService(token=group_token, token_class="group")
+        self.session = requests.Session()
+
+        group_id = (
+            group_id or os.getenv("VK_GROUP_ID") or self.resolve_group_id()
+        )
+        self.state = BotsLongPollState(
+            int(group_id), checkpoint or LongPollCheckpoint(), wait
+        )
+        self.__batch: int | None = None
+
+    def resolve_group_id(self) -> int:
+        """Определяет ID сообщества по ключу доступа."""
+
+        groups = self.api.call_method("groups.getById")
+        if isinstance(groups, dict):
+            groups = groups.get("groups", [])
+        if not groups:
+            raise ConnectionError("Не удалось определить ID сообщества.")
+
+        return groups[0]["id"]
+
+    def update_longpoll_server(self, update_ts: bool = True) -> None:
+        """Запрашивает адрес сервера и ключ (и при необходимости `ts`)."""
+        response = self.api.call_method(
+            "groups.getLongPollServer", self.state.server_params()
+        )
+        self.state.apply_server(response, update_ts)
+
+    def check(self) -> list[VkBotEvent]:
+        """Получает события от сервера один раз."""
+
+        if self.state.server is None:
+            if self.state.resumed:
+                self.logger.info(
+                    "Возобновление longpoll с ts=%s.", self.state.ts
+                )
+            self.update_longpoll_server(update_ts=False)
+
+        response = self.session.get(
+            self.state.server,
+            params=self.state.check_params(),
+            timeout=self.state.wait + 10
+        )
+        events, action = self.state.handle_response(response.json())
+
+        if action is not None:
+            self.logger.warning("Longpoll требует переподключения: %s", action)
+            time.sleep(self.state.next_reconnect_delay())
+            self.update_longpoll_server(
+                update_ts=action == BotsLongPollState.ACTION_REFRESH_ALL
+            )
+
+        return events
+
+    def hold(self) -> Callable[[], None]:
+        """
+        Откладывает сохранение позиции до обработки последнего события.
+
+        Вызывается потребителем `listen()`, который обрабатывает событие
+        не сразу (например, передает его диспетчеру).
+
+        ### Возвращает:
+        - Callable[[], None]: Функция, которую нужно вызвать ровно один
+          раз после обработки события.
+        """
+
+        batch = self.__batch
+        if batch is None:
+            raise RuntimeError("Нет события, полученного из listen().")
+
+        self.state.hold(batch)
+        return lambda: self.state.release(batch)
+
+    def listen(self):
+        """
+        Слушает сервер и возвращает события по мере их поступления.
+
+        Позиция сохраняется после того, как все события очередного ответа
+        были переданы потребителю и обработаны (см. `hold()`).
+        """
+
+        while True:
+            try:
+                events = self.check()
+            except (
+                requests.RequestException, ValueError, ConnectionError
+            ) as e:
+                delay = self.state.next_reconnect_delay()
+                self.logger.error(
+                    "Ошибка longpoll-запроса, повтор через %.1f с: %s",
+                    delay, e
+                )
+                time.sleep(delay)
+                self.state.server = None
+                continue
+
+            # Если потребитель прервал чтение пакета, пакет не
+            # освобождается: его события будут прочитаны повторно.
+            batch = self.__batch = self.state.begin_batch()
+            yield from events
+            self.__batch = None
+            self.state.release(batch)
@@ -0,0 +1,168 @@
+"""
+Общий HTTP-транспорт для запросов к VK API.
+
+Все экземпляры `VKApiService` используют одну сессию `requests` с пулом
+keep-alive соединений, поэтому TCP/TLS-рукопожатие выполняется один раз
+на соединение, а не на каждый вызов метода. Размер пула по умолчанию
+равен количеству потоков, которые могут одновременно обращаться к API:
+рабочие потоки диспетчера событий и планировщика поиска.
+
+Транспорт повторяет только неудавшиеся подключения (средствами
+`urllib3.Retry`): такой запрос не дошел до VK и не израсходовал лимит
+запросов. Остальные ошибки (тайм-аут чтения, 429/5xx) повторяет
+`RetryPolicy` сервиса VK API, снова проходя через ограничитель
+частоты. Длительность каждого вызова записывается в гистограмму
+соответствующего метода API.
+
+### Переменные окружения:
+- `VK_HTTP_POOL_SIZE`: Размер пула соединений.
+- `VK_HTTP_CONNECT_TIMEOUT`, `VK_HTTP_READ_TIMEOUT`: Тайм-ауты
+  подключения и чтения в секундах.
+- `VK_HTTP_RETRIES`: Количество повторов подключения на уровне
+  транспорта.
+- `VK_HTTP_BACKOFF`: Базовая задержка между повторами подключения в
+  секундах.
+
+### Пример использования:
+```python
+transport = get_transport()
+response = transport.get(url, params=params, method="users.get")
+print(transport.stats()["methods"]["users.get"]["p95"])
+```
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.metrics import HistogramRegistry
+
+# Пакет services.dispatch импортирует сервисы VK API, поэтому значения по
+# умолчанию для потоков диспетчера и планировщика читаются здесь напрямую
+DEFAULT_POOL_SIZE = int(os.getenv("VK_HTTP_POOL_SIZE") or (
+    int(os.getenv("BOT_WORKERS", "8"))
+    + int(os.getenv("SEARCH_MAX_CONCURRENT", "2"))
+))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("VK_HTTP_CONNECT_TIMEOUT", "3.05"))
+DEFAULT_READ_TIMEOUT = float(os.getenv("VK_HTTP_READ_TIMEOUT", "10"))
+DEFAULT_RETRIES = int(os.getenv("VK_HTTP_RETRIES", "1"))
+DEFAULT_BACKOFF = float(os.getenv("VK_HTTP_BACKOFF", "0.3"))
+
+
+class HTTPTransport:
+    """
+    HTTP-транспорт с пулом соединений, повторами подключения и метриками.
+
+    ### Аргументы:
+    - pool_size (int): Максимальное количество keep-alive соединений
+      с одним хостом.
+    - connect_timeout (float): Тайм-аут подключения в секундах.
+    - read_timeout (float): Тайм-аут чтения ответа в секундах.
+    - retries (int): Количество повторов неудавшегося подключения.
+      Запросы, отправленные в VK, транспорт не повторяет.
+    - backoff (float): Базовая задержка между повторами. Задержка перед
+      n-м повтором равна `backoff * 2 ** (n - 1)`.
+
+    ### Методы:
+    - `get()`: Выполняет GET-запрос.
+    - `stats()`: Возвращает настройки транспорта и гистограммы методов.
+    - `close()`: Закрывает соединения пула.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF
+    ) -> None:
+        if pool_size < 1:
+            raise ValueError("Размер пула соединений должен быть больше 0.")
+
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.latency = HistogramRegistry()
+
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                connect=retries,
+                read=0,
+                status=0,
+                other=0,
+                backoff_factor=backoff,
+                raise_on_status=False,
+            ),
+        )
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "VKMatchSensei"
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(
+        self, url: str, params: dict | None = None, method: str | None = None
+    ) -> requests.Response:
+        """
+        Выполняет GET-запрос через пул соединений.
+
+        ### Аргументы:
+        - url (str): Адрес запроса.
+        - params (dict, optional): Параметры строки запроса.
+        - method (str, optional): Имя метода VK API для гистограммы
+          длительностей. По умолчанию используется адрес запроса.
+
+        ### Исключения:
+        - requests.RequestException: Если запрос не удался после всех
+          повторов подключения.
+        """
+
+        started = time.perf_counter()
+        try:
+            return self.session.get(url, params=params, timeout=self.timeout)
+        finally:
+            self.latency.observe(method or url, time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику транспорта.
+
+        ### Возвращает:
+        - dict: Словарь с настройками (`pool_size`, `timeout`, `retries`)
+          и ключом `methods` — гистограммами длительностей вызовов по
+          методам API (в секундах, включая повторы).
+        """
+
+        return {
+            "pool_size": self.pool_size,
+            "timeout": self.timeout,
+            "retries": self.retries,
+            "methods": self.latency.as_dict(),
+        }
+
+    def close(self) -> None:
+        """Закрывает соединения пула."""
+        self.session.close()
+
+
+_shared_transport: HTTPTransport | None = None
+_shared_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Возвращает общий для процесса транспорт, создавая его при вызове."""
+
+    global _shared_transport
+
+    if _shared_transport is None:
+        with _shared_transport_lock:
+            if _shared_transport is None:
+                _shared_transport = HTTPTransport()
+    return _shared_transport
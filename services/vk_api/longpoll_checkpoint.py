@@ -0,0 +1,85 @@
+"""Хранилище позиции (`ts`) Bots Long Poll между перезапусками бота."""
+
+import json
+import os
+import threading
+
+from services.formatters.module_formatters import get_module_part
+from utils.logging.setup import setup_logger
+
+DEFAULT_CHECKPOINT_PATH = os.getenv(
+    "LONGPOLL_CHECKPOINT_PATH", "data/longpoll_checkpoint.json"
+)
+
+
+class LongPollCheckpoint:
+    """
+    Хранилище последнего обработанного `ts` Bots Long Poll.
+
+    Позиции хранятся в JSON-файле в виде словаря "ID группы -> ts".
+    Запись выполняется атомарно: сначала во временный файл, затем
+    заменой основного файла, поэтому падение процесса во время записи
+    не повреждает сохраненную позицию.
+
+    ### Аргументы:
+    - path (str): Путь к файлу от корня проекта. По умолчанию берется из
+      переменной окружения `LONGPOLL_CHECKPOINT_PATH`.
+    """
+
+    __DEFAULT_ENCODING = "utf-8"
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH) -> None:
+        self.logger = setup_logger(
+            module_name=get_module_part(__name__, idx=0),
+            logger_name=__name__
+        )
+        self.path = os.path.abspath(path)
+        self.__lock = threading.Lock()
+
+    def load(self, group_id: int) -> str | None:
+        """Возвращает сохраненный `ts` группы или None, если его нет."""
+
+        with self.__lock:
+            ts = self.__read().get(str(group_id))
+
+        return str(ts) if ts is not None else None
+
+    def save(self, group_id: int, ts: str) -> None:
+        """Сохраняет `ts` группы."""
+
+        with self.__lock:
+            data = self.__read()
+            data[str(group_id)] = str(ts)
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(
+                    tmp_path, "w", encoding=self.__DEFAULT_ENCODING
+                ) as file:
+                    json.dump(data, file)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                self.logger.error(
+                    "Не удалось сохранить позицию longpoll:\n%s", e
+                )
+
+    def __read(self) -> dict:
+        """Читает файл с позициями."""
+
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(
+                self.path, "r", encoding=self.__DEFAULT_ENCODING
+            ) as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            self.logger.error(
+                "Файл позиции longpoll поврежден и будет проигнорирован:\n%s",
+                e
+            )
+            return {}
+
+        return data if isinstance(data, dict) else {}
@@ -0,0 +1,375 @@
+"""
+Общий для процесса кэш страниц участников групп.
+
+Пользователи одного города ищут мэтчи среди участников одних и тех же
+групп. Кэш хранит загруженные страницы `groups.getMembers` (снимок
+группы) и отдает их всем пользователям, пока снимок не устарел, поэтому
+группу обходит через VK только первый поиск.
+
+- Снимок группы устаревает через `ttl` секунд после загрузки первой
+  страницы и загружается заново.
+- Объем кэша ограничен `max_bytes`: при превышении удаляются снимки,
+  которые дольше всех не читались (LRU). Снимок, который сам больше
+  лимита, перестает пополняться.
+- Одновременные запросы одной и той же страницы выполняются одним
+  запросом к VK (singleflight): остальные потоки ждут его результата.
+  Если загрузка завершилась исключением, ожидавшие загружают страницу
+  сами.
+- Неудавшиеся запросы не кэшируются.
+
+Кэшируются только полные страницы участников: ответы `execute` с уже
+отфильтрованными участниками зависят от настроек поиска и не подходят
+другим пользователям.
+
+### Переменные окружения:
+- `VK_MEMBERS_CACHE_TTL`: Время жизни снимка группы в секундах.
+  0 — кэш отключен.
+- `VK_MEMBERS_CACHE_MB`: Максимальный объем кэша в мегабайтах.
+
+### Пример использования:
+```python
+cache = get_member_cache()
+result = cache.fetch_page(
+    group_id, offset, lambda: vk_service.request("groups.getMembers", params)
+)
+print(member_cache_stats())
+```
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from typing import Awaitable, Callable
+
+DEFAULT_TTL = float(os.getenv("VK_MEMBERS_CACHE_TTL", "600"))
+DEFAULT_MAX_BYTES = int(float(os.getenv("VK_MEMBERS_CACHE_MB", "128")) * 2**20)
+
+# Сколько участников страницы измеряется для оценки ее объема
+SIZE_SAMPLE = 10
+
+
+def _deep_sizeof(obj: object) -> int:
+    """Объем объекта вместе с вложенными словарями, списками и строками."""
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(
+            _deep_sizeof(key) + _deep_sizeof(value)
+            for key, value in obj.items()
+        )
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_sizeof(item) for item in obj)
+    return size
+
+
+def estimate_page_size(items: list) -> int:
+    """
+    Оценивает объем страницы участников в байтах.
+
+    Измеряется не больше `SIZE_SAMPLE` участников, объем остальных
+    считается средним по выборке.
+    """
+
+    if not items:
+        return sys.getsizeof(items)
+
+    sample = items[:SIZE_SAMPLE]
+    average = sum(_deep_sizeof(member) for member in sample) / len(sample)
+    return sys.getsizeof(items) + int(average * len(items))
+
+
+class _Snapshot:
+    """Загруженные страницы одной группы."""
+
+    __slots__ = ("group_id", "pages", "members", "nbytes", "created_at")
+
+    def __init__(self, group_id: int) -> None:
+        self.group_id = group_id
+        # Результаты запросов страниц по смещению
+        self.pages: dict[int, object] = {}
+        self.members = 0
+        self.nbytes = 0
+        self.created_at = time.monotonic()
+
+    def age(self, now: float | None = None) -> float:
+        """Возраст снимка в секундах."""
+        return (now or time.monotonic()) - self.created_at
+
+
+class GroupSnapshotCache:
+    """
+    Кэш снимков участников групп с временем жизни и вытеснением LRU.
+
+    ### Аргументы:
+    - ttl (float): Время жизни снимка в секундах. 0 — кэш отключен.
+    - max_bytes (int): Максимальный объем кэша в байтах.
+
+    ### Методы:
+    - `fetch_page()`: Возвращает страницу из кэша или загружает ее.
+    - `fetch_page_async()`: Асинхронная версия `fetch_page()`.
+    - `invalidate()`: Удаляет снимок группы или весь кэш.
+    - `stats()`: Возвращает статистику кэша.
+    """
+
+    def __init__(
+        self, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self.__snapshots: OrderedDict[int, _Snapshot] = OrderedDict()
+        self.__bytes = 0
+        self.__in_flight: dict[tuple[int, int], Future] = {}
+        self.__async_in_flight: dict[tuple[int, int], asyncio.Future] = {}
+        self.__lock = threading.Lock()
+        self.__counters = dict.fromkeys(
+            ("hits", "misses", "shared", "evictions", "expired", "skipped"), 0
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Кэш включен."""
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def fetch_page(
+        self, group_id: int, offset: int, load: Callable[[], object]
+    ) -> object:
+        """
+        Возвращает страницу участников группы.
+
+        ### Аргументы:
+        - group_id (int): Идентификатор группы.
+        - offset (int): Смещение страницы.
+        - load (Callable[[], APIResult]): Загрузка страницы из VK, если
+          ее нет в кэше.
+
+        ### Возвращает:
+        - APIResult: Результат из кэша, общего запроса или `load()`.
+        """
+
+        if not self.enabled:
+            return load()
+
+        key = (group_id, offset)
+        while True:
+            with self.__lock:
+                result = self.__lookup(group_id, offset)
+                if result is not None:
+                    return result
+
+                future = self.__in_flight.get(key)
+                is_owner = future is None
+                if is_owner:
+                    future = self.__in_flight[key] = Future()
+                    self.__counters["misses"] += 1
+                else:
+                    self.__counters["shared"] += 1
+
+            if is_owner:
+                return self.__load(key, future, load)
+
+            try:
+                return future.result()
+            except CancelledError:
+                # Загрузка завершилась исключением, пробуем сами
+                continue
+
+    async def fetch_page_async(
+        self,
+        group_id: int,
+        offset: int,
+        load: Callable[[], Awaitable[object]]
+    ) -> object:
+        """Асинхронная версия `fetch_page()`."""
+
+        if not self.enabled:
+            return await load()
+
+        key = (group_id, offset)
+        while True:
+            with self.__lock:
+                result = self.__lookup(group_id, offset)
+                if result is not None:
+                    return result
+
+                future = self.__async_in_flight.get(key)
+                is_owner = future is None
+                if is_owner:
+                    future = asyncio.get_running_loop().create_future()
+                    self.__async_in_flight[key] = future
+                    self.__counters["misses"] += 1
+                else:
+                    self.__counters["shared"] += 1
+
+            if is_owner:
+                try:
+                    result = await load()
+                except BaseException:
+                    with self.__lock:
+                        self.__async_in_flight.pop(key, None)
+                    future.cancel()
+                    raise
+
+                with self.__lock:
+                    self.__async_in_flight.pop(key, None)
+                    self.__store(group_id, offset, result)
+                future.set_result(result)
+                return result
+
+            try:
+                # Отмена ожидающего не должна отменять общий запрос
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+
+    def invalidate(self, group_id: int | None = None) -> None:
+        """Удаляет снимок группы `group_id` или, если он не указан, все."""
+
+        with self.__lock:
+            if group_id is None:
+                self.__snapshots.clear()
+                self.__bytes = 0
+            elif group_id in self.__snapshots:
+                self.__drop(group_id)
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику кэша.
+
+        ### Возвращает:
+        - dict: Счетчики `hits`, `misses`, `shared` (запросов, дождавшихся
+          чужой загрузки), `evictions`, `expired`, `skipped` (страниц, не
+          поместившихся в кэш), доля попаданий `hit_rate`, занятый объем
+          `bytes` и `snapshots` — группа, количество страниц и
+          участников, объем и возраст каждого снимка в секундах.
+        """
+
+        now = time.monotonic()
+        with self.__lock:
+            counters = dict(self.__counters)
+            snapshots = [
+                {
+                    "group_id": snapshot.group_id,
+                    "pages": len(snapshot.pages),
+                    "members": snapshot.members,
+                    "bytes": snapshot.nbytes,
+                    "age": round(snapshot.age(now), 1),
+                }
+                for snapshot in self.__snapshots.values()
+            ]
+            total_bytes = self.__bytes
+
+        lookups = counters["hits"] + counters["misses"] + counters["shared"]
+        return {
+            **counters,
+            "hit_rate": (
+                round(counters["hits"] / lookups, 3) if lookups else 0.0
+            ),
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "snapshots": snapshots,
+        }
+
+    def __load(
+        self,
+        key: tuple[int, int],
+        future: Future,
+        load: Callable[[], object]
+    ) -> object:
+        """Загружает страницу и передает результат ожидающим потокам."""
+
+        try:
+            result = load()
+        except BaseException:
+            with self.__lock:
+                self.__in_flight.pop(key, None)
+            future.cancel()
+            raise
+
+        with self.__lock:
+            self.__in_flight.pop(key, None)
+            self.__store(*key, result)
+        future.set_result(result)
+        return result
+
+    def __lookup(self, group_id: int, offset: int) -> object | None:
+        """Ищет страницу в кэше. Вызывается под блокировкой."""
+
+        snapshot = self.__snapshots.get(group_id)
+        if snapshot is None:
+            return None
+
+        if snapshot.age() > self.ttl:
+            self.__drop(group_id)
+            self.__counters["expired"] += 1
+            return None
+
+        result = snapshot.pages.get(offset)
+        if result is not None:
+            self.__snapshots.move_to_end(group_id)
+            self.__counters["hits"] += 1
+        return result
+
+    def __store(self, group_id: int, offset: int, result: object) -> None:
+        """Сохраняет успешный результат. Вызывается под блокировкой."""
+
+        if not result.ok:
+            return
+
+        snapshot = self.__snapshots.get(group_id)
+        if snapshot is not None and snapshot.age() > self.ttl:
+            self.__drop(group_id)
+            self.__counters["expired"] += 1
+            snapshot = None
+        if snapshot is None:
+            snapshot = self.__snapshots[group_id] = _Snapshot(group_id)
+        self.__snapshots.move_to_end(group_id)
+
+        if offset in snapshot.pages:
+            return
+
+        size = estimate_page_size(result.items)
+        if snapshot.nbytes + size > self.max_bytes:
+            self.__counters["skipped"] += 1
+            return
+
+        snapshot.pages[offset] = result
+        snapshot.members += len(result.items)
+        snapshot.nbytes += size
+        self.__bytes += size
+
+        while self.__snapshots and self.__bytes > self.max_bytes:
+            # Текущий снимок последний в порядке LRU и помещается в лимит
+            self.__drop(next(iter(self.__snapshots)))
+            self.__counters["evictions"] += 1
+
+    def __drop(self, group_id: int) -> None:
+        """Удаляет снимок группы. Вызывается под блокировкой."""
+        snapshot = self.__snapshots.pop(group_id)
+        self.__bytes -= snapshot.nbytes
+
+
+_shared_cache: GroupSnapshotCache | None = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_member_cache() -> GroupSnapshotCache:
+    """Возвращает общий для процесса кэш участников групп."""
+
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = GroupSnapshotCache()
+    return _shared_cache
+
+
+def member_cache_stats() -> dict:
+    """Возвращает статистику общего кэша участников групп."""
+    return get_member_cache().stats()
@@ -0,0 +1,613 @@
+"""
+Потоковое чтение участников группы с упреждающей загрузкой страниц.
+
+`groups.getMembers` возвращает участников страницами по 1000. Поток
+запрашивает следующие `prefetch` страниц в фоне, пока потребитель
+обрабатывает текущую, поэтому задержка сети перекрывается фильтрацией,
+а не складывается с ней.
+
+Поток подходит для любого метода, который отдает объекты страницами
+вида `{"count": ..., "items": [...]}` по смещению, например
+`users.search`. Страница может содержать поле `scanned` — сколько
+объектов проверено на стороне VK, если в `items` отданы не все
+(см. `VKApiService.fetch_group_members_filtered`).
+
+Первая страница загружается отдельно: из ее ответа становится известно
+общее количество участников, и упреждающие запросы не выходят за конец
+группы. Одновременно в памяти находится не больше `prefetch + 1`
+страниц. Упреждающие запросы всех потоков выполняет один общий пул
+потоков. Закрытие потока (`close()` или выход из блока `with`)
+отменяет еще не начатые запросы и запросы, ожидающие разрешения
+ограничителя частоты (`rate_limiter.current_cancel_event`), поэтому
+они не расходуют лимит пользователя. Результаты запросов, уже
+отправленных в VK, отбрасываются.
+
+Участников нескольких групп читает `MultiGroupMemberStream`: у каждой
+группы свой поток со своим смещением, группы обходятся по очереди,
+а участник, состоящий в нескольких группах, отдается один раз.
+
+### Переменные окружения:
+- `VK_MEMBERS_PREFETCH`: Количество страниц, загружаемых заранее.
+  0 — страницы загружаются по одной по мере чтения.
+- `VK_MEMBERS_PREFETCH_WORKERS`: Размер общего пула потоков загрузки.
+- `SEARCH_GROUPS_CONCURRENCY`: Сколько групп `MultiGroupMemberStream`
+  читает одновременно.
+
+### Пример использования:
+```python
+with vk_service.iter_group_members(group_id) as stream:
+    for page in stream.pages():
+        matches.extend(filter_members(page))
+        if len(matches) >= 25:
+            break
+```
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+
+from services.vk_api.rate_limiter import current_cancel_event
+from utils.collections import CompactIntSet
+
+MEMBERS_PAGE_SIZE = 1000
+DEFAULT_PREFETCH = int(os.getenv("VK_MEMBERS_PREFETCH", "2"))
+DEFAULT_GROUP_CONCURRENCY = int(os.getenv("SEARCH_GROUPS_CONCURRENCY", "2"))
+# По умолчанию хватает на окна всех групп всех одновременных поисков.
+# Пакет services.dispatch импортирует сервисы VK API, поэтому количество
+# поисков читается здесь напрямую
+PREFETCH_WORKERS = int(os.getenv("VK_MEMBERS_PREFETCH_WORKERS") or max(1, (
+    DEFAULT_PREFETCH * DEFAULT_GROUP_CONCURRENCY
+    * int(os.getenv("SEARCH_MAX_CONCURRENT", "2"))
+)))
+
+_prefetch_executor: ThreadPoolExecutor | None = None
+_prefetch_executor_lock = threading.Lock()
+
+
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    """Возвращает общий пул потоков упреждающей загрузки страниц."""
+
+    global _prefetch_executor
+
+    if _prefetch_executor is None:
+        with _prefetch_executor_lock:
+            if _prefetch_executor is None:
+                _prefetch_executor = ThreadPoolExecutor(
+                    max_workers=PREFETCH_WORKERS,
+                    thread_name_prefix="vk-members"
+                )
+    return _prefetch_executor
+
+
+class _StreamState:
+    """
+    Общая логика синхронного и асинхронного потоков: смещения страниц,
+    конец группы и статистика.
+    """
+
+    def __init__(
+        self,
+        offset: int,
+        page_size: int,
+        prefetch: int,
+        limit: int | None = None
+    ) -> None:
+        if prefetch < 0:
+            raise ValueError(
+                "Количество загружаемых заранее страниц не может быть "
+                "отрицательным."
+            )
+
+        # Смещение первого участника, который еще не отдан потребителю
+        self.offset = offset
+        self.page_size = page_size
+        self.prefetch = prefetch
+        # Смещение, дальше которого VK не отдает результаты
+        self.limit = limit
+        # Общее количество участников, известно после первой страницы
+        self.total: int | None = None
+        self.closed = False
+
+        self._next_offset = offset
+        self._is_exhausted = False
+        self._counters = dict.fromkeys(
+            ("pages", "members", "discarded_pages"), 0
+        )
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику потока.
+
+        ### Возвращает:
+        - dict: Смещение, общее количество участников, счетчики
+          прочитанных страниц и участников и `discarded_pages` —
+          загруженных заранее страниц, которые не понадобились.
+        """
+        return {"offset": self.offset, "total": self.total, **self._counters}
+
+    @property
+    def exhausted(self) -> bool:
+        """Все участники группы отданы потребителю."""
+        return self._is_exhausted \
+            or (self.total is not None and self.offset >= self.total)
+
+    def _window(self) -> int:
+        """Сколько запросов может выполняться одновременно."""
+        if self.total is None:
+            return 1
+        return max(1, self.prefetch)
+
+    def _take_offset(self) -> int | None:
+        """Возвращает смещение следующей страницы для запроса."""
+
+        if (
+            self._is_exhausted
+            or (self.total is not None and self._next_offset >= self.total)
+            or (self.limit is not None and self._next_offset >= self.limit)
+        ):
+            return None
+
+        offset = self._next_offset
+        self._next_offset += self.page_size
+        return offset
+
+    def _accept(self, result) -> list[dict]:
+        """
+        Обрабатывает ответ на запрос страницы.
+
+        ### Исключения:
+        - VKAPIError: Если страницу не удалось получить.
+        """
+
+        response = result.raise_for_error().response
+        items = result.items
+        scanned = len(items)
+        if isinstance(response, dict):
+            if self.total is None:
+                self.total = response.get("count")
+            # Страницы, отфильтрованные на стороне VK, сообщают, сколько
+            # участников проверено, а отдают только подходящих
+            scanned = response.get("scanned", scanned)
+        if scanned < self.page_size:
+            self._is_exhausted = True
+
+        self.offset += scanned
+        self._counters["pages"] += 1
+        self._counters["members"] += scanned
+        return items
+
+
+class GroupMemberStream(_StreamState):
+    """
+    Поток участников группы с фоновой загрузкой следующих страниц.
+
+    Итерация по потоку отдает участников по одному, `pages()` — целыми
+    страницами. Ошибка загрузки страницы выбрасывается при чтении этой
+    страницы; уже прочитанные участники остаются у потребителя, а
+    `offset` указывает на первую непрочитанную позицию.
+
+    ### Аргументы:
+    - fetch_page (Callable[[int], APIResult]): Функция загрузки страницы
+      по смещению.
+    - offset (int): Смещение первого участника.
+    - page_size (int): Размер страницы.
+    - prefetch (int): Количество страниц, загружаемых заранее.
+    - limit (int, optional): Смещение, дальше которого результаты не
+      запрашиваются. Например, `users.search` отдает не больше 1000
+      результатов, сколько бы их ни было найдено.
+
+    ### Методы:
+    - `pages()`: Генератор страниц участников.
+    - `start()`: Начинает загрузку до первого чтения.
+    - `close()`: Останавливает загрузку.
+    - `stats()`: Возвращает статистику потока.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[int], object],
+        offset: int = 0,
+        page_size: int = MEMBERS_PAGE_SIZE,
+        prefetch: int = DEFAULT_PREFETCH,
+        limit: int | None = None
+    ) -> None:
+        super().__init__(offset, page_size, prefetch, limit)
+        self.__fetch_page = fetch_page
+        self.__in_flight: deque[Future] = deque()
+        self.__executor = get_prefetch_executor() if prefetch else None
+        self.__cancelled = threading.Event()
+
+    def pages(self) -> Iterator[list[dict]]:
+        """
+        Генератор страниц участников.
+
+        ### Исключения:
+        - VKAPIError: Если страницу не удалось получить.
+        """
+
+        while not self.closed:
+            if self.__executor is None:
+                offset = self._take_offset()
+                if offset is None:
+                    break
+                yield self._accept(self.__fetch_page(offset))
+                continue
+
+            self.__schedule()
+            if not self.__in_flight:
+                break
+
+            try:
+                items = self._accept(self.__in_flight.popleft().result())
+            except Exception:
+                self.close()
+                raise
+            # Следующие страницы запрашиваются до передачи текущей
+            # потребителю, чтобы загрузка шла во время ее обработки
+            self.__schedule()
+            yield items
+
+    def start(self) -> None:
+        """Запрашивает первую страницу, не дожидаясь чтения."""
+        if self.__executor is not None and not self.closed:
+            self.__schedule()
+
+    def __iter__(self) -> Iterator[dict]:
+        for page in self.pages():
+            yield from page
+
+    def close(self) -> None:
+        """
+        Отменяет запросы, еще не отправленные в VK.
+
+        Запросы в очереди пула отменяются сразу, а ожидающие разрешения
+        ограничителя частоты завершаются `RequestCancelled`.
+        """
+
+        if self.closed:
+            return
+
+        self.closed = True
+        self.__cancelled.set()
+        self._counters["discarded_pages"] += len(self.__in_flight)
+        for future in self.__in_flight:
+            future.cancel()
+        self.__in_flight.clear()
+
+    def __enter__(self) -> "GroupMemberStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __schedule(self) -> None:
+        """Дозаполняет окно упреждающих запросов."""
+
+        while len(self.__in_flight) < self._window():
+            offset = self._take_offset()
+            if offset is None:
+                return
+            # Контекст копируется, чтобы запрос учитывался ограничителем
+            # частоты за тем же пользователем (`current_user_id`) и
+            # прерывался при закрытии потока (`current_cancel_event`)
+            context = contextvars.copy_context()
+            context.run(current_cancel_event.set, self.__cancelled)
+            self.__in_flight.append(self.__executor.submit(
+                context.run, self.__fetch_page, offset
+            ))
+
+
+class AsyncGroupMemberStream(_StreamState):
+    """
+    Асинхронный аналог `GroupMemberStream`.
+
+    Страницы загружаются задачами `asyncio`, которые при закрытии потока
+    отменяются. `fetch_page` — корутинная функция.
+
+    ### Пример использования:
+    ```python
+    async with async_vk_service.iter_group_members(group_id) as stream:
+        async for page in stream.pages():
+            ...
+    ```
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[int], Awaitable[object]],
+        offset: int = 0,
+        page_size: int = MEMBERS_PAGE_SIZE,
+        prefetch: int = DEFAULT_PREFETCH,
+        limit: int | None = None
+    ) -> None:
+        super().__init__(offset, page_size, prefetch, limit)
+        self.__fetch_page = fetch_page
+        self.__in_flight: deque[asyncio.Task] = deque()
+
+    async def pages(self) -> AsyncIterator[list[dict]]:
+        """Асинхронная версия `GroupMemberStream.pages()`."""
+
+        while not self.closed:
+            if not self.prefetch:
+                offset = self._take_offset()
+                if offset is None:
+                    break
+                yield self._accept(await self.__fetch_page(offset))
+                continue
+
+            self.__schedule()
+            if not self.__in_flight:
+                break
+
+            try:
+                items = self._accept(await self.__in_flight.popleft())
+            except Exception:
+                await self.aclose()
+                raise
+            self.__schedule()
+            yield items
+
+    def start(self) -> None:
+        """Запрашивает первую страницу, не дожидаясь чтения."""
+        if self.prefetch and not self.closed:
+            self.__schedule()
+
+    async def __aiter__(self) -> AsyncIterator[dict]:
+        async for page in self.pages():
+            for member in page:
+                yield member
+
+    async def aclose(self) -> None:
+        """Отменяет задачи загрузки и дожидается их завершения."""
+
+        if self.closed:
+            return
+
+        self.closed = True
+        self._counters["discarded_pages"] += len(self.__in_flight)
+        tasks = list(self.__in_flight)
+        self.__in_flight.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> "AsyncGroupMemberStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def __schedule(self) -> None:
+        """Дозаполняет окно упреждающих запросов."""
+
+        while len(self.__in_flight) < self._window():
+            offset = self._take_offset()
+            if offset is None:
+                return
+            self.__in_flight.append(
+                asyncio.create_task(self.__fetch_page(offset))
+            )
+
+
+class _MultiStreamState:
+    """
+    Общая логика синхронного и асинхронного потоков нескольких групп:
+    очередь групп, удаление повторов и статистика.
+    """
+
+    def __init__(
+        self,
+        streams: dict[int, _StreamState],
+        concurrency: int
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError(
+                "Количество одновременно читаемых групп должно быть больше 0."
+            )
+
+        self.concurrency = concurrency
+        self.closed = False
+        self._streams = streams
+        self._pending = deque(streams)
+        self._errors: dict[int, Exception] = {}
+        self.__seen = CompactIntSet()
+        self.__duplicates = 0
+
+    @property
+    def offset(self) -> int:
+        """Сколько участников проверено во всех группах."""
+        return sum(
+            stream.stats()["members"] for stream in self._streams.values()
+        )
+
+    @property
+    def cursors(self) -> dict[int, int]:
+        """
+        Смещение первого непрочитанного участника каждой группы.
+
+        Курсор прочитанной до конца группы равен 0: следующий поиск
+        начнет ее с начала, а не с конца, где участников больше нет.
+        """
+        return {
+            group_id: 0 if stream.exhausted else stream.offset
+            for group_id, stream in self._streams.items()
+        }
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику потока.
+
+        ### Возвращает:
+        - dict: Количество проверенных участников, пропущенных повторов,
+          ошибки групп и статистику потоков групп (`groups`).
+        """
+        return {
+            "offset": self.offset,
+            "duplicates": self.__duplicates,
+            "unique_members": len(self.__seen),
+            "failed_groups": {
+                group_id: str(error)
+                for group_id, error in self._errors.items()
+            },
+            "groups": {
+                group_id: stream.stats()
+                for group_id, stream in self._streams.items()
+            },
+        }
+
+    def _dedupe(self, page: list[dict]) -> list[dict]:
+        """
+        Убирает участников, которые уже встречались в других группах.
+
+        Страница снимка группы (`handlers.member_snapshot.SnapshotPage`)
+        проверяется по столбцу ID и остается страницей снимка. Поток одной
+        группы повторов не содержит и отдает страницы как есть.
+        """
+
+        if len(self._streams) == 1:
+            return page
+        if isinstance(page, list):
+            unique = [
+                member for member in page if self.__seen.add(member["id"])
+            ]
+        else:
+            unique = page.take([
+                idx for idx, member_id in enumerate(page.id.tolist())
+                if self.__seen.add(member_id)
+            ])
+        self.__duplicates += len(page) - len(unique)
+        return unique
+
+    def _raise_if_nothing_read(self) -> None:
+        """
+        Выбрасывает последнюю ошибку, если ни одну группу не удалось
+        прочитать.
+        """
+        if self._errors and not self.offset:
+            raise next(reversed(self._errors.values()))
+
+
+class MultiGroupMemberStream(_MultiStreamState):
+    """
+    Поток участников нескольких групп.
+
+    Одновременно читается не больше `concurrency` групп: их страницы
+    загружаются параллельно, а потребителю отдаются по очереди. Когда
+    группа заканчивается, начинается чтение следующей. Ошибка чтения
+    группы исключает ее из поиска, не прерывая остальные.
+
+    ### Аргументы:
+    - streams (dict[int, GroupMemberStream]): Потоки участников по ID
+      групп в порядке обхода.
+    - concurrency (int): Количество одновременно читаемых групп.
+
+    ### Методы:
+    - `pages()`: Генератор страниц участников без повторов.
+    - `close()`: Закрывает потоки всех групп.
+    - `stats()`: Возвращает статистику потока.
+    """
+
+    def __init__(
+        self,
+        streams: dict[int, GroupMemberStream],
+        concurrency: int = DEFAULT_GROUP_CONCURRENCY
+    ) -> None:
+        super().__init__(streams, concurrency)
+
+    def pages(self) -> Iterator[list[dict]]:
+        """
+        Генератор страниц участников без повторов.
+
+        ### Исключения:
+        - VKAPIError: Если не удалось прочитать ни одну группу.
+        """
+
+        active: deque[tuple[int, Iterator[list[dict]]]] = deque()
+        while not self.closed:
+            while len(active) < self.concurrency and self._pending:
+                group_id = self._pending.popleft()
+                self._streams[group_id].start()
+                active.append((group_id, self._streams[group_id].pages()))
+            if not active:
+                break
+
+            group_id, pages = active.popleft()
+            try:
+                page = next(pages)
+            except StopIteration:
+                continue
+            except Exception as e:
+                self._errors[group_id] = e
+                continue
+
+            active.append((group_id, pages))
+            yield self._dedupe(page)
+
+        self._raise_if_nothing_read()
+
+    def close(self) -> None:
+        """Закрывает потоки всех групп."""
+        self.closed = True
+        for stream in self._streams.values():
+            stream.close()
+
+    def __enter__(self) -> "MultiGroupMemberStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncMultiGroupMemberStream(_MultiStreamState):
+    """Асинхронный аналог `MultiGroupMemberStream`."""
+
+    def __init__(
+        self,
+        streams: dict[int, AsyncGroupMemberStream],
+        concurrency: int = DEFAULT_GROUP_CONCURRENCY
+    ) -> None:
+        super().__init__(streams, concurrency)
+
+    async def pages(self) -> AsyncIterator[list[dict]]:
+        """Асинхронная версия `MultiGroupMemberStream.pages()`."""
+
+        active: deque[tuple[int, AsyncIterator[list[dict]]]] = deque()
+        while not self.closed:
+            while len(active) < self.concurrency and self._pending:
+                group_id = self._pending.popleft()
+                self._streams[group_id].start()
+                active.append((group_id, self._streams[group_id].pages()))
+            if not active:
+                break
+
+            group_id, pages = active.popleft()
+            try:
+                page = await anext(pages)
+            except StopAsyncIteration:
+                continue
+            except Exception as e:
+                self._errors[group_id] = e
+                continue
+
+            active.append((group_id, pages))
+            yield self._dedupe(page)
+
+        self._raise_if_nothing_read()
+
+    async def aclose(self) -> None:
+        """Закрывает потоки всех групп."""
+        self.closed = True
+        await asyncio.gather(
+            *(stream.aclose() for stream in self._streams.values())
+        )
+
+    async def __aenter__(self) -> "AsyncMultiGroupMemberStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
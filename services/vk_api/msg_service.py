@@ -1,9 +1,12 @@
 """Сервис для работы с сообщениями бота."""
 
 import os
+from vk_api.exceptions import ApiError
 from vk_api.keyboard import MAX_BUTTONS_ON_LINE, VkKeyboard, VkKeyboardColor
+from vk_api.utils import get_random_id
 
 from services.vk_api.auth_vk_service import AuthVKService
+from services.vk_api.rate_limiter import THROTTLE_ERROR_CODES, get_rate_limiter
 
 
 class MessageService:
@@ -11,6 +14,10 @@ class MessageService:
 
     def __init__(self, group_token: str = os.getenv("VK_GROUP_TOKEN")) -> None:
         self.vk = AuthVKService().auth_vk_group(group_token)
+        # Частоту запросов ограничивает общий ограничитель ключа сообщества,
+        # поэтому собственная задержка vk_api между запросами отключена
+        self.vk.RPS_DELAY = 0
+        self.rate_limiter = get_rate_limiter(group_token, "group")
 
     def send_message(
         self,
@@ -36,21 +43,31 @@ class MessageService:
         >>> send_message(123456, "Привет!")
         >>> send_message(123456, "Привет!", attachment="photo123456_123456")
         ```
+
+        Сообщение отправляется с уникальным `random_id`: если запрос
+        повторяется после обрыва соединения, VK не доставит сообщение
+        дважды.
         """
 
         if btns is not None:
             btns = self._create_markup(btns)
 
-        self.vk.method(
-            "messages.send",
-            {
-                "user_id": user_id,
-                "message": msg,
-                "keyboard": btns,
-                "attachment": attachment,
-                "random_id": 0
-            }
-        )
+        self.rate_limiter.acquire(user_id)
+        try:
+            self.vk.method(
+                "messages.send",
+                {
+                    "user_id": user_id,
+                    "message": msg,
+                    "keyboard": btns,
+                    "attachment": attachment,
+                    "random_id": get_random_id()
+                }
+            )
+        except ApiError as e:
+            if e.code in THROTTLE_ERROR_CODES:
+                self.rate_limiter.report_throttled()
+            raise
 
     def _create_markup(
         self, btns: dict[str, str | bool | list[dict[str, str]]]
@@ -0,0 +1,404 @@
+"""
+Общий для процесса ограничитель частоты запросов к VK API.
+
+VK ограничивает количество запросов в секунду для каждого ключа доступа:
+для ключа пользователя — 3 запроса, для ключа сообщества — 20. Все
+сервисы, работающие с одним ключом, получают один и тот же
+`RateLimiter` через `get_rate_limiter()` и перед каждым запросом
+получают у него разрешение.
+
+Ограничитель устроен как token bucket: разрешения выдаются равномерно
+с заданной частотой, поэтому поток запросов держится на пределе, но не
+превышает его. Ожидающие запросы обслуживаются по кругу между
+пользователями (пользователь берется из `current_user_id`), так что
+долгий поиск одного пользователя не задерживает ответы остальным.
+При ошибках VK 6 ("Слишком много запросов в секунду") и 9 ("Слишком
+много однотипных действий") частота временно снижается и затем
+постепенно восстанавливается.
+
+Синхронное ожидание разрешения можно прервать событием из
+`current_cancel_event`: так закрытый поток участников группы отзывает
+упреждающие запросы, которые еще ждут очереди, и они не расходуют
+лимит пользователя.
+
+### Переменные окружения:
+- `VK_USER_RPS`: Запросов в секунду для ключа пользователя.
+- `VK_GROUP_RPS`: Запросов в секунду для ключа сообщества.
+- `VK_RATE_BURST`: Сколько разрешений может накопиться за время простоя.
+
+Значение частоты 0 отключает ограничение.
+
+### Пример использования:
+```python
+limiter = get_rate_limiter(token, "user")
+with user_context(user_id):
+    limiter.acquire()
+    ...
+```
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+RATE_LIMITS = {
+    "user": float(os.getenv("VK_USER_RPS", "3")),
+    "group": float(os.getenv("VK_GROUP_RPS", "20")),
+}
+DEFAULT_BURST = int(os.getenv("VK_RATE_BURST", "1"))
+
+# Коды ошибок VK, при которых частота запросов снижается
+THROTTLE_ERROR_CODES = frozenset({6, 9})
+
+# Во сколько раз снижается частота при ошибке и ее нижняя граница
+SLOWDOWN_FACTOR = 0.5
+MIN_RATE_FACTOR = 0.1
+# Частота восстанавливается на 25% каждую секунду без ошибок
+RECOVERY_FACTOR = 1.25
+RECOVERY_INTERVAL = 1.0
+# Как часто ожидающий поток проверяет `current_cancel_event`, в секундах
+CANCEL_CHECK_INTERVAL = 0.1
+
+# Пользователь, от имени которого выполняется текущий запрос
+current_user_id: contextvars.ContextVar[int | None] = contextvars.ContextVar(
+    "current_user_id", default=None
+)
+
+
+# Событие, после которого ожидание разрешения прерывается
+current_cancel_event: contextvars.ContextVar[threading.Event | None] = (
+    contextvars.ContextVar("current_cancel_event", default=None)
+)
+
+
+class RequestCancelled(Exception):
+    """Запрос отменен до получения разрешения (`current_cancel_event`)."""
+
+
+@contextmanager
+def user_context(user_id: int | None) -> Iterator[None]:
+    """Устанавливает `current_user_id` на время выполнения блока."""
+
+    token = current_user_id.set(user_id)
+    try:
+        yield
+    finally:
+        current_user_id.reset(token)
+
+
+class _Ticket:
+    """Ожидающий запрос разрешения."""
+
+    __slots__ = ("user_id", "created_at", "event", "future", "loop")
+
+    def __init__(self, user_id: int | None) -> None:
+        self.user_id = user_id
+        self.created_at = time.monotonic()
+        self.event: threading.Event | None = None
+        self.future: asyncio.Future | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    def wake(self) -> None:
+        """Сообщает ожидающему, что разрешение выдано."""
+        if self.future is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.__resolve)
+            except RuntimeError:
+                # Цикл событий уже закрыт, ожидать разрешение некому
+                pass
+        else:
+            self.event.set()
+
+    def __resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class RateLimiter:
+    """
+    Token bucket с честной очередью по пользователям.
+
+    Разрешения выдаются сразу, если очередь пуста и есть свободный токен.
+    Иначе запрос ставится в очередь своего пользователя, а фоновый поток
+    выдает разрешения по мере пополнения токенов, по одному пользователю
+    за раз по кругу.
+
+    ### Аргументы:
+    - rate (float): Количество разрешений в секунду. 0 отключает
+      ограничение.
+    - burst (int): Максимальное количество накопленных разрешений.
+    - name (str): Имя ограничителя для статистики.
+
+    ### Методы:
+    - `acquire()`: Ожидает разрешение в текущем потоке.
+    - `acquire_async()`: Ожидает разрешение в цикле событий.
+    - `report_throttled()`: Сообщает об ошибке превышения частоты.
+    - `stats()`: Возвращает статистику ограничителя.
+    """
+
+    def __init__(
+        self, rate: float, burst: int = DEFAULT_BURST, name: str = ""
+    ) -> None:
+        self.name = name
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+
+        self.__cond = threading.Condition()
+        self.__tokens = float(self.burst)
+        self.__updated_at = time.monotonic()
+        self.__throttled_at = 0.0
+        self.__pending: dict[int | None, deque[_Ticket]] = {}
+        self.__turns: deque[int | None] = deque()
+        self.__granter: threading.Thread | None = None
+        self.__counters = dict.fromkeys(
+            ("granted", "queued", "throttled", "cancelled"), 0
+        )
+        self.__wait_time = 0.0
+        self.__max_wait = 0.0
+
+    @property
+    def is_unlimited(self) -> bool:
+        """Ограничение отключено."""
+        return self.base_rate <= 0
+
+    def acquire(self, user_id: int | None = None) -> None:
+        """
+        Ожидает разрешение на запрос, блокируя текущий поток.
+
+        ### Аргументы:
+        - user_id (int, optional): Пользователь, от имени которого
+          выполняется запрос. По умолчанию — `current_user_id`.
+
+        ### Исключения:
+        - RequestCancelled: Если событие `current_cancel_event`
+          установлено до выдачи разрешения.
+        """
+
+        cancel_event = current_cancel_event.get()
+        if cancel_event is not None and cancel_event.is_set():
+            raise RequestCancelled("Запрос отменен до отправки.")
+
+        ticket = self.__enqueue(user_id)
+        if ticket is None:
+            return
+
+        if cancel_event is None:
+            ticket.event.wait()
+            return
+
+        while not ticket.event.wait(CANCEL_CHECK_INTERVAL):
+            if cancel_event.is_set() and self.__cancel(ticket):
+                raise RequestCancelled("Запрос отменен в очереди.")
+
+    async def acquire_async(self, user_id: int | None = None) -> None:
+        """Ожидает разрешение на запрос, не блокируя цикл событий."""
+
+        ticket = self.__enqueue(user_id, is_async=True)
+        if ticket is None:
+            return
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            self.__cancel(ticket)
+            raise
+
+    def report_throttled(self) -> None:
+        """
+        Сообщает об ошибке VK 6 или 9.
+
+        Частота снижается в `1 / SLOWDOWN_FACTOR` раз (но не ниже
+        `MIN_RATE_FACTOR` от исходной), накопленные токены сгорают.
+        """
+
+        if self.is_unlimited:
+            return
+
+        with self.__cond:
+            self.rate = max(
+                self.base_rate * MIN_RATE_FACTOR, self.rate * SLOWDOWN_FACTOR
+            )
+            self.__tokens = 0.0
+            self.__throttled_at = time.monotonic()
+            self.__counters["throttled"] += 1
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику ограничителя.
+
+        ### Возвращает:
+        - dict: Имя, исходная и текущая частота, количество ожидающих
+          запросов и пользователей, счетчики `granted` (выдано
+          разрешений), `queued` (из них после ожидания в очереди),
+          `throttled` (ошибок 6/9), `cancelled` и время ожидания в очереди
+          (`wait_time_total`, `wait_time_max`) в секундах.
+        """
+
+        with self.__cond:
+            return {
+                "name": self.name,
+                "base_rate": self.base_rate,
+                "rate": round(self.rate, 3),
+                "waiting": sum(map(len, self.__pending.values())),
+                "users_waiting": len(self.__pending),
+                **self.__counters,
+                "wait_time_total": round(self.__wait_time, 6),
+                "wait_time_max": round(self.__max_wait, 6),
+            }
+
+    def __enqueue(self, user_id: int | None, is_async: bool = False) \
+        -> _Ticket | None:
+        """
+        Выдает разрешение сразу или ставит запрос в очередь.
+
+        ### Возвращает:
+        - _Ticket | None: Билет ожидания или None, если разрешение выдано.
+        """
+
+        if self.is_unlimited:
+            return None
+
+        if user_id is None:
+            user_id = current_user_id.get()
+
+        with self.__cond:
+            self.__refill()
+            if not self.__pending and self.__tokens >= 1:
+                self.__tokens -= 1
+                self.__counters["granted"] += 1
+                return None
+
+            ticket = _Ticket(user_id)
+            if is_async:
+                ticket.loop = asyncio.get_running_loop()
+                ticket.future = ticket.loop.create_future()
+            else:
+                ticket.event = threading.Event()
+
+            user_tickets = self.__pending.get(user_id)
+            if user_tickets is None:
+                user_tickets = self.__pending[user_id] = deque()
+                self.__turns.append(user_id)
+            user_tickets.append(ticket)
+
+            self.__ensure_granter()
+            self.__cond.notify()
+            return ticket
+
+    def __cancel(self, ticket: _Ticket) -> bool:
+        """
+        Убирает из очереди билет отмененного запроса.
+
+        ### Возвращает:
+        - bool: False, если разрешение уже выдано.
+        """
+
+        with self.__cond:
+            user_tickets = self.__pending.get(ticket.user_id)
+            if not user_tickets or ticket not in user_tickets:
+                return False
+
+            user_tickets.remove(ticket)
+            self.__counters["cancelled"] += 1
+            if not user_tickets:
+                del self.__pending[ticket.user_id]
+                self.__turns.remove(ticket.user_id)
+            return True
+
+    def __refill(self) -> None:
+        """Пополняет токены и восстанавливает частоту после ошибок."""
+
+        now = time.monotonic()
+        if (
+            self.rate < self.base_rate
+            and now - self.__throttled_at >= RECOVERY_INTERVAL
+        ):
+            self.rate = min(self.base_rate, self.rate * RECOVERY_FACTOR)
+            self.__throttled_at = now
+
+        self.__tokens = min(
+            self.burst,
+            self.__tokens + (now - self.__updated_at) * self.rate
+        )
+        self.__updated_at = now
+
+    def __ensure_granter(self) -> None:
+        """Запускает поток выдачи разрешений. Вызывается под блокировкой."""
+
+        if self.__granter is None:
+            self.__granter = threading.Thread(
+                target=self.__grant_loop,
+                name=f"rate-limiter-{self.name}",
+                daemon=True
+            )
+            self.__granter.start()
+
+    def __grant_loop(self) -> None:
+        """Выдает разрешения ожидающим запросам по кругу пользователей."""
+
+        with self.__cond:
+            while True:
+                if not self.__pending:
+                    self.__cond.wait()
+                    continue
+
+                self.__refill()
+                if self.__tokens < 1:
+                    self.__cond.wait((1 - self.__tokens) / self.rate)
+                    continue
+
+                user_id = self.__turns.popleft()
+                user_tickets = self.__pending[user_id]
+                ticket = user_tickets.popleft()
+                if user_tickets:
+                    self.__turns.append(user_id)
+                else:
+                    del self.__pending[user_id]
+
+                self.__tokens -= 1
+                self.__counters["granted"] += 1
+                self.__counters["queued"] += 1
+                waited = time.monotonic() - ticket.created_at
+                self.__wait_time += waited
+                self.__max_wait = max(self.__max_wait, waited)
+                ticket.wake()
+
+
+_limiters: dict[tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(token: str, token_class: str = "user") -> RateLimiter:
+    """
+    Возвращает общий ограничитель для ключа доступа.
+
+    ### Аргументы:
+    - token (str): Ключ доступа.
+    - token_class (str): Тип ключа: `user` или `group`. Определяет
+      частоту по умолчанию из `RATE_LIMITS`.
+    """
+
+    key = (token_class, token)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = _limiters[key] = RateLimiter(
+                    RATE_LIMITS.get(token_class, RATE_LIMITS["user"]),
+                    name=f"{token_class}-{len(_limiters) + 1}"
+                )
+    return limiter
+
+
+def rate_limiter_stats() -> list[dict]:
+    """Возвращает статистику всех созданных ограничителей."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
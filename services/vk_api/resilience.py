@@ -0,0 +1,263 @@
+"""
+Повторы запросов и автоматический выключатель для VK API.
+
+`RetryPolicy` решает, стоит ли повторять запрос после ошибки VK, и
+вычисляет задержку перед повтором: экспоненциальный рост с полным
+случайным разбросом (full jitter), чтобы повторы разных потоков не
+приходили в VK одновременно.
+
+`CircuitBreaker` отслеживает сбои каждого метода API. После
+`failure_threshold` сбоев подряд выключатель размыкается, и запросы
+к методу сразу завершаются ошибкой, не нагружая недоступный VK. Через
+`reset_timeout` секунд пропускается один пробный запрос: успех замыкает
+выключатель, сбой снова размыкает его. Если пробный запрос прерван
+(например, отменой задачи `asyncio`), выключатель освобождает его
+(`release_probe()`), и следующий запрос снова становится пробным.
+
+Счетчики повторов, срабатываний и время восстановления доступны через
+`resilience_stats()`.
+
+### Переменные окружения:
+- `VK_RETRY_ATTEMPTS`: Максимальное количество попыток запроса.
+- `VK_RETRY_BASE_DELAY`, `VK_RETRY_MAX_DELAY`: Базовая и максимальная
+  задержка между попытками в секундах.
+- `VK_BREAKER_THRESHOLD`: Количество сбоев подряд до размыкания.
+- `VK_BREAKER_RESET`: Время до пробного запроса в секундах.
+"""
+
+import os
+import random
+import threading
+import time
+
+from utils.metrics import CounterRegistry, HistogramRegistry
+
+DEFAULT_RETRY_ATTEMPTS = int(os.getenv("VK_RETRY_ATTEMPTS", "4"))
+DEFAULT_RETRY_BASE_DELAY = float(os.getenv("VK_RETRY_BASE_DELAY", "0.5"))
+DEFAULT_RETRY_MAX_DELAY = float(os.getenv("VK_RETRY_MAX_DELAY", "8"))
+DEFAULT_BREAKER_THRESHOLD = int(os.getenv("VK_BREAKER_THRESHOLD", "5"))
+DEFAULT_BREAKER_RESET = float(os.getenv("VK_BREAKER_RESET", "30"))
+
+# Временные ошибки VK, после которых запрос имеет смысл повторить:
+# 1 — неизвестная ошибка, 6 — слишком много запросов в секунду,
+# 9 — слишком много однотипных действий, 10 — внутренняя ошибка сервера
+RETRYABLE_ERROR_CODES = frozenset({1, 6, 9, 10})
+
+# Ошибки, которые говорят о проблемах на стороне VK и учитываются
+# выключателем. Ошибки запроса (нет доступа, неверный параметр) — нет
+SERVER_ERROR_CODES = frozenset({1, 10})
+
+# Счетчики и время восстановления, общие для всех сервисов процесса
+counters = CounterRegistry()
+recovery_time = HistogramRegistry(
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+
+
+class RetryPolicy:
+    """
+    Политика повторов по коду ошибки VK.
+
+    ### Аргументы:
+    - max_attempts (int): Максимальное количество попыток, включая первую.
+    - base_delay (float): Задержка перед первым повтором в секундах.
+    - max_delay (float): Верхняя граница задержки в секундах.
+    - retryable_codes (frozenset[int]): Коды ошибок VK, которые
+      повторяются. Сетевые ошибки (код None) повторяются всегда.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_RETRY_ATTEMPTS,
+        base_delay: float = DEFAULT_RETRY_BASE_DELAY,
+        max_delay: float = DEFAULT_RETRY_MAX_DELAY,
+        retryable_codes: frozenset[int] = RETRYABLE_ERROR_CODES
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable_codes = retryable_codes
+
+    def should_retry(self, error_code: int | None, attempt: int) -> bool:
+        """
+        Проверяет, нужно ли повторить запрос.
+
+        ### Аргументы:
+        - error_code (int | None): Код ошибки VK или None для сетевой
+          ошибки.
+        - attempt (int): Номер неудавшейся попытки, начиная с 1.
+        """
+
+        if attempt >= self.max_attempts:
+            return False
+        return error_code is None or error_code in self.retryable_codes
+
+    def get_delay(self, attempt: int) -> float:
+        """Задержка перед следующей попыткой (full jitter)."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+class CircuitOpenError(Exception):
+    """Выключатель метода разомкнут, запрос не выполнялся."""
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель одного метода API.
+
+    ### Аргументы:
+    - name (str): Имя метода API.
+    - failure_threshold (int): Количество сбоев подряд до размыкания.
+    - reset_timeout (float): Время до пробного запроса в секундах.
+
+    ### Методы:
+    - `before_request()`: Проверяет, можно ли выполнить запрос.
+    - `record_success()`: Отмечает успешный запрос.
+    - `record_failure()`: Отмечает сбой.
+    - `release_probe()`: Освобождает прерванный пробный запрос.
+    - `stats()`: Возвращает состояние выключателя.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+        reset_timeout: float = DEFAULT_BREAKER_RESET
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+
+        self.__lock = threading.Lock()
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__first_opened_at: float | None = None
+        self.__probe_in_flight = False
+
+    def before_request(self) -> bool:
+        """
+        Проверяет, можно ли выполнить запрос.
+
+        ### Возвращает:
+        - bool: True, если запрос пробный. Если такой запрос завершится
+          без `record_success()` или `record_failure()`, нужно вызвать
+          `release_probe()`.
+
+        ### Исключения:
+        - CircuitOpenError: Если выключатель разомкнут или пробный запрос
+          уже выполняется.
+        """
+
+        with self.__lock:
+            if self.state == self.CLOSED:
+                return False
+
+            if (
+                self.state == self.OPEN
+                and time.monotonic() - self.__opened_at >= self.reset_timeout
+            ):
+                self.state = self.HALF_OPEN
+
+            if self.state == self.HALF_OPEN and not self.__probe_in_flight:
+                self.__probe_in_flight = True
+                return True
+
+        counters.inc(f"breaker_rejected.{self.name}")
+        raise CircuitOpenError(
+            f"Метод {self.name} временно недоступен: выключатель разомкнут."
+        )
+
+    def record_success(self) -> None:
+        """Отмечает успешный запрос и замыкает выключатель."""
+
+        with self.__lock:
+            self.__failures = 0
+            self.__probe_in_flight = False
+            if self.state == self.CLOSED:
+                return
+
+            self.state = self.CLOSED
+            recovered_in = time.monotonic() - self.__first_opened_at
+            self.__first_opened_at = None
+
+        counters.inc(f"breaker_recoveries.{self.name}")
+        recovery_time.observe(self.name, recovered_in)
+
+    def record_failure(self) -> None:
+        """Отмечает сбой и при необходимости размыкает выключатель."""
+
+        with self.__lock:
+            self.__failures += 1
+            self.__probe_in_flight = False
+            if (
+                self.state == self.CLOSED
+                and self.__failures < self.failure_threshold
+            ):
+                return
+
+            is_trip = self.state == self.CLOSED
+            self.state = self.OPEN
+            self.__opened_at = time.monotonic()
+            if self.__first_opened_at is None:
+                self.__first_opened_at = self.__opened_at
+
+        if is_trip:
+            counters.inc(f"breaker_trips.{self.name}")
+
+    def release_probe(self) -> None:
+        """
+        Освобождает пробный запрос, завершившийся без результата.
+
+        Состояние выключателя не меняется: следующий запрос снова
+        становится пробным.
+        """
+        with self.__lock:
+            self.__probe_in_flight = False
+
+    def stats(self) -> dict:
+        """Возвращает состояние выключателя."""
+        with self.__lock:
+            return {"state": self.state, "failures": self.__failures}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(method: str) -> CircuitBreaker:
+    """Возвращает общий для процесса выключатель метода API."""
+
+    breaker = _breakers.get(method)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(method, CircuitBreaker(method))
+    return breaker
+
+
+def resilience_stats() -> dict:
+    """
+    Возвращает счетчики повторов и выключателей.
+
+    ### Возвращает:
+    - dict: Ключи `counters` (`retries.<метод>`, `failures.<метод>`,
+      `breaker_trips.<метод>`, `breaker_rejected.<метод>`,
+      `breaker_recoveries.<метод>`), `recovery_time` (гистограммы времени
+      от размыкания до восстановления в секундах) и `breakers` (текущее
+      состояние выключателей).
+    """
+
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {
+        "counters": counters.as_dict(),
+        "recovery_time": recovery_time.as_dict(),
+        "breakers": {
+            name: breaker.stats() for name, breaker in sorted(breakers.items())
+        },
+    }
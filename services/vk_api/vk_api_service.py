@@ -1,23 +1,170 @@
 """Сервис для работы с API ВКонтакте"""
 
 import os
+import time
 import requests
 
 from dotenv import load_dotenv
 from services.formatters.module_formatters import get_module_part
+from services.vk_api.http_transport import HTTPTransport, get_transport
+from services.vk_api.member_cache import get_member_cache
+from services.vk_api.member_stream import (
+    DEFAULT_PREFETCH, MEMBERS_PAGE_SIZE, GroupMemberStream
+)
+from services.vk_api.rate_limiter import (
+    THROTTLE_ERROR_CODES, get_rate_limiter
+)
+from services.vk_api.resilience import (
+    SERVER_ERROR_CODES, CircuitBreaker, CircuitOpenError, RetryPolicy,
+    counters, get_circuit_breaker
+)
 from utils.logging.setup import setup_logger
 
 load_dotenv()
 
+# Поля профиля, по которым фильтруются кандидаты в мэтчи
+MEMBER_FIELDS = (
+    "city,sex,last_seen,bdate,relation,can_write_private_message"
+)
+
+# Количество страниц groups.getMembers, обрабатываемых одним вызовом
+# execute в режиме фильтрации на стороне VK. Кроме времени выполнения VK
+# ограничивает количество операций программы (ошибка 13), а проверка
+# каждого участника — несколько операций, поэтому страниц намного
+# меньше, чем допустимых обращений к API
+EXECUTE_MEMBER_PAGES = int(os.getenv("VK_EXECUTE_MEMBER_PAGES", "2"))
+
+# Программа VKScript для `fetch_group_members_filtered`: читает
+# страницы участников и оставляет только тех, кто проходит фильтр по
+# полу, городу и возможности написать сообщение. Возраст и семейное
+# положение проверяет `SearchHandler.filter_members`. Вместо числа
+# участников в поле `scanned` возвращается количество проверенных.
+# Неудавшееся обращение к API внутри программы возвращает false: тогда
+# программа завершается с `failed`, и ответ считается ошибкой
+# (`VKApiService.fetch_group_members_filtered`), а не концом группы.
+# Операция `@.` не подходит для чтения полей: у удаленных участников
+# полей нет, и массивы полей разошлись бы с массивом участников
+FILTER_MEMBERS_CODE = """
+var group_id = %(group_id)d;
+var offset = %(offset)d;
+var pages = %(pages)d;
+var sex = %(sex)d;
+var city = %(city)d;
+var items = [];
+var count = 0;
+var scanned = 0;
+var page_idx = 0;
+while (page_idx < pages) {
+    var page = API.groups.getMembers({
+        "group_id": group_id, "offset": offset + scanned,
+        "count": %(page_size)d,
+        "fields": "%(fields)s"
+    });
+    if (!page) {
+        return {"count": count, "scanned": scanned, "items": [], "failed": 1};
+    }
+    count = page.count;
+    var members = page.items;
+    var n = members.length;
+    var i = 0;
+    while (i < n) {
+        var member = members[i];
+        if (member.can_write_private_message == 1
+            && (sex == 0 || member.sex == sex) && member.city) {
+            if (member.city.id == city) {
+                items.push(member);
+            }
+        }
+        i = i + 1;
+    }
+    scanned = scanned + n;
+    page_idx = page_idx + 1;
+    if (n < %(page_size)d) {
+        page_idx = pages;
+    }
+}
+return {"count": count, "scanned": scanned, "items": items};
+"""
+
+# users.search отдает не больше 1000 результатов по одному запросу
+USERS_SEARCH_MAX_RESULTS = 1000
+USERS_SEARCH_PAGE_SIZE = int(os.getenv("VK_USERS_SEARCH_PAGE_SIZE", "100"))
+
 
 class VKAPIError(Exception):
-    """Базовый класс для исключений VK API."""
+    """
+    Базовый класс для исключений VK API.
+
+    ### Атрибуты:
+    - code (int | None): Код ошибки VK. None для сетевых ошибок и
+      отказов выключателя.
+    """
+
+    def __init__(self, message: str = "", code: int | None = None) -> None:
+        super().__init__(message)
+        self.code = code
 
 
 class VKAPIAuthError(VKAPIError):
     """Исключение при авторизации VK API."""
 
 
+class APIResult:
+    """
+    Результат вызова метода API.
+
+    Позволяет отличить пустой ответ ("в группе больше нет участников") от
+    неудавшегося запроса ("VK не ответил").
+
+    ### Атрибуты:
+    - method (str): Название метода.
+    - data (dict): Ответ VK целиком. Пустой словарь при ошибке.
+    - error (VKAPIError | None): Ошибка, если запрос не удался.
+    """
+
+    __slots__ = ("method", "data", "error")
+
+    def __init__(
+        self, method: str, data: dict | None = None,
+        error: VKAPIError | None = None
+    ) -> None:
+        self.method = method
+        self.data = data if data is not None else {}
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        """Запрос выполнен успешно."""
+        return self.error is None
+
+    @property
+    def response(self) -> dict | list:
+        """Поле `response` ответа."""
+        return self.data.get("response", {})
+
+    @property
+    def items(self) -> list:
+        """Поле `items` ответа со списком объектов."""
+        response = self.response
+        return response.get("items", []) if isinstance(response, dict) else []
+
+    @property
+    def is_empty(self) -> bool:
+        """Запрос успешен, но не вернул ни одного объекта."""
+        return self.ok and not self.items
+
+    def raise_for_error(self) -> "APIResult":
+        """
+        Возвращает результат или выбрасывает ошибку запроса.
+
+        ### Исключения:
+        - VKAPIError: Если запрос не удался.
+        """
+        if self.error is not None:
+            raise self.error
+        return self
+
+
 class VKApiService:
     """
     Сервис для работы с API ВКонтакте.
@@ -27,13 +174,25 @@ class VKApiService:
 
     api_url = "https://api.vk.com/method/"
 
-    def __init__(self) -> None:
-        self.token = os.getenv("VK_TOKEN")
+    # Максимальное количество обращений к API внутри одного `execute`
+    EXECUTE_MAX_CALLS = 25
+
+    def __init__(
+        self,
+        token: str | None = None,
+        transport: HTTPTransport | None = None,
+        token_class: str = "user"
+    ) -> None:
+        self.token = token or os.getenv("VK_TOKEN")
         self.api_version = "5.199"
         self.logger = setup_logger(
             module_name=get_module_part(__name__), logger_name=__name__
         )
         self.timeout = 10
+        # Пул keep-alive соединений, общий для всех экземпляров сервиса
+        self.transport = transport or get_transport()
+        # Снимки участников групп, общие для всех пользователей процесса
+        self.member_cache = get_member_cache()
 
         self.error_messages = {
             1: "Произошла неизвестная ошибка.",
@@ -68,19 +227,130 @@ class VKApiService:
                 "VK API token не найден в переменных окружениях"
             )
 
-    def search_users(self) -> list[dict]:
-        """Поиск пользователей по заданным параметрам."""
+        # Ограничитель частоты, общий для всех сервисов с этим ключом
+        self.rate_limiter = get_rate_limiter(self.token, token_class)
+        self.retry_policy = RetryPolicy()
 
-        params = {
-            "count": 100,
-            "sort": 0,
-            "age_from": 18,
-            "age_to": 99,
-            "status": 6,
-        }
+    def call_method(self, method: str, params: dict | None = None) \
+        -> dict | list:
+        """
+        Вызывает произвольный метод API и возвращает поле `response`.
 
-        response = self._make_request("users.search", params)
-        return response.get("response", {}).get("items", [])
+        ### Возвращает:
+        - dict | list: Содержимое поля `response` либо пустой словарь
+          при ошибке.
+        """
+
+        response = self._make_request(method, dict(params or {}))
+        return response.get("response", {})
+
+    def search_users(self, **criteria: any) -> list[dict]:
+        """
+        Поиск пользователей по заданным параметрам.
+
+        ### Аргументы:
+        - criteria: Параметры метода `users.search` (`city`, `sex`,
+          `age_from`, `age_to`, `status` и т.д.).
+        """
+        return self.fetch_users_search(criteria).items
+
+    def fetch_group_members_filtered(
+        self,
+        group_id: int,
+        offset: int,
+        sex: int,
+        city_id: int,
+        pages: int = EXECUTE_MEMBER_PAGES
+    ) -> APIResult:
+        """
+        Получение подходящих участников нескольких страниц группы одним
+        вызовом `execute`.
+
+        Страницы `groups.getMembers` читаются и фильтруются по полу,
+        городу и возможности написать сообщение программой VKScript,
+        поэтому VK возвращает только подходящих участников.
+
+        ### Аргументы:
+        - group_id (int): Идентификатор группы.
+        - offset (int): Смещение первого участника.
+        - sex (int): Пол, 0 — любой.
+        - city_id (int): ID города.
+        - pages (int): Количество страниц по `MEMBERS_PAGE_SIZE`.
+
+        ### Возвращает:
+        - APIResult: Ответ с ключами `count` (участников в группе),
+          `scanned` (проверено участников) и `items` (подходящие). Если
+          обращение к `groups.getMembers` внутри программы не удалось,
+          результат содержит ошибку.
+        """
+        return self._check_filtered_members(self.request(
+            "execute", {"code": self._filter_members_code(
+                group_id, offset, sex, city_id, pages
+            )}
+        ))
+
+    def iter_group_members_filtered(
+        self,
+        group_id: int,
+        sex: int,
+        city_id: int,
+        offset: int = 0,
+        pages: int = EXECUTE_MEMBER_PAGES,
+        prefetch: int = DEFAULT_PREFETCH
+    ) -> GroupMemberStream:
+        """
+        Поток подходящих участников группы через
+        `fetch_group_members_filtered`. Каждая "страница" потока —
+        подходящие участники `pages` страниц группы.
+        """
+        return GroupMemberStream(
+            lambda page_offset: self.fetch_group_members_filtered(
+                group_id, page_offset, sex, city_id, pages
+            ),
+            offset,
+            page_size=pages * MEMBERS_PAGE_SIZE,
+            prefetch=prefetch
+        )
+
+    def fetch_users_search(
+        self,
+        criteria: dict[str, any],
+        offset: int = 0,
+        count: int = USERS_SEARCH_PAGE_SIZE
+    ) -> APIResult:
+        """
+        Получение страницы результатов `users.search` с результатом запроса.
+
+        Участникам возвращаются те же поля, что и `groups.getMembers`,
+        поэтому результаты фильтруются так же, как участники группы.
+        """
+        return self.request("users.search", {
+            **criteria,
+            "count": count,
+            "offset": offset,
+            "fields": MEMBER_FIELDS,
+        })
+
+    def iter_users_search(
+        self,
+        criteria: dict[str, any],
+        page_size: int = USERS_SEARCH_PAGE_SIZE,
+        prefetch: int = DEFAULT_PREFETCH
+    ) -> GroupMemberStream:
+        """
+        Поток результатов `users.search`.
+
+        VK отдает не больше `USERS_SEARCH_MAX_RESULTS` результатов на
+        запрос, поэтому поток не запрашивает страницы дальше этой границы.
+        """
+        return GroupMemberStream(
+            lambda page_offset: self.fetch_users_search(
+                criteria, page_offset, page_size
+            ),
+            page_size=page_size,
+            prefetch=prefetch,
+            limit=USERS_SEARCH_MAX_RESULTS
+        )
 
     def get_user_info(self, user_id: int) -> dict:
         """Получение информации о пользователе по его ID."""
@@ -100,6 +370,68 @@ class VKApiService:
         response = self._make_request("photos.get", params)
         return response.get("response", {})
 
+    def execute(self, code: str) -> dict:
+        """
+        Выполняет код VKScript методом `execute`.
+
+        ### Аргументы:
+        - code (str): Код VKScript. Внутри одного вызова допускается не
+          более `EXECUTE_MAX_CALLS` обращений к API.
+
+        ### Возвращает:
+        - dict: Ответ с ключами `response` (результат кода) и
+          `execute_errors` (ошибки отдельных обращений к API внутри кода,
+          если они были). Пустой словарь при ошибке запроса.
+        """
+        return self._make_request("execute", {"code": code})
+
+    def get_profile_photo_ids(self, user_ids: list[int]) \
+        -> dict[int, int | None]:
+        """
+        Получение ID последней фотографии профиля для списка пользователей.
+
+        Запросы `photos.get` объединяются в вызовы `execute` по
+        `EXECUTE_MAX_CALLS` штук, поэтому 25 пользователей обрабатываются
+        за один запрос к API. Ошибка отдельного `photos.get` (закрытый
+        профиль, запрещенный доступ к альбому) не влияет на остальных
+        пользователей пакета.
+
+        ### Аргументы:
+        - user_ids (list[int]): ID пользователей.
+
+        ### Возвращает:
+        - dict: Словарь "ID пользователя -> ID фотографии". Для
+          пользователей без доступных фотографий значение равно None.
+        """
+
+        photo_ids: dict[int, int | None] = {}
+
+        for start in range(0, len(user_ids), self.EXECUTE_MAX_CALLS):
+            batch = user_ids[start:start + self.EXECUTE_MAX_CALLS]
+            calls = ",".join(
+                f'API.photos.get({{"owner_id": {int(user_id)}, '
+                f'"album_id": "profile", "rev": 1, "count": 1}})'
+                for user_id in batch
+            )
+            data = self.execute(f"return [{calls}];")
+
+            if data.get("execute_errors"):
+                self.logger.info(
+                    "Фотографии недоступны для %d из %d пользователей.",
+                    len(data["execute_errors"]), len(batch)
+                )
+
+            # Неудавшиеся обращения к API возвращают false на своей позиции
+            results = data.get("response") or []
+            for idx, user_id in enumerate(batch):
+                result = results[idx] if idx < len(results) else None
+                items = (
+                    result.get("items") if isinstance(result, dict) else None
+                )
+                photo_ids[user_id] = items[0].get("id") if items else None
+
+        return photo_ids
+
     def get_city_info(self, query: str) -> dict:
         """Получение информации о городе по его названию через API ВКонтакте."""
 
@@ -119,14 +451,24 @@ class VKApiService:
 
         return {}
 
-    def get_group_info(self, city_id: int, query: str) -> list[dict]:
-        """Поиск групп по заданному запросу."""
+    def get_group_info(self, city_id: int, query: str, count: int = 1) \
+        -> list[dict]:
+        """
+        Поиск групп по заданному запросу.
+
+        Группы отсортированы по убыванию количества участников.
+
+        ### Аргументы:
+        - city_id (int): ID города.
+        - query (str): Поисковый запрос.
+        - count (int): Количество групп.
+        """
 
         params = {
             "q": query,
             "city_id": city_id,
             "sort": 6,
-            "count": 1,
+            "count": count,
         }
 
         response = self._make_request("groups.search", params)
@@ -134,45 +476,203 @@ class VKApiService:
 
     def get_group_members(self, group_id: int, offset: int = 0) -> list[dict]:
         """Получение списка участников группы."""
+        return self.fetch_group_members(group_id, offset).items
 
-        params = {
+    def fetch_group_members(self, group_id: int, offset: int = 0) \
+        -> APIResult:
+        """
+        Получение страницы участников группы с результатом запроса.
+
+        В отличие от `get_group_members`, позволяет отличить конец списка
+        участников от неудавшегося запроса. Страницы берутся из общего
+        кэша `member_cache`, если группу недавно читал другой поиск.
+        """
+        return self.member_cache.fetch_page(
+            group_id, offset,
+            lambda: self.request(
+                "groups.getMembers",
+                self._group_members_params(group_id, offset)
+            )
+        )
+
+    def iter_group_members(
+        self,
+        group_id: int,
+        offset: int = 0,
+        prefetch: int = DEFAULT_PREFETCH
+    ) -> GroupMemberStream:
+        """
+        Поток участников группы с упреждающей загрузкой страниц.
+
+        ### Аргументы:
+        - group_id (int): Идентификатор группы.
+        - offset (int): Смещение первого участника.
+        - prefetch (int): Количество страниц, загружаемых заранее.
+
+        ### Пример использования:
+        ```python
+        with vk_service.iter_group_members(group_id) as stream:
+            for member in stream:
+                ...
+        ```
+        """
+        return GroupMemberStream(
+            lambda page_offset: self.fetch_group_members(
+                group_id, page_offset
+            ),
+            offset,
+            prefetch=prefetch
+        )
+
+    def request(self, method: str, params: dict[str, any]) -> APIResult:
+        """
+        Выполняет запрос к VK API с повторами и выключателем.
+
+        Временные ошибки (сеть, коды `RETRYABLE_ERROR_CODES`) повторяются
+        по `retry_policy`. Если выключатель метода разомкнут, запрос не
+        выполняется.
+
+        ### Возвращает:
+        - APIResult: Результат запроса.
+        """
+
+        url = self.api_url + method
+        params = self._prepare_params(params)
+        breaker = get_circuit_breaker(method)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            is_probe = False
+            try:
+                is_probe = breaker.before_request()
+                self.rate_limiter.acquire()
+                response = self.transport.get(
+                    url, params=params, method=method
+                )
+                data = self._handle_response_errors(response.json())
+            except CircuitOpenError as e:
+                return self._fail(method, VKAPIError(str(e)))
+            except (requests.exceptions.RequestException, ValueError) as e:
+                error = VKAPIError(f"Ошибка сети: {e}")
+            except VKAPIError as e:
+                error = e
+            except BaseException:
+                # Прерванный запрос (отмена задачи, KeyboardInterrupt) не
+                # является ни успехом, ни сбоем
+                if is_probe:
+                    breaker.release_probe()
+                raise
+            else:
+                breaker.record_success()
+                return APIResult(method, data)
+
+            delay = self._on_attempt_failed(method, breaker, error, attempt)
+            if delay is None:
+                return self._fail(method, error)
+            time.sleep(delay)
+
+    def _group_members_params(self, group_id: int, offset: int) -> dict:
+        """Параметры запроса `groups.getMembers`."""
+        return {
             "group_id": group_id,
-            "count": 1000,
+            "count": MEMBERS_PAGE_SIZE,
             "offset": offset,
-            "fields": "city,sex,last_seen,bdate,relation,\
-                can_write_private_message",
+            "fields": MEMBER_FIELDS,
         }
 
-        response = self._make_request("groups.getMembers", params)
-        return response.get("response", {}).get("items", [])
+    @staticmethod
+    def _filter_members_code(
+        group_id: int, offset: int, sex: int, city_id: int, pages: int
+    ) -> str:
+        """Программа VKScript для `fetch_group_members_filtered`."""
+        return FILTER_MEMBERS_CODE % {
+            "group_id": int(group_id),
+            "offset": int(offset),
+            "pages": max(1, min(int(pages), VKApiService.EXECUTE_MAX_CALLS)),
+            "sex": int(sex),
+            "city": int(city_id),
+            "page_size": MEMBERS_PAGE_SIZE,
+            "fields": MEMBER_FIELDS,
+        }
+
+    @staticmethod
+    def _check_filtered_members(result: APIResult) -> APIResult:
+        """
+        Превращает ответ `FILTER_MEMBERS_CODE` с `failed` в ошибку.
+
+        Иначе неполный ответ был бы принят потоком участников за конец
+        группы. Код ошибки берется из первой ошибки `execute_errors`.
+        """
+
+        response = result.response
+        if not result.ok or not (
+            isinstance(response, dict) and response.get("failed")
+        ):
+            return result
+
+        errors = result.data.get("execute_errors") or [{}]
+        code = errors[0].get("error_code")
+        return APIResult(result.method, error=VKAPIError(
+            "Ошибка groups.getMembers внутри execute "
+            f"({code}): {errors[0].get('error_msg', 'Unknown error')}",
+            code=code
+        ))
+
+    def _prepare_params(self, params: dict[str, any]) -> dict[str, any]:
+        """Добавляет к параметрам запроса ключ доступа и версию API."""
+        return {**params, "access_token": self.token, "v": self.api_version}
+
+    def _on_attempt_failed(
+        self,
+        method: str,
+        breaker: CircuitBreaker,
+        error: VKAPIError,
+        attempt: int
+    ) -> float | None:
+        """
+        Учитывает неудавшуюся попытку запроса.
+
+        Сбоем для выключателя считаются только сетевые ошибки и ошибки
+        сервера VK. Остальные ошибки означают, что VK отвечает.
+
+        ### Возвращает:
+        - float | None: Задержка перед повтором или None, если запрос
+          повторять не нужно.
+        """
+
+        if error.code is None or error.code in SERVER_ERROR_CODES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        if not self.retry_policy.should_retry(error.code, attempt):
+            return None
+
+        counters.inc(f"retries.{method}")
+        delay = self.retry_policy.get_delay(attempt)
+        self.logger.warning(
+            "Повтор %s через %.2f с (попытка %d): %s",
+            method, delay, attempt, error
+        )
+        return delay
+
+    def _fail(self, method: str, error: VKAPIError) -> APIResult:
+        """Возвращает результат неудавшегося запроса."""
+        counters.inc(f"failures.{method}")
+        self.logger.error("Ошибка при выполнении запроса: %s", error)
+        return APIResult(method, error=error)
 
     def _make_request(self, method: str, params: dict[str, any]) \
         -> dict[str, any]:
         """
         Базовый метод для выполнения запросов к VK API с обработкой ошибок.
-        """
 
-        url = self.api_url + method
-        params["access_token"] = self.token
-        params["v"] = self.api_version
-
-        try:
-            response = requests.get(
-                url,
-                params=params,
-                headers={"User-Agent": "VKMatchSensei"},
-                timeout=self.timeout,
-            )
-            data = response.json()
-            return self._handle_response_errors(data)
-        except (
-            requests.exceptions.RequestException,
-            ValueError,
-            VKAPIError,
-            VKAPIAuthError
-        ) as e:
-            self.logger.error("Ошибка при выполнении запроса: %s", e)
-            return {}
+        ### Возвращает:
+        - dict: Ответ VK или пустой словарь, если запрос не удался.
+          Чтобы отличить ошибку от пустого ответа, используйте `request()`.
+        """
+        return self.request(method, params).data
 
     def _handle_response_errors(self, data: dict) -> dict:
         """Обрабатывает ошибки, полученные от VK API."""
@@ -184,11 +684,18 @@ class VKApiService:
 
             error_msg = self.error_messages.get(error_code, error_msg)
 
+            if error_code in THROTTLE_ERROR_CODES:
+                self.rate_limiter.report_throttled()
+
             if error_code == 5:
                 raise VKAPIAuthError(
-                    f"Ошибка авторизации ({error_code}): {error_msg}"
+                    f"Ошибка авторизации ({error_code}): {error_msg}",
+                    code=error_code
                 )
 
-            raise VKAPIError(f"Ошибка от API VK ({error_code}): {error_msg}")
+            raise VKAPIError(
+                f"Ошибка от API VK ({error_code}): {error_msg}",
+                code=error_code
+            )
 
         return data
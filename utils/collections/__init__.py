@@ -0,0 +1,21 @@
+"""
+Пакет с компактными структурами данных.
+
+### Классы:
+- `CompactIntSet`: Множество неотрицательных целых чисел, занимающее
+  2 байта на элемент.
+- `BloomFilter`: Фильтр Блума для целых чисел с заданной долей ложных
+  срабатываний.
+- `LRUCache`: Потокобезопасный кэш с вытеснением LRU и временем жизни
+  записей.
+"""
+
+from .bloom_filter import BloomFilter
+from .int_set import CompactIntSet
+from .lru_cache import LRUCache
+
+__all__ = [
+    "BloomFilter",
+    "CompactIntSet",
+    "LRUCache",
+]
@@ -0,0 +1,189 @@
+"""
+Потокобезопасный кэш с вытеснением LRU и временем жизни записей.
+
+Кэш хранит не больше `max_size` записей: при переполнении удаляется
+запись, которую дольше всех не читали. Запись старше `ttl` секунд
+считается отсутствующей и удаляется при чтении. Значение None
+кэшируется как обычное, поэтому отсутствие строки в базе данных тоже
+запоминается; промах отличается от него значением `default` метода
+`get()`.
+
+Чтение при промахе не должно вернуть в кэш значение, устаревшее за время
+загрузки: версия ключа (`version()`) запоминается до загрузки и
+передается в `set()`, и если ключ за это время удален (`invalidate()`)
+или записан, значение не сохраняется. Версии хранятся в
+`VERSION_SLOTS` счетчиках по хэшу ключа, поэтому их объем не зависит от
+количества ключей; совпадение хэшей лишь изредка отменяет сохранение.
+
+### Пример использования:
+```python
+cache = LRUCache(max_size=10_000, ttl=300)
+values = cache.get(user_id, MISSING)
+if values is MISSING:
+    version = cache.version(user_id)
+    values = load(user_id)
+    cache.set(user_id, values, version)
+print(cache.stats()["hit_rate"])
+```
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# Количество счетчиков версий ключей
+VERSION_SLOTS = 1024
+
+
+class LRUCache:
+    """
+    Кэш с вытеснением LRU и временем жизни записей.
+
+    ### Аргументы:
+    - max_size (int): Максимальное количество записей. 0 — кэш отключен.
+    - ttl (float): Время жизни записи в секундах. 0 — кэш отключен.
+
+    ### Методы:
+    - `get()`: Возвращает значение или `default`.
+    - `version()`: Возвращает версию ключа.
+    - `set()`: Сохраняет значение.
+    - `invalidate()`: Удаляет запись или все записи.
+    - `stats()`: Возвращает статистику кэша.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.__entries: OrderedDict[Hashable, tuple[float, Any]] = \
+            OrderedDict()
+        # Версия ключа — поколение кэша и счетчик изменений его слота
+        self.__generation = 0
+        self.__versions = [0] * VERSION_SLOTS
+        self.__lock = threading.Lock()
+        self.__counters = dict.fromkeys(
+            (
+                "hits", "misses", "evictions", "expired", "invalidations",
+                "stale_sets"
+            ),
+            0
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Кэш включен."""
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Возвращает значение по ключу или `default`, если его нет."""
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__counters["misses"] += 1
+                return default
+
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.__entries[key]
+                self.__counters["expired"] += 1
+                self.__counters["misses"] += 1
+                return default
+
+            self.__entries.move_to_end(key)
+            self.__counters["hits"] += 1
+            return value
+
+    def version(self, key: Hashable) -> tuple[int, int]:
+        """
+        Возвращает версию ключа для `set()`.
+
+        Версия меняется при каждом `invalidate()` и `set()` ключа.
+        """
+        with self.__lock:
+            return self.__generation, self.__versions[self.__slot(key)]
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        version: tuple[int, int] | None = None
+    ) -> None:
+        """
+        Сохраняет значение, вытесняя давно не читавшиеся записи.
+
+        ### Аргументы:
+        - key (Hashable): Ключ.
+        - value (Any): Значение.
+        - version (tuple[int, int], optional): Версия ключа из
+          `version()`, полученная до загрузки значения. Если ключ с тех
+          пор изменился, значение не сохраняется.
+        """
+
+        if not self.enabled:
+            return
+
+        slot = self.__slot(key)
+        with self.__lock:
+            if version is not None \
+                    and version != (self.__generation, self.__versions[slot]):
+                self.__counters["stale_sets"] += 1
+                return
+
+            self.__versions[slot] += 1
+            self.__entries[key] = (time.monotonic(), value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.__counters["evictions"] += 1
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Удаляет запись `key` или, если ключ не указан, все записи."""
+
+        with self.__lock:
+            if key is None:
+                self.__generation += 1
+                self.__counters["invalidations"] += len(self.__entries)
+                self.__entries.clear()
+                return
+
+            # Версия меняется, даже если записи нет: ее может загружать
+            # другой поток
+            self.__versions[self.__slot(key)] += 1
+            if self.__entries.pop(key, None) is not None:
+                self.__counters["invalidations"] += 1
+
+    @staticmethod
+    def __slot(key: Hashable) -> int:
+        """Номер счетчика версий ключа."""
+        return hash(key) % VERSION_SLOTS
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику кэша.
+
+        ### Возвращает:
+        - dict: Счетчики `hits`, `misses`, `evictions` (вытеснено LRU),
+          `expired` (удалено по времени жизни), `invalidations`,
+          `stale_sets` (не сохранено из-за изменения версии), доля
+          попаданий `hit_rate`, количество записей `size`, `max_size` и
+          `ttl`.
+        """
+
+        with self.__lock:
+            counters = dict(self.__counters)
+            size = len(self.__entries)
+
+        lookups = counters["hits"] + counters["misses"]
+        hit_rate = counters["hits"] / lookups if lookups else 0.0
+        return {
+            **counters,
+            "hit_rate": round(hit_rate, 3),
+            "size": size,
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,21 @@
+"""
+Пакет для сбора метрик бота.
+
+### Модули:
+- `counter`: Счетчики событий.
+- `histogram`: Гистограммы длительностей.
+
+### Классы:
+- `CounterRegistry`: Набор именованных счетчиков.
+- `Histogram`: Гистограмма с фиксированными границами корзин.
+- `HistogramRegistry`: Набор гистограмм, сгруппированных по имени.
+"""
+
+from .counter import CounterRegistry
+from .histogram import Histogram, HistogramRegistry
+
+__all__ = [
+    "CounterRegistry",
+    "Histogram",
+    "HistogramRegistry",
+]
@@ -0,0 +1,36 @@
+"""
+Счетчики событий.
+
+### Пример использования:
+```python
+counters = CounterRegistry()
+counters.inc("retries.groups.getMembers")
+print(counters.as_dict())
+```
+"""
+
+import threading
+from collections import defaultdict
+
+
+class CounterRegistry:
+    """Потокобезопасный набор именованных счетчиков."""
+
+    def __init__(self) -> None:
+        self.__values: defaultdict[str, float] = defaultdict(int)
+        self.__lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        """Увеличивает счетчик `name` на `amount`."""
+        with self.__lock:
+            self.__values[name] += amount
+
+    def get(self, name: str) -> float:
+        """Возвращает значение счетчика."""
+        with self.__lock:
+            return self.__values.get(name, 0)
+
+    def as_dict(self) -> dict[str, float]:
+        """Возвращает все счетчики в виде словаря."""
+        with self.__lock:
+            return dict(sorted(self.__values.items()))
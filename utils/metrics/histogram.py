@@ -0,0 +1,142 @@
+"""
+Гистограммы длительностей.
+
+Гистограмма хранит количество значений в корзинах с фиксированными
+границами, поэтому запись значения не требует памяти под само значение,
+а перцентили оцениваются по верхней границе корзины.
+
+### Пример использования:
+```python
+registry = HistogramRegistry()
+registry.observe("users.get", 0.042)
+print(registry.as_dict()["users.get"]["p95"])
+```
+"""
+
+import bisect
+import threading
+
+# Границы корзин в секундах, подходят для сетевых запросов
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Histogram:
+    """
+    Потокобезопасная гистограмма значений.
+
+    ### Аргументы:
+    - buckets (tuple[float, ...]): Возрастающие верхние границы корзин.
+      Значения больше последней границы попадают в корзину `inf`.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        if list(buckets) != sorted(buckets):
+            raise ValueError("Границы корзин должны возрастать.")
+
+        self.buckets = tuple(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.__counts = [0] * (len(self.buckets) + 1)
+        self.__lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Добавляет значение."""
+
+        idx = bisect.bisect_left(self.buckets, value)
+        with self.__lock:
+            self.__counts[idx] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """
+        Оценивает перцентиль по границам корзин.
+
+        ### Аргументы:
+        - q (float): Доля от 0 до 1.
+
+        ### Возвращает:
+        - float: Верхняя граница корзины, в которую попадает перцентиль.
+          Для корзины `inf` — максимальное значение.
+        """
+
+        with self.__lock:
+            if not self.count:
+                return 0.0
+
+            rank = q * self.count
+            seen = 0
+            for idx, bucket_count in enumerate(self.__counts):
+                seen += bucket_count
+                if seen >= rank and bucket_count:
+                    break
+
+            return self.buckets[idx] if idx < len(self.buckets) else self.max
+
+    def as_dict(self) -> dict:
+        """
+        Возвращает гистограмму в виде словаря.
+
+        ### Возвращает:
+        - dict: Количество значений, сумма, среднее, максимум, оценки
+          p50/p95/p99 и количество значений в каждой корзине (ключи —
+          верхние границы, `inf` — значения больше последней границы).
+        """
+
+        p50, p95, p99 = (self.percentile(q) for q in (0.5, 0.95, 0.99))
+        with self.__lock:
+            labels = [str(bucket) for bucket in self.buckets] + ["inf"]
+            return {
+                "count": self.count,
+                "sum": round(self.total, 6),
+                "avg": (
+                    round(self.total / self.count, 6) if self.count else 0.0
+                ),
+                "max": round(self.max, 6),
+                "p50": p50,
+                "p95": p95,
+                "p99": p99,
+                "buckets": dict(zip(labels, self.__counts)),
+            }
+
+
+class HistogramRegistry:
+    """
+    Набор гистограмм, создаваемых по имени при первом значении.
+
+    ### Аргументы:
+    - buckets (tuple[float, ...]): Границы корзин для новых гистограмм.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.__histograms: dict[str, Histogram] = {}
+        self.__lock = threading.Lock()
+
+    def get(self, name: str) -> Histogram:
+        """Возвращает гистограмму по имени, создавая ее при необходимости."""
+
+        histogram = self.__histograms.get(name)
+        if histogram is None:
+            with self.__lock:
+                histogram = self.__histograms.setdefault(
+                    name, Histogram(self.buckets)
+                )
+        return histogram
+
+    def observe(self, name: str, value: float) -> None:
+        """Добавляет значение в гистограмму `name`."""
+        self.get(name).observe(value)
+
+    def as_dict(self) -> dict[str, dict]:
+        """Возвращает все гистограммы в виде словаря "имя -> гистограмма"."""
+        with self.__lock:
+            histograms = dict(self.__histograms)
+        return {
+            name: histogram.as_dict()
+            for name, histogram in sorted(histograms.items())
+        }